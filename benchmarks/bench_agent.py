@@ -0,0 +1,405 @@
+"""End-to-end and per-tool benchmarks of the agent, fully offline.
+
+Builds synthetic homes (see synthetic_hass.py) and answers queries through
+the real provider clients against a local fake provider server (see
+fake_provider.py), measuring process_query latency per provider, the
+latency of each read tool including encoding its result for the model,
+Python allocations (tracemalloc) and process RSS. Results are written as
+JSON; with --baseline, a previous results file is compared and the run
+fails if a p50 latency regressed by more than --max-regression.
+
+Needs Home Assistant installed, as for the tests. Run from the repository
+root:
+
+    python benchmarks/bench_agent.py [--entities 500 5000 20000]
+        [--providers openai anthropic gemini local] [--queries 20]
+        [--concurrency 1] [--latency-ms 0] [--output bench_agent.json]
+        [--baseline previous.json] [--max-regression 1.25]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from homeassistant.const import __version__ as HA_VERSION  # noqa: E402
+
+from custom_components.ai_agent_ha.agent import AiAgentHaAgent  # noqa: E402
+from custom_components.ai_agent_ha.client_registry import (  # noqa: E402
+    ClientRegistry,
+)
+from custom_components.ai_agent_ha.const import DOMAIN  # noqa: E402
+from custom_components.ai_agent_ha.home_digest import HomeDigest  # noqa: E402
+from custom_components.ai_agent_ha.metrics import MetricsCollector  # noqa: E402
+from custom_components.ai_agent_ha.state_cache import (  # noqa: E402
+    EntityStateCache,
+    encode_data_payload,
+)
+from fake_provider import FakeProvider, point_client_at, provider_config  # noqa: E402
+from synthetic_hass import SyntheticHome, async_create_home  # noqa: E402
+
+PROVIDERS = ("openai", "anthropic", "gemini", "local")
+
+# Read tools timed on their own: name -> call on (agent, home)
+TOOLS: Dict[str, Callable[[AiAgentHaAgent, SyntheticHome], Awaitable[Any]]] = {
+    "get_entity_state": lambda agent, home: agent.get_entity_state(home.entity_ids[0]),
+    "get_entities_by_domain": lambda agent, home: agent.get_entities_by_domain("light"),
+    "get_entities_by_area": lambda agent, home: agent.get_entities_by_area(
+        home.area_ids[0]
+    ),
+    "get_entities": lambda agent, home: agent.get_entities(area_ids=home.area_ids[:3]),
+    "get_entities_by_device_class": lambda agent, home: (
+        agent.get_entities_by_device_class("temperature", "sensor")
+    ),
+    "get_climate_related_entities": lambda agent, home: (
+        agent.get_climate_related_entities()
+    ),
+    "get_entity_registry": lambda agent, home: agent.get_entity_registry(),
+    "get_device_registry": lambda agent, home: agent.get_device_registry(),
+    "get_area_registry": lambda agent, home: agent.get_area_registry(),
+}
+
+
+def query_script(home: SyntheticHome) -> List[str]:
+    """Return the replies of a typical query: two lookups, then an answer."""
+    return [
+        json.dumps(
+            {
+                "request_type": "get_entities_by_area",
+                "parameters": {"area_id": home.area_ids[0]},
+            }
+        ),
+        json.dumps(
+            {
+                "request_type": "get_entity_state",
+                "parameters": {"entity_id": home.entity_ids[0]},
+            }
+        ),
+        json.dumps(
+            {
+                "request_type": "final_response",
+                "response": "The light in Area 0 is on at 70% brightness.",
+            }
+        ),
+    ]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Return count, mean and nearest-rank percentiles of samples in ms."""
+    ordered = sorted(samples_ms)
+
+    def percentile(pct: float) -> float:
+        rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+        return round(ordered[rank - 1], 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def rss_kib() -> Dict[str, int]:
+    """Return the current (Linux only) and peak resident set size in KiB."""
+    usage: Dict[str, int] = {}
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+        usage["current_kib"] = pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    usage["peak_kib"] = peak // 1024 if sys.platform == "darwin" else peak
+    return usage
+
+
+async def measure_allocations(func: Callable[[], Awaitable[Any]]) -> Dict[str, float]:
+    """Run func once under tracemalloc; return peak and retained KiB."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = await func()
+        after, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib": round((peak - before) / 1024, 1),
+        "retained_kib": round((after - before) / 1024, 1),
+    }
+
+
+async def setup_integration(home: SyntheticHome) -> None:
+    """Create the shared objects async_setup_entry would create."""
+    hass = home.hass
+    hass.data[DOMAIN] = {
+        "agents": {},
+        "configs": {},
+        "client_registry": ClientRegistry(),
+        "metrics": MetricsCollector(),
+    }
+    home_digest = HomeDigest(hass)
+    await home_digest.async_start()
+    hass.data[DOMAIN]["home_digest"] = home_digest
+    state_cache = EntityStateCache(hass)
+    state_cache.async_start()
+    hass.data[DOMAIN]["state_cache"] = state_cache
+
+
+async def bench_queries(
+    home: SyntheticHome,
+    provider: str,
+    base_url: str,
+    queries: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Time process_query end to end for one provider."""
+    config = provider_config(provider, base_url)
+    home.hass.data[DOMAIN]["configs"][provider] = config
+    agent = AiAgentHaAgent(home.hass, config, persist_history=False)
+    # The client is shared through the registry, so redirecting it once
+    # redirects every ephemeral agent below
+    point_client_at(agent.ai_client, provider, base_url)
+
+    counter = iter(range(sys.maxsize))
+
+    async def run_query() -> Dict[str, Any]:
+        # A fresh conversation and prompt per query, so no cached answers
+        query_agent = agent.create_ephemeral_agent()
+        result = await query_agent.process_query(
+            f"Is the light in Area 0 on? ({next(counter)})", provider=provider
+        )
+        if not result.get("success"):
+            raise RuntimeError(f"{provider} query failed: {result.get('error')}")
+        return result
+
+    await run_query()  # warm-up
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_query() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await run_query()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed_query() for _ in range(queries)))
+    elapsed = time.perf_counter() - started
+
+    metrics = home.hass.data[DOMAIN]["metrics"].provider_summary(provider)
+    return {
+        **summarize(latencies),
+        "queries_per_s": round(queries / elapsed, 2),
+        "ai_requests_per_query": metrics["iterations_per_query"],
+        "prompt_tokens_per_query": round(
+            metrics["prompt_tokens"] / max(metrics["queries"], 1), 1
+        ),
+        "allocations": await measure_allocations(run_query),
+    }
+
+
+async def bench_tools(
+    home: SyntheticHome, base_url: str, repeat: int
+) -> Dict[str, Dict[str, Any]]:
+    """Time each read tool, including encoding its result for the model."""
+    agent = AiAgentHaAgent(
+        home.hass, provider_config("openai", base_url), persist_history=False
+    )
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, tool in TOOLS.items():
+
+        async def call(tool=tool) -> str:
+            return encode_data_payload(await tool(agent, home))
+
+        started = time.perf_counter()
+        payload = await call()
+        cold_ms = (time.perf_counter() - started) * 1000
+        if isinstance(payload, str) and '"error"' in payload[:100]:
+            raise RuntimeError(f"{name} failed: {payload[:200]}")
+
+        samples: List[float] = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await call()
+            samples.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            **summarize(samples),
+            "cold_ms": round(cold_ms, 3),
+            "result_chars": len(payload),
+            "allocations": await measure_allocations(call),
+        }
+    return results
+
+
+async def bench_home(
+    entities: int, args: argparse.Namespace, fake: FakeProvider
+) -> Dict[str, Any]:
+    """Run all benchmarks against one home size."""
+    started = time.perf_counter()
+    home = await async_create_home(entities)
+    build_s = time.perf_counter() - started
+    try:
+        await setup_integration(home)
+        fake.script = query_script(home)
+        print(
+            f"{entities} entities ({len(home.area_ids)} areas, built in {build_s:.1f}s)"
+        )
+
+        tools = await bench_tools(home, fake.url, args.repeat)
+        for name, result in tools.items():
+            print(
+                f"  tool {name:<30} p50 {result['p50_ms']:9.3f} ms"
+                f"  p95 {result['p95_ms']:9.3f} ms  {result['result_chars']:>9} chars"
+            )
+
+        queries: Dict[str, Any] = {}
+        for provider in args.providers:
+            queries[provider] = result = await bench_queries(
+                home, provider, fake.url, args.queries, args.concurrency
+            )
+            print(
+                f"  query {provider:<29} p50 {result['p50_ms']:9.3f} ms"
+                f"  p95 {result['p95_ms']:9.3f} ms  {result['queries_per_s']:>7} q/s"
+            )
+
+        return {
+            "entities": entities,
+            "areas": len(home.area_ids),
+            "devices": len(home.device_ids),
+            "build_s": round(build_s, 3),
+            "tools": tools,
+            "queries": queries,
+            "rss": rss_kib(),
+        }
+    finally:
+        for key in ("home_digest", "state_cache"):
+            if (component := home.hass.data[DOMAIN].get(key)) is not None:
+                component.async_stop()
+        await home.async_stop()
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float
+) -> List[str]:
+    """Return the p50 latencies that regressed by more than max_regression."""
+
+    def p50s(report: Dict[str, Any]) -> Dict[Tuple[int, str, str], float]:
+        return {
+            (run["entities"], section, name): values["p50_ms"]
+            for run in report["results"]
+            for section in ("tools", "queries")
+            for name, values in run[section].items()
+        }
+
+    current = p50s(results)
+    regressions = []
+    for key, before in p50s(baseline).items():
+        after = current.get(key)
+        # Sub-millisecond timings are too noisy to compare by ratio
+        if after is None or max(before, after) < 1:
+            continue
+        if after > before * max_regression:
+            entities, section, name = key
+            regressions.append(
+                f"{entities} entities, {section} {name}: "
+                f"p50 {before:.3f} -> {after:.3f} ms ({after / before:.2f}x)"
+            )
+    return regressions
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    """Run the suite and write the results."""
+    baseline = None
+    if args.baseline:
+        # Read first, so the baseline may be the file being overwritten
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    fake = FakeProvider(["{}"], latency=args.latency_ms / 1000)
+    await fake.start()
+    try:
+        runs = [await bench_home(entities, args, fake) for entities in args.entities]
+    finally:
+        await fake.stop()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "homeassistant": HA_VERSION,
+            "queries": args.queries,
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "provider_latency_ms": args.latency_ms,
+        },
+        "results": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        for setting in ("concurrency", "provider_latency_ms", "homeassistant"):
+            if baseline["meta"].get(setting) != results["meta"][setting]:
+                print(
+                    f"Warning: {setting} differs from the baseline "
+                    f"({baseline['meta'].get(setting)} vs {results['meta'][setting]})"
+                )
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+def main() -> None:
+    """Parse the arguments and run the suite."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entities", type=int, nargs="+", default=[500, 5000, 20000])
+    parser.add_argument(
+        "--providers", nargs="+", choices=PROVIDERS, default=list(PROVIDERS)
+    )
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=10, help="runs per tool")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0, help="fake provider response delay"
+    )
+    parser.add_argument("--output", default="bench_agent.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=1.25)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
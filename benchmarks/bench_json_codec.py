@@ -0,0 +1,118 @@
+"""Microbenchmarks for the JSON codec on registry- and history-sized payloads.
+
+Compares the previous json.dumps(..., default=str) path with each available
+codec backend. Run from the repository root:
+
+    python benchmarks/bench_json_codec.py [--entities 1500] [--number 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+CODEC_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "custom_components",
+    "ai_agent_ha",
+    "json_codec.py",
+)
+
+
+def load_codec():
+    """Import json_codec.py directly, without the integration package."""
+    spec = importlib.util.spec_from_file_location("json_codec", CODEC_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def entity_registry_payload(count: int) -> List[Dict[str, Any]]:
+    """Build a get_entity_registry style result."""
+    domains = ("light", "sensor", "switch", "binary_sensor", "climate", "cover")
+    return [
+        {
+            "entity_id": f"{domains[i % len(domains)]}.device_{i}",
+            "device_id": f"{i:032x}",
+            "platform": "zha",
+            "disabled": False,
+            "area_id": f"area_{i % 12}",
+            "original_name": f"Device {i}",
+            "unique_id": f"00:11:22:33:{i % 256:02x}:{i // 256:02x}-1",
+        }
+        for i in range(count)
+    ]
+
+
+def history_payload(entities: int, points: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Build a get_history style result with datetime values."""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return {
+        f"sensor.temperature_{e}": [
+            {
+                "state": f"{20 + (p % 50) / 10:.1f}",
+                "last_changed": start + timedelta(minutes=5 * p),
+                "attributes": {
+                    "unit_of_measurement": "°C",
+                    "device_class": "temperature",
+                    "friendly_name": f"Temperature {e}",
+                },
+            }
+            for p in range(points)
+        ]
+        for e in range(entities)
+    }
+
+
+def bench(label: str, func: Callable[[], Any], number: int) -> float:
+    """Time func and print the best per-call duration in milliseconds."""
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number * 1000
+    print(f"  {label:<28} {best:8.3f} ms")
+    return best
+
+
+def main() -> None:
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=1500)
+    parser.add_argument("--history-entities", type=int, default=20)
+    parser.add_argument("--points", type=int, default=288)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    codec = load_codec()
+    payloads = {
+        f"entity registry ({args.entities})": entity_registry_payload(args.entities),
+        f"history ({args.history_entities}x{args.points})": history_payload(
+            args.history_entities, args.points
+        ),
+    }
+
+    for name, payload in payloads.items():
+        baseline_text = json.dumps({"data": payload}, default=str)
+        print(f"{name}: {len(baseline_text)} chars with json.dumps(default=str)")
+        bench(
+            "encode json.dumps", lambda: json.dumps(payload, default=str), args.number
+        )
+        for backend in codec.available_backends():
+            codec.use_backend(backend)
+            text = codec.dumps(payload)
+            bench(
+                f"encode {backend} ({len(text)} chars)",
+                lambda: codec.dumps(payload),
+                args.number,
+            )
+        bench("decode json.loads", lambda: json.loads(baseline_text), args.number)
+        for backend in codec.available_backends():
+            codec.use_backend(backend)
+            bench(f"decode {backend}", lambda: codec.loads(baseline_text), args.number)
+
+
+if __name__ == "__main__":
+    main()
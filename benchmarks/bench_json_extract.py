@@ -0,0 +1,105 @@
+"""Microbenchmarks for extracting the JSON command from model output.
+
+Compares the previous process_query parsing (invisible character cleanup,
+json loads, then a first "{" to last "}" retry) with json_extract on clean,
+decorated and pathological replies. Run from the repository root:
+
+    python benchmarks/bench_json_extract.py [--number 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import timeit
+import types
+from typing import Any, Callable, Dict, Optional
+
+PACKAGE_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "custom_components", "ai_agent_ha"
+)
+INVISIBLE_CHARS = ["\ufeff", "\u200b", "\u200c", "\u200d", "\u2060"]
+
+
+def load_extractor():
+    """Import json_extract.py and json_codec.py without the integration."""
+    package = types.ModuleType("ai_agent_ha_bench")
+    package.__path__ = [PACKAGE_DIR]
+    sys.modules["ai_agent_ha_bench"] = package
+    return importlib.import_module("ai_agent_ha_bench.json_extract")
+
+
+def previous_parse(response: str) -> Optional[Dict[str, Any]]:
+    """The parsing json_extract replaced in process_query."""
+    response_clean = response.strip()
+    for char in INVISIBLE_CHARS:
+        response_clean = response_clean.replace(char, "")
+    try:
+        return json.loads(response_clean)
+    except json.JSONDecodeError:
+        json_start = response_clean.find("{")
+        json_end = response_clean.rfind("}")
+        if json_start != -1 and json_end > json_start:
+            try:
+                return json.loads(response_clean[json_start : json_end + 1])
+            except (json.JSONDecodeError, RecursionError):
+                return None
+        return None
+
+
+def replies() -> Dict[str, str]:
+    """Build the model replies to parse."""
+    command = json.dumps(
+        {
+            "request_type": "get_entities_by_domain",
+            "parameters": {"domain": "light", "fields": ["state"]},
+        }
+    )
+    answer = json.dumps(
+        {"request_type": "final_response", "response": "The lights are off. " * 200}
+    )
+    return {
+        "clean command": command,
+        "fenced command": f"```json\n{command}\n```",
+        "command + trailing text": f"{command}\nLet me know if you need more {{help}}.",
+        "concatenated commands": command + command + command,
+        "long answer (4 KB)": answer,
+        "plain prose (100 KB)": "The living room lights are on. " * 3300,
+        "1 MB of '{'": "{" * 1_000_000,
+        "unterminated string": '{"request_type": "final_response", "response": "'
+        + "x" * 100_000,
+        "deep nesting": '{"a":' * 5000 + "1" + "}" * 5000,
+    }
+
+
+def bench(label: str, func: Callable[[], Any], number: int) -> float:
+    """Time func and print the best per-call duration in milliseconds."""
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number * 1000
+    print(f"  {label:<28} {best:10.4f} ms")
+    return best
+
+
+def main() -> None:
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    json_extract = load_extractor()
+    for name, reply in replies().items():
+        previous = previous_parse(reply)
+        current = json_extract.extract_json(reply).command
+        print(
+            f"{name}: {len(reply)} chars, previous found a command: "
+            f"{isinstance(previous, dict) and 'request_type' in previous}, "
+            f"json_extract: {current is not None}"
+        )
+        bench("previous", lambda: previous_parse(reply), args.number)
+        bench("json_extract", lambda: json_extract.extract_json(reply), args.number)
+
+
+if __name__ == "__main__":
+    main()
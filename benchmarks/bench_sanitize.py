@@ -0,0 +1,165 @@
+"""Microbenchmarks for sanitize_for_logging on trace-sized payloads.
+
+Compares the previous recursive implementation (a substring scan of every
+lowercased key against each pattern, copying every container) with the
+iterative walk, with and without copy_on_write, on debug-trace style
+payloads of about 1 MB. Run from the repository root:
+
+    python benchmarks/bench_sanitize.py [--size-mb 1] [--number 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import timeit
+from typing import Any, Callable, Dict, List
+
+SANITIZE_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "custom_components",
+    "ai_agent_ha",
+    "sanitize.py",
+)
+
+PREVIOUS_PATTERNS = {
+    "token",
+    "key",
+    "password",
+    "secret",
+    "credential",
+    "auth",
+    "authorization",
+    "api_key",
+    "apikey",
+    "llama_token",
+    "openai_token",
+    "gemini_token",
+    "anthropic_token",
+    "openrouter_token",
+    "alter_token",
+    "zai_token",
+}
+
+
+def load_sanitize():
+    """Import sanitize.py directly, without the integration package."""
+    spec = importlib.util.spec_from_file_location("sanitize", SANITIZE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def previous_sanitize(data: Any, mask: str = "***REDACTED***") -> Any:
+    """The recursive implementation sanitize.py replaced."""
+    if isinstance(data, dict):
+        sanitized = {}
+        for key, value in data.items():
+            key_lower = str(key).lower()
+            if any(pattern in key_lower for pattern in PREVIOUS_PATTERNS):
+                sanitized[key] = mask
+            else:
+                sanitized[key] = previous_sanitize(value, mask)
+        return sanitized
+    if isinstance(data, list):
+        return [previous_sanitize(item, mask) for item in data]
+    if isinstance(data, tuple):
+        return tuple(previous_sanitize(item, mask) for item in data)
+    return data
+
+
+def entity_state(i: int) -> Dict[str, Any]:
+    """Build a get_entity_state style result."""
+    return {
+        "entity_id": f"sensor.temperature_{i}",
+        "state": f"{20 + (i % 50) / 10:.1f}",
+        "last_changed": "2025-01-01T00:00:00+00:00",
+        "friendly_name": f"Temperature {i}",
+        "area_id": f"area_{i % 12}",
+        "attributes": {
+            "unit_of_measurement": "°C",
+            "device_class": "temperature",
+            "state_class": "measurement",
+        },
+    }
+
+
+def trace_payload(size_bytes: int, with_secrets: bool) -> Dict[str, Any]:
+    """Build a debug trace of tool results and spans of about size_bytes."""
+    trace: Dict[str, Any] = {
+        "provider": "openai",
+        "config": {"ai_provider": "openai", "models": {"openai": "gpt-4o"}},
+        "spans": [],
+        "history": [],
+    }
+    if with_secrets:
+        trace["config"]["openai_token"] = "sk-abc123"
+    i = 0
+    while len(json.dumps(trace)) < size_bytes:
+        batch: List[Dict[str, Any]] = [entity_state(i + n) for n in range(50)]
+        i += 50
+        trace["history"].append({"role": "user", "content": {"data": batch}})
+        trace["spans"].append(
+            {
+                "name": "tool",
+                "attributes": {"request_type": "get_entities_by_domain"},
+                "http": {"headers": {"Content-Type": "application/json"}},
+                "children": [{"name": "encode", "ms": 0.3}],
+            }
+        )
+    return trace
+
+
+def bench(label: str, func: Callable[[], Any], number: int) -> float:
+    """Time func and print the best per-call duration in milliseconds."""
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number * 1000
+    print(f"  {label:<34} {best:8.3f} ms")
+    return best
+
+
+def main() -> None:
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    sanitize = load_sanitize()
+    size = int(args.size_mb * 1024 * 1024)
+    payloads = {
+        "trace without secrets": trace_payload(size, with_secrets=False),
+        "trace with a token": trace_payload(size, with_secrets=True),
+    }
+
+    for name, payload in payloads.items():
+        assert previous_sanitize(payload) == sanitize.sanitize_for_logging(payload)
+        print(f"{name}: {len(json.dumps(payload))} bytes")
+        bench("previous recursive", lambda: previous_sanitize(payload), args.number)
+        bench(
+            "iterative",
+            lambda: sanitize.sanitize_for_logging(payload),
+            args.number,
+        )
+        bench(
+            "iterative, copy_on_write",
+            lambda: sanitize.sanitize_for_logging(payload, copy_on_write=True),
+            args.number,
+        )
+
+    deep = current = {}
+    for _ in range(5000):
+        current["child"] = current = {}
+    print("5000 nested dicts:")
+    try:
+        previous_sanitize(deep)
+        print("  previous recursive                 completed")
+    except RecursionError:
+        print("  previous recursive                 RecursionError")
+    bench("iterative (truncated)", lambda: sanitize.sanitize_for_logging(deep), 100)
+
+
+if __name__ == "__main__":
+    main()
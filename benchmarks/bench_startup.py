@@ -0,0 +1,176 @@
+"""Startup benchmark: integration import time and async_setup_entry duration.
+
+Each measurement runs in a fresh interpreter that has already imported the
+Home Assistant modules loaded during boot, so only the integration's own
+modules are timed. async_setup_entry runs against a mocked hass (as in
+tests/test_ai_agent_ha/test_init.py), so its duration is the integration's
+own setup work, including importing the configured provider's client.
+Pass --ref to compare with the integration at another git revision. Run
+from the repository root:
+
+    python benchmarks/bench_startup.py [--provider openai] [--ref HEAD~1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PACKAGE = "custom_components.ai_agent_ha"
+
+# Modules Home Assistant has loaded before it sets up the integration
+PRELOADED = (
+    "aiohttp",
+    "voluptuous",
+    "yaml",
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.components.frontend",
+    "homeassistant.components.http",
+    "homeassistant.components.websocket_api",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.importlib",
+    "homeassistant.helpers.storage",
+)
+
+
+def worker(root: str, provider: str) -> Dict[str, Any]:
+    """Measure one cold import and setup of the integration under root."""
+    import asyncio
+    import importlib
+    import time
+    from unittest.mock import AsyncMock, MagicMock
+
+    for name in PRELOADED:
+        importlib.import_module(name)
+    sys.path.insert(0, root)
+
+    before = set(sys.modules)
+    started = time.perf_counter()
+    integration = importlib.import_module(PACKAGE)
+    import_ms = (time.perf_counter() - started) * 1000
+    imported = set(sys.modules) - before
+
+    hass = MagicMock()
+    hass.data = {}
+    hass.http.async_register_static_paths = AsyncMock()
+    hass.config.path = MagicMock(return_value=tempfile.gettempdir())
+    hass.config_entries.async_forward_entry_setups = AsyncMock()
+    hass.async_add_import_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+    entry = MagicMock()
+    entry.version = 1
+    entry.data = {
+        "ai_provider": provider,
+        f"{provider}_token": "benchmark-token",
+        "local_url": "http://localhost:11434",
+        "bedrock_access_key": "benchmark",
+        "bedrock_secret_key": "benchmark",
+    }
+
+    async def setup() -> float:
+        started = time.perf_counter()
+        assert await integration.async_setup_entry(hass, entry)
+        return (time.perf_counter() - started) * 1000
+
+    before = set(sys.modules)
+    setup_ms = asyncio.run(setup())
+    imported_in_setup = set(sys.modules) - before
+
+    def lines(modules: set) -> int:
+        total = 0
+        for name in modules:
+            path = getattr(sys.modules[name], "__file__", None) or ""
+            if name.startswith(PACKAGE) and path.endswith(".py"):
+                with open(path, encoding="utf-8") as f:
+                    total += sum(1 for _ in f)
+        return total
+
+    return {
+        "import_ms": import_ms,
+        "setup_ms": setup_ms,
+        "modules": sorted(m for m in imported if m.startswith(PACKAGE)),
+        "import_lines": lines(imported),
+        "setup_modules": sorted(m for m in imported_in_setup if m.startswith(PACKAGE)),
+    }
+
+
+def measure(root: str, provider: str, runs: int) -> List[Dict[str, Any]]:
+    """Run the worker in fresh interpreters."""
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", root, "--provider", provider],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+    return results
+
+
+def export_ref(ref: str, target: str) -> None:
+    """Extract the integration at a git revision into target."""
+    archive = subprocess.run(
+        ["git", "archive", ref, "custom_components"],
+        cwd=REPO_ROOT,
+        check=True,
+        capture_output=True,
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(target, filter="data")
+
+
+def report(label: str, results: List[Dict[str, Any]]) -> None:
+    """Print the best and median timings of a set of runs."""
+    short = [name[len(PACKAGE) + 1 :] or "__init__" for name in results[0]["modules"]]
+    setup = [name[len(PACKAGE) + 1 :] for name in results[0]["setup_modules"]]
+    print(f"{label}:")
+    for key, name in (("import_ms", "import"), ("setup_ms", "async_setup_entry")):
+        values = [result[key] for result in results]
+        print(
+            f"  {name:<18} best {min(values):8.2f} ms, "
+            f"median {statistics.median(values):8.2f} ms"
+        )
+    print(
+        f"  import loaded {len(short)} modules "
+        f"({results[0]['import_lines']} lines): {', '.join(short)}"
+    )
+    print(f"  setup loaded: {', '.join(setup) or 'nothing more'}")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--ref", help="git revision to compare with")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.provider)))
+        return
+
+    # One throwaway run per tree writes the bytecode caches
+    measure(REPO_ROOT, args.provider, 1)
+    report("working tree", measure(REPO_ROOT, args.provider, args.runs))
+    if args.ref:
+        with tempfile.TemporaryDirectory() as target:
+            export_ref(args.ref, target)
+            measure(target, args.provider, 1)
+            report(args.ref, measure(target, args.provider, args.runs))
+
+
+if __name__ == "__main__":
+    main()
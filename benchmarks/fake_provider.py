@@ -0,0 +1,223 @@
+"""Local stand-in for the AI provider APIs used by the benchmarks.
+
+Serves the OpenAI chat completions, Anthropic messages, Gemini
+generateContent and streamGenerateContent (server-sent events) and Ollama
+chat endpoints on one aiohttp server. Replies
+come from a script: the nth reply of a conversation is script[n], where n is
+the number of assistant turns already in the request, so concurrent queries
+each follow the script independently. Each reply is delayed by a
+configurable latency and carries token usage like the real APIs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiohttp import web
+
+# Rough token estimate for the usage fields
+CHARS_PER_TOKEN = 4
+# Characters of reply text per streamed chunk
+STREAM_CHUNK_CHARS = 64
+
+
+class FakeProvider:
+    """aiohttp server answering provider API requests from a script."""
+
+    def __init__(
+        self,
+        script: Sequence[str],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Initialize with the replies of a conversation and a delay in seconds."""
+        if not script:
+            raise ValueError("script needs at least one reply")
+        self.script = list(script)
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+        self.app = web.Application(client_max_size=64 * 1024 * 1024)
+        self.app.router.add_post("/v1/chat/completions", self._openai)
+        self.app.router.add_post("/v1/messages", self._anthropic)
+        self.app.router.add_post("/v1beta/models/{model}:generateContent", self._gemini)
+        self.app.router.add_post(
+            "/v1beta/models/{model}:streamGenerateContent", self._gemini_stream
+        )
+        self.app.router.add_post("/api/chat", self._ollama)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{bound_port}"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _reply(self, messages: List[Dict[str, Any]], assistant_role: str):
+        """Wait for the latency and return (reply, prompt_tokens, completion_tokens)."""
+        self.requests += 1
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        turn = sum(1 for message in messages if message.get("role") == assistant_role)
+        reply = self.script[min(turn, len(self.script) - 1)]
+        prompt_chars = len(json.dumps(messages))
+        return (
+            reply,
+            prompt_chars // CHARS_PER_TOKEN,
+            len(reply) // CHARS_PER_TOKEN,
+        )
+
+    async def _openai(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        reply, prompt_tokens, completion_tokens = await self._reply(
+            body.get("messages", []), "assistant"
+        )
+        return web.json_response(
+            {
+                "id": f"chatcmpl-{self.requests}",
+                "object": "chat.completion",
+                "model": body.get("model", ""),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    async def _anthropic(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        reply, prompt_tokens, completion_tokens = await self._reply(
+            body.get("messages", []), "assistant"
+        )
+        return web.json_response(
+            {
+                "id": f"msg_{self.requests}",
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model", ""),
+                "content": [{"type": "text", "text": reply}],
+                "stop_reason": "end_turn",
+                "usage": {
+                    "input_tokens": prompt_tokens,
+                    "output_tokens": completion_tokens,
+                },
+            }
+        )
+
+    async def _gemini(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        reply, prompt_tokens, completion_tokens = await self._reply(
+            body.get("contents", []), "model"
+        )
+        return web.json_response(
+            {
+                "candidates": [
+                    {
+                        "content": {"role": "model", "parts": [{"text": reply}]},
+                        "finishReason": "STOP",
+                    }
+                ],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": completion_tokens,
+                    "totalTokenCount": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    async def _gemini_stream(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        reply, prompt_tokens, completion_tokens = await self._reply(
+            body.get("contents", []), "model"
+        )
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        chunks = [
+            reply[pos : pos + STREAM_CHUNK_CHARS]
+            for pos in range(0, len(reply), STREAM_CHUNK_CHARS)
+        ] or [""]
+        sent = 0
+        for index, text in enumerate(chunks):
+            sent += len(text)
+            candidate: Dict[str, Any] = {
+                "content": {"role": "model", "parts": [{"text": text}]}
+            }
+            if index == len(chunks) - 1:
+                candidate["finishReason"] = "STOP"
+            # Like the real API, every chunk carries the running usage totals
+            chunk = {
+                "candidates": [candidate],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": sent // CHARS_PER_TOKEN,
+                    "totalTokenCount": prompt_tokens + sent // CHARS_PER_TOKEN,
+                },
+            }
+            await response.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+        await response.write_eof()
+        return response
+
+    async def _ollama(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        reply, prompt_tokens, completion_tokens = await self._reply(
+            body.get("messages", []), "assistant"
+        )
+        return web.json_response(
+            {
+                "model": body.get("model", ""),
+                "message": {"role": "assistant", "content": reply},
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": completion_tokens,
+            }
+        )
+
+
+def provider_config(provider: str, base_url: str) -> Dict[str, Any]:
+    """Return an integration config for a provider served by the fake server."""
+    if provider == "local":
+        return {
+            "ai_provider": "local",
+            "local_url": f"{base_url}/api/chat",
+            "local_api_mode": "ollama",
+            "models": {"local": "bench-model"},
+        }
+    # OpenAI checks for the sk- prefix, the others accept any token
+    return {"ai_provider": provider, f"{provider}_token": "sk-bench-0123456789abcdef"}
+
+
+def point_client_at(client: Any, provider: str, base_url: str) -> None:
+    """Redirect a hosted provider's client to the fake server."""
+    if provider == "openai":
+        client.api_url = f"{base_url}/v1/chat/completions"
+    elif provider == "anthropic":
+        client.api_url = f"{base_url}/v1/messages"
+    elif provider == "gemini":
+        # api_url is derived from base_url and streams by default
+        client.base_url = f"{base_url}/v1beta"
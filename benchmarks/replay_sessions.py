@@ -0,0 +1,254 @@
+"""Replay recorded query sessions against the current code, fully offline.
+
+Sessions are recorded by the integration while the ai_agent_ha.record_sessions
+service has recording switched on (see session_recorder.py). Each session is
+re-run through process_query on a synthetic home (see synthetic_hass.py) with
+a deterministic client that returns the recorded AI responses in order, and
+with the recorded tools answering from their recorded results. Tools the
+current code calls that were not recorded run for real against the synthetic
+home.
+
+Reported per session and turn: the number of AI requests, the messages and
+characters of each prompt (next to the recorded ones) and the CPU time the
+agent spent preparing each request. Every session is replayed with an OpenAI
+configuration, since the client is replaced anyway; prompt building does not
+depend on the provider. The home summary in the system prompt is the
+synthetic home's, so compare prompt sizes between replays rather than with
+the recording.
+
+Needs Home Assistant installed, as for the tests. Run from the repository
+root:
+
+    python benchmarks/replay_sessions.py sessions.jsonl [more.jsonl ...]
+        [--entities 500] [--repeat 5] [--output replay_sessions.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from custom_components.ai_agent_ha.agent import AiAgentHaAgent  # noqa: E402
+from custom_components.ai_agent_ha.const import DOMAIN  # noqa: E402
+from bench_agent import setup_integration  # noqa: E402
+from fake_provider import provider_config  # noqa: E402
+from synthetic_hass import SyntheticHome, async_create_home  # noqa: E402
+
+# Nothing listens here; the replay client never makes requests
+UNUSED_URL = "http://127.0.0.1:9"
+
+
+class ReplayExhausted(Exception):
+    """The current code asked for more AI responses than were recorded."""
+
+
+class ReplayClient:
+    """AI client returning recorded responses and timing the agent between them."""
+
+    def __init__(self, responses: List[str], model: str) -> None:
+        """Initialize with the recorded responses of a session."""
+        self.model = model
+        self.turns: List[Dict[str, Any]] = []
+        self._responses: Deque[str] = deque(responses)
+        self._mark = time.process_time()
+
+    @property
+    def responses_left(self) -> int:
+        """Return how many recorded responses were not asked for."""
+        return len(self._responses)
+
+    def start(self) -> None:
+        """Start timing the agent's first request."""
+        self._mark = time.process_time()
+
+    def stop(self) -> float:
+        """Return the CPU time in ms since the last response."""
+        return (time.process_time() - self._mark) * 1000
+
+    async def get_response(self, messages: List[Dict[str, Any]], **kwargs) -> str:
+        """Return the next recorded response."""
+        self.turns.append(
+            {
+                "messages": len(messages),
+                "prompt_chars": sum(len(str(m.get("content", ""))) for m in messages),
+                "cpu_ms": self.stop(),
+            }
+        )
+        if not self._responses:
+            raise ReplayExhausted("no recorded response left")
+        response = self._responses.popleft()
+        self._mark = time.process_time()
+        return response
+
+
+def load_sessions(paths: List[str]) -> List[Dict[str, Any]]:
+    """Read the sessions of one or more sessions files."""
+    sessions = []
+    for path in paths:
+        with open(path, encoding="utf-8") as sessions_file:
+            sessions.extend(json.loads(line) for line in sessions_file if line.strip())
+    return sessions
+
+
+def recorded_tools(session: Dict[str, Any]) -> Dict[str, Deque[Any]]:
+    """Return the recorded results of each tool, in call order."""
+    tools: Dict[str, Deque[Any]] = defaultdict(deque)
+    for turn in session["turns"]:
+        if "tool" in turn:
+            tools[turn["tool"]].append(turn["result"])
+    return tools
+
+
+async def replay_once(home: SyntheticHome, session: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a session through process_query once."""
+    config = {
+        **provider_config("openai", UNUSED_URL),
+        "models": {"openai": session.get("model") or "gpt-3.5-turbo"},
+    }
+    agent = AiAgentHaAgent(home.hass, config, persist_history=False)
+    client = ReplayClient(
+        [turn["response"] for turn in session["turns"] if "response" in turn],
+        config["models"]["openai"],
+    )
+    agent._get_client = lambda provider, config: client
+    # A diverging replay fails at once instead of backing off between retries
+    agent._max_retries = 1
+    agent._retry_delay = 0
+
+    for name, results in recorded_tools(session).items():
+        if not hasattr(agent, name):
+            continue
+
+        async def recorded_result(*args, _results=results, **kwargs):
+            return _results.popleft() if _results else {"error": "not recorded"}
+
+        setattr(agent, name, recorded_result)
+
+    agent.conversation_history = list(session.get("history", []))
+    client.start()
+    result = await agent.process_query(session["query"])
+    finish_ms = client.stop()
+    return {
+        "success": bool(result.get("success")),
+        "error": result.get("error"),
+        "turns": client.turns,
+        "finish_cpu_ms": finish_ms,
+        "responses_left": client.responses_left,
+    }
+
+
+async def replay_session(
+    home: SyntheticHome, session: Dict[str, Any], repeat: int
+) -> Dict[str, Any]:
+    """Replay a session repeatedly; report median CPU times per turn."""
+    runs = [await replay_once(home, session) for _ in range(repeat)]
+    last = runs[-1]
+    turns = [
+        {
+            "messages": turn["messages"],
+            "prompt_chars": turn["prompt_chars"],
+            "cpu_ms": round(
+                statistics.median(run["turns"][index]["cpu_ms"] for run in runs), 3
+            ),
+        }
+        for index, turn in enumerate(last["turns"])
+    ]
+    recorded = [turn for turn in session["turns"] if "response" in turn]
+    return {
+        "query": session["query"][:80],
+        "provider": session.get("provider"),
+        "model": session.get("model"),
+        "recorded": {
+            "iterations": len(recorded),
+            "prompt_chars": [turn["prompt_chars"] for turn in recorded],
+            "seconds": session.get("seconds"),
+        },
+        "replayed": {
+            "success": last["success"],
+            "error": last["error"],
+            "iterations": len(turns),
+            "responses_left": last["responses_left"],
+            "turns": turns,
+            "cpu_ms": round(
+                sum(turn["cpu_ms"] for turn in turns)
+                + statistics.median(run["finish_cpu_ms"] for run in runs),
+                3,
+            ),
+        },
+    }
+
+
+def print_report(reports: List[Dict[str, Any]]) -> None:
+    """Print one line per session and one per replayed turn."""
+    for report in reports:
+        recorded, replayed = report["recorded"], report["replayed"]
+        status = "ok" if replayed["success"] else f"failed: {replayed['error']}"
+        print(
+            f"{report['query']!r}: {replayed['iterations']} AI requests "
+            f"(recorded {recorded['iterations']}), "
+            f"{replayed['cpu_ms']:.2f} ms CPU, {status}"
+        )
+        for index, turn in enumerate(replayed["turns"]):
+            recorded_chars = (
+                recorded["prompt_chars"][index]
+                if index < len(recorded["prompt_chars"])
+                else "-"
+            )
+            print(
+                f"  turn {index + 1}: {turn['messages']} messages, "
+                f"{turn['prompt_chars']} chars (recorded {recorded_chars}), "
+                f"{turn['cpu_ms']:.2f} ms CPU"
+            )
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    """Replay the sessions and write the results."""
+    sessions = load_sessions(args.sessions)
+    home = await async_create_home(args.entities)
+    try:
+        await setup_integration(home)
+        reports = [
+            await replay_session(home, session, args.repeat) for session in sessions
+        ]
+    finally:
+        for key in ("home_digest", "state_cache"):
+            if (component := home.hass.data.get(DOMAIN, {}).get(key)) is not None:
+                component.async_stop()
+        await home.async_stop()
+
+    print_report(reports)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(
+                {"entities": args.entities, "sessions": reports}, output, indent=2
+            )
+        print(f"Results written to {args.output}")
+    return 0 if all(report["replayed"]["success"] for report in reports) else 1
+
+
+def main() -> None:
+    """Parse the arguments and replay the sessions."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sessions", nargs="+", help="sessions.jsonl files")
+    parser.add_argument("--entities", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5, help="replays per session")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
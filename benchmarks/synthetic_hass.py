@@ -0,0 +1,156 @@
+"""Synthetic Home Assistant instances for the benchmarks.
+
+Builds a real HomeAssistant core with loaded area, device and entity
+registries and a state machine populated with a deterministic home of the
+requested size: entities of the common domains with realistic attributes,
+grouped into devices (four entities each) and areas (fifty entities each).
+Nothing is loaded from or saved to the temporary config directory beyond
+what the registries do on their own.
+"""
+
+from __future__ import annotations
+
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from homeassistant import config_entries
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import area_registry as ar
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers import floor_registry as fr
+from homeassistant.helpers import label_registry as lr
+
+ENTITIES_PER_DEVICE = 4
+ENTITIES_PER_AREA = 50
+BENCH_DOMAIN = "bench"
+
+# (domain, device_class, state, attributes), cycled through for the entities
+ENTITY_KINDS: Tuple[Tuple[str, Any, str, Dict[str, Any]], ...] = (
+    ("light", None, "on", {"brightness": 180, "color_mode": "brightness"}),
+    (
+        "sensor",
+        "temperature",
+        "21.4",
+        {"unit_of_measurement": "°C", "state_class": "measurement"},
+    ),
+    ("switch", "outlet", "off", {}),
+    ("binary_sensor", "motion", "off", {}),
+    (
+        "sensor",
+        "humidity",
+        "48",
+        {"unit_of_measurement": "%", "state_class": "measurement"},
+    ),
+    (
+        "climate",
+        None,
+        "heat",
+        {
+            "current_temperature": 20.5,
+            "temperature": 21,
+            "hvac_modes": ["off", "heat", "cool", "auto"],
+        },
+    ),
+    ("cover", "blind", "open", {"current_position": 100}),
+    (
+        "sensor",
+        "power",
+        "132.7",
+        {"unit_of_measurement": "W", "state_class": "measurement"},
+    ),
+    ("media_player", "speaker", "idle", {"volume_level": 0.3}),
+    ("binary_sensor", "door", "off", {}),
+)
+
+
+@dataclass
+class SyntheticHome:
+    """A running synthetic instance and the ids the benchmarks query."""
+
+    hass: HomeAssistant
+    entity_ids: List[str] = field(default_factory=list)
+    area_ids: List[str] = field(default_factory=list)
+    device_ids: List[str] = field(default_factory=list)
+
+    async def async_stop(self) -> None:
+        """Stop the instance."""
+        await self.hass.async_stop(force=True)
+
+
+async def async_create_home(entities: int) -> SyntheticHome:
+    """Start a HomeAssistant core holding a home with the given entity count."""
+    hass = HomeAssistant(tempfile.mkdtemp(prefix="ai_agent_ha_bench_"))
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    await lr.async_load(hass)
+    await fr.async_load(hass)
+    await ar.async_load(hass)
+    await dr.async_load(hass)
+    await er.async_load(hass)
+
+    # Devices must belong to a config entry; it is registered but never set up
+    entry = config_entries.ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=BENCH_DOMAIN,
+        title="Benchmark devices",
+        data={},
+        options={},
+        source=config_entries.SOURCE_USER,
+        unique_id=None,
+        discovery_keys={},
+    )
+    # pylint: disable-next=protected-access
+    hass.config_entries._entries[entry.entry_id] = entry
+
+    home = SyntheticHome(hass)
+    area_registry = ar.async_get(hass)
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+
+    for index in range(max(1, entities // ENTITIES_PER_AREA)):
+        area = area_registry.async_create(f"Area {index}")
+        home.area_ids.append(area.id)
+
+    for index in range(entities):
+        if index % ENTITIES_PER_DEVICE == 0:
+            device_index = index // ENTITIES_PER_DEVICE
+            device = device_registry.async_get_or_create(
+                config_entry_id=entry.entry_id,
+                identifiers={(BENCH_DOMAIN, f"device_{device_index}")},
+                manufacturer="Bench",
+                model=f"Model {device_index % 7}",
+                name=f"Device {device_index}",
+            )
+            area_id = home.area_ids[(index // ENTITIES_PER_AREA) % len(home.area_ids)]
+            device = device_registry.async_update_device(device.id, area_id=area_id)
+            home.device_ids.append(device.id)
+
+        domain, device_class, state, attributes = ENTITY_KINDS[
+            index % len(ENTITY_KINDS)
+        ]
+        entry_kwargs: Dict[str, Any] = {}
+        if device_class and domain in ("sensor", "binary_sensor", "cover"):
+            entry_kwargs["original_device_class"] = device_class
+        entity = entity_registry.async_get_or_create(
+            domain,
+            BENCH_DOMAIN,
+            f"entity_{index}",
+            suggested_object_id=f"bench_{domain}_{index}",
+            config_entry=entry,
+            device_id=home.device_ids[-1],
+            original_name=f"Bench {domain.replace('_', ' ')} {index}",
+            **entry_kwargs,
+        )
+        state_attributes = {
+            "friendly_name": f"Bench {domain.replace('_', ' ')} {index}",
+            **attributes,
+        }
+        if device_class:
+            state_attributes["device_class"] = device_class
+        hass.states.async_set(entity.entity_id, state, state_attributes)
+        home.entity_ids.append(entity.entity_id)
+
+    return home
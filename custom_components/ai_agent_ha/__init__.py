@@ -3,21 +3,41 @@
 from __future__ import annotations
 
 import logging
+from functools import partial
+from typing import Any, Dict
 
 import voluptuous as vol
 from homeassistant.components.frontend import async_register_built_in_panel
 from homeassistant.components.http import StaticPathConfig
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.typing import ConfigType
 
 from .agent import AiAgentHaAgent
+from .batch import QUERY_BATCH_SCHEMA, async_run_query_batch
+from .client_registry import ClientRegistry
 from .const import DOMAIN
+from .home_digest import HomeDigest
+from .metrics import MetricsCollector
+from .providers import async_load_client_class
+from .sanitize import sanitize_for_logging
+from .scheduler import PRIORITIES, PRIORITY_BACKGROUND, QueryScheduler
+from .session_recorder import SessionRecorder
+from .state_cache import EntityStateCache
+from .websocket_api import async_register_websocket_commands, get_agent
 
 _LOGGER = logging.getLogger(__name__)
 
+PLATFORMS = [Platform.SENSOR]
+
 # Config schema - this integration only supports config entries
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
@@ -28,6 +48,12 @@ SERVICE_SCHEMA = vol.Schema(
     }
 )
 
+RECORD_SESSIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required("enabled"): cv.boolean,
+    }
+)
+
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the AI Agent HA component."""
@@ -79,9 +105,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if "models" not in config_data:
             config_data["models"] = {}
             _LOGGER.debug("Models dict missing, creating new one")
-        
+
         # If the provider's model is missing, set default and update config entry
         from .config_flow import DEFAULT_MODELS
+
         if provider not in config_data["models"] or not config_data["models"][provider]:
             default_model = DEFAULT_MODELS.get(provider, "")
             config_data["models"][provider] = default_model
@@ -124,7 +151,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             {
                 k: v
                 for k, v in config_data.items()
-                if                 k
+                if k
                 not in [
                     "llama_token",
                     "openai_token",
@@ -137,7 +164,50 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 ]
             },
         )
+        # Provider clients are created once and shared by all agents and queries
+        if "client_registry" not in hass.data[DOMAIN]:
+            hass.data[DOMAIN]["client_registry"] = ClientRegistry()
+
+        # Query metrics of all providers, published by the sensor platform
+        if "metrics" not in hass.data[DOMAIN]:
+            hass.data[DOMAIN]["metrics"] = MetricsCollector()
+
+        # Queries are recorded for offline replay once record_sessions enables it
+        if "session_recorder" not in hass.data[DOMAIN]:
+            hass.data[DOMAIN]["session_recorder"] = SessionRecorder(
+                hass, partial(sanitize_for_logging, copy_on_write=True)
+            )
+
+        # Queries of all providers are admitted by priority through one scheduler
+        if "scheduler" not in hass.data[DOMAIN]:
+            hass.data[DOMAIN]["scheduler"] = QueryScheduler()
+
+        # Only the configured provider's client module is imported
+        await async_load_client_class(hass, provider)
         hass.data[DOMAIN]["agents"][provider] = AiAgentHaAgent(hass, config_data)
+        entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+        # Load local models ahead of the first query instead of on it
+        if provider == "local":
+            entry.async_create_background_task(
+                hass,
+                hass.data[DOMAIN]["agents"][provider].ai_client.async_warm_up(),
+                f"{DOMAIN}_local_warm_up",
+            )
+
+        # One home digest is shared by all provider agents
+        if "home_digest" not in hass.data[DOMAIN]:
+            home_digest = HomeDigest(hass)
+            await home_digest.async_start()
+            hass.data[DOMAIN]["home_digest"] = home_digest
+
+        # Serialized entity states are likewise shared and kept current by events
+        if "state_cache" not in hass.data[DOMAIN]:
+            state_cache = EntityStateCache(hass)
+            state_cache.async_start()
+            hass.data[DOMAIN]["state_cache"] = state_cache
+
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
         _LOGGER.info("Successfully set up AI Agent HA for provider: %s", provider)
 
@@ -149,41 +219,49 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         raise ConfigEntryNotReady(f"Error setting up AI Agent HA: {err}")
 
     # Modify the query service handler to use the correct provider
-    async def async_handle_query(call):
-        """Handle the query service call."""
+    async def async_handle_query(call: ServiceCall) -> ServiceResponse:
+        """Handle the query service call.
+
+        The result is returned to the caller when a response is requested,
+        otherwise it is fired as an ai_agent_ha_response event. Queries run
+        at background priority unless the call sets another one.
+        """
+        result: Dict[str, Any]
         try:
-            # Check if agents are available
-            if DOMAIN not in hass.data or not hass.data[DOMAIN].get("agents"):
+            agent, provider = get_agent(hass, call.data.get("provider"))
+            priority = call.data.get("priority") or PRIORITY_BACKGROUND
+            if agent is None:
                 _LOGGER.error(
                     "No AI agents available. Please configure the integration first."
                 )
                 result = {"error": "No AI agents configured"}
-                hass.bus.async_fire("ai_agent_ha_response", result)
-                return
-
-            provider = call.data.get("provider")
-            if provider not in hass.data[DOMAIN]["agents"]:
-                # Get the first available provider
-                available_providers = list(hass.data[DOMAIN]["agents"].keys())
-                if not available_providers:
-                    _LOGGER.error("No AI agents available")
-                    result = {"error": "No AI agents configured"}
-                    hass.bus.async_fire("ai_agent_ha_response", result)
-                    return
-                provider = available_providers[0]
-                _LOGGER.debug(f"Using fallback provider: {provider}")
-
-            agent = hass.data[DOMAIN]["agents"][provider]
-            result = await agent.process_query(
-                call.data.get("prompt", ""),
-                provider=provider,
-                debug=call.data.get("debug", False),
-            )
-            hass.bus.async_fire("ai_agent_ha_response", result)
+            elif priority not in PRIORITIES:
+                result = {"error": f"Unknown query priority: {priority}"}
+            else:
+                result = await agent.process_query(
+                    call.data.get("prompt", ""),
+                    provider=provider,
+                    debug=call.data.get("debug", False),
+                    priority=priority,
+                )
         except Exception as e:
             _LOGGER.error(f"Error processing query: {e}")
             result = {"error": str(e)}
-            hass.bus.async_fire("ai_agent_ha_response", result)
+
+        if call.return_response:
+            return result
+        hass.bus.async_fire("ai_agent_ha_response", result)
+        return None
+
+    async def async_handle_query_batch(call: ServiceCall) -> ServiceResponse:
+        """Handle the query_batch service call."""
+        return await async_run_query_batch(
+            hass,
+            call.data["prompts"],
+            default_provider=call.data.get("provider"),
+            max_concurrency=call.data["max_concurrency"],
+            failure_policy=call.data["failure_policy"],
+        )
 
     async def async_handle_create_automation(call):
         """Handle the create_automation service call."""
@@ -206,7 +284,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 _LOGGER.debug(f"Using fallback provider: {provider}")
 
             agent = hass.data[DOMAIN]["agents"][provider]
-            result = await agent.create_automation(call.data.get("automation", {}))
+            automation = call.data.get("automation", {})
+            # A list of automations is written and reloaded in one go
+            if isinstance(automation, list):
+                return await agent.create_automations(automation)
+            result = await agent.create_automation(automation)
             return result
         except Exception as e:
             _LOGGER.error(f"Error creating automation: {e}")
@@ -376,7 +458,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             agent = hass.data[DOMAIN]["agents"][provider]
             user_id = call.context.user_id if call.context.user_id else "default"
             messages = call.data.get("messages", [])
-            
+
             result = await agent.save_chat_messages(user_id, messages, provider)
             return result
         except Exception as e:
@@ -405,15 +487,44 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
             agent = hass.data[DOMAIN]["agents"][provider]
             user_id = call.context.user_id if call.context.user_id else "default"
-            
+
             result = await agent.load_chat_messages(user_id, provider)
             return result
         except Exception as e:
             _LOGGER.error(f"Error loading chat messages: {e}")
             return {"error": str(e)}
 
+    async def async_handle_record_sessions(call):
+        """Handle the record_sessions service call."""
+        recorder = hass.data.get(DOMAIN, {}).get("session_recorder")
+        if recorder is None:
+            return {"error": "No AI agents configured"}
+        recorder.enabled = call.data["enabled"]
+        _LOGGER.info(
+            "Session recording %s (%s)",
+            "enabled" if recorder.enabled else "disabled",
+            recorder.path,
+        )
+        return {
+            "recording": recorder.enabled,
+            "recorded": recorder.recorded,
+            "path": recorder.path,
+        }
+
     # Register services
-    hass.services.async_register(DOMAIN, "query", async_handle_query)
+    hass.services.async_register(
+        DOMAIN,
+        "query",
+        async_handle_query,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "query_batch",
+        async_handle_query_batch,
+        schema=QUERY_BATCH_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
     hass.services.async_register(
         DOMAIN, "create_automation", async_handle_create_automation
     )
@@ -435,6 +546,16 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.services.async_register(
         DOMAIN, "load_chat_messages", async_handle_load_chat_messages
     )
+    hass.services.async_register(
+        DOMAIN,
+        "record_sessions",
+        async_handle_record_sessions,
+        schema=RECORD_SESSIONS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    # Query commands that answer only the requesting connection
+    async_register_websocket_commands(hass)
 
     # Register static path for frontend
     await hass.http.async_register_static_paths(
@@ -482,8 +603,37 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply updated provider settings without reloading the integration."""
+    if DOMAIN not in hass.data:
+        return
+    config_data = dict(entry.data)
+    provider = config_data.get("ai_provider")
+
+    # Drop clients built from the previous model, credentials or endpoint
+    if hass.data[DOMAIN].get("client_registry"):
+        hass.data[DOMAIN]["client_registry"].invalidate(provider)
+
+    agent = hass.data[DOMAIN]["agents"].get(provider)
+    if agent is None:
+        # The options flow switched this entry to a different provider
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    hass.data[DOMAIN]["configs"][provider] = config_data
+    await async_load_client_class(hass, provider)
+    agent.update_config(config_data)
+    if provider == "local":
+        entry.async_create_background_task(
+            hass, agent.ai_client.async_warm_up(), f"{DOMAIN}_local_warm_up"
+        )
+    _LOGGER.debug("Applied updated configuration for provider: %s", provider)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
     if await _panel_exists(hass, "ai_agent_ha"):
         try:
             from homeassistant.components.frontend import async_remove_panel
@@ -495,6 +645,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     # Remove services
     hass.services.async_remove(DOMAIN, "query")
+    hass.services.async_remove(DOMAIN, "query_batch")
     hass.services.async_remove(DOMAIN, "create_automation")
     hass.services.async_remove(DOMAIN, "save_prompt_history")
     hass.services.async_remove(DOMAIN, "load_prompt_history")
@@ -502,8 +653,12 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.services.async_remove(DOMAIN, "update_dashboard")
     hass.services.async_remove(DOMAIN, "save_chat_messages")
     hass.services.async_remove(DOMAIN, "load_chat_messages")
+    hass.services.async_remove(DOMAIN, "record_sessions")
     # Remove data
     if DOMAIN in hass.data:
+        for key in ("home_digest", "state_cache"):
+            if hass.data[DOMAIN].get(key):
+                hass.data[DOMAIN][key].async_stop()
         hass.data.pop(DOMAIN)
 
     return True
@@ -517,14 +672,14 @@ async def _panel_exists(hass: HomeAssistant, panel_name: str) -> bool:
             panels = hass.data.get("frontend_panels", {})
             if panel_name in panels:
                 return True
-        
+
         # Also check if panel is registered via frontend component
         if hasattr(hass.components, "frontend"):
             frontend = hass.components.frontend
             if hasattr(frontend, "panels"):
                 if panel_name in frontend.panels:
                     return True
-        
+
         return False
     except Exception as e:
         _LOGGER.debug("Error checking panel existence: %s", str(e))
@@ -15,6 +15,9 @@ ai_agent_ha:
   bedrock_secret_key: "..."  # AWS secret access key for Bedrock
   bedrock_region: "us-east-1"  # AWS region (optional, defaults to us-east-1)
   local_url: "http://localhost:11434/api/generate"  # Required for local models
+  local_api_mode: "auto"  # or 'ollama' (/api/chat), 'openai' (/v1/chat/completions), 'generic'
+  local_keep_alive: "30m"  # how long Ollama keeps the model loaded (-1 = forever)
+  local_num_ctx: 8192  # Ollama context window (optional)
   # Model configuration (optional, defaults will be used if not specified)
   models:
     openai: "gpt-3.5-turbo"  # or "gpt-4", "gpt-4-turbo", etc.
@@ -29,1063 +32,137 @@ ai_agent_ha:
 """
 
 import asyncio
-import json
+import importlib
 import logging
+import os
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
-from urllib.parse import quote
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Union,
+)
 
-import aiohttp
-import yaml  # type: ignore[import-untyped]
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.storage import Store
 from homeassistant.util import dt as dt_util
 
-from .const import CONF_WEATHER_ENTITY, DOMAIN
+from . import (
+    compaction,
+    degeneration,
+    json_codec,
+    json_extract,
+    metrics,
+    paging,
+    prefetch,
+    session_recorder,
+    tracing,
+)
+from .client_registry import ClientKey, ClientRegistry, hash_credentials
+from .const import (
+    CONF_COMPACTION_MODEL,
+    CONF_COMPACTION_THRESHOLD,
+    CONF_EXPORT_TRACES,
+    CONF_GEMINI_CACHE_TTL,
+    CONF_LOCAL_API_MODE,
+    CONF_LOCAL_KEEP_ALIVE,
+    CONF_LOCAL_NUM_CTX,
+    DEFAULT_COMPACTION_THRESHOLD,
+    DOMAIN,
+)
+from .metrics import MetricsCollector
+from .projection import is_default_projection, project_entity_state
+from .providers import PROVIDER_CLIENTS, async_load_client_class, client_class
+from .providers.base import BaseAIClient
+from .sanitize import sanitize_for_logging
+from .scheduler import PRIORITY_PANEL, QueryRejected, QueryScheduler
+from .state_cache import EntityStateCache, encode_data_payload
+
+if TYPE_CHECKING:
+    from .automation_store import AutomationStore
 
 _LOGGER = logging.getLogger(__name__)
 
-
-# === Security Utilities ===
-def sanitize_for_logging(data: Any, mask: str = "***REDACTED***") -> Any:
-    """Sanitize sensitive data for safe logging.
-
-    Recursively masks sensitive fields like API keys, tokens, passwords, etc.
-    This prevents accidental exposure of credentials in debug logs.
-
-    Args:
-        data: The data structure to sanitize (dict, list, str, etc.)
-        mask: The string to use for masking sensitive values
-
-    Returns:
-        A sanitized copy of the data with sensitive fields masked
-
-    Example:
-        >>> config = {"openai_token": "sk-abc123", "ai_provider": "openai"}
-        >>> sanitize_for_logging(config)
-        {"openai_token": "***REDACTED***", "ai_provider": "openai"}
-    """
-    # Sensitive field patterns (case-insensitive)
-    sensitive_patterns = {
-        "token",
-        "key",
-        "password",
-        "secret",
-        "credential",
-        "auth",
-        "authorization",
-        "api_key",
-        "apikey",
-        "llama_token",
-        "openai_token",
-        "gemini_token",
-        "anthropic_token",
-        "openrouter_token",
-        "alter_token",
-        "zai_token",
-    }
-
-    if isinstance(data, dict):
-        sanitized = {}
-        for key, value in data.items():
-            # Check if key matches any sensitive pattern
-            key_lower = str(key).lower()
-            is_sensitive = any(pattern in key_lower for pattern in sensitive_patterns)
-
-            if is_sensitive:
-                sanitized[key] = mask
-            else:
-                # Recursively sanitize nested structures
-                sanitized[key] = sanitize_for_logging(value, mask)
-        return sanitized
-
-    elif isinstance(data, list):
-        return [sanitize_for_logging(item, mask) for item in data]
-
-    elif isinstance(data, tuple):
-        return tuple(sanitize_for_logging(item, mask) for item in data)
-
-    else:
-        # Primitive types (str, int, bool, etc.) - return as-is
-        return data
-
-
-# === AI Client Abstractions ===
-class BaseAIClient:
-    async def get_response(self, messages, **kwargs):
-        raise NotImplementedError
-
-
-class LocalClient(BaseAIClient):
-    def __init__(self, url, model=""):
-        self.url = url
-        self.model = model
-
-    async def get_response(self, messages, **kwargs):
-        _LOGGER.debug(
-            "Making request to local API with model: '%s' at URL: %s",
-            self.model or "[NO MODEL SPECIFIED]",
-            self.url,
-        )
-
-        if not self.model:
-            _LOGGER.warning(
-                "No model specified for local API request. Some APIs (like Ollama) require a model name."
-            )
-        headers = {"Content-Type": "application/json"}
-
-        # Format user prompt from messages
-        prompt = ""
-        for message in messages:
-            role = message.get("role", "")
-            content = message.get("content", "")
-
-            # Simple formatting: prefixing each message with its role
-            if role == "system":
-                prompt += f"System: {content}\n\n"
-            elif role == "user":
-                prompt += f"User: {content}\n\n"
-            elif role == "assistant":
-                prompt += f"Assistant: {content}\n\n"
-
-        # Add final prompt prefix for the assistant's response
-        prompt += "Assistant: "
-
-        # Build a generic payload that works with most local API servers
-        payload = {
-            "prompt": prompt,
-            "stream": False,  # Disable streaming to get a single complete response
-            # max_tokens omitted - let local model use its default capacity
-        }
-
-        # Add model if specified
-        if self.model:
-            payload["model"] = self.model
-
-        # Note: Payloads don't contain auth tokens (those are in headers), but may contain user prompts
-        _LOGGER.debug("Local API request payload: %s", json.dumps(payload, indent=2))
-
-        # Ollama-specific validation
-        if "model" not in payload or not payload["model"]:
-            _LOGGER.warning(
-                "Missing 'model' field in request to local API. This may cause issues with Ollama."
-            )
-        elif self.url and "ollama" in self.url.lower():
-            _LOGGER.debug(
-                "Detected Ollama URL, ensuring model is specified: %s",
-                payload.get("model"),
-            )
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.url,
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=300),
-            ) as resp:
-                if resp.status != 200:
-                    error_text = await resp.text()
-                    _LOGGER.error("Local API error %d: %s", resp.status, error_text)
-
-                    # Provide more specific error messages for common Ollama issues
-                    if resp.status == 404:
-                        if "model" in payload and payload["model"]:
-                            raise Exception(
-                                f"Model '{payload['model']}' not found. Please ensure the model is installed in Ollama using: ollama pull {payload['model']}"
-                            )
-                        else:
-                            raise Exception(
-                                "Local API endpoint not found. Please check the URL and ensure Ollama is running."
-                            )
-                    elif resp.status == 400:
-                        raise Exception(
-                            f"Bad request to local API. Error: {error_text}"
-                        )
-                    else:
-                        raise Exception(f"Local API error {resp.status}: {error_text}")
-
-                try:
-                    response_text = await resp.text()
-                    _LOGGER.debug(
-                        "Local API response (first 200 chars): %s", response_text[:200]
-                    )
-                    _LOGGER.debug("Local API response status: %d", resp.status)
-                    # Sanitize headers to avoid logging any auth tokens
-                    _LOGGER.debug(
-                        "Local API response headers: %s",
-                        sanitize_for_logging(dict(resp.headers)),
-                    )
-
-                    # Try to parse as JSON
-                    try:
-                        data = json.loads(response_text)
-
-                        # Try common response formats
-                        # Ollama format - return only the response text
-                        if "response" in data:
-                            response_content = data["response"]
-                            _LOGGER.debug(
-                                "Extracted response content: %s",
-                                (
-                                    response_content[:100]
-                                    if response_content
-                                    else "[EMPTY]"
-                                ),
-                            )
-
-                            # Check if response is empty or None
-                            if not response_content or response_content.strip() == "":
-                                _LOGGER.warning(
-                                    "Ollama returned empty response. Full data: %s",
-                                    data,
-                                )
-                                # Check if this is a loading response
-                                if data.get("done_reason") == "load":
-                                    _LOGGER.warning(
-                                        "Ollama is still loading the model. Please wait and try again."
-                                    )
-                                    return json.dumps(
-                                        {
-                                            "request_type": "final_response",
-                                            "response": "The AI model is still loading. Please wait a moment and try again.",
-                                        }
-                                    )
-                                elif data.get("done") is False:
-                                    _LOGGER.warning(
-                                        "Ollama response indicates it's not done yet."
-                                    )
-                                    return json.dumps(
-                                        {
-                                            "request_type": "final_response",
-                                            "response": "The AI is still processing your request. Please try again.",
-                                        }
-                                    )
-                                else:
-                                    return json.dumps(
-                                        {
-                                            "request_type": "final_response",
-                                            "response": "The AI returned an empty response. Please try rephrasing your question.",
-                                        }
-                                    )
-
-                            # Check if the response looks like JSON
-                            response_content = response_content.strip()
-                            if response_content.startswith(
-                                "{"
-                            ) and response_content.endswith("}"):
-                                try:
-                                    # Validate that it's actually JSON and contains valid request_type
-                                    parsed_json = json.loads(response_content)
-                                    if (
-                                        isinstance(parsed_json, dict)
-                                        and "request_type" in parsed_json
-                                    ):
-                                        _LOGGER.debug(
-                                            "Local model provided valid JSON response"
-                                        )
-                                        return response_content
-                                    else:
-                                        _LOGGER.debug(
-                                            "JSON missing request_type, treating as plain text"
-                                        )
-                                except json.JSONDecodeError:
-                                    _LOGGER.debug(
-                                        "Invalid JSON from local model, treating as plain text"
-                                    )
-                                    pass
-
-                            # If it's plain text, wrap it in the expected JSON format
-                            wrapped_response = {
-                                "request_type": "final_response",
-                                "response": response_content,
-                            }
-                            _LOGGER.debug("Wrapped plain text response in JSON format")
-                            return json.dumps(wrapped_response)
-
-                        # OpenAI-like format
-                        elif "choices" in data and len(data["choices"]) > 0:
-                            choice = data["choices"][0]
-                            if "message" in choice and "content" in choice["message"]:
-                                content = choice["message"]["content"]
-                            elif "text" in choice:
-                                content = choice["text"]
-                            else:
-                                content = str(data)
-
-                            # Check if it's valid JSON with request_type
-                            content = content.strip()
-                            if content.startswith("{") and content.endswith("}"):
-                                try:
-                                    parsed_json = json.loads(content)
-                                    if (
-                                        isinstance(parsed_json, dict)
-                                        and "request_type" in parsed_json
-                                    ):
-                                        _LOGGER.debug(
-                                            "Local model provided valid JSON response (OpenAI format)"
-                                        )
-                                        return content
-                                    else:
-                                        _LOGGER.debug(
-                                            "JSON missing request_type, treating as plain text (OpenAI format)"
-                                        )
-                                except json.JSONDecodeError:
-                                    _LOGGER.debug(
-                                        "Invalid JSON from local model, treating as plain text (OpenAI format)"
-                                    )
-                                    pass
-
-                            # Wrap in expected format if plain text
-                            wrapped_response = {
-                                "request_type": "final_response",
-                                "response": content,
-                            }
-                            return json.dumps(wrapped_response)
-
-                        # Generic content field
-                        elif "content" in data:
-                            content = data["content"]
-                            content = content.strip()
-                            if content.startswith("{") and content.endswith("}"):
-                                try:
-                                    parsed_json = json.loads(content)
-                                    if (
-                                        isinstance(parsed_json, dict)
-                                        and "request_type" in parsed_json
-                                    ):
-                                        _LOGGER.debug(
-                                            "Local model provided valid JSON response (generic format)"
-                                        )
-                                        return content
-                                    else:
-                                        _LOGGER.debug(
-                                            "JSON missing request_type, treating as plain text (generic format)"
-                                        )
-                                except json.JSONDecodeError:
-                                    _LOGGER.debug(
-                                        "Invalid JSON from local model, treating as plain text (generic format)"
-                                    )
-                                    pass
-
-                            wrapped_response = {
-                                "request_type": "final_response",
-                                "response": content,
-                            }
-                            return json.dumps(wrapped_response)
-
-                        # Handle case where no standard fields are found
-                        _LOGGER.warning(
-                            "No standard response fields found in local API response. Full response: %s",
-                            data,
-                        )
-
-                        # Check for Ollama-specific edge cases
-                        if data.get("done_reason") == "load":
-                            return json.dumps(
-                                {
-                                    "request_type": "final_response",
-                                    "response": "The AI model is still loading. Please wait a moment and try again.",
-                                }
-                            )
-                        elif data.get("done") is False:
-                            return json.dumps(
-                                {
-                                    "request_type": "final_response",
-                                    "response": "The AI is still processing your request. Please try again.",
-                                }
-                            )
-                        elif "message" in data:
-                            # Some APIs use "message" field
-                            message_content = data["message"]
-                            if (
-                                isinstance(message_content, dict)
-                                and "content" in message_content
-                            ):
-                                content = message_content["content"]
-                            else:
-                                content = str(message_content)
-                            return json.dumps(
-                                {"request_type": "final_response", "response": content}
-                            )
-
-                        # Return the whole data as string if we can't find a specific field
-                        return json.dumps(
-                            {
-                                "request_type": "final_response",
-                                "response": f"Received unexpected response format from local API: {str(data)}",
-                            }
-                        )
-
-                    except json.JSONDecodeError:
-                        # If not JSON, check if it's a JSON response that got corrupted by wrapping
-                        response_text = response_text.strip()
-                        if response_text.startswith("{") and response_text.endswith(
-                            "}"
-                        ):
-                            try:
-                                parsed_json = json.loads(response_text)
-                                if (
-                                    isinstance(parsed_json, dict)
-                                    and "request_type" in parsed_json
-                                ):
-                                    _LOGGER.debug(
-                                        "Local model provided valid JSON response (direct)"
-                                    )
-                                    return response_text
-                            except json.JSONDecodeError:
-                                pass
-
-                        # If not valid JSON, wrap the raw text in expected format
-                        _LOGGER.debug("Response is not JSON, wrapping plain text")
-                        wrapped_response = {
-                            "request_type": "final_response",
-                            "response": response_text,
-                        }
-                        return json.dumps(wrapped_response)
-
-                except Exception as e:
-                    _LOGGER.error("Failed to parse local API response: %s", str(e))
-                    raise Exception(f"Failed to parse local API response: {str(e)}")
-
-
-class LlamaClient(BaseAIClient):
-    def __init__(self, token, model="Llama-4-Maverick-17B-128E-Instruct-FP8"):
-        self.token = token
-        self.model = model
-        self.api_url = "https://api.llama.com/v1/chat/completions"
-
-    async def get_response(self, messages, **kwargs):
-        _LOGGER.debug("Making request to Llama API with model: %s", self.model)
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7,
-            "top_p": 0.9,
-            # max_tokens omitted - let Llama use the model's default capacity
-        }
-
-        _LOGGER.debug("Llama request payload: %s", json.dumps(payload, indent=2))
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=300),
-            ) as resp:
-                if resp.status != 200:
-                    error_text = await resp.text()
-                    _LOGGER.error("Llama API error %d: %s", resp.status, error_text)
-                    raise Exception(f"Llama API error {resp.status}")
-                data = await resp.json()
-                # Extract text from Llama response
-                completion = data.get("completion_message", {})
-                content = completion.get("content", {})
-                return content.get("text", str(data))
-
-
-class OpenAIClient(BaseAIClient):
-    def __init__(self, token, model="gpt-3.5-turbo"):
-        self.token = token
-        self.model = model
-        self.api_url = "https://api.openai.com/v1/chat/completions"
-
-    def _is_restricted_model(self):
-        """Check if the model has restricted parameters (no temperature, top_p, etc.)."""
-        # Models that don't support temperature, top_p and other parameters
-        restricted_models = ["o3-mini", "o3", "o1-mini", "o1-preview", "o1", "gpt-5"]
-
-        model_lower = self.model.lower()
-        return any(model_id in model_lower for model_id in restricted_models)
-
-    async def get_response(self, messages, **kwargs):
-        _LOGGER.debug("Making request to OpenAI API with model: %s", self.model)
-
-        # Validate token
-        if not self.token or not self.token.startswith("sk-"):
-            raise Exception("Invalid OpenAI API key format")
-
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
-
-        # Check if model has restricted parameters
-        is_restricted = self._is_restricted_model()
-        _LOGGER.debug(
-            "Using model: %s (restricted parameters: %s)",
-            self.model,
-            is_restricted,
-        )
-
-        # Build payload with model-appropriate parameters
-        # Don't set max_tokens - let OpenAI use the model's maximum capacity
-        payload = {"model": self.model, "messages": messages}
-
-        # Only add temperature and top_p for models that support them
-        if not is_restricted:
-            payload.update({"temperature": 0.7, "top_p": 0.9})
-
-        _LOGGER.debug("OpenAI request payload: %s", json.dumps(payload, indent=2))
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=300),
-            ) as resp:
-                response_text = await resp.text()
-                _LOGGER.debug("OpenAI API response status: %d", resp.status)
-                _LOGGER.debug("OpenAI API response: %s", response_text[:500])
-
-                if resp.status != 200:
-                    _LOGGER.error("OpenAI API error %d: %s", resp.status, response_text)
-                    raise Exception(f"OpenAI API error {resp.status}: {response_text}")
-
-                try:
-                    data = json.loads(response_text)
-                except json.JSONDecodeError as e:
-                    _LOGGER.error("Failed to parse OpenAI response as JSON: %s", str(e))
-                    raise Exception(
-                        f"Invalid JSON response from OpenAI: {response_text[:200]}"
-                    )
-
-                # Extract text from OpenAI response
-                choices = data.get("choices", [])
-                if choices and "message" in choices[0]:
-                    content = choices[0]["message"].get("content", "")
-                    if not content:
-                        _LOGGER.warning("OpenAI returned empty content in message")
-                        _LOGGER.debug(
-                            "Full OpenAI response: %s", json.dumps(data, indent=2)
-                        )
-                    return content
-                else:
-                    _LOGGER.warning("OpenAI response missing expected structure")
-                    _LOGGER.debug(
-                        "Full OpenAI response: %s", json.dumps(data, indent=2)
-                    )
-                    return str(data)
-
-
-class GeminiClient(BaseAIClient):
-    def __init__(self, token, model="gemini-2.5-flash"):
-        self.token = token.strip() if token else token  # Strip whitespace from token
-        self.model = model
-        # Use v1beta for all models as per Google's current API documentation
-        # All Gemini 2.0/2.5 models are available on v1beta endpoint
-        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-
-    async def get_response(self, messages, **kwargs):
-        _LOGGER.debug("Making request to Gemini API with model: %s", self.model)
-
-        # Validate token
-        if not self.token:
-            raise Exception("Missing Gemini API key")
-
-        headers = {"Content-Type": "application/json"}
-
-        # Convert OpenAI-style messages to Gemini format
-        gemini_contents = []
-        for message in messages:
-            role = message.get("role", "user")
-            content = message.get("content", "")
-
-            if role == "system":
-                # Gemini doesn't have a system role, so we prepend it to the first user message
-                if not gemini_contents:
-                    gemini_contents.append(
-                        {"role": "user", "parts": [{"text": f"System: {content}"}]}
-                    )
-                else:
-                    # Add system message as user message
-                    gemini_contents.append(
-                        {"role": "user", "parts": [{"text": f"System: {content}"}]}
-                    )
-            elif role == "user":
-                gemini_contents.append({"role": "user", "parts": [{"text": content}]})
-            elif role == "assistant":
-                gemini_contents.append({"role": "model", "parts": [{"text": content}]})
-
-        payload = {
-            "contents": gemini_contents,
-            "generationConfig": {
-                "temperature": 0.7,
-                "topP": 0.9,
-                # maxOutputTokens omitted - let Gemini use model's maximum capacity
-            },
-        }
-
-        # Add API key as query parameter (URL encoded)
-        url_with_key = f"{self.api_url}?key={quote(self.token)}"
-
-        _LOGGER.debug("Gemini request payload: %s", json.dumps(payload, indent=2))
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url_with_key,
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=300),
-            ) as resp:
-                response_text = await resp.text()
-                _LOGGER.debug("Gemini API response status: %d", resp.status)
-                _LOGGER.debug("Gemini API response: %s", response_text[:500])
-
-                if resp.status != 200:
-                    _LOGGER.error("Gemini API error %d: %s", resp.status, response_text)
-                    raise Exception(f"Gemini API error {resp.status}: {response_text}")
-
-                try:
-                    data = json.loads(response_text)
-                except json.JSONDecodeError as e:
-                    _LOGGER.error("Failed to parse Gemini response as JSON: %s", str(e))
-                    raise Exception(
-                        f"Invalid JSON response from Gemini: {response_text[:200]}"
-                    )
-
-                # Log token usage for debugging, especially for Gemini 2.5 extended thinking
-                usage_metadata = data.get("usageMetadata", {})
-                if usage_metadata:
-                    _LOGGER.debug(
-                        "Gemini token usage - prompt: %d, total: %d, thoughts: %d",
-                        usage_metadata.get("promptTokenCount", 0),
-                        usage_metadata.get("totalTokenCount", 0),
-                        usage_metadata.get("thoughtsTokenCount", 0),
-                    )
-
-                # Extract text from Gemini response
-                candidates = data.get("candidates", [])
-                if candidates and "content" in candidates[0]:
-                    # Check finish reason for potential issues
-                    finish_reason = candidates[0].get("finishReason", "")
-                    if finish_reason == "MAX_TOKENS":
-                        _LOGGER.warning(
-                            "Gemini response truncated due to MAX_TOKENS limit. "
-                            "Thoughts used: %d tokens. Consider increasing maxOutputTokens.",
-                            usage_metadata.get("thoughtsTokenCount", 0),
-                        )
-
-                    parts = candidates[0]["content"].get("parts", [])
-                    if parts:
-                        content = parts[0].get("text", "")
-                        if not content:
-                            _LOGGER.warning("Gemini returned empty text content")
-                            _LOGGER.debug(
-                                "Full Gemini response: %s", json.dumps(data, indent=2)
-                            )
-                        return content
-                    else:
-                        _LOGGER.warning("Gemini response missing parts")
-                        _LOGGER.debug(
-                            "Full Gemini response: %s", json.dumps(data, indent=2)
-                        )
-                else:
-                    _LOGGER.warning("Gemini response missing expected structure")
-                    _LOGGER.debug(
-                        "Full Gemini response: %s", json.dumps(data, indent=2)
-                    )
-                return str(data)
-
-
-class AnthropicClient(BaseAIClient):
-    def __init__(self, token, model="claude-sonnet-4-5-20250929"):
-        self.token = token
-        self.model = model
-        self.api_url = "https://api.anthropic.com/v1/messages"
-
-    async def get_response(self, messages, **kwargs):
-        _LOGGER.debug("Making request to Anthropic API with model: %s", self.model)
-        headers = {
-            "x-api-key": self.token,
-            "Content-Type": "application/json",
-            "anthropic-version": "2023-06-01",
-        }
-
-        # Convert OpenAI-style messages to Anthropic format
-        system_message = None
-        anthropic_messages = []
-
-        for message in messages:
-            role = message.get("role", "user")
-            content = message.get("content", "")
-
-            if role == "system":
-                # Anthropic uses a separate system parameter
-                system_message = content
-            elif role == "user":
-                anthropic_messages.append({"role": "user", "content": content})
-            elif role == "assistant":
-                anthropic_messages.append({"role": "assistant", "content": content})
-
-        payload = {
-            "model": self.model,
-            "max_tokens": 8192,  # Maximum for Anthropic Claude models
-            "temperature": 0.7,
-            "messages": anthropic_messages,
-        }
-
-        # Add system message if present
-        if system_message:
-            payload["system"] = system_message
-
-        _LOGGER.debug("Anthropic request payload: %s", json.dumps(payload, indent=2))
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=30),
-            ) as resp:
-                if resp.status != 200:
-                    error_text = await resp.text()
-                    _LOGGER.error("Anthropic API error %d: %s", resp.status, error_text)
-                    raise Exception(f"Anthropic API error {resp.status}")
-                data = await resp.json()
-                # Extract text from Anthropic response
-                content_blocks = data.get("content", [])
-                if content_blocks and isinstance(content_blocks, list):
-                    # Get the text from the first content block
-                    for block in content_blocks:
-                        if block.get("type") == "text":
-                            return block.get("text", str(data))
-                return str(data)
-
-
-class OpenRouterClient(BaseAIClient):
-    def __init__(self, token, model="openai/gpt-4o"):
-        self.token = token
-        self.model = model
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
-
-    async def get_response(self, messages, **kwargs):
-        _LOGGER.debug("Making request to OpenRouter API with model: %s", self.model)
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://home-assistant.io",  # Optional for OpenRouter rankings
-            "X-Title": "Home Assistant AI Agent",  # Optional for OpenRouter rankings
-        }
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7,
-            "top_p": 0.9,
-            # max_tokens omitted - let OpenRouter use the model's maximum capacity
-        }
-
-        _LOGGER.debug("OpenRouter request payload: %s", json.dumps(payload, indent=2))
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=300),
-            ) as resp:
-                if resp.status != 200:
-                    error_text = await resp.text()
-                    _LOGGER.error(
-                        "OpenRouter API error %d: %s", resp.status, error_text
-                    )
-                    raise Exception(f"OpenRouter API error {resp.status}")
-                data = await resp.json()
-                # Extract text from OpenRouter response (OpenAI-compatible format)
-                choices = data.get("choices", [])
-                if not choices:
-                    _LOGGER.warning("OpenRouter response missing choices")
-                    _LOGGER.debug(
-                        "Full OpenRouter response: %s", json.dumps(data, indent=2)
-                    )
-                    return str(data)
-                if choices and "message" in choices[0]:
-                    return choices[0]["message"].get("content", str(data))
-                return str(data)
-
-
-class AlterClient(BaseAIClient):
-    def __init__(self, token, model=""):
-        self.token = token
-        self.model = model
-        self.api_url = "https://alterhq.com/api/v1/chat/completions"
-
-    async def get_response(self, messages, **kwargs):
-        _LOGGER.debug("Making request to Alter API with model: %s", self.model)
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7,
-            "top_p": 0.9,
-        }
-
-        _LOGGER.debug("Alter request payload: %s", json.dumps(payload, indent=2))
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=300),
-            ) as resp:
-                if resp.status != 200:
-                    error_text = await resp.text()
-                    _LOGGER.error("Alter API error %d: %s", resp.status, error_text)
-                    raise Exception(f"Alter API error {resp.status}")
-                data = await resp.json()
-                # Extract text from Alter response (OpenAI-compatible format)
-                choices = data.get("choices", [])
-                if not choices:
-                    _LOGGER.warning("Alter response missing choices")
-                    _LOGGER.debug("Full Alter response: %s", json.dumps(data, indent=2))
-                    return str(data)
-                if choices and "message" in choices[0]:
-                    return choices[0]["message"].get("content", str(data))
-                return str(data)
-
-
-class ZaiClient(BaseAIClient):
-    def __init__(self, token, model="", endpoint_type="general"):
-        self.token = token
-        self.model = model
-        self.endpoint_type = endpoint_type
-        # General endpoint: https://api.z.ai/api/paas/v4/chat/completions
-        # Coding endpoint: https://api.z.ai/api/coding/paas/v4/chat/completions
-        if endpoint_type == "coding":
-            self.api_url = "https://api.z.ai/api/coding/paas/v4/chat/completions"
-        else:
-            self.api_url = "https://api.z.ai/api/paas/v4/chat/completions"
-
-    async def get_response(self, messages, **kwargs):
-        _LOGGER.debug(
-            "Making request to z.ai API with model: %s, endpoint: %s",
-            self.model,
-            self.endpoint_type,
+# The home digest snapshotted for the query running in this context, so
+# concurrent queries of one agent each keep their own (see _run_query)
+_query_context: ContextVar[Optional[str]] = ContextVar(
+    "ai_agent_ha_query_context", default=None
+)
+
+# Names that moved to the providers package, still importable from here
+_PROVIDER_EXPORTS = {
+    "iter_sse_data": "base",
+    "merge_turns": "base",
+    "resolve_local_endpoint": "local",
+    "_wrap_local_content": "local",
+    **{
+        path.rsplit(".", 1)[1]: path.rsplit(".", 1)[0]
+        for _, _, path in PROVIDER_CLIENTS.values()
+    },
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import moved provider names on first access."""
+    if name in _PROVIDER_EXPORTS:
+        module = importlib.import_module(
+            f"{__package__}.providers.{_PROVIDER_EXPORTS[name]}"
         )
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7,
-            "top_p": 0.9,
-        }
-
-        _LOGGER.debug("z.ai request payload: %s", json.dumps(payload, indent=2))
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=300),
-            ) as resp:
-                if resp.status != 200:
-                    error_text = await resp.text()
-                    _LOGGER.error("z.ai API error %d: %s", resp.status, error_text)
-                    raise Exception(f"z.ai API error {resp.status}")
-                data = await resp.json()
-                # Extract text from z.ai response (OpenAI-compatible format)
-                choices = data.get("choices", [])
-                if not choices:
-                    _LOGGER.warning("z.ai response missing choices")
-                    _LOGGER.debug("Full z.ai response: %s", json.dumps(data, indent=2))
-                    return str(data)
-                if choices and "message" in choices[0]:
-                    return choices[0]["message"].get("content", str(data))
-                return str(data)
-
-
-class BedrockClient(BaseAIClient):
-    def __init__(self, access_key_id, secret_access_key, model="us.anthropic.claude-opus-4-5-20251101-v1:0", region="us-east-1"):
-        self.access_key_id = access_key_id
-        self.secret_access_key = secret_access_key
-        self.model = model
-        self.region = region
-
-    def _get_model_family(self):
-        """Determine the model family from the model ID."""
-        model_lower = self.model.lower()
-        if "claude" in model_lower or "anthropic" in model_lower:
-            return "claude"
-        elif "llama" in model_lower or "meta" in model_lower:
-            return "llama"
-        elif "titan" in model_lower or "amazon" in model_lower:
-            return "titan"
-        elif "mistral" in model_lower:
-            return "mistral"
-        elif "cohere" in model_lower:
-            return "cohere"
-        else:
-            # Default to Claude format for unknown models
-            return "claude"
-
-    def _format_messages_for_bedrock(self, messages):
-        """Convert OpenAI-style messages to Bedrock format based on model family."""
-        model_family = self._get_model_family()
-        
-        if model_family == "claude":
-            # Claude uses Anthropic message format
-            system_message = None
-            anthropic_messages = []
-            
-            for message in messages:
-                role = message.get("role", "")
-                content = message.get("content", "")
-                
-                if role == "system":
-                    system_message = content
-                elif role == "user":
-                    anthropic_messages.append({"role": "user", "content": content})
-                elif role == "assistant":
-                    anthropic_messages.append({"role": "assistant", "content": content})
-            
-            return {
-                "system": system_message,
-                "messages": anthropic_messages
-            }
-        elif model_family in ["llama", "mistral", "cohere"]:
-            # These models use OpenAI-compatible format
-            return {
-                "messages": messages
-            }
-        elif model_family == "titan":
-            # Titan uses a specific format
-            input_text = ""
-            for message in messages:
-                role = message.get("role", "")
-                content = message.get("content", "")
-                if role == "system":
-                    input_text += f"System: {content}\n\n"
-                elif role == "user":
-                    input_text += f"User: {content}\n\n"
-                elif role == "assistant":
-                    input_text += f"Assistant: {content}\n\n"
-            return {
-                "inputText": input_text
-            }
-        else:
-            # Default to Claude format
-            return self._format_messages_for_bedrock(messages)
-
-    async def get_response(self, messages, **kwargs):
-        """Get response from AWS Bedrock."""
-        _LOGGER.debug("Making request to AWS Bedrock API with model: %s, region: %s", self.model, self.region)
-        
-        try:
-            import boto3
-            from botocore.exceptions import ClientError, BotoCoreError
-        except ImportError:
-            raise Exception("boto3 is required for AWS Bedrock support. Please install it: pip install boto3>=1.28.0")
-        
-        # Create boto3 client (synchronous, but we'll run it in executor)
-        def create_client():
-            return boto3.client(
-                'bedrock-runtime',
-                aws_access_key_id=self.access_key_id,
-                aws_secret_access_key=self.secret_access_key,
-                region_name=self.region
-            )
-        
-        # Run client creation in executor
-        loop = asyncio.get_event_loop()
-        bedrock_client = await loop.run_in_executor(None, create_client)
-        
-        model_family = self._get_model_family()
-        formatted_messages = self._format_messages_for_bedrock(messages)
-        
-        # Build request body based on model family
-        if model_family == "claude":
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 8192,
-                **formatted_messages
-            }
-            # Remove system if None
-            if request_body.get("system") is None:
-                request_body.pop("system", None)
-        elif model_family in ["llama", "mistral", "cohere"]:
-            request_body = {
-                "messages": formatted_messages["messages"],
-                "temperature": 0.7,
-                "top_p": 0.9,
-            }
-        elif model_family == "titan":
-            request_body = {
-                "inputText": formatted_messages["inputText"],
-                "textGenerationConfig": {
-                    "maxTokenCount": 4096,
-                    "temperature": 0.7,
-                    "topP": 0.9,
-                }
-            }
-        else:
-            request_body = formatted_messages
-        
-        _LOGGER.debug("Bedrock request body: %s", json.dumps(request_body, indent=2))
-        
-        # Invoke model (synchronous, run in executor)
-        def invoke_model():
-            try:
-                response = bedrock_client.invoke_model(
-                    modelId=self.model,
-                    body=json.dumps(request_body)
-                )
-                return response
-            except ClientError as e:
-                error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-                error_message = e.response.get('Error', {}).get('Message', str(e))
-                _LOGGER.error("AWS Bedrock API error [%s]: %s", error_code, error_message)
-                raise Exception(f"AWS Bedrock API error [{error_code}]: {error_message}")
-            except BotoCoreError as e:
-                _LOGGER.error("AWS Bedrock client error: %s", str(e))
-                raise Exception(f"AWS Bedrock client error: {str(e)}")
-        
-        try:
-            response = await loop.run_in_executor(None, invoke_model)
-            response_body = json.loads(response['body'].read())
-            
-            _LOGGER.debug("Bedrock response: %s", json.dumps(response_body, indent=2)[:500])
-            
-            # Extract text based on model family
-            if model_family == "claude":
-                # Claude response format
-                if "content" in response_body:
-                    content_blocks = response_body["content"]
-                    if isinstance(content_blocks, list) and len(content_blocks) > 0:
-                        text_content = content_blocks[0].get("text", "")
-                        if text_content:
-                            return text_content
-                return str(response_body)
-            elif model_family in ["llama", "mistral", "cohere"]:
-                # OpenAI-compatible format
-                if "choices" in response_body and len(response_body["choices"]) > 0:
-                    message = response_body["choices"][0].get("message", {})
-                    return message.get("content", str(response_body))
-                return str(response_body)
-            elif model_family == "titan":
-                # Titan response format
-                if "results" in response_body and len(response_body["results"]) > 0:
-                    return response_body["results"][0].get("outputText", str(response_body))
-                return str(response_body)
-            else:
-                return str(response_body)
-                
-        except Exception as e:
-            _LOGGER.exception("Error invoking Bedrock model: %s", str(e))
-            raise Exception(f"Error invoking Bedrock model: {str(e)}")
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# How list results over the tool result budget are returned (see paging.py)
+PAGING_INSTRUCTIONS = (
+    "Large list results come back as one page: "
+    '{"items": [...], "total": N, "continuation": "...", "summary": {...}}. '
+    "Use the summary (counts per domain and area) to narrow the request, e.g. "
+    "by domain or area. Only if you need more items, repeat the same request "
+    'with "continuation" added to its parameters; "offset" and "limit" page '
+    "explicitly.\n"
+)
+
+# How entity tool results are projected (see projection.py)
+PROJECTION_INSTRUCTIONS = (
+    "Entity tools (get_entity_state, get_entities_by_domain, get_entities_by_area, "
+    "get_entities, get_entities_by_device_class, get_climate_related_entities, "
+    'get_calendar_events, get_automations) accept "fields" (e.g. ["state"]) to '
+    'return only those fields and "attributes" (e.g. ["brightness"], or "*" for '
+    "all) to return only those attributes. By default bulky attributes are left "
+    'out and listed in "omitted_attributes"; request them by name if needed.\n'
+)
+
+# Appended to the messages for the one retry of a degenerate reply (see
+# degeneration.py); resending the same prompt tends to produce the same loop
+DEGENERATE_RETRY_MESSAGE = {
+    "role": "user",
+    "content": (
+        "Your previous reply was discarded because it kept repeating itself "
+        "or grew too long. Reply again with one short, valid JSON response and "
+        "do not repeat phrases or list items."
+    ),
+}
+
+# Recorder statistics query options
+STATISTICS_PERIODS = ("5minute", "hour", "day", "week", "month")
+STATISTICS_PERIOD_ALIASES = {
+    "5min": "5minute",
+    "5m": "5minute",
+    "hourly": "hour",
+    "daily": "day",
+    "weekly": "week",
+    "monthly": "month",
+}
+STATISTIC_TYPES = {"change", "last_reset", "max", "mean", "min", "state", "sum"}
+DEFAULT_STATISTIC_TYPES = ("mean", "min", "max", "state", "sum")
 
 
 # === Main Agent ===
@@ -1123,15 +200,17 @@ class AiAgentHaAgent:
             "- get_entity_registry(): Get entity registry entries (now includes device_class, state_class, unit_of_measurement)\n"
             "- get_device_registry(): Get device registry entries\n"
             "- get_area_registry(): Get room/area information\n"
-            "- get_history(entity_id, hours): Get historical state changes\n"
+            "- get_history(entity_id or entity_ids, hours): Get historical state changes - pass entity_ids=[...] to fetch several entities in one request\n"
             "- get_person_data(): Get person tracking information\n"
-            "- get_statistics(entity_id): Get sensor statistics\n"
+            "- get_statistics(entity_id or entity_ids, period?, hours?, statistic_types?): Get sensor statistics - without period returns the latest short-term values;\n"
+            "  with period (5minute/hour/day/week/month) returns long-term statistics over the last 'hours' hours. statistic_types selects from mean/min/max/sum/state/change/last_reset\n"
             "- get_scenes(): Get scene configurations\n"
             "- get_dashboards(): Get list of all dashboards\n"
             "- get_dashboard_config(dashboard_url): Get configuration of a specific dashboard\n"
             "- set_entity_state(entity_id, state, attributes?): Set state of an entity (e.g., turn on/off lights, open/close covers)\n"
             "- call_service(domain, service, target?, service_data?): Call any Home Assistant service directly\n"
             "- create_automation(automation): Create a new automation with the provided configuration\n"
+            "- create_automations(automations): Create several automations at once from a list of configurations\n"
             "- create_dashboard(dashboard_config): Create a new dashboard with the provided configuration\n"
             "- update_dashboard(dashboard_url, dashboard_config): Update an existing dashboard configuration\n\n"
             "IMPORTANT DEVICE_CLASS GUIDANCE:\n"
@@ -1192,7 +271,10 @@ class AiAgentHaAgent:
             '  "parameters": {...}\n'
             "}\n"
             'For get_entities with multiple areas: {"request_type": "get_entities", "parameters": {"area_ids": ["area1", "area2"]}}\n'
-            'For get_entities with single area: {"request_type": "get_entities", "parameters": {"area_id": "single_area"}}\n\n'
+            'For get_entities with single area: {"request_type": "get_entities", "parameters": {"area_id": "single_area"}}\n'
+            + PAGING_INSTRUCTIONS
+            + PROJECTION_INSTRUCTIONS
+            + "\n"
             "For service calls, use this exact JSON format:\n"
             "{\n"
             '  "request_type": "call_service",\n'
@@ -1262,15 +344,17 @@ class AiAgentHaAgent:
             "- get_entity_registry(): Get entity registry entries (now includes device_class, state_class, unit_of_measurement)\n"
             "- get_device_registry(): Get device registry entries\n"
             "- get_area_registry(): Get room/area information\n"
-            "- get_history(entity_id, hours): Get historical state changes\n"
+            "- get_history(entity_id or entity_ids, hours): Get historical state changes - pass entity_ids=[...] to fetch several entities in one request\n"
             "- get_person_data(): Get person tracking information\n"
-            "- get_statistics(entity_id): Get sensor statistics\n"
+            "- get_statistics(entity_id or entity_ids, period?, hours?, statistic_types?): Get sensor statistics - without period returns the latest short-term values;\n"
+            "  with period (5minute/hour/day/week/month) returns long-term statistics over the last 'hours' hours. statistic_types selects from mean/min/max/sum/state/change/last_reset\n"
             "- get_scenes(): Get scene configurations\n"
             "- get_dashboards(): Get list of all dashboards\n"
             "- get_dashboard_config(dashboard_url): Get configuration of a specific dashboard\n"
             "- set_entity_state(entity_id, state, attributes?): Set state of an entity (e.g., turn on/off lights, open/close covers)\n"
             "- call_service(domain, service, target?, service_data?): Call any Home Assistant service directly\n"
             "- create_automation(automation): Create a new automation with the provided configuration\n"
+            "- create_automations(automations): Create several automations at once from a list of configurations\n"
             "- create_dashboard(dashboard_config): Create a new dashboard with the provided configuration\n"
             "- update_dashboard(dashboard_url, dashboard_config): Update an existing dashboard configuration\n\n"
             "IMPORTANT DEVICE_CLASS GUIDANCE:\n"
@@ -1335,7 +419,10 @@ class AiAgentHaAgent:
             '- Get all lights: {"request_type": "data_request", "request": "get_entities_by_domain", "parameters": {"domain": "light"}}\n'
             '- Get temperature sensors: {"request_type": "data_request", "request": "get_entities_by_device_class", "parameters": {"device_class": "temperature", "domain": "sensor"}}\n'
             '- Get entities from multiple areas: {"request_type": "data_request", "request": "get_entities", "parameters": {"area_ids": ["area1", "area2"]}}\n'
-            '- Get entities from single area: {"request_type": "data_request", "request": "get_entities", "parameters": {"area_id": "living_room"}}\n\n'
+            '- Get entities from single area: {"request_type": "data_request", "request": "get_entities", "parameters": {"area_id": "living_room"}}\n'
+            + PAGING_INSTRUCTIONS
+            + PROJECTION_INSTRUCTIONS
+            + "\n"
             "For service calls, use this exact JSON format:\n"
             "{\n"
             '  "request_type": "call_service",\n'
@@ -1378,14 +465,29 @@ class AiAgentHaAgent:
         ),
     }
 
-    def __init__(self, hass: HomeAssistant, config: Dict[str, Any]):
-        """Initialize the agent with provider selection."""
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config: Dict[str, Any],
+        persist_history: bool = True,
+    ):
+        """Initialize the agent with provider selection.
+
+        With persist_history=False the conversation is kept in memory only and
+        never loaded from or saved to storage.
+        """
         self.hass = hass
         self.config = config
+        self._persist_history = persist_history
         self.conversation_history: List[Dict[str, Any]] = []
+        # Rolling summary of the turns compacted out of conversation_history
+        self.conversation_summary: Optional[str] = None
+        # Compactions of this conversation run one at a time
+        self._compaction_lock = asyncio.Lock()
         self._cache: Dict[str, Any] = {}
         self.ai_client: BaseAIClient
         self._cache_timeout = 300  # 5 minutes
+        self._tool_result_budget = paging.DEFAULT_BUDGET_CHARS
         self._max_retries = 10
         self._retry_delay = 1  # seconds
         self._rate_limit = 60  # requests per minute
@@ -1394,6 +496,10 @@ class AiAgentHaAgent:
         self._request_window_start = time.time()
         self._conversation_store: Optional[Store] = None
         self._provider_id = config.get("ai_provider", "openai")
+        # Used when the integration's shared registry and store are not set up
+        self._own_client_registry = ClientRegistry()
+        self._own_automation_store: Optional["AutomationStore"] = None
+        self._own_metrics = MetricsCollector()
 
         provider = config.get("ai_provider", "openai")
         models_config = config.get("models", {})
@@ -1410,44 +516,20 @@ class AiAgentHaAgent:
             _LOGGER.debug("Using standard system prompt")
 
         # Initialize the appropriate AI client with model selection
-        if provider == "openai":
-            model = models_config.get("openai", "gpt-3.5-turbo")
-            self.ai_client = OpenAIClient(config.get("openai_token"), model)
-        elif provider == "gemini":
-            model = models_config.get("gemini", "gemini-2.5-flash")
-            self.ai_client = GeminiClient(config.get("gemini_token"), model)
-        elif provider == "openrouter":
-            model = models_config.get("openrouter", "openai/gpt-4o")
-            self.ai_client = OpenRouterClient(config.get("openrouter_token"), model)
-        elif provider == "anthropic":
-            model = models_config.get("anthropic", "claude-sonnet-4-5-20250929")
-            self.ai_client = AnthropicClient(config.get("anthropic_token"), model)
-        elif provider == "alter":
-            model = models_config.get("alter", "")
-            self.ai_client = AlterClient(config.get("alter_token"), model)
-        elif provider == "zai":
-            model = models_config.get("zai", "glm-4.7")
-            endpoint_type = config.get("zai_endpoint", "general")
-            self.ai_client = ZaiClient(config.get("zai_token"), model, endpoint_type)
-        elif provider == "bedrock":
-            model = models_config.get("bedrock", "us.anthropic.claude-opus-4-5-20251101-v1:0")
-            access_key = config.get("bedrock_access_key")
-            secret_key = config.get("bedrock_secret_key")
-            region = config.get("bedrock_region", "us-east-1")
-            if not access_key or not secret_key:
-                _LOGGER.error("Missing Bedrock credentials")
-                raise Exception("Missing Bedrock credentials (access_key and secret_key required)")
-            self.ai_client = BedrockClient(access_key, secret_key, model, region)
-        elif provider == "local":
-            model = models_config.get("local", "")
-            url = config.get("local_url")
-            if not url:
-                _LOGGER.error("Missing local_url for local provider")
-                raise Exception("Missing local_url configuration for local provider")
-            self.ai_client = LocalClient(url, model)
-        else:  # default to llama if somehow specified
-            model = models_config.get("llama", "Llama-4-Maverick-17B-128E-Instruct-FP8")
-            self.ai_client = LlamaClient(config.get("llama_token"), model)
+        if provider not in PROVIDER_CLIENTS:  # default to llama if somehow specified
+            provider = "llama"
+        if provider == "bedrock" and not (
+            config.get("bedrock_access_key") and config.get("bedrock_secret_key")
+        ):
+            _LOGGER.error("Missing Bedrock credentials")
+            raise Exception(
+                "Missing Bedrock credentials (access_key and secret_key required)"
+            )
+        if provider == "local" and not config.get("local_url"):
+            _LOGGER.error("Missing local_url for local provider")
+            raise Exception("Missing local_url configuration for local provider")
+        self.ai_client = self._get_client(provider, config)
+        model = self.ai_client.model
 
         _LOGGER.debug(
             "AiAgentHaAgent initialized successfully with provider: %s, model: %s",
@@ -1455,6 +537,126 @@ class AiAgentHaAgent:
             model,
         )
 
+    def _get_client_registry(self) -> ClientRegistry:
+        """Return the integration's shared client registry."""
+        registry = self.hass.data.get(DOMAIN, {}).get("client_registry")
+        return registry if registry is not None else self._own_client_registry
+
+    def _get_metrics(self) -> MetricsCollector:
+        """Return the integration's shared metrics collector."""
+        collector = self.hass.data.get(DOMAIN, {}).get("metrics")
+        return collector if collector is not None else self._own_metrics
+
+    def _get_session_recorder(self) -> Optional[session_recorder.SessionRecorder]:
+        """Return the integration's session recorder, if it is set up."""
+        return self.hass.data.get(DOMAIN, {}).get("session_recorder")
+
+    def _get_scheduler(self) -> Optional[QueryScheduler]:
+        """Return the integration's query scheduler, if it is set up."""
+        return self.hass.data.get(DOMAIN, {}).get("scheduler")
+
+    def _get_automation_store(self) -> "AutomationStore":
+        """Return the integration's shared automations.yaml store.
+
+        The store (and yaml) is only imported once an automation is created.
+        """
+        domain_data = self.hass.data.get(DOMAIN)
+        store = (domain_data or {}).get("automation_store")
+        if store is not None:
+            return store
+        from .automation_store import AutomationStore
+
+        if isinstance(domain_data, dict):
+            store = domain_data["automation_store"] = AutomationStore(self.hass)
+            return store
+        if self._own_automation_store is None:
+            self._own_automation_store = AutomationStore(self.hass)
+        return self._own_automation_store
+
+    @staticmethod
+    def _client_key(provider: str, model: str, config: Dict[str, Any]) -> ClientKey:
+        """Build the registry key identifying a provider client."""
+        if provider == "bedrock":
+            credentials = hash_credentials(
+                config.get("bedrock_access_key"), config.get("bedrock_secret_key")
+            )
+            endpoint = config.get("bedrock_region", "us-east-1")
+        elif provider == "gemini":
+            credentials = hash_credentials(config.get("gemini_token"))
+            endpoint = str(config.get(CONF_GEMINI_CACHE_TTL) or 0)
+        elif provider == "local":
+            credentials = hash_credentials()
+            endpoint = "|".join(
+                str(config.get(key) or "")
+                for key in (
+                    "local_url",
+                    CONF_LOCAL_API_MODE,
+                    CONF_LOCAL_KEEP_ALIVE,
+                    CONF_LOCAL_NUM_CTX,
+                )
+            )
+        else:
+            credentials = hash_credentials(config.get(PROVIDER_CLIENTS[provider][0]))
+            endpoint = (
+                config.get("zai_endpoint", "general") if provider == "zai" else ""
+            )
+        return ClientKey(provider, model, credentials, endpoint)
+
+    @staticmethod
+    def _create_client(
+        provider: str, model: str, config: Dict[str, Any]
+    ) -> BaseAIClient:
+        """Construct a client for a provider from its config."""
+        cls = client_class(provider)
+        if provider == "zai":
+            # ZaiClient takes (token, model, endpoint_type)
+            return cls(
+                config.get("zai_token"), model, config.get("zai_endpoint", "general")
+            )
+        if provider == "bedrock":
+            # BedrockClient takes (access_key_id, secret_access_key, model, region)
+            return cls(
+                config.get("bedrock_access_key"),
+                config.get("bedrock_secret_key"),
+                model,
+                config.get("bedrock_region", "us-east-1"),
+            )
+        if provider == "gemini":
+            return cls(
+                config.get("gemini_token"),
+                model,
+                cache_ttl=config.get(CONF_GEMINI_CACHE_TTL) or 0,
+            )
+        if provider == "local":
+            from .providers.local import LocalClient
+
+            return LocalClient.from_config(config, model)
+        token_key = PROVIDER_CLIENTS[provider][0]
+        return cls(token=config.get(token_key), model=model)
+
+    def _get_client(self, provider: str, config: Dict[str, Any]) -> BaseAIClient:
+        """Return the shared client for a provider, creating it on first use."""
+        _, default_model, _ = PROVIDER_CLIENTS[provider]
+        model = config.get("models", {}).get(provider, default_model)
+        return self._get_client_registry().get_or_create(
+            self._client_key(provider, model, config),
+            lambda: self._create_client(provider, model, config),
+        )
+
+    def create_ephemeral_agent(self) -> "AiAgentHaAgent":
+        """Return an agent with this config and a fresh, unsaved conversation.
+
+        Provider clients are shared through the registry, so this is cheap.
+        """
+        return AiAgentHaAgent(self.hass, self.config, persist_history=False)
+
+    def update_config(self, config: Dict[str, Any]) -> None:
+        """Switch to updated settings, e.g. after the config entry changed."""
+        self.config = config
+        provider = config.get("ai_provider", "openai")
+        if provider in PROVIDER_CLIENTS:
+            self.ai_client = self._get_client(provider, config)
+
     def _validate_api_key(self) -> bool:
         """Validate the API key format."""
         provider = self.config.get("ai_provider", "openai")
@@ -1540,8 +742,21 @@ class AiAgentHaAgent:
                     sanitized[key] = value
         return sanitized
 
-    async def get_entity_state(self, entity_id: str) -> Dict[str, Any]:
-        """Get the state of a specific entity."""
+    def _get_state_cache(self) -> Optional[EntityStateCache]:
+        """Return the shared serialized entity state cache, if set up."""
+        return self.hass.data.get(DOMAIN, {}).get("state_cache")
+
+    async def get_entity_state(
+        self,
+        entity_id: str,
+        fields: Optional[Union[str, List[str]]] = None,
+        attributes: Optional[Union[str, List[str]]] = None,
+    ) -> Dict[str, Any]:
+        """Get the state of a specific entity.
+
+        fields and attributes select the returned fields and state attributes;
+        by default the domain's default projection applies.
+        """
         try:
             _LOGGER.debug("Requesting entity state for: %s", entity_id)
             state = self.hass.states.get(entity_id)
@@ -1549,6 +764,19 @@ class AiAgentHaAgent:
                 _LOGGER.warning("Entity not found: %s", entity_id)
                 return {"error": f"Entity {entity_id} not found"}
 
+            # Reuse the serialized result while the entity is unchanged; only
+            # the default projection is cached
+            state_cache = (
+                self._get_state_cache()
+                if is_default_projection(fields, attributes)
+                else None
+            )
+            if state_cache is not None:
+                cached = state_cache.get(entity_id, state.last_updated)
+                if cached is not None:
+                    metrics.record_cache_hit()
+                    return cached
+
             # Get area information from entity/device registry
             # Wrapped in try-except to handle cases where registries aren't available (e.g., in tests)
             area_id = None
@@ -1669,12 +897,20 @@ class AiAgentHaAgent:
                 area_id,
                 area_name,
             )
+            result = project_entity_state(result, fields, attributes)
+            if state_cache is not None:
+                return state_cache.put(entity_id, state.last_updated, result)
             return result
         except Exception as e:
             _LOGGER.exception("Error getting entity state: %s", str(e))
             return {"error": f"Error getting entity state: {str(e)}"}
 
-    async def get_entities_by_domain(self, domain: str) -> List[Dict[str, Any]]:
+    async def get_entities_by_domain(
+        self,
+        domain: str,
+        fields: Optional[Union[str, List[str]]] = None,
+        attributes: Optional[Union[str, List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
         """Get all entities for a specific domain."""
         try:
             _LOGGER.debug("Requesting all entities for domain: %s", domain)
@@ -1684,19 +920,28 @@ class AiAgentHaAgent:
                 if state.entity_id.startswith(f"{domain}.")
             ]
             _LOGGER.debug("Found %d entities in domain %s", len(states), domain)
-            return [await self.get_entity_state(state.entity_id) for state in states]
+            return [
+                await self.get_entity_state(state.entity_id, fields, attributes)
+                for state in states
+            ]
         except Exception as e:
             _LOGGER.exception("Error getting entities by domain: %s", str(e))
             return [{"error": f"Error getting entities for domain {domain}: {str(e)}"}]
 
     async def get_entities_by_device_class(
-        self, device_class: str, domain: str = None
+        self,
+        device_class: str,
+        domain: str = None,
+        fields: Optional[Union[str, List[str]]] = None,
+        attributes: Optional[Union[str, List[str]]] = None,
     ) -> List[Dict[str, Any]]:
         """Get all entities with a specific device_class.
 
         Args:
             device_class: The device class to filter by (e.g., 'temperature', 'humidity', 'motion')
             domain: Optional domain to restrict search (e.g., 'sensor', 'binary_sensor')
+            fields: Optional top-level fields to return
+            attributes: Optional state attributes to return, "*" for all
 
         Returns:
             List of entity state dictionaries that match the device_class
@@ -1727,7 +972,7 @@ class AiAgentHaAgent:
 
             # Get full state information for each matching entity
             return [
-                await self.get_entity_state(entity_id)
+                await self.get_entity_state(entity_id, fields, attributes)
                 for entity_id in matching_entities
             ]
 
@@ -1739,7 +984,11 @@ class AiAgentHaAgent:
                 }
             ]
 
-    async def get_climate_related_entities(self) -> List[Dict[str, Any]]:
+    async def get_climate_related_entities(
+        self,
+        fields: Optional[Union[str, List[str]]] = None,
+        attributes: Optional[Union[str, List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
         """Get all climate-related entities including climate domain and temperature/humidity sensors.
 
         Returns:
@@ -1753,18 +1002,20 @@ class AiAgentHaAgent:
             climate_entities = []
 
             # Get all climate domain entities (thermostats, HVAC)
-            climate_domain = await self.get_entities_by_domain("climate")
+            climate_domain = await self.get_entities_by_domain(
+                "climate", fields, attributes
+            )
             climate_entities.extend(climate_domain)
 
             # Get temperature sensors
             temp_sensors = await self.get_entities_by_device_class(
-                "temperature", "sensor"
+                "temperature", "sensor", fields, attributes
             )
             climate_entities.extend(temp_sensors)
 
             # Get humidity sensors
             humidity_sensors = await self.get_entities_by_device_class(
-                "humidity", "sensor"
+                "humidity", "sensor", fields, attributes
             )
             climate_entities.extend(humidity_sensors)
 
@@ -1788,7 +1039,12 @@ class AiAgentHaAgent:
             _LOGGER.exception("Error getting climate-related entities: %s", str(e))
             return [{"error": f"Error getting climate-related entities: {str(e)}"}]
 
-    async def get_entities_by_area(self, area_id: str) -> List[Dict[str, Any]]:
+    async def get_entities_by_area(
+        self,
+        area_id: str,
+        fields: Optional[Union[str, List[str]]] = None,
+        attributes: Optional[Union[str, List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
         """Get all entities for a specific area."""
         try:
             _LOGGER.debug("Requesting all entities for area: %s", area_id)
@@ -1820,7 +1076,7 @@ class AiAgentHaAgent:
             # Get state information for each entity
             result = []
             for entity_id in entities_in_area:
-                state_info = await self.get_entity_state(entity_id)
+                state_info = await self.get_entity_state(entity_id, fields, attributes)
                 if not state_info.get("error"):  # Only include entities that exist
                     result.append(state_info)
 
@@ -1830,7 +1086,9 @@ class AiAgentHaAgent:
             _LOGGER.exception("Error getting entities by area: %s", str(e))
             return [{"error": f"Error getting entities for area {area_id}: {str(e)}"}]
 
-    async def get_entities(self, area_id=None, area_ids=None) -> List[Dict[str, Any]]:
+    async def get_entities(
+        self, area_id=None, area_ids=None, fields=None, attributes=None
+    ) -> List[Dict[str, Any]]:
         """Get entities by area(s) - flexible method that supports single area or multiple areas."""
         try:
             # Handle different parameter formats
@@ -1855,7 +1113,9 @@ class AiAgentHaAgent:
 
             all_entities = []
             for area in areas_to_process:
-                entities_in_area = await self.get_entities_by_area(area)
+                entities_in_area = await self.get_entities_by_area(
+                    area, fields, attributes
+                )
                 all_entities.extend(entities_in_area)
 
             # Remove duplicates based on entity_id
@@ -1881,7 +1141,10 @@ class AiAgentHaAgent:
             return [{"error": f"Error getting entities: {str(e)}"}]
 
     async def get_calendar_events(
-        self, entity_id: Optional[str] = None
+        self,
+        entity_id: Optional[str] = None,
+        fields: Optional[Union[str, List[str]]] = None,
+        attributes: Optional[Union[str, List[str]]] = None,
     ) -> List[Dict[str, Any]]:
         """Get calendar events, optionally filtered by entity_id."""
         try:
@@ -1889,19 +1152,23 @@ class AiAgentHaAgent:
                 _LOGGER.debug(
                     "Requesting calendar events for specific entity: %s", entity_id
                 )
-                return [await self.get_entity_state(entity_id)]
+                return [await self.get_entity_state(entity_id, fields, attributes)]
 
             _LOGGER.debug("Requesting all calendar events")
-            return await self.get_entities_by_domain("calendar")
+            return await self.get_entities_by_domain("calendar", fields, attributes)
         except Exception as e:
             _LOGGER.exception("Error getting calendar events: %s", str(e))
             return [{"error": f"Error getting calendar events: {str(e)}"}]
 
-    async def get_automations(self) -> List[Dict[str, Any]]:
+    async def get_automations(
+        self,
+        fields: Optional[Union[str, List[str]]] = None,
+        attributes: Optional[Union[str, List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
         """Get all automations."""
         try:
             _LOGGER.debug("Requesting all automations")
-            return await self.get_entities_by_domain("automation")
+            return await self.get_entities_by_domain("automation", fields, attributes)
         except Exception as e:
             _LOGGER.exception("Error getting automations: %s", str(e))
             return [{"error": f"Error getting automations: {str(e)}"}]
@@ -2008,9 +1275,39 @@ class AiAgentHaAgent:
             _LOGGER.exception("Error getting device registry entries: %s", str(e))
             return [{"error": f"Error getting device registry entries: {str(e)}"}]
 
-    async def get_history(self, entity_id: str, hours: int = 24) -> List[Dict]:
-        """Get historical state changes for an entity"""
-        _LOGGER.debug("Requesting historical state changes for entity: %s", entity_id)
+    @staticmethod
+    def _normalize_entity_ids(
+        entity_id: Optional[Union[str, List[str]]] = None,
+        entity_ids: Optional[Union[str, List[str]]] = None,
+    ) -> List[str]:
+        """Merge entity_id/entity_ids parameters into a deduplicated list."""
+        requested: List[str] = []
+        for value in (entity_id, entity_ids):
+            if not value:
+                continue
+            if isinstance(value, str):
+                requested.append(value)
+            else:
+                requested.extend(str(item) for item in value if item)
+        return list(dict.fromkeys(requested))
+
+    async def get_history(
+        self,
+        entity_id: Optional[str] = None,
+        hours: int = 24,
+        entity_ids: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """Get historical state changes for one or more entities.
+
+        All requested entities are fetched with a single recorder query.
+        """
+        requested_ids = self._normalize_entity_ids(entity_id, entity_ids)
+        if not requested_ids:
+            return [{"error": "No entity_id or entity_ids provided"}]
+
+        _LOGGER.debug(
+            "Requesting historical state changes for entities: %s", requested_ids
+        )
         try:
             from homeassistant.components.recorder.history import get_significant_states
 
@@ -2023,7 +1320,7 @@ class AiAgentHaAgent:
                 self.hass,
                 start,
                 now,
-                [entity_id],
+                requested_ids,
             )
 
             # Convert to serializable format
@@ -2099,9 +1396,51 @@ class AiAgentHaAgent:
             _LOGGER.exception("Error getting person tracking information: %s", str(e))
             return [{"error": f"Error getting person tracking information: {str(e)}"}]
 
-    async def get_statistics(self, entity_id: str) -> Dict:
-        """Get statistics for an entity"""
-        _LOGGER.debug("Requesting statistics for entity: %s", entity_id)
+    async def get_statistics(
+        self,
+        entity_id: Optional[str] = None,
+        entity_ids: Optional[List[str]] = None,
+        period: Optional[str] = None,
+        hours: int = 24,
+        statistic_types: Optional[List[str]] = None,
+    ) -> Dict:
+        """Get statistics for one or more entities.
+
+        Without a period, a single entity returns its latest short-term
+        statistic (the original behaviour). With a period, or when several
+        entities are requested, all of them are fetched with a single
+        statistics_during_period query.
+        """
+        requested_ids = self._normalize_entity_ids(entity_id, entity_ids)
+        if not requested_ids:
+            return {"error": "No entity_id or entity_ids provided"}
+
+        _LOGGER.debug(
+            "Requesting statistics for entities: %s (period: %s, hours: %s)",
+            requested_ids,
+            period,
+            hours,
+        )
+
+        if period is not None:
+            period = STATISTICS_PERIOD_ALIASES.get(str(period).lower(), period)
+            if period not in STATISTICS_PERIODS:
+                return {
+                    "error": f"Invalid statistics period '{period}'. Use one of: {', '.join(STATISTICS_PERIODS)}"
+                }
+
+        if statistic_types:
+            if isinstance(statistic_types, str):
+                statistic_types = [statistic_types]
+            invalid_types = [t for t in statistic_types if t not in STATISTIC_TYPES]
+            if invalid_types:
+                return {
+                    "error": f"Invalid statistic types {invalid_types}. Use any of: {', '.join(sorted(STATISTIC_TYPES))}"
+                }
+            types = set(statistic_types)
+        else:
+            types = set(DEFAULT_STATISTIC_TYPES)
+
         try:
             from homeassistant.components import recorder
 
@@ -2109,38 +1448,108 @@ class AiAgentHaAgent:
             if not self.hass.data.get(recorder.DATA_INSTANCE):
                 return {"error": "Recorder component is not available"}
 
-            # from homeassistant.components.recorder.statistics import get_latest_short_term_statistics
             import homeassistant.components.recorder.statistics as stats_module
 
-            # Get latest statistics
+            if period is None and len(requested_ids) == 1:
+                # Get latest statistics
+                single_id = requested_ids[0]
+                stats = await self.hass.async_add_executor_job(
+                    stats_module.get_last_short_term_statistics,
+                    self.hass,
+                    1,
+                    single_id,
+                    True,
+                    set(),
+                )
+
+                if single_id in stats:
+                    stat_data = stats[single_id][0] if stats[single_id] else {}
+                    return {
+                        "entity_id": single_id,
+                        "start": stat_data.get("start"),
+                        "mean": stat_data.get("mean"),
+                        "min": stat_data.get("min"),
+                        "max": stat_data.get("max"),
+                        "last_reset": stat_data.get("last_reset"),
+                        "state": stat_data.get("state"),
+                        "sum": stat_data.get("sum"),
+                    }
+                return {"error": f"No statistics available for entity {single_id}"}
+
+            # Without an explicit period, return only the latest short-term
+            # row per entity from the last hour of 5-minute statistics
+            latest_only = period is None
+            query_period = period or "5minute"
+            now = dt_util.utcnow()
+            start = now - timedelta(hours=1 if latest_only else hours)
+
+            # period and types were checked against the recorder's literals above
             stats = await self.hass.async_add_executor_job(
-                # get_latest_short_term_statistics,
-                stats_module.get_last_short_term_statistics,
+                stats_module.statistics_during_period,  # type: ignore[arg-type]
                 self.hass,
-                1,
-                entity_id,
-                True,
-                set(),
+                start,
+                now,
+                set(requested_ids),
+                query_period,
+                None,
+                types,
             )
 
-            if entity_id in stats:
-                stat_data = stats[entity_id][0] if stats[entity_id] else {}
+            statistics: Dict[str, List[Dict[str, Any]]] = {}
+            for stat_id in requested_ids:
+                rows = stats.get(stat_id) or []
+                if not rows:
+                    continue
+                if latest_only:
+                    rows = rows[-1:]
+                statistics[stat_id] = [
+                    self._format_statistics_row(row, types) for row in rows
+                ]
+
+            missing = [
+                stat_id for stat_id in requested_ids if stat_id not in statistics
+            ]
+            if not statistics:
                 return {
-                    "entity_id": entity_id,
-                    "start": stat_data.get("start"),
-                    "mean": stat_data.get("mean"),
-                    "min": stat_data.get("min"),
-                    "max": stat_data.get("max"),
-                    "last_reset": stat_data.get("last_reset"),
-                    "state": stat_data.get("state"),
-                    "sum": stat_data.get("sum"),
+                    "error": f"No statistics available for entities {', '.join(requested_ids)}"
                 }
-            else:
-                return {"error": f"No statistics available for entity {entity_id}"}
+
+            return {
+                "period": "latest" if latest_only else query_period,
+                "start": start.isoformat(),
+                "end": now.isoformat(),
+                "statistic_types": sorted(types),
+                "statistics": statistics,
+                "missing": missing,
+            }
         except Exception as e:
             _LOGGER.exception("Error getting statistics: %s", str(e))
             return {"error": f"Error getting statistics: {str(e)}"}
 
+    @staticmethod
+    def _format_statistics_row(row: Mapping[str, Any], types: set) -> Dict[str, Any]:
+        """Convert a recorder statistics row into a compact serializable dict."""
+
+        def _to_iso(value: Any) -> Any:
+            # Recorder rows carry UTC timestamps as floats
+            if isinstance(value, (int, float)):
+                return dt_util.utc_from_timestamp(value).isoformat()
+            if hasattr(value, "isoformat"):
+                return value.isoformat()
+            return value
+
+        formatted: Dict[str, Any] = {
+            "start": _to_iso(row.get("start")),
+            "end": _to_iso(row.get("end")),
+        }
+        for stat_type in sorted(types):
+            if stat_type in row:
+                value = row[stat_type]
+                formatted[stat_type] = (
+                    _to_iso(value) if stat_type == "last_reset" else value
+                )
+        return formatted
+
     async def get_scenes(self) -> List[Dict]:
         """Get scene configurations"""
         _LOGGER.debug("Requesting scene configurations")
@@ -2187,7 +1596,7 @@ class AiAgentHaAgent:
             # Get all available attributes
             all_attributes = state.attributes
             _LOGGER.debug(
-                "Available weather attributes: %s", json.dumps(all_attributes)
+                "Available weather attributes: %s", json_codec.dumps(all_attributes)
             )
 
             # Get forecast data
@@ -2225,7 +1634,7 @@ class AiAgentHaAgent:
             # Log the processed data for debugging
             _LOGGER.debug(
                 "Processed weather data: %s",
-                json.dumps(
+                json_codec.dumps(
                     {"current": current, "forecast_count": len(processed_forecast)}
                 ),
             )
@@ -2239,74 +1648,81 @@ class AiAgentHaAgent:
         self, automation_config: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Create a new automation with validation and sanitization."""
+        result = await self.create_automations([automation_config])
+        if "error" in result:
+            return {"error": result["error"]}
+        return {"success": True, "message": result["message"]}
+
+    async def create_automations(
+        self, automation_configs: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Create automations with a single file write and automation reload.
+
+        Either all automations are created or, if any of them is invalid or
+        uses an existing alias, none are.
+        """
         try:
             _LOGGER.debug(
-                "Creating automation with config: %s", json.dumps(automation_config)
+                "Creating %d automation(s) with config: %s",
+                len(automation_configs),
+                json_codec.LazyJSON(automation_configs),
             )
 
-            # Validate required fields
-            if not all(
-                key in automation_config for key in ["alias", "trigger", "action"]
-            ):
-                return {"error": "Missing required fields in automation configuration"}
-
-            # Sanitize configuration
-            sanitized_config = self._sanitize_automation_config(automation_config)
-
-            # Generate a unique ID for the automation
-            automation_id = f"ai_agent_auto_{int(time.time() * 1000)}"
-
-            # Create the automation entry
-            automation_entry = {
-                "id": automation_id,
-                "alias": sanitized_config["alias"],
-                "description": sanitized_config.get("description", ""),
-                "trigger": sanitized_config["trigger"],
-                "condition": sanitized_config.get("condition", []),
-                "action": sanitized_config["action"],
-                "mode": sanitized_config.get("mode", "single"),
-            }
+            if not automation_configs:
+                return {"error": "No automations provided"}
 
-            # Read current automations.yaml using async executor
-            automations_path = self.hass.config.path("automations.yaml")
-            try:
-                current_automations = await self.hass.async_add_executor_job(
-                    lambda: yaml.safe_load(open(automations_path, "r")) or []
-                )
-            except FileNotFoundError:
-                current_automations = []
-
-            # Check for duplicate automation names
-            if any(
-                auto.get("alias") == automation_entry["alias"]
-                for auto in current_automations
-            ):
-                return {
-                    "error": f"An automation with the name '{automation_entry['alias']}' already exists"
-                }
+            # Generate unique IDs for the automations
+            base_id = f"ai_agent_auto_{int(time.time() * 1000)}"
+            entries = []
+            for index, automation_config in enumerate(automation_configs):
+                # Validate required fields
+                if not isinstance(automation_config, dict) or not all(
+                    key in automation_config for key in ["alias", "trigger", "action"]
+                ):
+                    return {
+                        "error": "Missing required fields in automation configuration",
+                        "index": index,
+                    }
 
-            # Append new automation
-            current_automations.append(automation_entry)
+                # Sanitize configuration
+                sanitized_config = self._sanitize_automation_config(automation_config)
 
-            # Write back to file using async executor
-            await self.hass.async_add_executor_job(
-                lambda: yaml.dump(
-                    current_automations,
-                    open(automations_path, "w"),
-                    default_flow_style=False,
+                # Create the automation entry
+                entries.append(
+                    {
+                        "id": (
+                            base_id
+                            if len(automation_configs) == 1
+                            else f"{base_id}_{index}"
+                        ),
+                        "alias": sanitized_config["alias"],
+                        "description": sanitized_config.get("description", ""),
+                        "trigger": sanitized_config["trigger"],
+                        "condition": sanitized_config.get("condition", []),
+                        "action": sanitized_config["action"],
+                        "mode": sanitized_config.get("mode", "single"),
+                    }
                 )
-            )
 
-            # Reload automations
+            from .automation_store import DuplicateAutomationError
+
+            try:
+                await self._get_automation_store().async_add(entries)
+            except DuplicateAutomationError as e:
+                return {"error": str(e)}
+
+            # Reload automations once for the whole batch
             await self.hass.services.async_call("automation", "reload")
 
             # Clear automation-related caches
             self._cache.clear()
 
-            return {
-                "success": True,
-                "message": f"Automation '{automation_entry['alias']}' created successfully",
-            }
+            aliases = [entry["alias"] for entry in entries]
+            if len(aliases) == 1:
+                message = f"Automation '{aliases[0]}' created successfully"
+            else:
+                message = f"{len(aliases)} automations created successfully"
+            return {"success": True, "message": message, "created": aliases}
 
         except Exception as e:
             _LOGGER.exception("Error creating automation: %s", str(e))
@@ -2314,447 +1730,101 @@ class AiAgentHaAgent:
 
     async def get_dashboards(self) -> List[Dict[str, Any]]:
         """Get list of all dashboards."""
+        from .dashboards import describe_dashboards, get_lovelace_dashboards
+
         try:
             _LOGGER.debug("Requesting all dashboards")
 
-            # Get dashboards via WebSocket API
-            ws_api = self.hass.data.get("websocket_api")
-            if not ws_api:
-                return [{"error": "WebSocket API not available"}]
-
-            # Use the lovelace service to get dashboards
-            try:
-                from homeassistant.components.lovelace import DOMAIN as LOVELACE_DOMAIN
-
-                # Get lovelace data using property access (required for HA 2026.2+)
-                # lovelace_data is a LovelaceData dataclass with a 'dashboards' attribute
-                lovelace_data = self.hass.data.get(LOVELACE_DOMAIN)
-                if lovelace_data is None:
-                    return [{"error": "Lovelace not available"}]
-
-                # Safety check for dashboards attribute (backward compatibility)
-                if not hasattr(lovelace_data, "dashboards"):
-                    return [{"error": "Lovelace dashboards not available"}]
-
-                # Use property access instead of dictionary access
-                dashboards = lovelace_data.dashboards
-
-                # Get YAML dashboard configs for metadata (title, icon, etc.)
-                # yaml_dashboards contains the configuration with metadata
-                yaml_configs = getattr(lovelace_data, "yaml_dashboards", {}) or {}
-
-                dashboard_list = []
-
-                # Iterate over all dashboards (None key = default dashboard)
-                for url_path, dashboard_obj in dashboards.items():
-                    # Try to get metadata from yaml_dashboards first
-                    yaml_config = yaml_configs.get(url_path, {}) or {}
-
-                    # Get title - check yaml config, then use defaults
-                    title = yaml_config.get("title")
-                    if not title:
-                        title = (
-                            "Overview"
-                            if url_path is None
-                            else (url_path or "Dashboard")
-                        )
-
-                    # Get icon - check yaml config, then use defaults
-                    icon = yaml_config.get("icon")
-                    if not icon:
-                        icon = "mdi:home" if url_path is None else "mdi:view-dashboard"
-
-                    # Get sidebar/admin settings from yaml config or defaults
-                    show_in_sidebar = yaml_config.get("show_in_sidebar", True)
-                    require_admin = yaml_config.get("require_admin", False)
-
-                    dashboard_list.append(
-                        {
-                            "url_path": url_path,
-                            "title": title,
-                            "icon": icon,
-                            "show_in_sidebar": show_in_sidebar,
-                            "require_admin": require_admin,
-                        }
-                    )
+            if get_lovelace_dashboards(self.hass) is None:
+                return [{"error": "Lovelace dashboards not available"}]
 
-                _LOGGER.debug("Found %d dashboards", len(dashboard_list))
-                return dashboard_list
-
-            except Exception as e:
-                _LOGGER.warning("Could not get dashboards via lovelace: %s", str(e))
-                return [{"error": f"Could not retrieve dashboards: {str(e)}"}]
+            dashboard_list = describe_dashboards(self.hass)
+            _LOGGER.debug("Found %d dashboards", len(dashboard_list))
+            return dashboard_list
 
         except Exception as e:
             _LOGGER.exception("Error getting dashboards: %s", str(e))
-            return [{"error": f"Error getting dashboards: {str(e)}"}]
-
-    async def get_dashboard_config(
-        self, dashboard_url: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Get configuration of a specific dashboard."""
-        try:
-            _LOGGER.debug(
-                "Requesting dashboard config for: %s", dashboard_url or "default"
-            )
-
-            # Get dashboard configuration
-            try:
-                from homeassistant.components.lovelace import DOMAIN as LOVELACE_DOMAIN
-
-                # Get lovelace data using property access (required for HA 2026.2+)
-                lovelace_data = self.hass.data.get(LOVELACE_DOMAIN)
-                if lovelace_data is None:
-                    return {"error": "Lovelace not available"}
-
-                # Safety check for dashboards attribute (backward compatibility)
-                if not hasattr(lovelace_data, "dashboards"):
-                    return {"error": "Lovelace dashboards not available"}
-
-                # Use property access instead of dictionary access
-                # The dashboards dict uses None as key for the default dashboard
-                dashboards = lovelace_data.dashboards
-
-                # Get the dashboard (None key = default dashboard)
-                dashboard_key = None if dashboard_url is None else dashboard_url
-                if dashboard_key in dashboards:
-                    dashboard = dashboards[dashboard_key]
-                    config = await dashboard.async_get_info()
-                    return dict(config) if config else {"error": "No dashboard config"}
-                else:
-                    if dashboard_url is None:
-                        return {"error": "Default dashboard not found"}
-                    else:
-                        return {"error": f"Dashboard '{dashboard_url}' not found"}
-
-            except Exception as e:
-                _LOGGER.warning("Could not get dashboard config: %s", str(e))
-                return {"error": f"Could not retrieve dashboard config: {str(e)}"}
-
-        except Exception as e:
-            _LOGGER.exception("Error getting dashboard config: %s", str(e))
-            return {"error": f"Error getting dashboard config: {str(e)}"}
-
-    async def create_dashboard(
-        self, dashboard_config: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Create a new dashboard using Home Assistant's Lovelace WebSocket API."""
-        try:
-            _LOGGER.debug(
-                "Creating dashboard with config: %s",
-                json.dumps(dashboard_config, default=str),
-            )
-
-            # Validate required fields
-            if not dashboard_config.get("title"):
-                return {"error": "Dashboard title is required"}
-
-            if not dashboard_config.get("url_path"):
-                return {"error": "Dashboard URL path is required"}
-
-            # Sanitize the URL path
-            url_path = (
-                dashboard_config["url_path"].lower().replace(" ", "-").replace("_", "-")
-            )
-
-            # Prepare dashboard configuration for Lovelace
-            dashboard_data = {
-                "title": dashboard_config["title"],
-                "icon": dashboard_config.get("icon", "mdi:view-dashboard"),
-                "show_in_sidebar": dashboard_config.get("show_in_sidebar", True),
-                "require_admin": dashboard_config.get("require_admin", False),
-                "views": dashboard_config.get("views", []),
-            }
-
-            try:
-                # Create dashboard file directly - this is the most reliable method
-                import os
-
-                import yaml
-
-                # Create the dashboard YAML file
-                lovelace_config_file = self.hass.config.path(
-                    f"ui-lovelace-{url_path}.yaml"
-                )
-
-                # Use async_add_executor_job to perform file I/O asynchronously
-                def write_dashboard_file():
-                    with open(lovelace_config_file, "w") as f:
-                        yaml.dump(
-                            dashboard_data,
-                            f,
-                            default_flow_style=False,
-                            allow_unicode=True,
-                        )
-
-                await self.hass.async_add_executor_job(write_dashboard_file)
-
-                _LOGGER.info(
-                    "Successfully created dashboard file: %s", lovelace_config_file
-                )
-
-                # Now update configuration.yaml
-                try:
-                    config_file = self.hass.config.path("configuration.yaml")
-                    dashboard_config_entry = {
-                        url_path: {
-                            "mode": "yaml",
-                            "title": dashboard_config["title"],
-                            "icon": dashboard_config.get("icon", "mdi:view-dashboard"),
-                            "show_in_sidebar": dashboard_config.get(
-                                "show_in_sidebar", True
-                            ),
-                            "filename": f"ui-lovelace-{url_path}.yaml",
-                        }
-                    }
-
-                    def update_config_file():
-                        try:
-                            with open(config_file, "r") as f:
-                                content = f.read()
-
-                            # Dashboard configuration to add
-                            dashboard_yaml = f"""    {url_path}:
-      mode: yaml
-      title: {dashboard_config['title']}
-      icon: {dashboard_config.get('icon', 'mdi:view-dashboard')}
-      show_in_sidebar: {str(dashboard_config.get('show_in_sidebar', True)).lower()}
-      filename: ui-lovelace-{url_path}.yaml"""
-
-                            # Check if lovelace section exists
-                            if "lovelace:" not in content:
-                                # Add complete lovelace section at the end
-                                lovelace_section = f"""
-# Lovelace dashboards configuration added by AI Agent
-lovelace:
-  dashboards:
-{dashboard_yaml}
-"""
-                                with open(config_file, "a") as f:
-                                    f.write(lovelace_section)
-                                return True
-
-                            # If lovelace exists, check for dashboards section
-                            lines = content.split("\n")
-                            new_lines = []
-                            dashboard_added = False
-                            in_lovelace = False
-                            lovelace_indent = 0
-
-                            for i, line in enumerate(lines):
-                                new_lines.append(line)
-
-                                # Detect lovelace section
-                                if (
-                                    line.strip() == "lovelace:"
-                                    or line.strip().startswith("lovelace:")
-                                ):
-                                    in_lovelace = True
-                                    lovelace_indent = len(line) - len(line.lstrip())
-                                    continue
-
-                                # If we're in lovelace section
-                                if in_lovelace:
-                                    current_indent = (
-                                        len(line) - len(line.lstrip())
-                                        if line.strip()
-                                        else 0
-                                    )
-
-                                    # If we hit another top-level section, we're out of lovelace
-                                    if (
-                                        line.strip()
-                                        and current_indent <= lovelace_indent
-                                        and not line.startswith(" ")
-                                    ):
-                                        if line.strip() != "lovelace:":
-                                            in_lovelace = False
-
-                                    # Look for dashboards section
-                                    if in_lovelace and "dashboards:" in line:
-                                        # Add our dashboard after the dashboards: line
-                                        new_lines.append(dashboard_yaml)
-                                        dashboard_added = True
-                                        in_lovelace = False  # We're done
-                                        break
-
-                            # If we found lovelace but no dashboards section, add it
-                            if not dashboard_added and "lovelace:" in content:
-                                # Find lovelace section and add dashboards
-                                new_lines = []
-                                for line in lines:
-                                    new_lines.append(line)
-                                    if (
-                                        line.strip() == "lovelace:"
-                                        or line.strip().startswith("lovelace:")
-                                    ):
-                                        # Add dashboards section right after lovelace
-                                        new_lines.append("  dashboards:")
-                                        new_lines.append(dashboard_yaml)
-                                        dashboard_added = True
-                                        break
-
-                            if dashboard_added:
-                                with open(config_file, "w") as f:
-                                    f.write("\n".join(new_lines))
-                                return True
-                            else:
-                                # Last resort: append to end of file
-                                with open(config_file, "a") as f:
-                                    f.write(f"\n  dashboards:\n{dashboard_yaml}\n")
-                                return True
-
-                        except Exception as e:
-                            _LOGGER.error(
-                                "Failed to update configuration.yaml: %s", str(e)
-                            )
-                            # Fallback to simple append method
-                            try:
-                                with open(config_file, "r") as f:
-                                    content = f.read()
-
-                                # Check if lovelace section exists
-                                if "lovelace:" not in content:
-                                    # Add lovelace section
-                                    lovelace_config = f"""
-# Lovelace dashboards
-lovelace:
-  dashboards:
-    {url_path}:
-      mode: yaml
-      title: {dashboard_config['title']}
-      icon: {dashboard_config.get('icon', 'mdi:view-dashboard')}
-      show_in_sidebar: {str(dashboard_config.get('show_in_sidebar', True)).lower()}
-      filename: ui-lovelace-{url_path}.yaml
-"""
-                                    with open(config_file, "a") as f:
-                                        f.write(lovelace_config)
-                                else:
-                                    # Add to existing lovelace section (simple approach)
-                                    dashboard_entry = f"""    {url_path}:
-      mode: yaml
-      title: {dashboard_config['title']}
-      icon: {dashboard_config.get('icon', 'mdi:view-dashboard')}
-      show_in_sidebar: {str(dashboard_config.get('show_in_sidebar', True)).lower()}
-      filename: ui-lovelace-{url_path}.yaml
-"""
-                                    # Find the dashboards section and add to it
-                                    lines = content.split("\n")
-                                    new_lines = []
-                                    in_dashboards = False
-                                    dashboards_indented = False
-
-                                    for line in lines:
-                                        new_lines.append(line)
-                                        if (
-                                            "dashboards:" in line
-                                            and "lovelace"
-                                            in content[: content.find(line)]
-                                        ):
-                                            in_dashboards = True
-                                            # Add our dashboard entry after dashboards:
-                                            new_lines.append(dashboard_entry.rstrip())
-                                            in_dashboards = False
-
-                                    # If we couldn't find dashboards section, add it under lovelace
-                                    if not any("dashboards:" in line for line in lines):
-                                        for i, line in enumerate(new_lines):
-                                            if line.strip() == "lovelace:":
-                                                new_lines.insert(i + 1, "  dashboards:")
-                                                new_lines.insert(
-                                                    i + 2, dashboard_entry.rstrip()
-                                                )
-                                                break
-
-                                    with open(config_file, "w") as f:
-                                        f.write("\n".join(new_lines))
-
-                                return True
-                            except Exception as fallback_error:
-                                _LOGGER.error(
-                                    "Fallback config update also failed: %s",
-                                    str(fallback_error),
-                                )
-                                return False
+            return [{"error": f"Error getting dashboards: {str(e)}"}]
 
-                    config_updated = await self.hass.async_add_executor_job(
-                        update_config_file
-                    )
+    async def get_dashboard_config(
+        self, dashboard_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get configuration of a specific dashboard."""
+        from .dashboards import get_lovelace_dashboards, resolve_dashboard_url
 
-                    if config_updated:
-                        success_message = f"""Dashboard '{dashboard_config['title']}' created successfully!
+        try:
+            _LOGGER.debug(
+                "Requesting dashboard config for: %s", dashboard_url or "default"
+            )
 
-✅ Dashboard file created: ui-lovelace-{url_path}.yaml
-✅ Configuration.yaml updated automatically
+            dashboards = get_lovelace_dashboards(self.hass)
+            if dashboards is None:
+                return {"error": "Lovelace dashboards not available"}
 
-🔄 Please restart Home Assistant to see your new dashboard in the sidebar."""
+            # The dashboards dict uses None as key for the default dashboard
+            dashboard = dashboards.get(resolve_dashboard_url(dashboard_url))
+            if dashboard is None:
+                if resolve_dashboard_url(dashboard_url) is None:
+                    return {"error": "Default dashboard not found"}
+                return {"error": f"Dashboard '{dashboard_url}' not found"}
 
-                        return {
-                            "success": True,
-                            "message": success_message,
-                            "url_path": url_path,
-                            "restart_required": True,
-                        }
-                    else:
-                        # Config update failed, provide manual instructions
-                        config_instructions = f"""Dashboard '{dashboard_config['title']}' created successfully!
-
-✅ Dashboard file created: ui-lovelace-{url_path}.yaml
-⚠️  Could not automatically update configuration.yaml
-
-Please manually add this to your configuration.yaml:
-
-lovelace:
-  dashboards:
-    {url_path}:
-      mode: yaml
-      title: {dashboard_config['title']}
-      icon: {dashboard_config.get('icon', 'mdi:view-dashboard')}
-      show_in_sidebar: {str(dashboard_config.get('show_in_sidebar', True)).lower()}
-      filename: ui-lovelace-{url_path}.yaml
-
-Then restart Home Assistant to see your new dashboard in the sidebar."""
-
-                        return {
-                            "success": True,
-                            "message": config_instructions,
-                            "url_path": url_path,
-                            "restart_required": True,
-                        }
+            try:
+                config = await dashboard.async_load(False)
+            except Exception as e:
+                _LOGGER.warning("Could not get dashboard config: %s", str(e))
+                return {"error": f"Could not retrieve dashboard config: {str(e)}"}
+            return dict(config) if config else {"error": "No dashboard config"}
 
-                except Exception as config_error:
-                    _LOGGER.error(
-                        "Error updating configuration.yaml: %s", str(config_error)
-                    )
-                    # Provide manual instructions as fallback
-                    config_instructions = f"""Dashboard '{dashboard_config['title']}' created successfully!
+        except Exception as e:
+            _LOGGER.exception("Error getting dashboard config: %s", str(e))
+            return {"error": f"Error getting dashboard config: {str(e)}"}
+
+    async def create_dashboard(
+        self, dashboard_config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Create a new dashboard through Lovelace."""
+        from .dashboards import MODE_STORAGE, async_create_dashboard
 
-✅ Dashboard file created: ui-lovelace-{url_path}.yaml
-⚠️  Could not automatically update configuration.yaml
+        try:
+            _LOGGER.debug(
+                "Creating dashboard with config: %s",
+                json_codec.LazyJSON(dashboard_config),
+            )
 
-Please manually add this to your configuration.yaml:
+            # Validate required fields
+            if not dashboard_config.get("title"):
+                return {"error": "Dashboard title is required"}
 
-lovelace:
-  dashboards:
-    {url_path}:
-      mode: yaml
-      title: {dashboard_config['title']}
-      icon: {dashboard_config.get('icon', 'mdi:view-dashboard')}
-      show_in_sidebar: {str(dashboard_config.get('show_in_sidebar', True)).lower()}
-      filename: ui-lovelace-{url_path}.yaml
+            if not dashboard_config.get("url_path"):
+                return {"error": "Dashboard URL path is required"}
 
-Then restart Home Assistant to see your new dashboard in the sidebar."""
+            # Sanitize the URL path
+            url_path = (
+                dashboard_config["url_path"].lower().replace(" ", "-").replace("_", "-")
+            )
 
-                    return {
-                        "success": True,
-                        "message": config_instructions,
-                        "url_path": url_path,
-                        "restart_required": True,
-                    }
+            result = await async_create_dashboard(self.hass, url_path, dashboard_config)
+            if "error" in result:
+                return result
 
-            except Exception as e:
-                _LOGGER.error("Failed to create dashboard file: %s", str(e))
-                return {"error": f"Failed to create dashboard file: {str(e)}"}
+            message = f"Dashboard '{dashboard_config['title']}' created successfully!"
+            if result["mode"] == MODE_STORAGE:
+                message += " It is available in the sidebar now."
+            elif "configuration_entry" in result:
+                message += (
+                    f" Its views were saved to ui-lovelace-{url_path}.yaml, but "
+                    "configuration.yaml could not be updated automatically. Add "
+                    "this under lovelace: dashboards: in configuration.yaml:\n\n"
+                    f"{result.pop('configuration_entry')}\n\n"
+                    "Then restart Home Assistant to see it in the sidebar."
+                )
+            else:
+                message += (
+                    f" Its views were saved to ui-lovelace-{url_path}.yaml and it "
+                    "was added to configuration.yaml. Restart Home Assistant to "
+                    "see it in the sidebar."
+                )
+            return {**result, "message": message}
 
         except Exception as e:
             _LOGGER.exception("Error creating dashboard: %s", str(e))
@@ -2763,181 +1833,114 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
     async def update_dashboard(
         self, dashboard_url: str, dashboard_config: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Update an existing dashboard using Home Assistant's Lovelace WebSocket API."""
+        """Update an existing dashboard's views and settings."""
+        from .dashboards import async_update_dashboard
+
         try:
             _LOGGER.debug(
                 "Updating dashboard %s with config: %s",
                 dashboard_url,
-                json.dumps(dashboard_config, default=str),
+                json_codec.LazyJSON(dashboard_config),
             )
 
-            # Prepare updated dashboard configuration
-            dashboard_data = {
-                "title": dashboard_config.get("title", "Updated Dashboard"),
-                "icon": dashboard_config.get("icon", "mdi:view-dashboard"),
-                "show_in_sidebar": dashboard_config.get("show_in_sidebar", True),
-                "require_admin": dashboard_config.get("require_admin", False),
-                "views": dashboard_config.get("views", []),
-            }
-
-            # First, try to check if this is a storage-mode dashboard
-            try:
-                from homeassistant.components.lovelace import DOMAIN as LOVELACE_DOMAIN
-
-                lovelace_data = self.hass.data.get(LOVELACE_DOMAIN)
-                if lovelace_data is not None and hasattr(lovelace_data, "dashboards"):
-                    dashboards = lovelace_data.dashboards
-                    
-                    # Handle special case: if dashboard_url is "storage", it might refer to default dashboard
-                    # or we need to find the actual dashboard URL
-                    dashboard_key = None if (dashboard_url is None or dashboard_url == "storage") else dashboard_url
-                    
-                    # If "storage" was passed and default dashboard not found, try to find any storage-mode dashboard
-                    if dashboard_url == "storage" and dashboard_key not in dashboards:
-                        _LOGGER.debug("'storage' passed as dashboard_url, searching for storage-mode dashboards")
-                        # Try to find a storage-mode dashboard
-                        for key, dash in dashboards.items():
-                            try:
-                                config = await dash.async_get_info()
-                                if config and config.get("mode") == "storage":
-                                    dashboard_key = key
-                                    _LOGGER.debug("Found storage-mode dashboard with key: %s", key)
-                                    break
-                            except Exception:
-                                continue
-                    
-                    if dashboard_key in dashboards:
-                        dashboard = dashboards[dashboard_key]
-                        # Check if this is a storage-mode dashboard
-                        config = await dashboard.async_get_info()
-                        if config and config.get("mode") == "storage":
-                            # This is a storage-mode dashboard, update via Lovelace API
-                            _LOGGER.debug("Updating storage-mode dashboard: %s", dashboard_url)
-                            
-                            # Update the dashboard configuration using the Lovelace API
-                            # For storage-mode dashboards, we need to update the config via the dashboard's storage
-                            try:
-                                # Get the current config to preserve any existing data
-                                current_config = await dashboard.async_get_info()
-                                
-                                # Update the config with new data
-                                updated_config = dashboard_data.copy()
-                                
-                                # Try to save the config using the dashboard's async_save_config method
-                                if hasattr(dashboard, "async_save_config"):
-                                    await dashboard.async_save_config(updated_config)
-                                elif hasattr(dashboard, "config_store"):
-                                    # Access the storage directly
-                                    store = dashboard.config_store
-                                    if hasattr(store, "async_save"):
-                                        await store.async_save(updated_config)
-                                    else:
-                                        # Try alternative storage access
-                                        if hasattr(dashboard, "_config_store"):
-                                            store = dashboard._config_store
-                                            await store.async_save(updated_config)
-                                        else:
-                                            raise AttributeError("No storage method found")
-                                else:
-                                    # Try using the lovelace.save_config service
-                                    await self.hass.services.async_call(
-                                        "lovelace",
-                                        "save_config",
-                                        {
-                                            "url_path": dashboard_url,
-                                            "config": updated_config
-                                        }
-                                    )
-                                
-                                _LOGGER.info(
-                                    "Successfully updated storage-mode dashboard: %s", dashboard_url
-                                )
-                                return {
-                                    "success": True,
-                                    "message": f"Dashboard '{dashboard_url}' updated successfully!",
-                                }
-                            except Exception as e:
-                                _LOGGER.warning(
-                                    "Failed to update storage-mode dashboard via API: %s", str(e)
-                                )
-                                # Fall through to try YAML file method
-            except Exception as e:
-                _LOGGER.debug("Could not check for storage-mode dashboard: %s", str(e))
-                # Fall through to try YAML file method
-
-            # Try updating the YAML file (for YAML-mode dashboards)
-            try:
-                import os
-                import yaml
-
-                # Try updating the YAML file
-                dashboard_file = self.hass.config.path(
-                    f"ui-lovelace-{dashboard_url}.yaml"
-                )
-
-                # Check if file exists asynchronously
-                def check_file_exists():
-                    return os.path.exists(dashboard_file)
-
-                file_exists = await self.hass.async_add_executor_job(check_file_exists)
-
-                if not file_exists:
-                    dashboard_file = self.hass.config.path(
-                        f"dashboards/{dashboard_url}.yaml"
-                    )
-                    file_exists = await self.hass.async_add_executor_job(
-                        lambda: os.path.exists(dashboard_file)
-                    )
-
-                if file_exists:
-                    # Use async_add_executor_job to perform file I/O asynchronously
-                    def update_dashboard_file():
-                        with open(dashboard_file, "w") as f:
-                            yaml.dump(
-                                dashboard_data,
-                                f,
-                                default_flow_style=False,
-                                allow_unicode=True,
-                            )
-
-                    await self.hass.async_add_executor_job(update_dashboard_file)
-
-                    _LOGGER.info(
-                        "Successfully updated dashboard file: %s", dashboard_file
-                    )
-                    return {
-                        "success": True,
-                        "message": f"Dashboard '{dashboard_url}' updated successfully!",
-                    }
-                else:
-                    # Provide more helpful error message
-                    available_dashboards = []
-                    try:
-                        from homeassistant.components.lovelace import DOMAIN as LOVELACE_DOMAIN
-                        lovelace_data = self.hass.data.get(LOVELACE_DOMAIN)
-                        if lovelace_data and hasattr(lovelace_data, "dashboards"):
-                            for key in lovelace_data.dashboards.keys():
-                                available_dashboards.append(str(key) if key is not None else "default")
-                    except Exception:
-                        pass
-                    
-                    error_msg = f"Dashboard '{dashboard_url}' not found"
-                    if available_dashboards:
-                        error_msg += f". Available dashboards: {', '.join(available_dashboards)}"
-                    return {"error": error_msg}
+            result = await async_update_dashboard(
+                self.hass, dashboard_url, dashboard_config
+            )
+            if "error" in result:
+                return result
 
-            except Exception as e:
-                _LOGGER.error("Failed to update dashboard file: %s", str(e))
-                return {"error": f"Failed to update dashboard file: {str(e)}"}
+            return {
+                **result,
+                "message": f"Dashboard '{dashboard_url}' updated successfully!",
+            }
 
         except Exception as e:
             _LOGGER.exception("Error updating dashboard: %s", str(e))
             return {"error": f"Error updating dashboard: {str(e)}"}
 
     async def process_query(
-        self, user_query: str, provider: Optional[str] = None, debug: bool = False
+        self,
+        user_query: str,
+        provider: Optional[str] = None,
+        debug: bool = False,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        priority: str = PRIORITY_PANEL,
+    ) -> Dict[str, Any]:
+        """Process a user query with input validation and rate limiting.
+
+        progress_callback, if given, is called with a dict describing each
+        step (AI request, tool call, service call) while the query runs.
+        Latency, tokens, retries and errors are recorded per provider. With
+        debug, the response includes the query's trace spans. While session
+        recording is on, the query is recorded for offline replay. Data the
+        query is likely to need is prefetched during the first AI request.
+
+        The query waits for a slot of its priority class (see scheduler.py)
+        and fails without running if it cannot start before the class's
+        deadline.
+        """
+        scheduler = self._get_scheduler()
+        if scheduler is None:
+            return await self._run_query(user_query, provider, debug, progress_callback)
+        try:
+            async with scheduler.slot(priority):
+                return await self._run_query(
+                    user_query, provider, debug, progress_callback
+                )
+        except QueryRejected as err:
+            _LOGGER.warning("Query not admitted (%s): %s", err.reason, err)
+            return {"success": False, "error": str(err)}
+
+    async def _run_query(
+        self,
+        user_query: str,
+        provider: Optional[str],
+        debug: bool,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]],
+    ) -> Dict[str, Any]:
+        """Run a query admitted by the scheduler (see process_query)."""
+        export = bool(self.config.get(CONF_EXPORT_TRACES))
+        provider_name = provider or self.config.get("ai_provider", "unknown")
+        with (
+            self._get_metrics().track_query(provider_name) as query_metrics,
+            tracing.trace_query(
+                enabled=debug or export, provider=provider_name
+            ) as trace,
+            session_recorder.record_session(
+                self._get_session_recorder(), user_query, provider_name
+            ),
+            prefetch.prefetch_scope(),
+            self._home_digest_scope(),
+        ):
+            result = await self._process_query(
+                user_query, provider, debug, progress_callback
+            )
+            query_metrics.finish(result)
+            session_recorder.record_result(result)
+            if trace is not None and result.get("error"):
+                trace.root.error = str(result["error"])[:200]
+
+        if trace is not None:
+            if export:
+                self.hass.async_add_executor_job(
+                    tracing.export_otlp, self.hass.config.config_dir, trace
+                )
+            if debug and isinstance(result.get("debug"), dict):
+                # Copy rather than update: the result may also be in the cache
+                result = {
+                    **result,
+                    "debug": {**result["debug"], "trace": trace.as_dict()},
+                }
+        return result
+
+    async def _process_query(
+        self,
+        user_query: str,
+        provider: Optional[str],
+        debug: bool,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]],
     ) -> Dict[str, Any]:
-        """Process a user query with input validation and rate limiting."""
+        """Run the query loop (see process_query)."""
         try:
             if not user_query or not isinstance(user_query, str):
                 return {"success": False, "error": "Invalid query format"}
@@ -2950,74 +1953,37 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
 
             _LOGGER.debug(f"Processing query with provider: {provider}")
             # Log sanitized config (masks all tokens/keys for security)
-            _LOGGER.debug(
-                f"Using config: {json.dumps(sanitize_for_logging(config), default=str)}"
-            )
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "Using config: %s",
+                    json_codec.dumps(sanitize_for_logging(config, copy_on_write=True)),
+                )
 
             selected_provider = provider or config.get("ai_provider", "llama")
             models_config = config.get("models", {})
 
-            provider_config = {
-                "openai": {
-                    "token_key": "openai_token",
-                    "model": models_config.get("openai", "gpt-3.5-turbo"),
-                    "client_class": OpenAIClient,
-                },
-                "gemini": {
-                    "token_key": "gemini_token",
-                    "model": models_config.get("gemini", "gemini-1.5-flash"),
-                    "client_class": GeminiClient,
-                },
-                "openrouter": {
-                    "token_key": "openrouter_token",
-                    "model": models_config.get("openrouter", "openai/gpt-4o"),
-                    "client_class": OpenRouterClient,
-                },
-                "llama": {
-                    "token_key": "llama_token",
-                    "model": models_config.get(
-                        "llama", "Llama-4-Maverick-17B-128E-Instruct-FP8"
-                    ),
-                    "client_class": LlamaClient,
-                },
-                "anthropic": {
-                    "token_key": "anthropic_token",
-                    "model": models_config.get(
-                        "anthropic", "claude-sonnet-4-5-20250929"
-                    ),
-                    "client_class": AnthropicClient,
-                },
-                "alter": {
-                    "token_key": "alter_token",
-                    "model": models_config.get("alter", ""),
-                    "client_class": AlterClient,
-                },
-                "zai": {
-                    "token_key": "zai_token",
-                    "model": models_config.get("zai", ""),
-                    "client_class": ZaiClient,
-                },
-                "bedrock": {
-                    "token_key": "bedrock_access_key",  # Primary key for validation
-                    "model": models_config.get("bedrock", "us.anthropic.claude-opus-4-5-20251101-v1:0"),
-                    "client_class": BedrockClient,
-                },
-                "local": {
-                    "token_key": "local_url",
-                    "model": models_config.get("local", ""),
-                    "client_class": LocalClient,
-                },
-            }
-
             # Validate provider and get configuration
-            if selected_provider not in provider_config:
+            if selected_provider not in PROVIDER_CLIENTS:
                 _LOGGER.warning(
                     f"Invalid provider {selected_provider}, falling back to llama"
                 )
                 selected_provider = "llama"
 
-            provider_settings = provider_config[selected_provider]
-            token = self.config.get(provider_settings["token_key"])
+            token_key, default_model, _ = PROVIDER_CLIENTS[selected_provider]
+            provider_settings = {
+                "token_key": token_key,
+                "model": models_config.get(selected_provider, default_model),
+            }
+            token = config.get(token_key)
+            metrics.set_query_model(selected_provider, provider_settings["model"])
+            session_recorder.set_session_model(
+                selected_provider, provider_settings["model"]
+            )
+            tracing.set_query_attributes(
+                provider=selected_provider,
+                model=provider_settings["model"],
+                query_chars=len(user_query),
+            )
 
             def _with_debug(result: Dict[str, Any]) -> Dict[str, Any]:
                 """Attach a sanitized trace when UI requests debug info."""
@@ -3043,49 +2009,16 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                 _LOGGER.error(error_msg)
                 return _with_debug({"success": False, "error": error_msg})
 
-            # Initialize client
+            # Get the shared client; it is passed down rather than read back
+            # from self.ai_client so concurrent queries cannot swap it mid-query
             try:
-                if selected_provider == "zai":
-                    # ZaiClient takes (token, model, endpoint_type)
-                    endpoint_type = config.get("zai_endpoint", "general")
-                    self.ai_client = provider_settings["client_class"](
-                        token=token,
-                        model=provider_settings["model"],
-                        endpoint_type=endpoint_type,
-                    )
-                    _LOGGER.debug(
-                        f"Initialized {selected_provider} client with model {provider_settings['model']}, endpoint_type {endpoint_type}"
-                    )
-                elif selected_provider == "bedrock":
-                    # BedrockClient takes (access_key_id, secret_access_key, model, region)
-                    access_key = config.get("bedrock_access_key")
-                    secret_key = config.get("bedrock_secret_key")
-                    region = config.get("bedrock_region", "us-east-1")
-                    self.ai_client = provider_settings["client_class"](
-                        access_key_id=access_key,
-                        secret_access_key=secret_key,
-                        model=provider_settings["model"],
-                        region=region,
-                    )
-                    _LOGGER.debug(
-                        f"Initialized {selected_provider} client with model {provider_settings['model']}, region {region}"
-                    )
-                elif selected_provider == "local":
-                    # LocalClient takes (url, model)
-                    self.ai_client = provider_settings["client_class"](
-                        url=token, model=provider_settings["model"]
-                    )
-                    _LOGGER.debug(
-                        f"Initialized {selected_provider} client with model {provider_settings['model']}"
-                    )
-                else:
-                    # Other clients take (token, model)
-                    self.ai_client = provider_settings["client_class"](
-                        token=token, model=provider_settings["model"]
-                    )
-                    _LOGGER.debug(
-                        f"Initialized {selected_provider} client with model {provider_settings['model']}"
-                    )
+                # Provider modules load on first use, off the event loop
+                await async_load_client_class(self.hass, selected_provider)
+                client = self._get_client(selected_provider, config)
+                self.ai_client = client
+                _LOGGER.debug(
+                    f"Using {selected_provider} client with model {provider_settings['model']}"
+                )
             except Exception as e:
                 error_msg = f"Error initializing {selected_provider} client: {str(e)}"
                 _LOGGER.error(error_msg)
@@ -3109,6 +2042,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
             cache_key = f"query_{hash(user_query)}_{provider}_{debug}"
             cached_result = self._get_cached_data(cache_key)
             if cached_result:
+                metrics.record_cache_hit()
                 return (
                     dict(cached_result)
                     if isinstance(cached_result, dict)
@@ -3125,129 +2059,67 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                 self.conversation_history.append(self.system_prompt)
 
             # Add user query to conversation
+            session_recorder.set_session_history(self.conversation_history)
             self.conversation_history.append({"role": "user", "content": user_query})
             _LOGGER.debug("Added user query to conversation history")
-            
+            self._start_prefetch(user_query)
+
+            # Fold older turns into the summary before they are sent again
+            await self._compact_history(selected_provider, config)
+
             # Save conversation history after adding user message
             await self.save_conversation_history()
 
             max_iterations = 5  # Prevent infinite loops
             iteration = 0
+            # Spans of returning iterations are closed with the query's trace
+            iteration_span: tracing.AnySpan = tracing.NOOP_SPAN
 
             while iteration < max_iterations:
                 iteration += 1
                 _LOGGER.debug(f"Processing iteration {iteration} of {max_iterations}")
+                tracing.end_span(iteration_span)
+                iteration_span = tracing.start_span(
+                    "iteration", activate=True, iteration=iteration
+                )
 
                 try:
                     # Get AI response
                     _LOGGER.debug("Requesting response from AI provider")
-                    response = await self._get_ai_response()
+                    self._report_progress(
+                        progress_callback, "requesting_ai", iteration=iteration
+                    )
+                    response = await self._get_ai_response(client)
                     _LOGGER.debug("Received response from AI provider: %s", response)
 
                     try:
-                        # Try to parse the response as JSON with simplified approach
-                        response_clean = response.strip()
-
-                        # Remove potential BOM and other invisible characters
-                        import codecs
-
-                        if response_clean.startswith(codecs.BOM_UTF8.decode("utf-8")):
-                            response_clean = response_clean[1:]
-
-                        # Remove other common invisible characters
-                        invisible_chars = [
-                            "\ufeff",
-                            "\u200b",
-                            "\u200c",
-                            "\u200d",
-                            "\u2060",
-                        ]
-                        for char in invisible_chars:
-                            response_clean = response_clean.replace(char, "")
-
-                        _LOGGER.debug(
-                            "Cleaned response length: %d", len(response_clean)
-                        )
-                        _LOGGER.debug(
-                            "Cleaned response first 100 chars: %s", response_clean[:100]
-                        )
-                        _LOGGER.debug(
-                            "Cleaned response last 100 chars: %s", response_clean[-100:]
-                        )
-
-                        # Check if response is empty
-                        if not response_clean or not response_clean.strip():
-                            _LOGGER.warning("Empty response from AI provider")
-                            raise Exception("Empty response from AI provider")
-                        
-                        # Simple strategy: try to parse the cleaned response directly
-                        response_data = None
-                        try:
-                            _LOGGER.debug("Attempting basic JSON parse...")
-                            _LOGGER.debug("Response length: %d, First 200 chars: %s", len(response_clean), response_clean[:200])
-                            response_data = json.loads(response_clean)
-                            _LOGGER.debug("Basic JSON parse succeeded!")
-                        except json.JSONDecodeError as e:
-                            _LOGGER.warning("Basic JSON parse failed: %s", str(e))
-                            _LOGGER.debug("Response content (first 500 chars): %s", response_clean[:500])
-                            _LOGGER.debug("JSON error position: %d", e.pos)
-                            if e.pos < len(response_clean):
-                                _LOGGER.debug(
-                                    "Character at error position: %s (ord: %d)",
-                                    repr(response_clean[e.pos]),
-                                    ord(response_clean[e.pos]),
-                                )
-                                _LOGGER.debug(
-                                    "Context around error: %s",
-                                    repr(
-                                        response_clean[max(0, e.pos - 10) : e.pos + 10]
-                                    ),
-                                )
-
-                            # Fallback: try to extract JSON by finding the first { and last }
-                            json_start = response_clean.find("{")
-                            json_end = response_clean.rfind("}")
-
+                        # Find the command in the response, tolerating fences,
+                        # text around it and concatenated objects
+                        extraction = json_extract.extract_json(response)
+                        response_data = extraction.command
+                        if response_data is None:
+                            response_clean = json_extract.clean_text(response)
+                            if not response_clean:
+                                _LOGGER.warning("Empty response from AI provider")
+                                raise Exception("Empty response from AI provider")
                             if (
-                                json_start != -1
-                                and json_end != -1
-                                and json_end > json_start
+                                extraction.error is not None
+                                and not extraction.objects
+                                and response_clean.startswith("{")
                             ):
-                                json_part = response_clean[json_start : json_end + 1]
-                                _LOGGER.debug(
-                                    "Trying fallback extraction from pos %d to %d",
-                                    json_start,
-                                    json_end,
-                                )
-                                _LOGGER.debug("Extracted JSON: %s", json_part[:200])
-
-                                try:
-                                    response_data = json.loads(json_part)
-                                    _LOGGER.debug("Fallback JSON extraction succeeded!")
-                                except json.JSONDecodeError as e2:
-                                    _LOGGER.warning(
-                                        "Fallback JSON extraction also failed: %s",
-                                        str(e2),
-                                    )
-                                    raise e  # Re-raise the original error
-                            else:
-                                _LOGGER.warning(
-                                    "Could not find JSON boundaries in response. Treating as plain text response."
-                                )
-                                # If no JSON found, wrap the response as plain text
-                                response_data = {
-                                    "request_type": "final_response",
-                                    "response": response_clean
-                                }
-                                _LOGGER.debug("Wrapped non-JSON response as final_response")
-
-                        if response_data is None:
-                            # Last resort: wrap the entire response as plain text
-                            _LOGGER.warning("All JSON parsing strategies failed, wrapping as plain text")
+                                # Meant as JSON, but broken or cut off
+                                raise extraction.error
+                            # Plain text, or JSON that is not a command
+                            _LOGGER.debug("Wrapped non-JSON response as final_response")
                             response_data = {
                                 "request_type": "final_response",
-                                "response": response_clean
+                                "response": response_clean,
                             }
+                        elif len(extraction.objects) > 1:
+                            _LOGGER.debug(
+                                "Response held %d JSON objects, using the first command",
+                                len(extraction.objects),
+                            )
 
                         _LOGGER.debug("Successfully parsed JSON response")
                         _LOGGER.debug(
@@ -3277,6 +2149,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             "get_dashboard_config",
                             "set_entity_state",
                             "create_automation",
+                            "create_automations",
                             "create_dashboard",
                             "update_dashboard",
                         ]
@@ -3294,14 +2167,17 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             _LOGGER.debug(
                                 "Processing data request: %s with parameters: %s",
                                 request_type,
-                                json.dumps(parameters),
+                                json_codec.dumps(parameters),
+                            )
+                            self._report_progress(
+                                progress_callback, "tool", request_type=request_type
                             )
 
                             # Add AI's response to conversation history
                             self.conversation_history.append(
                                 {
                                     "role": "assistant",
-                                    "content": json.dumps(
+                                    "content": json_codec.dumps(
                                         response_data
                                     ),  # Store clean JSON
                                 }
@@ -3309,36 +2185,53 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
 
                             # Get requested data
                             data: Union[Dict[str, Any], List[Dict[str, Any]]]
-                            if request_type == "get_entity_state":
+                            tool_started = time.monotonic()
+                            tool_span = tracing.start_span(
+                                "tool", activate=True, tool=request_type
+                            )
+                            # Field and attribute selection of the entity tools
+                            fields = parameters.get("fields")
+                            attributes = parameters.get("attributes")
+                            prefetched = prefetch.take(request_type, parameters)
+                            if prefetched is not None:
+                                tool_span.set(prefetched=True)
+                                data = await prefetched
+                            elif request_type == "get_entity_state":
                                 data = await self.get_entity_state(
-                                    parameters.get("entity_id")
+                                    parameters.get("entity_id"), fields, attributes
                                 )
                             elif request_type == "get_entities_by_domain":
                                 data = await self.get_entities_by_domain(
-                                    parameters.get("domain")
+                                    parameters.get("domain"), fields, attributes
                                 )
                             elif request_type == "get_entities_by_area":
                                 data = await self.get_entities_by_area(
-                                    parameters.get("area_id")
+                                    parameters.get("area_id"), fields, attributes
                                 )
                             elif request_type == "get_entities":
                                 data = await self.get_entities(
                                     area_id=parameters.get("area_id"),
                                     area_ids=parameters.get("area_ids"),
+                                    fields=fields,
+                                    attributes=attributes,
                                 )
                             elif request_type == "get_entities_by_device_class":
                                 data = await self.get_entities_by_device_class(
                                     parameters.get("device_class"),
                                     parameters.get("domain"),
+                                    fields,
+                                    attributes,
                                 )
                             elif request_type == "get_climate_related_entities":
-                                data = await self.get_climate_related_entities()
+                                data = await self.get_climate_related_entities(
+                                    fields, attributes
+                                )
                             elif request_type == "get_calendar_events":
                                 data = await self.get_calendar_events(
-                                    parameters.get("entity_id")
+                                    parameters.get("entity_id"), fields, attributes
                                 )
                             elif request_type == "get_automations":
-                                data = await self.get_automations()
+                                data = await self.get_automations(fields, attributes)
                             elif request_type == "get_entity_registry":
                                 data = await self.get_entity_registry()
                             elif request_type == "get_device_registry":
@@ -3351,12 +2244,17 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                                 data = await self.get_history(
                                     parameters.get("entity_id"),
                                     parameters.get("hours", 24),
+                                    entity_ids=parameters.get("entity_ids"),
                                 )
                             elif request_type == "get_person_data":
                                 data = await self.get_person_data()
                             elif request_type == "get_statistics":
                                 data = await self.get_statistics(
-                                    parameters.get("entity_id")
+                                    parameters.get("entity_id"),
+                                    entity_ids=parameters.get("entity_ids"),
+                                    period=parameters.get("period"),
+                                    hours=parameters.get("hours", 24),
+                                    statistic_types=parameters.get("statistic_types"),
                                 )
                             elif request_type == "get_scenes":
                                 data = await self.get_scenes()
@@ -3376,6 +2274,10 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                                 data = await self.create_automation(
                                     parameters.get("automation")
                                 )
+                            elif request_type == "create_automations":
+                                data = await self.create_automations(
+                                    parameters.get("automations") or []
+                                )
                             elif request_type == "create_dashboard":
                                 data = await self.create_dashboard(
                                     parameters.get("dashboard_config")
@@ -3392,6 +2294,16 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                                 _LOGGER.warning(
                                     "Unknown request type: %s", request_type
                                 )
+                            tool_seconds = time.monotonic() - tool_started
+                            metrics.record_tool(
+                                request_type,
+                                tool_seconds,
+                                failed=isinstance(data, dict) and "error" in data,
+                            )
+                            session_recorder.record_tool(
+                                request_type, parameters, data, tool_seconds
+                            )
+                            tracing.end_span(tool_span)
 
                             # Check if any data request resulted in an error
                             if isinstance(data, dict) and "error" in data:
@@ -3412,17 +2324,26 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                                     {"success": False, "error": "; ".join(errors)}
                                 )
 
+                            # Oversized lists are returned a page at a time
+                            try:
+                                data = paging.paginate(
+                                    request_type,
+                                    parameters or {},
+                                    data,
+                                    self._tool_result_budget,
+                                )
+                            except paging.PagingError as e:
+                                return _with_debug({"success": False, "error": str(e)})
+
+                            data_message = encode_data_payload(data)
+                            tool_span.set(result_chars=len(data_message))
                             _LOGGER.debug(
-                                "Retrieved data for request: %s",
-                                json.dumps(data, default=str),
+                                "Retrieved data for request: %s", data_message
                             )
 
                             # Add data to conversation as a user message (not system to avoid overwriting system prompt in Anthropic API)
                             self.conversation_history.append(
-                                {
-                                    "role": "user",
-                                    "content": json.dumps({"data": data}, default=str),
-                                }
+                                {"role": "user", "content": data_message}
                             )
                             continue
 
@@ -3431,7 +2352,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             self.conversation_history.append(
                                 {
                                     "role": "assistant",
-                                    "content": json.dumps(
+                                    "content": json_codec.dumps(
                                         response_data
                                     ),  # Store clean JSON
                                 }
@@ -3458,7 +2379,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             self.conversation_history.append(
                                 {
                                     "role": "assistant",
-                                    "content": json.dumps(
+                                    "content": json_codec.dumps(
                                         response_data
                                     ),  # Store clean JSON
                                 }
@@ -3467,11 +2388,11 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             # Return automation suggestion
                             _LOGGER.debug(
                                 "Received automation suggestion: %s",
-                                json.dumps(response_data.get("automation")),
+                                json_codec.dumps(response_data.get("automation")),
                             )
                             result = {
                                 "success": True,
-                                "answer": json.dumps(response_data),
+                                "answer": json_codec.dumps(response_data),
                             }
                             result = _with_debug(result)
                             self._set_cached_data(cache_key, result)
@@ -3483,7 +2404,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             self.conversation_history.append(
                                 {
                                     "role": "assistant",
-                                    "content": json.dumps(
+                                    "content": json_codec.dumps(
                                         response_data
                                     ),  # Store clean JSON
                                 }
@@ -3492,11 +2413,11 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             # Return dashboard suggestion
                             _LOGGER.debug(
                                 "Received dashboard suggestion: %s",
-                                json.dumps(response_data.get("dashboard")),
+                                json_codec.dumps(response_data.get("dashboard")),
                             )
                             result = {
                                 "success": True,
-                                "answer": json.dumps(response_data),
+                                "answer": json_codec.dumps(response_data),
                             }
                             result = _with_debug(result)
                             self._set_cached_data(cache_key, result)
@@ -3509,14 +2430,14 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             parameters = response_data.get("parameters", {})
                             _LOGGER.debug(
                                 "Processing direct get_entities request with parameters: %s",
-                                json.dumps(parameters),
+                                json_codec.dumps(parameters),
                             )
 
                             # Add AI's response to conversation history
                             self.conversation_history.append(
                                 {
                                     "role": "assistant",
-                                    "content": json.dumps(
+                                    "content": json_codec.dumps(
                                         response_data
                                     ),  # Store clean JSON
                                 }
@@ -3540,10 +2461,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
 
                             # Add data to conversation as a user message (not system to avoid overwriting system prompt in Anthropic API)
                             self.conversation_history.append(
-                                {
-                                    "role": "user",
-                                    "content": json.dumps({"data": data}, default=str),
-                                }
+                                {"role": "user", "content": encode_data_payload(data)}
                             )
                             continue
                         elif response_data.get("request_type") == "call_service":
@@ -3552,6 +2470,12 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             service = response_data.get("service")
                             target = response_data.get("target", {})
                             service_data = response_data.get("service_data", {})
+                            self._report_progress(
+                                progress_callback,
+                                "call_service",
+                                domain=domain,
+                                service=service,
+                            )
 
                             # Resolve nested requests in target
                             if target and "entity_id" in target:
@@ -3571,7 +2495,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                                     _LOGGER.debug(
                                         "Resolving nested request: %s with parameters: %s",
                                         nested_request_type,
-                                        json.dumps(nested_parameters),
+                                        json_codec.dumps(nested_parameters),
                                     )
 
                                     # Resolve the nested request
@@ -3653,23 +2577,40 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                                 "Processing service call: %s.%s with target: %s and data: %s",
                                 domain,
                                 service,
-                                json.dumps(target),
-                                json.dumps(service_data),
+                                json_codec.dumps(target),
+                                json_codec.dumps(service_data),
                             )
 
                             # Add AI's response to conversation history
                             self.conversation_history.append(
                                 {
                                     "role": "assistant",
-                                    "content": json.dumps(
+                                    "content": json_codec.dumps(
                                         response_data
                                     ),  # Store clean JSON
                                 }
                             )
 
                             # Call the service
-                            data = await self.call_service(
-                                domain, service, target, service_data
+                            service_started = time.monotonic()
+                            with tracing.span(
+                                "tool",
+                                tool="call_service",
+                                service=f"{domain}.{service}",
+                            ):
+                                data = await self.call_service(
+                                    domain, service, target, service_data
+                                )
+                            session_recorder.record_tool(
+                                "call_service",
+                                {
+                                    "domain": domain,
+                                    "service": service,
+                                    "target": target,
+                                    "service_data": service_data,
+                                },
+                                data,
+                                time.monotonic() - service_started,
                             )
 
                             # Check if service call resulted in an error
@@ -3678,17 +2619,12 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                                     {"success": False, "error": data["error"]}
                                 )
 
-                            _LOGGER.debug(
-                                "Service call completed: %s",
-                                json.dumps(data, default=str),
-                            )
+                            data_message = encode_data_payload(data)
+                            _LOGGER.debug("Service call completed: %s", data_message)
 
                             # Add data to conversation as a user message (not system to avoid overwriting system prompt in Anthropic API)
                             self.conversation_history.append(
-                                {
-                                    "role": "user",
-                                    "content": json.dumps({"data": data}, default=str),
-                                }
+                                {"role": "user", "content": data_message}
                             )
                             # Go to next iteration to continue the loop
                             continue
@@ -3705,7 +2641,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             }
                         )
 
-                    except json.JSONDecodeError as e:
+                    except json_codec.JSONDecodeError as e:
                         # Check if this is a local provider that might have already wrapped the response
                         provider = self.config.get("ai_provider", "unknown")
                         if provider == "local":
@@ -3738,19 +2674,13 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                         # Also log the response to a separate debug file for detailed analysis (non-local providers only)
                         if provider != "local":
                             try:
-                                import os
-
                                 debug_dir = "/config/ai_agent_ha_debug"
 
                                 def write_debug_file():
                                     if not os.path.exists(debug_dir):
                                         os.makedirs(debug_dir)
 
-                                    import datetime
-
-                                    timestamp = datetime.datetime.now().strftime(
-                                        "%Y%m%d_%H%M%S"
-                                    )
+                                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                                     debug_file = os.path.join(
                                         debug_dir, f"failed_response_{timestamp}.txt"
                                     )
@@ -3781,26 +2711,6 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                                     "Could not save debug file: %s", str(debug_error)
                                 )
 
-                        # Check if this looks like a corrupted automation suggestion
-                        if (
-                            response.strip().startswith(
-                                '{"request_type": "automation_suggestion'
-                            )
-                            and len(response) > 10000
-                            and response.count("for its use in various fields") > 50
-                        ):
-                            _LOGGER.warning(
-                                "Detected corrupted automation suggestion response with repetitive text"
-                            )
-                            result = _with_debug(
-                                {
-                                    "success": False,
-                                    "error": "AI generated corrupted automation response. Please try again with a more specific automation request.",
-                                }
-                            )
-                            self._set_cached_data(cache_key, result)
-                            return result
-
                         # If response is not valid JSON, try to wrap it as a final response
                         try:
                             # Truncate extremely long responses to prevent memory issues
@@ -3821,7 +2731,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                             }
                             result = {
                                 "success": True,
-                                "answer": json.dumps(wrapped_response),
+                                "answer": json_codec.dumps(wrapped_response),
                             }
                             _LOGGER.debug("Wrapped non-JSON response as final_response")
                         except Exception as wrap_error:
@@ -3862,6 +2772,20 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                 {"success": False, "error": f"Error in process_query: {str(e)}"}
             )
 
+    @staticmethod
+    def _report_progress(
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]],
+        stage: str,
+        **details: Any,
+    ) -> None:
+        """Send a progress update, never letting the callback fail the query."""
+        if progress_callback is None:
+            return
+        try:
+            progress_callback({"stage": stage, **details})
+        except Exception:
+            _LOGGER.exception("Error in query progress callback")
+
     def _build_debug_trace(
         self,
         provider: Optional[str],
@@ -3879,21 +2803,153 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
             "conversation": history_tail,
         }
 
-    async def _get_ai_response(self) -> str:
+    def _get_home_digest(self) -> Optional[str]:
+        """Return the background-maintained home digest, if available."""
+        home_digest = self.hass.data.get(DOMAIN, {}).get("home_digest")
+        return home_digest.digest if home_digest else None
+
+    @contextmanager
+    def _home_digest_scope(self) -> Iterator[None]:
+        """Snapshot the home digest for every iteration of the query in this context."""
+        token = _query_context.set(self._get_home_digest())
+        try:
+            yield
+        finally:
+            _query_context.reset(token)
+
+    def _build_system_messages(self) -> List[Dict[str, Any]]:
+        """Return the system prompt, then the home digest and conversation summary.
+
+        The digest and summary change from query to query, so they follow
+        the unchanging system prompt in a message of their own, which lets
+        providers cache the prompt alone.
+        """
+        sections = []
+        query_context = _query_context.get()
+        if query_context:
+            sections.append(
+                "CURRENT HOME OVERVIEW (snapshot taken when the user asked; "
+                "use the get_* commands for details or fresher values):\n"
+                f"{query_context}\n"
+            )
+        if self.conversation_summary:
+            sections.append(
+                "SUMMARY OF THE EARLIER CONVERSATION (older messages are no "
+                "longer included):\n"
+                f"{self.conversation_summary}\n"
+            )
+        if not sections:
+            return [self.system_prompt]
+        return [self.system_prompt, {"role": "system", "content": "\n".join(sections)}]
+
+    def _start_prefetch(self, user_query: str) -> None:
+        """Start fetching the data the query likely needs (see prefetch.py)."""
+        try:
+            predicted = prefetch.predict_requests(
+                user_query,
+                prefetch.build_area_index(self.hass),
+                {
+                    domain: self.hass.states.async_entity_ids_count(domain)
+                    for domain in (*prefetch.DOMAIN_KEYWORDS, "weather")
+                },
+            )
+        except Exception as e:
+            # Registries not available (e.g. in tests); nothing is prefetched
+            _LOGGER.debug("Could not predict data requests: %s", e)
+            return
+        fetchers = {
+            "get_entities_by_area": lambda p: self.get_entities_by_area(p["area_id"]),
+            "get_entities_by_domain": lambda p: self.get_entities_by_domain(
+                p["domain"]
+            ),
+            "get_weather_data": lambda p: self.get_weather_data(),
+        }
+        for request_type, parameters in predicted:
+            _LOGGER.debug("Prefetching %s %s", request_type, parameters)
+            prefetch.start(request_type, parameters, fetchers[request_type](parameters))
+
+    async def _compact_history(self, provider: str, config: Dict[str, Any]) -> None:
+        """Fold older turns into the rolling summary once history grows too long."""
+        threshold = int(
+            config.get(CONF_COMPACTION_THRESHOLD, DEFAULT_COMPACTION_THRESHOLD) or 0
+        )
+        if threshold <= 0:
+            return
+        async with self._compaction_lock:
+            # A compaction that ran while this one waited may have folded enough
+            if compaction.estimate_tokens(self.conversation_history) <= threshold:
+                return
+            boundary, older = compaction.split_history(
+                self.conversation_history, threshold
+            )
+            if not older:
+                return
+
+            with tracing.span("compaction", messages=len(older)) as compaction_span:
+                summary = None
+                summary_model = config.get(CONF_COMPACTION_MODEL)
+                if summary_model:
+                    try:
+                        client = self._get_client(
+                            provider,
+                            {
+                                **config,
+                                "models": {
+                                    **config.get("models", {}),
+                                    provider: summary_model,
+                                },
+                            },
+                        )
+                        summary = await client.get_response(
+                            compaction.summary_request(self.conversation_summary, older)
+                        )
+                    except Exception as e:
+                        _LOGGER.warning(
+                            "Conversation summary by %s failed, using an extractive "
+                            "summary: %s",
+                            summary_model,
+                            e,
+                        )
+                if summary and summary.strip():
+                    summary = summary.strip()[: compaction.SUMMARY_MAX_CHARS]
+                else:
+                    summary = compaction.summarize_extractive(
+                        self.conversation_summary, older
+                    )
+                compaction_span.set(summary_chars=len(summary))
+
+            # Concurrent queries only append and compactions of this agent wait
+            # for each other, so the folded turns are still in front
+            self.conversation_history[:boundary] = [
+                message
+                for message in self.conversation_history[:boundary]
+                if message.get("role") == "system"
+            ]
+            self.conversation_summary = summary
+            _LOGGER.debug(
+                "Compacted %d messages into a %d character summary",
+                len(older),
+                len(summary),
+            )
+
+    async def _get_ai_response(self, client: Optional[BaseAIClient] = None) -> str:
         """Get response from the selected AI provider with retries and rate limiting."""
+        client = client or self.ai_client
         if not self._check_rate_limit():
             raise Exception("Rate limit exceeded. Please try again later.")
         retry_count = 0
         last_error = None
+        degenerate_retried = False
         # Limit conversation history to last 10 messages to prevent token overflow
         recent_messages = (
             self.conversation_history[-10:]
             if len(self.conversation_history) > 10
             else self.conversation_history
         )
-        # Ensure system prompt is always the first message
-        if not recent_messages or recent_messages[0].get("role") != "system":
-            recent_messages = [self.system_prompt] + recent_messages
+        # Ensure the (current) system prompt is always the first message
+        if recent_messages and recent_messages[0].get("role") == "system":
+            recent_messages = recent_messages[1:]
+        recent_messages = self._build_system_messages() + recent_messages
 
         _LOGGER.debug("Sending %d messages to AI provider", len(recent_messages))
         _LOGGER.debug("AI provider: %s", self.config.get("ai_provider", "unknown"))
@@ -3905,27 +2961,29 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                     retry_count + 1,
                     self._max_retries,
                 )
-                response = await self.ai_client.get_response(recent_messages)
+                request_started = time.monotonic()
+                with (
+                    tracing.span(
+                        "provider_call",
+                        attempt=retry_count + 1,
+                        messages=len(recent_messages),
+                        request_chars=sum(
+                            len(str(message.get("content", "")))
+                            for message in recent_messages
+                        ),
+                    ) as call_span,
+                    degeneration.watch() as detector,
+                ):
+                    response = await client.get_response(recent_messages)
+                    call_span.set(response_chars=len(response or ""))
+                    if not detector.fed and response:
+                        # The client did not stream: check the whole reply
+                        detector.feed(response)
                 _LOGGER.debug(
                     "AI client returned response of length: %d", len(response or "")
                 )
                 _LOGGER.debug("AI response preview: %s", (response or "")[:200])
 
-                # Check for extremely long responses that might indicate model issues
-                if response and len(response) > 50000:
-                    _LOGGER.warning(
-                        "AI returned extremely long response (%d characters), this may indicate a model issue",
-                        len(response),
-                    )
-                    # Check for repetitive patterns that indicate a corrupted response
-                    if response.count("for its use in various fields") > 50:
-                        _LOGGER.error(
-                            "Detected corrupted repetitive response, aborting this iteration"
-                        )
-                        raise Exception(
-                            "AI generated corrupted response with repetitive text. Please try again with a clearer request."
-                        )
-
                 # Check if response is empty
                 if not response or response.strip() == "":
                     _LOGGER.warning(
@@ -3938,10 +2996,28 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                         )
                     else:
                         retry_count += 1
+                        metrics.record_retry()
                         await asyncio.sleep(self._retry_delay * retry_count)
                         continue
 
+                request_seconds = time.monotonic() - request_started
+                metrics.record_ai_request(request_seconds)
+                session_recorder.record_ai_turn(
+                    recent_messages, str(response), request_seconds
+                )
                 return str(response)
+            except degeneration.DegenerateOutput as e:
+                _LOGGER.warning(
+                    "AI reply degenerated on attempt %d: %s", retry_count + 1, e
+                )
+                # Retry once with a nudge; a model caught in a loop is likely
+                # to loop again, so further attempts would only waste tokens
+                if degenerate_retried or retry_count + 1 >= self._max_retries:
+                    raise
+                degenerate_retried = True
+                retry_count += 1
+                metrics.record_retry()
+                recent_messages = recent_messages + [DEGENERATE_RETRY_MESSAGE]
             except Exception as e:
                 _LOGGER.error(
                     "AI client error on attempt %d: %s", retry_count + 1, str(e)
@@ -3949,6 +3025,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                 last_error = e
                 retry_count += 1
                 if retry_count < self._max_retries:
+                    metrics.record_retry()
                     await asyncio.sleep(self._retry_delay * retry_count)
                 continue
         raise Exception(
@@ -3958,6 +3035,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
     async def clear_conversation_history(self) -> None:
         """Clear the conversation history and cache."""
         self.conversation_history = []
+        self.conversation_summary = None
         self._cache.clear()
         await self.save_conversation_history()
         _LOGGER.debug("Conversation history and cache cleared")
@@ -3966,12 +3044,13 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
         self, entity_id: str, state: str, attributes: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Set the state of an entity."""
+        prefetch.invalidate()
         try:
             _LOGGER.debug(
                 "Setting state for entity %s to %s with attributes: %s",
                 entity_id,
                 state,
-                json.dumps(attributes or {}),
+                json_codec.dumps(attributes or {}),
             )
 
             # Validate entity exists
@@ -4058,13 +3137,14 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
         service_data: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """Call a Home Assistant service."""
+        prefetch.invalidate()
         try:
             _LOGGER.debug(
                 "Calling service %s.%s with target: %s and data: %s",
                 domain,
                 service,
-                json.dumps(target or {}),
-                json.dumps(service_data or {}),
+                json_codec.dumps(target or {}),
+                json_codec.dumps(service_data or {}),
             )
 
             # Prepare the service call data
@@ -4088,7 +3168,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
             if service_data:
                 call_data.update(service_data)
 
-            _LOGGER.debug("Final service call data: %s", json.dumps(call_data))
+            _LOGGER.debug("Final service call data: %s", json_codec.dumps(call_data))
 
             # Call the service
             await self.hass.services.async_call(domain, service, call_data)
@@ -4145,6 +3225,8 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
 
     async def load_conversation_history(self) -> None:
         """Load conversation history from HA storage."""
+        if not self._persist_history:
+            return
         try:
             if self._conversation_store is None:
                 provider_id = self._provider_id
@@ -4154,6 +3236,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
             data = await self._conversation_store.async_load()
             if data and "conversation_history" in data:
                 self.conversation_history = data["conversation_history"]
+                self.conversation_summary = data.get("summary")
                 _LOGGER.debug(
                     "Loaded %d messages from conversation history",
                     len(self.conversation_history),
@@ -4166,6 +3249,8 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
 
     async def save_conversation_history(self) -> None:
         """Save conversation history to HA storage."""
+        if not self._persist_history:
+            return
         try:
             if self._conversation_store is None:
                 provider_id = self._provider_id
@@ -4173,8 +3258,18 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
                     self.hass, 1, f"ai_agent_ha_conversation_{provider_id}"
                 )
             # Limit history to last 100 messages to avoid storage bloat
-            history_to_save = self.conversation_history[-100:] if len(self.conversation_history) > 100 else self.conversation_history
-            await self._conversation_store.async_save({"conversation_history": history_to_save})
+            history_to_save = (
+                self.conversation_history[-100:]
+                if len(self.conversation_history) > 100
+                else self.conversation_history
+            )
+            with tracing.span("persistence", messages=len(history_to_save)):
+                await self._conversation_store.async_save(
+                    {
+                        "conversation_history": history_to_save,
+                        "summary": self.conversation_summary,
+                    }
+                )
             _LOGGER.debug(
                 "Saved %d messages to conversation history",
                 len(history_to_save),
@@ -4187,9 +3282,7 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
     ) -> Dict[str, Any]:
         """Save chat messages to HA storage."""
         try:
-            store: Store = Store(
-                self.hass, 1, f"ai_agent_ha_chat_{user_id}_{provider}"
-            )
+            store: Store = Store(self.hass, 1, f"ai_agent_ha_chat_{user_id}_{provider}")
             # Limit to last 200 messages to avoid storage bloat
             messages_to_save = messages[-200:] if len(messages) > 200 else messages
             await store.async_save({"messages": messages_to_save, "provider": provider})
@@ -4204,14 +3297,10 @@ Then restart Home Assistant to see your new dashboard in the sidebar."""
             _LOGGER.exception("Error saving chat messages: %s", str(e))
             return {"error": f"Error saving chat messages: {str(e)}"}
 
-    async def load_chat_messages(
-        self, user_id: str, provider: str
-    ) -> Dict[str, Any]:
+    async def load_chat_messages(self, user_id: str, provider: str) -> Dict[str, Any]:
         """Load chat messages from HA storage."""
         try:
-            store: Store = Store(
-                self.hass, 1, f"ai_agent_ha_chat_{user_id}_{provider}"
-            )
+            store: Store = Store(self.hass, 1, f"ai_agent_ha_chat_{user_id}_{provider}")
             data = await store.async_load()
             if data and "messages" in data:
                 messages = data["messages"]
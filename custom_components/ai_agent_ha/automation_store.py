@@ -0,0 +1,113 @@
+"""In-memory store for automations.yaml.
+
+The parsed automations are kept in memory and only re-read when the file's
+modification time changes, e.g. after an edit in the automation editor.
+Parsing and dumping use libyaml's C loader and dumper when PyYAML was built
+with them. Writes go to a temporary file that is renamed over
+automations.yaml, so a crash mid-write never leaves a truncated file.
+Aliases are kept in a set for duplicate checks, and several automations can
+be added with a single write.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set
+
+import yaml  # type: ignore[import-untyped]
+from homeassistant.core import HomeAssistant
+from homeassistant.util.file import write_utf8_file
+
+_LOGGER = logging.getLogger(__name__)
+
+AUTOMATIONS_FILE = "automations.yaml"
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper, SafeLoader  # type: ignore[assignment]
+
+
+class DuplicateAutomationError(ValueError):
+    """Raised when an automation alias is already in use."""
+
+
+class AutomationStore:
+    """Cached, atomically written copy of automations.yaml.
+
+    All access goes through a lock so concurrent queries cannot interleave a
+    read-modify-write of the file.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: Optional[str] = None) -> None:
+        """Initialize the store for the config directory's automations.yaml."""
+        self.hass = hass
+        self.path = path or hass.config.path(AUTOMATIONS_FILE)
+        self._automations: List[Dict[str, Any]] = []
+        self._aliases: Set[str] = set()
+        self._mtime_ns: Optional[int] = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def _stat_mtime_ns(self) -> Optional[int]:
+        """Return the file's modification time, or None if it doesn't exist."""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _set_automations(
+        self, automations: List[Dict[str, Any]], mtime_ns: Optional[int]
+    ) -> None:
+        """Replace the in-memory copy and rebuild the alias set."""
+        self._automations = automations
+        self._aliases = {a["alias"] for a in automations if a.get("alias")}
+        self._mtime_ns = mtime_ns
+        self._loaded = True
+
+    def _load_if_changed(self) -> None:
+        """Re-read the file if it changed since it was last read or written."""
+        mtime_ns = self._stat_mtime_ns()
+        if self._loaded and mtime_ns == self._mtime_ns:
+            return
+        automations: Any = []
+        if mtime_ns is not None:
+            with open(self.path, encoding="utf-8") as f:
+                automations = yaml.load(f, Loader=SafeLoader) or []
+        if not isinstance(automations, list):
+            raise ValueError(f"{self.path} does not contain a list of automations")
+        _LOGGER.debug("Loaded %d automations from %s", len(automations), self.path)
+        self._set_automations(automations, mtime_ns)
+
+    def _write(self, automations: List[Dict[str, Any]]) -> None:
+        """Write the automations to a temporary file and rename it into place."""
+        data = yaml.dump(
+            automations,
+            Dumper=SafeDumper,
+            default_flow_style=False,
+            allow_unicode=True,
+            sort_keys=False,
+        )
+        write_utf8_file(self.path, data)
+        self._set_automations(automations, self._stat_mtime_ns())
+
+    def _add(self, entries: List[Dict[str, Any]]) -> None:
+        """Add entries in one write, rejecting aliases that are already used."""
+        self._load_if_changed()
+        seen: Set[str] = set()
+        for entry in entries:
+            alias = entry["alias"]
+            if alias in self._aliases or alias in seen:
+                raise DuplicateAutomationError(
+                    f"An automation with the name '{alias}' already exists"
+                )
+            seen.add(alias)
+        self._write(self._automations + entries)
+
+    async def async_add(self, entries: List[Dict[str, Any]]) -> None:
+        """Append automations to the file with a single atomic write."""
+        async with self._lock:
+            await self.hass.async_add_executor_job(self._add, entries)
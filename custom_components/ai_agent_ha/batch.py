@@ -0,0 +1,129 @@
+"""Batch query service for automations and scripts.
+
+Runs several prompts in parallel, bounded by a concurrency limit, and
+returns their results in request order in a single service response. Each
+prompt gets its own in-memory conversation so parallel items cannot see
+each other's messages, while provider clients are shared through the
+client registry. Items run at background priority (see scheduler.py), so
+a batch runs at most as many prompts at once as the background class
+allows; max_concurrency is capped at that.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant
+
+from .scheduler import DEFAULT_CLASSES, PRIORITY_BACKGROUND
+from .websocket_api import get_agent
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 20
+# More would only wait in the scheduler for a background slot
+MAX_BATCH_CONCURRENCY = DEFAULT_CLASSES[PRIORITY_BACKGROUND].max_concurrent
+DEFAULT_BATCH_CONCURRENCY = MAX_BATCH_CONCURRENCY
+
+# Partial-failure policies
+FAILURE_POLICY_CONTINUE = "continue"  # Run every item, report failures per item
+FAILURE_POLICY_FAIL_FAST = "fail_fast"  # Skip items not yet started after a failure
+FAILURE_POLICIES = [FAILURE_POLICY_CONTINUE, FAILURE_POLICY_FAIL_FAST]
+
+BATCH_ITEM_SCHEMA = vol.Any(
+    vol.All(str, lambda prompt: {"prompt": prompt}),
+    vol.Schema(
+        {
+            vol.Required("prompt"): str,
+            vol.Optional("provider"): str,
+            vol.Optional("debug", default=False): bool,
+        }
+    ),
+)
+
+QUERY_BATCH_SCHEMA = vol.Schema(
+    {
+        vol.Required("prompts"): vol.All(
+            [BATCH_ITEM_SCHEMA], vol.Length(min=1, max=MAX_BATCH_SIZE)
+        ),
+        vol.Optional("provider"): str,
+        vol.Optional("max_concurrency", default=DEFAULT_BATCH_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_BATCH_CONCURRENCY)
+        ),
+        vol.Optional("failure_policy", default=FAILURE_POLICY_CONTINUE): vol.In(
+            FAILURE_POLICIES
+        ),
+    }
+)
+
+
+async def _async_run_item(
+    hass: HomeAssistant, item: Dict[str, Any], default_provider: Optional[str]
+) -> Dict[str, Any]:
+    """Run one prompt on an ephemeral agent for its provider."""
+    agent, provider = get_agent(hass, item.get("provider") or default_provider)
+    result: Dict[str, Any] = {"prompt": item["prompt"], "provider": provider}
+    if agent is None:
+        result.update({"success": False, "error": "No AI agents configured"})
+        return result
+    try:
+        response = await agent.create_ephemeral_agent().process_query(
+            item["prompt"],
+            provider=provider,
+            debug=item.get("debug", False),
+            priority=PRIORITY_BACKGROUND,
+        )
+    except Exception as e:
+        _LOGGER.exception("Error processing batch query")
+        response = {"success": False, "error": str(e)}
+    result.update(response)
+    # process_query reports some failures with only an "error" key
+    result.setdefault("success", "error" not in response)
+    return result
+
+
+async def async_run_query_batch(
+    hass: HomeAssistant,
+    items: List[Dict[str, Any]],
+    default_provider: Optional[str] = None,
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    failure_policy: str = FAILURE_POLICY_CONTINUE,
+) -> Dict[str, Any]:
+    """Run the prompts concurrently and return their results in order."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results: List[Dict[str, Any]] = [{} for _ in items]
+    failed = asyncio.Event()
+
+    async def run(index: int, item: Dict[str, Any]) -> None:
+        async with semaphore:
+            if failed.is_set() and failure_policy == FAILURE_POLICY_FAIL_FAST:
+                results[index] = {
+                    "prompt": item["prompt"],
+                    "provider": item.get("provider") or default_provider,
+                    "success": False,
+                    "skipped": True,
+                    "error": "Skipped after an earlier prompt in the batch failed",
+                }
+                return
+            results[index] = await _async_run_item(hass, item, default_provider)
+        if not results[index]["success"]:
+            failed.set()
+
+    await asyncio.gather(*(run(index, item) for index, item in enumerate(items)))
+
+    succeeded = sum(1 for result in results if result["success"])
+    _LOGGER.debug(
+        "Batch of %d prompts finished: %d succeeded, %d failed",
+        len(items),
+        succeeded,
+        len(items) - succeeded,
+    )
+    return {
+        "success": succeeded == len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": results,
+    }
@@ -0,0 +1,87 @@
+"""Registry of AI provider clients shared between queries.
+
+Clients are created once per (provider, model, credentials hash, endpoint)
+and reused by every query, including concurrent ones, so connection state
+and per-client caches survive between calls. A provider's clients are
+dropped when its config entry is updated.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ClientKey(NamedTuple):
+    """Identity of a provider client."""
+
+    provider: str
+    model: str
+    credentials_hash: str
+    endpoint: str
+
+
+def hash_credentials(*secrets: Any) -> str:
+    """Return a short digest identifying a set of credentials.
+
+    Only the digest is kept in registry keys, so secrets do not end up in
+    logs or debug output that include the key.
+    """
+    digest = hashlib.sha256()
+    for secret in secrets:
+        digest.update(str(secret or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class ClientRegistry:
+    """Create-once cache of AI clients.
+
+    Must only be used from the event loop. get_or_create has no await
+    points, so concurrent queries can never build the same client twice.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._clients: Dict[ClientKey, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key: ClientKey, factory: Callable[[], Any]) -> Any:
+        """Return the client for key, creating it with factory on first use."""
+        client = self._clients.get(key)
+        if client is not None:
+            self.hits += 1
+            return client
+        client = factory()
+        self._clients[key] = client
+        self.misses += 1
+        _LOGGER.debug(
+            "Created %s client for model %s (%s)",
+            key.provider,
+            key.model or "[default]",
+            key.endpoint or "default endpoint",
+        )
+        return client
+
+    def invalidate(self, provider: Optional[str] = None) -> int:
+        """Drop the clients of a provider, or all clients, returning the count."""
+        stale = [
+            key for key in self._clients if provider is None or key.provider == provider
+        ]
+        for key in stale:
+            del self._clients[key]
+        if stale:
+            _LOGGER.debug(
+                "Invalidated %d client(s) for %s",
+                len(stale),
+                provider or "all providers",
+            )
+        return len(stale)
+
+    def __len__(self) -> int:
+        """Return the number of cached clients."""
+        return len(self._clients)
@@ -0,0 +1,209 @@
+"""Compaction of long conversations into a rolling summary.
+
+Once the stored conversation grows past a token threshold, the turns before
+the most recent queries are folded into a summary that is sent as part of
+the system message instead. Tool results are reduced to the facts worth
+remembering (entity states, errors), so bulky registry dumps do not linger
+in every later request. The summary is either extractive (built locally
+from the turns) or written by a cheaper model from that extract.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import json_codec
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rough estimate, matching the one used for the home digest
+CHARS_PER_TOKEN = 4
+# Queries kept verbatim after compaction, counting the one being asked
+KEEP_RECENT_QUERIES = 2
+# The summary is trimmed from its oldest lines once it grows past this
+SUMMARY_MAX_CHARS = 4000
+# Per-line limits of the extractive summary
+MAX_QUERY_CHARS = 200
+MAX_ANSWER_CHARS = 300
+MAX_PARAMETER_CHARS = 120
+MAX_LISTED_STATES = 5
+
+SUMMARY_PROMPT = (
+    "You maintain the memory of a Home Assistant assistant. Rewrite the "
+    "previous summary and the new conversation extract below into one "
+    "summary for future requests. Keep what the user asked for and "
+    "prefers, decisions made, entity ids and their states, and automations, "
+    "dashboards or service calls that were made. Leave out greetings and "
+    "anything superseded. Reply with plain text only, at most 150 words."
+)
+
+
+def estimate_tokens(messages: Sequence[Dict[str, Any]]) -> int:
+    """Estimate the tokens of the non-system messages of a conversation."""
+    chars = sum(
+        len(str(message.get("content", "")))
+        for message in messages
+        if message.get("role") != "system"
+    )
+    return chars // CHARS_PER_TOKEN
+
+
+def is_data_message(message: Dict[str, Any]) -> bool:
+    """Return whether a message carries a tool result rather than a query."""
+    content = message.get("content")
+    return (
+        message.get("role") == "user"
+        and isinstance(content, str)
+        and content.startswith('{"data"')
+    )
+
+
+def split_history(
+    history: Sequence[Dict[str, Any]], threshold: int
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Return the index where the kept history starts and the turns to fold.
+
+    Up to KEEP_RECENT_QUERIES queries are kept, fewer if they alone exceed
+    the threshold; the query being asked is always kept.
+    """
+    queries = [
+        index
+        for index, message in enumerate(history)
+        if message.get("role") == "user" and not is_data_message(message)
+    ]
+    boundary = 0
+    for keep in range(min(KEEP_RECENT_QUERIES, len(queries)), 0, -1):
+        boundary = queries[-keep]
+        if estimate_tokens(history[boundary:]) <= threshold:
+            break
+    older = [m for m in history[:boundary] if m.get("role") != "system"]
+    return boundary, older
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Shorten text to limit characters, marking the cut."""
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _describe_request(response: Dict[str, Any]) -> Optional[str]:
+    """Return a summary line for an assistant response."""
+    request_type = response.get("request_type")
+    if request_type == "final_response":
+        return f"Assistant: {_truncate(str(response.get('response', '')), MAX_ANSWER_CHARS)}"
+    if request_type == "call_service":
+        parameters = response.get("parameters") or {}
+        domain = response.get("domain") or parameters.get("domain", "")
+        service = response.get("service") or parameters.get("service", "")
+        target = response.get("target") or parameters.get("target") or {}
+        entities = (
+            target.get("entity_id") if isinstance(target, dict) else None
+        ) or parameters.get("entity_id")
+        line = f"Assistant called {domain}.{service}"
+        if entities:
+            line += f" on {_truncate(str(entities), MAX_PARAMETER_CHARS)}"
+        return line
+    if request_type == "automation_suggestion":
+        automation = response.get("automation") or {}
+        alias = automation.get("alias", "") if isinstance(automation, dict) else ""
+        return f"Assistant suggested an automation {alias!r}".rstrip()
+    if request_type == "dashboard_suggestion":
+        dashboard = response.get("dashboard") or {}
+        title = dashboard.get("title", "") if isinstance(dashboard, dict) else ""
+        return f"Assistant suggested a dashboard {title!r}".rstrip()
+    if request_type:
+        parameters = json_codec.dumps(response.get("parameters") or {})
+        return (
+            f"Assistant looked up {request_type} "
+            f"{_truncate(parameters, MAX_PARAMETER_CHARS)}"
+        )
+    return None
+
+
+def _describe_data(data: Any) -> Optional[str]:
+    """Return a summary line for a tool result, keeping entity states."""
+    if isinstance(data, dict):
+        if "error" in data:
+            return f"  failed: {_truncate(str(data['error']), MAX_PARAMETER_CHARS)}"
+        if "items" in data and "total" in data:
+            return f"  ({data['total']} results)"
+        if "entity_id" in data and "state" in data:
+            return f"  {data['entity_id']}: {data['state']}"
+        if data.get("success"):
+            return "  succeeded"
+        return None
+    if isinstance(data, list):
+        states = [
+            f"{item['entity_id']}: {item['state']}"
+            for item in data
+            if isinstance(item, dict) and "entity_id" in item and "state" in item
+        ]
+        if states and len(states) <= MAX_LISTED_STATES:
+            return "  " + ", ".join(states)
+        return f"  ({len(data)} results)"
+    return None
+
+
+def summary_lines(messages: Sequence[Dict[str, Any]]) -> List[str]:
+    """Reduce conversation turns to one line per query, action and answer."""
+    lines: List[str] = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, str) or not content:
+            continue
+        role = message.get("role")
+        if role == "user" and not is_data_message(message):
+            lines.append(f"User: {_truncate(content, MAX_QUERY_CHARS)}")
+            continue
+        try:
+            parsed = json_codec.loads(content)
+        except json_codec.JSONDecodeError:
+            parsed = None
+        if role == "user":
+            line = _describe_data(parsed.get("data")) if parsed else None
+        elif isinstance(parsed, dict):
+            line = _describe_request(parsed)
+        else:
+            line = f"Assistant: {_truncate(content, MAX_ANSWER_CHARS)}"
+        if line:
+            lines.append(line)
+    return lines
+
+
+def _fit(lines: List[str], max_chars: int) -> str:
+    """Join lines, dropping the oldest until they fit in max_chars."""
+    total = sum(len(line) + 1 for line in lines)
+    start = 0
+    while start < len(lines) - 1 and total > max_chars:
+        total -= len(lines[start]) + 1
+        start += 1
+    return "\n".join(lines[start:])[:max_chars]
+
+
+def summarize_extractive(
+    previous: Optional[str],
+    messages: Sequence[Dict[str, Any]],
+    max_chars: int = SUMMARY_MAX_CHARS,
+) -> str:
+    """Extend the rolling summary with the folded turns."""
+    lines = previous.splitlines() if previous else []
+    lines.extend(summary_lines(messages))
+    return _fit(lines, max_chars)
+
+
+def summary_request(
+    previous: Optional[str], messages: Sequence[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Return the messages asking a model to rewrite the summary."""
+    extract = "\n".join(summary_lines(messages))
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"Previous summary:\n{previous or '(none)'}\n\n"
+                f"New conversation:\n{extract}"
+            ),
+        },
+    ]
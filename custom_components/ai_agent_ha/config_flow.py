@@ -9,19 +9,38 @@ from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.selector import (
+    BooleanSelector,
+    NumberSelector,
+    NumberSelectorConfig,
+    NumberSelectorMode,
+    SelectOptionDict,
     SelectSelector,
     SelectSelectorConfig,
     TextSelector,
     TextSelectorConfig,
+    TextSelectorType,
 )
 
 from .const import (
     CONF_BEDROCK_ACCESS_KEY,
     CONF_BEDROCK_REGION,
     CONF_BEDROCK_SECRET_KEY,
+    CONF_COMPACTION_MODEL,
+    CONF_COMPACTION_THRESHOLD,
+    CONF_EXPORT_TRACES,
+    CONF_GEMINI_CACHE_TTL,
+    CONF_LOCAL_API_MODE,
+    CONF_LOCAL_KEEP_ALIVE,
     CONF_LOCAL_MODEL,
+    CONF_LOCAL_NUM_CTX,
     CONF_LOCAL_URL,
+    DEFAULT_COMPACTION_THRESHOLD,
+    DEFAULT_LOCAL_KEEP_ALIVE,
     DOMAIN,
+    LOCAL_API_MODE_AUTO,
+    LOCAL_API_MODE_GENERIC,
+    LOCAL_API_MODE_OLLAMA,
+    LOCAL_API_MODE_OPENAI,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -65,7 +84,7 @@ TOKEN_LABELS = {
     "bedrock": "AWS Access Key ID",
     "bedrock_secret": "AWS Secret Access Key",
     "bedrock_region": "AWS Region",
-    "local": "Local API URL (e.g., http://localhost:11434/api/generate)",
+    "local": "Local API URL (e.g., http://localhost:11434/api/chat)",
 }
 
 DEFAULT_MODELS = {
@@ -189,6 +208,113 @@ AVAILABLE_MODELS = {
 DEFAULT_PROVIDER = "openai"
 
 
+def _local_api_schema(data: dict) -> dict:
+    """Build the local API mode, keep_alive and num_ctx fields."""
+    return {
+        vol.Optional(
+            CONF_LOCAL_API_MODE,
+            default=data.get(CONF_LOCAL_API_MODE, LOCAL_API_MODE_AUTO),
+        ): SelectSelector(
+            SelectSelectorConfig(
+                options=[
+                    SelectOptionDict(
+                        value=LOCAL_API_MODE_AUTO, label="Auto-detect from URL"
+                    ),
+                    SelectOptionDict(
+                        value=LOCAL_API_MODE_OLLAMA, label="Ollama (/api/chat)"
+                    ),
+                    SelectOptionDict(
+                        value=LOCAL_API_MODE_OPENAI,
+                        label="OpenAI-compatible (/v1/chat/completions)",
+                    ),
+                    SelectOptionDict(
+                        value=LOCAL_API_MODE_GENERIC, label="Generic prompt"
+                    ),
+                ]
+            )
+        ),
+        vol.Optional(
+            CONF_LOCAL_KEEP_ALIVE,
+            default=data.get(CONF_LOCAL_KEEP_ALIVE, DEFAULT_LOCAL_KEEP_ALIVE),
+        ): TextSelector(TextSelectorConfig(type=TextSelectorType.TEXT)),
+        vol.Optional(
+            CONF_LOCAL_NUM_CTX, default=data.get(CONF_LOCAL_NUM_CTX, 0)
+        ): NumberSelector(
+            NumberSelectorConfig(
+                min=0, max=1048576, step=512, mode=NumberSelectorMode.BOX
+            )
+        ),
+    }
+
+
+def _local_api_options(user_input: dict) -> dict:
+    """Extract the local API options from submitted form data."""
+    return {
+        CONF_LOCAL_API_MODE: user_input.get(CONF_LOCAL_API_MODE, LOCAL_API_MODE_AUTO),
+        CONF_LOCAL_KEEP_ALIVE: user_input.get(
+            CONF_LOCAL_KEEP_ALIVE, DEFAULT_LOCAL_KEEP_ALIVE
+        ),
+        CONF_LOCAL_NUM_CTX: int(user_input.get(CONF_LOCAL_NUM_CTX) or 0),
+    }
+
+
+def _gemini_schema(data: dict) -> dict:
+    """Build the Gemini context caching field."""
+    return {
+        vol.Optional(
+            CONF_GEMINI_CACHE_TTL, default=data.get(CONF_GEMINI_CACHE_TTL, 0)
+        ): NumberSelector(
+            NumberSelectorConfig(min=0, max=86400, step=60, mode=NumberSelectorMode.BOX)
+        ),
+    }
+
+
+def _gemini_options(user_input: dict) -> dict:
+    """Extract the Gemini options from submitted form data."""
+    return {CONF_GEMINI_CACHE_TTL: int(user_input.get(CONF_GEMINI_CACHE_TTL) or 0)}
+
+
+def _compaction_schema(data: dict) -> dict:
+    """Build the conversation compaction fields."""
+    return {
+        vol.Optional(
+            CONF_COMPACTION_THRESHOLD,
+            default=data.get(CONF_COMPACTION_THRESHOLD, DEFAULT_COMPACTION_THRESHOLD),
+        ): NumberSelector(
+            NumberSelectorConfig(
+                min=0, max=1048576, step=500, mode=NumberSelectorMode.BOX
+            )
+        ),
+        vol.Optional(
+            CONF_COMPACTION_MODEL,
+            description={"suggested_value": data.get(CONF_COMPACTION_MODEL, "")},
+        ): TextSelector(TextSelectorConfig(type=TextSelectorType.TEXT)),
+    }
+
+
+def _compaction_options(user_input: dict) -> dict:
+    """Extract the conversation compaction options from submitted form data."""
+    threshold = user_input.get(CONF_COMPACTION_THRESHOLD, DEFAULT_COMPACTION_THRESHOLD)
+    return {
+        CONF_COMPACTION_THRESHOLD: int(threshold or 0),
+        CONF_COMPACTION_MODEL: (user_input.get(CONF_COMPACTION_MODEL) or "").strip(),
+    }
+
+
+def _trace_export_schema(data: dict) -> dict:
+    """Build the trace export field."""
+    return {
+        vol.Optional(
+            CONF_EXPORT_TRACES, default=data.get(CONF_EXPORT_TRACES, False)
+        ): BooleanSelector(),
+    }
+
+
+def _trace_export_options(user_input: dict) -> dict:
+    """Extract the trace export option from submitted form data."""
+    return {CONF_EXPORT_TRACES: bool(user_input.get(CONF_EXPORT_TRACES, False))}
+
+
 class AiAgentHaConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ignore[call-arg,misc]
     """Handle a config flow for AI Agent HA."""
 
@@ -275,6 +401,13 @@ class AiAgentHaConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ig
                     endpoint_type = user_input.get("zai_endpoint", "general")
                     self.config_data["zai_endpoint"] = endpoint_type
 
+                # For local models, store the API mode and Ollama options
+                if provider == "local":
+                    self.config_data.update(_local_api_options(user_input))
+
+                if provider == "gemini":
+                    self.config_data.update(_gemini_options(user_input))
+
                 # Add model configuration if provided
                 selected_model = user_input.get("model")
                 custom_model = user_input.get("custom_model")
@@ -398,6 +531,7 @@ class AiAgentHaConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ig
             schema_dict[vol.Optional("custom_model")] = TextSelector(
                 TextSelectorConfig(type="text")
             )
+            schema_dict.update(_local_api_schema({}))
 
             return self.async_show_form(
                 step_id="configure",
@@ -430,6 +564,9 @@ class AiAgentHaConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ig
                 TextSelectorConfig(type="text")
             )
 
+        if provider == "gemini":
+            schema_dict.update(_gemini_schema({}))
+
         return self.async_show_form(
             step_id="configure",
             data_schema=vol.Schema(schema_dict),
@@ -540,6 +677,16 @@ class AiAgentHaOptionsFlowHandler(config_entries.OptionsFlow):
                         endpoint_type = user_input.get("zai_endpoint", "general")
                         updated_data["zai_endpoint"] = endpoint_type
 
+                    # For local models, update the API mode and Ollama options
+                    if provider == "local":
+                        updated_data.update(_local_api_options(user_input))
+
+                    if provider == "gemini":
+                        updated_data.update(_gemini_options(user_input))
+
+                    updated_data.update(_compaction_options(user_input))
+                    updated_data.update(_trace_export_options(user_input))
+
                     # Initialize models dict if it doesn't exist
                     if "models" not in updated_data:
                         updated_data["models"] = {}
@@ -611,6 +758,9 @@ class AiAgentHaOptionsFlowHandler(config_entries.OptionsFlow):
                 ),
             }
 
+            schema_dict.update(_compaction_schema(self.config_entry.data))
+            schema_dict.update(_trace_export_schema(self.config_entry.data))
+
             return self.async_show_form(
                 step_id="configure_options",
                 data_schema=vol.Schema(schema_dict),
@@ -644,6 +794,9 @@ class AiAgentHaOptionsFlowHandler(config_entries.OptionsFlow):
                 ),
             }
 
+            schema_dict.update(_compaction_schema(self.config_entry.data))
+            schema_dict.update(_trace_export_schema(self.config_entry.data))
+
             return self.async_show_form(
                 step_id="configure_options",
                 data_schema=vol.Schema(schema_dict),
@@ -674,6 +827,10 @@ class AiAgentHaOptionsFlowHandler(config_entries.OptionsFlow):
             schema_dict[vol.Optional("custom_model")] = TextSelector(
                 TextSelectorConfig(type="text")
             )
+            schema_dict.update(_local_api_schema(self.config_entry.data))
+
+            schema_dict.update(_compaction_schema(self.config_entry.data))
+            schema_dict.update(_trace_export_schema(self.config_entry.data))
 
             return self.async_show_form(
                 step_id="configure_options",
@@ -706,6 +863,12 @@ class AiAgentHaOptionsFlowHandler(config_entries.OptionsFlow):
                 TextSelectorConfig(type="text")
             )
 
+        if provider == "gemini":
+            schema_dict.update(_gemini_schema(self.config_entry.data))
+
+        schema_dict.update(_compaction_schema(self.config_entry.data))
+        schema_dict.update(_trace_export_schema(self.config_entry.data))
+
         return self.async_show_form(
             step_id="configure_options",
             data_schema=vol.Schema(schema_dict),
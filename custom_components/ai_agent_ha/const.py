@@ -17,6 +17,34 @@ CONF_BEDROCK_SECRET_KEY = "bedrock_secret_key"  # nosec B105
 CONF_BEDROCK_REGION = "bedrock_region"
 CONF_LOCAL_URL = "local_url"
 CONF_LOCAL_MODEL = "local_model"
+CONF_LOCAL_API_MODE = "local_api_mode"
+CONF_LOCAL_KEEP_ALIVE = "local_keep_alive"
+CONF_LOCAL_NUM_CTX = "local_num_ctx"
+# Seconds the Gemini system prompt is kept in cachedContents (0 disables)
+CONF_GEMINI_CACHE_TTL = "gemini_cache_ttl"
+
+# Local API modes: "auto" picks one from the configured URL
+LOCAL_API_MODE_AUTO = "auto"
+LOCAL_API_MODE_OLLAMA = "ollama"  # Ollama /api/chat
+LOCAL_API_MODE_OPENAI = "openai"  # OpenAI-compatible /v1/chat/completions
+LOCAL_API_MODE_GENERIC = "generic"  # Flattened prompt to any endpoint
+LOCAL_API_MODES = [
+    LOCAL_API_MODE_AUTO,
+    LOCAL_API_MODE_OLLAMA,
+    LOCAL_API_MODE_OPENAI,
+    LOCAL_API_MODE_GENERIC,
+]
+DEFAULT_LOCAL_KEEP_ALIVE = "30m"
+
+# Conversation compaction: older turns are folded into a summary once the
+# conversation exceeds the threshold (estimated tokens, 0 disables it). The
+# summary is extractive unless a (cheaper) model of the provider is set.
+CONF_COMPACTION_THRESHOLD = "compaction_threshold"
+CONF_COMPACTION_MODEL = "compaction_model"
+DEFAULT_COMPACTION_THRESHOLD = 4000
+
+# Append each query's trace to ai_agent_ha_debug/traces.jsonl (see tracing.py)
+CONF_EXPORT_TRACES = "export_traces"
 
 # Available AI providers
 AI_PROVIDERS = [
@@ -0,0 +1,328 @@
+"""Lovelace dashboard storage.
+
+Dashboards are created through Lovelace's storage dashboards collection, the
+same path the dashboard editor uses, so they show up in the sidebar right
+away without editing configuration.yaml or restarting Home Assistant. Views
+are saved with a single write to the dashboard's storage.
+
+Older Home Assistant releases do not expose the collection in hass.data. On
+those, dashboards are created in YAML mode instead: the views are written to
+ui-lovelace-<url_path>.yaml and the dashboard is added to configuration.yaml,
+which takes effect after a restart.
+
+Lovelace keeps its dashboards in a dict keyed by url_path, which serves as
+the url_path -> mode index: picking the save path for a dashboard is a dict
+lookup instead of loading the info of every dashboard.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+LOVELACE_DOMAIN = "lovelace"
+MODE_STORAGE = "storage"
+MODE_YAML = "yaml"
+DEFAULT_DASHBOARD_ICON = "mdi:view-dashboard"
+
+# Dashboard settings kept in the collection item rather than the views config
+METADATA_KEYS = ("title", "icon", "show_in_sidebar", "require_admin")
+
+# Older prompts refer to the default storage dashboard as "storage"
+DEFAULT_DASHBOARD_ALIASES = ("", "storage")
+
+# configuration.yaml entry of dashboards created in YAML mode
+YAML_DASHBOARD_FILENAME = "ui-lovelace-{url_path}.yaml"
+
+
+def _get_lovelace_value(hass: HomeAssistant, key: str) -> Any:
+    """Return a value from Lovelace's hass.data entry (dict or dataclass)."""
+    lovelace_data = hass.data.get(LOVELACE_DOMAIN)
+    if lovelace_data is None:
+        return None
+    if isinstance(lovelace_data, dict):
+        return lovelace_data.get(key)
+    return getattr(lovelace_data, key, None)
+
+
+def get_lovelace_dashboards(hass: HomeAssistant) -> Optional[Dict[Optional[str], Any]]:
+    """Return Lovelace's url_path -> dashboard dict (None is the default)."""
+    return _get_lovelace_value(hass, "dashboards")
+
+
+def get_dashboard_modes(hass: HomeAssistant) -> Dict[Optional[str], str]:
+    """Return the url_path -> mode index of all dashboards."""
+    dashboards = get_lovelace_dashboards(hass) or {}
+    return {url_path: dashboard.mode for url_path, dashboard in dashboards.items()}
+
+
+def get_dashboards_collection(hass: HomeAssistant) -> Any:
+    """Return Lovelace's storage dashboards collection, if it is loaded."""
+    return _get_lovelace_value(hass, "dashboards_collection")
+
+
+def resolve_dashboard_url(url_path: Optional[str]) -> Optional[str]:
+    """Map the names used for the default dashboard to its None key."""
+    if url_path is None or url_path in DEFAULT_DASHBOARD_ALIASES:
+        return None
+    return url_path
+
+
+def build_views_config(dashboard_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the Lovelace config (title and views) of a dashboard config."""
+    views_config: Dict[str, Any] = {"views": dashboard_config.get("views", [])}
+    if dashboard_config.get("title"):
+        views_config = {"title": dashboard_config["title"], **views_config}
+    return views_config
+
+
+async def async_create_dashboard(
+    hass: HomeAssistant, url_path: str, dashboard_config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Create a dashboard in storage mode, or in YAML mode on older releases."""
+    if get_dashboards_collection(hass) is None:
+        _LOGGER.debug(
+            "Lovelace dashboards collection not available, creating %s in YAML mode",
+            url_path,
+        )
+        return await async_create_yaml_dashboard(hass, url_path, dashboard_config)
+    return await async_create_storage_dashboard(hass, url_path, dashboard_config)
+
+
+async def async_create_storage_dashboard(
+    hass: HomeAssistant, url_path: str, dashboard_config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Create a storage dashboard and save its views."""
+    dashboards_collection = get_dashboards_collection(hass)
+    dashboards = get_lovelace_dashboards(hass)
+    if dashboards_collection is None or dashboards is None:
+        return {"error": "Lovelace storage dashboards are not available"}
+
+    if url_path in dashboards:
+        return {
+            "error": f"Dashboard '{url_path}' already exists, "
+            "use update_dashboard to change it"
+        }
+
+    try:
+        await dashboards_collection.async_create_item(
+            {
+                "url_path": url_path,
+                "title": dashboard_config["title"],
+                "icon": dashboard_config.get("icon", DEFAULT_DASHBOARD_ICON),
+                "show_in_sidebar": dashboard_config.get("show_in_sidebar", True),
+                "require_admin": dashboard_config.get("require_admin", False),
+                "mode": MODE_STORAGE,
+                "allow_single_word": True,
+            }
+        )
+    except vol.Invalid as e:
+        return {"error": f"Invalid dashboard: {e}"}
+
+    # The collection listener registers the dashboard before create returns
+    dashboard = dashboards.get(url_path)
+    if dashboard is None:
+        return {"error": f"Dashboard '{url_path}' was not registered by Lovelace"}
+
+    await dashboard.async_save(build_views_config(dashboard_config))
+    _LOGGER.info("Created storage dashboard: %s", url_path)
+    return {"success": True, "url_path": url_path, "mode": MODE_STORAGE}
+
+
+async def async_create_yaml_dashboard(
+    hass: HomeAssistant, url_path: str, dashboard_config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Write a YAML dashboard file and add it to configuration.yaml."""
+    dashboards = get_lovelace_dashboards(hass) or {}
+    if url_path in dashboards:
+        return {
+            "error": f"Dashboard '{url_path}' already exists, "
+            "use update_dashboard to change it"
+        }
+
+    filename = YAML_DASHBOARD_FILENAME.format(url_path=url_path)
+    entry = {
+        "mode": MODE_YAML,
+        "title": dashboard_config["title"],
+        "icon": dashboard_config.get("icon", DEFAULT_DASHBOARD_ICON),
+        "show_in_sidebar": dashboard_config.get("show_in_sidebar", True),
+        "require_admin": dashboard_config.get("require_admin", False),
+        "filename": filename,
+    }
+    await hass.async_add_executor_job(
+        _write_yaml, hass.config.path(filename), build_views_config(dashboard_config)
+    )
+    _LOGGER.info("Created YAML dashboard file: %s", filename)
+
+    result = {
+        "success": True,
+        "url_path": url_path,
+        "mode": MODE_YAML,
+        "restart_required": True,
+    }
+    try:
+        await hass.async_add_executor_job(
+            _add_configuration_entry,
+            hass.config.path("configuration.yaml"),
+            url_path,
+            entry,
+        )
+    except (OSError, ValueError) as e:
+        _LOGGER.warning("Could not add dashboard to configuration.yaml: %s", e)
+        return {**result, "configuration_entry": _dump_entry(url_path, entry, 4)}
+    return result
+
+
+def _dump_entry(url_path: str, entry: Dict[str, Any], indent: int) -> str:
+    """Return a dashboards entry of configuration.yaml, indented by indent."""
+    import yaml
+
+    text = yaml.safe_dump(
+        {url_path: entry},
+        default_flow_style=False,
+        allow_unicode=True,
+        sort_keys=False,
+    )
+    return "\n".join(" " * indent + line for line in text.splitlines())
+
+
+def _add_configuration_entry(
+    config_path: str, url_path: str, entry: Dict[str, Any]
+) -> None:
+    """Add a dashboard under lovelace: dashboards: in configuration.yaml.
+
+    Raises ValueError when the lovelace section or its dashboards are not a
+    plain mapping (for example an !include), so the entry has to be added by
+    hand.
+    """
+    with open(config_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    start = next(
+        (i for i, line in enumerate(lines) if line.startswith("lovelace:")), None
+    )
+    if start is None:
+        lines += ["", "lovelace:", "  dashboards:", _dump_entry(url_path, entry, 4)]
+    elif lines[start].split("#", 1)[0].strip() != "lovelace:":
+        raise ValueError("the lovelace section is not a plain mapping")
+    else:
+        # The section ends at the next top-level key
+        end = next(
+            (
+                i
+                for i in range(start + 1, len(lines))
+                if lines[i][:1] not in ("", " ", "\t", "#")
+            ),
+            len(lines),
+        )
+        keys = [
+            i
+            for i in range(start + 1, end)
+            if lines[i].strip() and not lines[i].lstrip().startswith("#")
+        ]
+        # Follow the indentation configuration.yaml already uses
+        step = len(lines[keys[0]]) - len(lines[keys[0]].lstrip()) if keys else 2
+        section = next(
+            (i for i in keys if lines[i].lstrip().startswith("dashboards:")), None
+        )
+        if section is None:
+            lines.insert(start + 1, " " * step + "dashboards:")
+            lines.insert(start + 2, _dump_entry(url_path, entry, step * 2))
+        elif lines[section].split("#", 1)[0].strip() != "dashboards:":
+            raise ValueError("lovelace dashboards is not a plain mapping")
+        else:
+            indent = len(lines[section]) - len(lines[section].lstrip()) + step
+            lines.insert(section + 1, _dump_entry(url_path, entry, indent))
+
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+async def async_update_dashboard(
+    hass: HomeAssistant, url_path: Optional[str], dashboard_config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Save a dashboard's views using the save path for its mode."""
+    dashboards = get_lovelace_dashboards(hass)
+    if dashboards is None:
+        return {"error": "Lovelace dashboards not available"}
+
+    dashboard_key = resolve_dashboard_url(url_path)
+    dashboard = dashboards.get(dashboard_key)
+    if dashboard is None:
+        available = [
+            f"{key or 'default'} ({mode})"
+            for key, mode in get_dashboard_modes(hass).items()
+        ]
+        return {
+            "error": f"Dashboard '{url_path}' not found. "
+            f"Available dashboards: {', '.join(available)}"
+        }
+
+    views_config = build_views_config(dashboard_config)
+    if dashboard.mode == MODE_STORAGE:
+        await dashboard.async_save(views_config)
+        await _async_update_metadata(hass, dashboard, dashboard_config)
+    elif dashboard.mode == MODE_YAML:
+        await hass.async_add_executor_job(_write_yaml, dashboard.path, views_config)
+    else:
+        return {
+            "error": f"Dashboard '{url_path}' uses unsupported mode {dashboard.mode}"
+        }
+
+    _LOGGER.info("Updated %s dashboard: %s", dashboard.mode, url_path or "default")
+    return {"success": True, "url_path": dashboard_key, "mode": dashboard.mode}
+
+
+async def _async_update_metadata(
+    hass: HomeAssistant, dashboard: Any, dashboard_config: Dict[str, Any]
+) -> None:
+    """Apply title, icon and sidebar changes to a storage dashboard."""
+    changes = {
+        key: dashboard_config[key] for key in METADATA_KEYS if key in dashboard_config
+    }
+    # The default dashboard has no collection item to update
+    if not changes or not dashboard.config or "id" not in dashboard.config:
+        return
+    dashboards_collection = get_dashboards_collection(hass)
+    if dashboards_collection is None:
+        return
+    await dashboards_collection.async_update_item(dashboard.config["id"], changes)
+
+
+def _write_yaml(path: str, views_config: Dict[str, Any]) -> None:
+    """Write a YAML dashboard file."""
+    import yaml
+
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.dump(views_config, f, default_flow_style=False, allow_unicode=True)
+
+
+def describe_dashboards(hass: HomeAssistant) -> List[Dict[str, Any]]:
+    """Return the url_path, mode and sidebar settings of every dashboard."""
+    dashboards = get_lovelace_dashboards(hass) or {}
+    yaml_configs = _get_lovelace_value(hass, "yaml_dashboards") or {}
+    dashboard_list = []
+    for url_path, dashboard in dashboards.items():
+        # Storage dashboards carry their collection item, YAML ones their config
+        settings = (
+            getattr(dashboard, "config", None) or yaml_configs.get(url_path) or {}
+        )
+        is_default = url_path is None
+        dashboard_list.append(
+            {
+                "url_path": url_path,
+                "mode": getattr(dashboard, "mode", None),
+                "title": settings.get("title")
+                or ("Overview" if is_default else url_path),
+                "icon": settings.get("icon")
+                or ("mdi:home" if is_default else DEFAULT_DASHBOARD_ICON),
+                "show_in_sidebar": settings.get("show_in_sidebar", True),
+                "require_admin": settings.get("require_admin", False),
+            }
+        )
+    return dashboard_list
@@ -0,0 +1,34 @@
+"""Append-only JSON lines files under ai_agent_ha_debug.
+
+Recorded sessions and exported traces are appended from executor threads,
+so several writes can run at once. append_line serializes them with one
+lock: each line is written in a single call, and the size check and
+rotation to <file>.1 happen under the same lock, so no line is interleaved
+with another or written to a file that is being rotated away.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+
+DEBUG_DIR = "ai_agent_ha_debug"
+
+_lock = threading.Lock()
+
+
+def append_line(path: str, line: str, max_bytes: int) -> None:
+    """Append a line to a file, rotating it once it exceeds max_bytes.
+
+    Does blocking I/O; run it in the executor. Errors are raised to the
+    caller.
+    """
+    with _lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            if os.path.getsize(path) > max_bytes:
+                os.replace(path, f"{path}.1")
+        except FileNotFoundError:
+            pass
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
@@ -0,0 +1,175 @@
+"""Detection of degenerate model output while it streams in.
+
+Models sometimes fall into a loop and repeat the same phrase until they hit
+their output limit, or open brackets without end. DegenerationDetector is
+fed the reply text chunk by chunk and raises DegenerateOutput as soon as:
+
+- the rolling repetition rate is too high: over the last WINDOW_NGRAMS
+  n-grams of NGRAM_TOKENS tokens (words and punctuation), the share of
+  repeated n-grams exceeds MAX_REPETITION_RATE. Looping output repeats
+  nearly every n-gram, while prose and structured JSON (dashboard cards,
+  entity lists) keep varying names in most of theirs;
+- the reply exceeds MAX_RESPONSE_CHARS;
+- JSON brackets outside strings nest deeper than MAX_JSON_DEPTH.
+
+_get_ai_response runs each provider request inside watch(). Streaming
+clients pass every text chunk to the module-level feed(), so raising
+DegenerateOutput there ends the stream and cancels the upstream request.
+Replies of clients that do not stream are checked once they are complete.
+A degenerate reply is retried once, with a message asking for a short
+reply, rather than up to the agent's usual retry limit.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Iterator, Optional
+
+MAX_RESPONSE_CHARS = 100_000
+MAX_JSON_DEPTH = 50
+NGRAM_TOKENS = 8
+WINDOW_NGRAMS = 256
+MAX_REPETITION_RATE = 0.9
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_TRAILING_WORD = re.compile(r"\w+\Z")
+# Escapes (a backslash and the character it escapes), quotes and brackets
+_STRUCTURE = re.compile(r'\\.?|["\[\]{}]', re.DOTALL)
+
+_current_detector: ContextVar[Optional["DegenerationDetector"]] = ContextVar(
+    "ai_agent_ha_degeneration", default=None
+)
+
+
+class DegenerateOutput(Exception):
+    """The model's output degenerated."""
+
+    def __init__(self, reason: str, message: str) -> None:
+        """Initialize with the guard that tripped."""
+        super().__init__(message)
+        self.reason = reason
+
+
+class DegenerationDetector:
+    """Incremental repetition, length and nesting checks of one reply."""
+
+    def __init__(
+        self,
+        max_chars: int = MAX_RESPONSE_CHARS,
+        max_json_depth: int = MAX_JSON_DEPTH,
+        ngram_tokens: int = NGRAM_TOKENS,
+        window: int = WINDOW_NGRAMS,
+        max_repetition_rate: float = MAX_REPETITION_RATE,
+    ) -> None:
+        """Initialize with no text seen."""
+        self.max_chars = max_chars
+        self.max_json_depth = max_json_depth
+        self.window = window
+        self.max_repetition_rate = max_repetition_rate
+        self.chars = 0
+        self.fed = False
+        # A word cut off at the end of the previous chunk
+        self._partial = ""
+        self._tokens: Deque[str] = deque(maxlen=ngram_tokens)
+        self._ngrams: Deque[int] = deque()
+        self._ngram_counts: Counter = Counter()
+        self._depth = 0
+        self._in_string = False
+        self._skip_first = False  # The previous chunk ended in a backslash
+
+    @property
+    def repetition_rate(self) -> float:
+        """Return the share of repeated n-grams in the window."""
+        if not self._ngrams:
+            return 0.0
+        return 1 - len(self._ngram_counts) / len(self._ngrams)
+
+    def feed(self, chunk: str) -> None:
+        """Check the next piece of the reply; raise DegenerateOutput if it
+        degenerated."""
+        if not chunk:
+            return
+        self.fed = True
+        self.chars += len(chunk)
+        if self.chars > self.max_chars:
+            raise DegenerateOutput(
+                "length",
+                f"AI response exceeded {self.max_chars} characters",
+            )
+        self._check_nesting(chunk)
+        self._check_repetition(chunk)
+
+    def _check_nesting(self, chunk: str) -> None:
+        """Track bracket depth outside JSON strings."""
+        start = 1 if self._skip_first else 0
+        self._skip_first = False
+        for match in _STRUCTURE.finditer(chunk, start):
+            token = match.group()
+            if token[0] == "\\":
+                self._skip_first = len(token) == 1
+            elif token == '"':
+                self._in_string = not self._in_string
+            elif self._in_string:
+                continue
+            elif token in "[{":
+                self._depth += 1
+                if self._depth > self.max_json_depth:
+                    raise DegenerateOutput(
+                        "json_depth",
+                        f"AI response nested JSON deeper than {self.max_json_depth}",
+                    )
+            elif self._depth:
+                self._depth -= 1
+
+    def _check_repetition(self, chunk: str) -> None:
+        """Add the chunk's tokens to the rolling n-gram window."""
+        text = self._partial + chunk
+        trailing = _TRAILING_WORD.search(text)
+        if trailing:
+            self._partial = trailing.group()
+            text = text[: trailing.start()]
+        else:
+            self._partial = ""
+
+        tokens, ngrams, counts = self._tokens, self._ngrams, self._ngram_counts
+        for token in _TOKEN.findall(text):
+            tokens.append(token)
+            if len(tokens) < tokens.maxlen:
+                continue
+            ngram = hash(tuple(tokens))
+            ngrams.append(ngram)
+            counts[ngram] += 1
+            if len(ngrams) > self.window:
+                old = ngrams.popleft()
+                counts[old] -= 1
+                if not counts[old]:
+                    del counts[old]
+            if (
+                len(ngrams) == self.window
+                and self.repetition_rate > self.max_repetition_rate
+            ):
+                raise DegenerateOutput(
+                    "repetition",
+                    "AI generated repetitive output "
+                    f"({self.repetition_rate:.0%} repeated phrases)",
+                )
+
+
+@contextmanager
+def watch() -> Iterator[DegenerationDetector]:
+    """Check the reply of the provider request made in this context."""
+    detector = DegenerationDetector()
+    token = _current_detector.set(detector)
+    try:
+        yield detector
+    finally:
+        _current_detector.reset(token)
+
+
+def feed(chunk: str) -> None:
+    """Check a streamed chunk of the current reply, if it is watched."""
+    if (detector := _current_detector.get()) is not None:
+        detector.feed(chunk)
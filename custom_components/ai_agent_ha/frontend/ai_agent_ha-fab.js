@@ -328,14 +328,15 @@ class AiAgentHaFab extends LitElement {
     });
 
     try {
-      const response = await this.hass.callService("ai_agent_ha", "query", {
+      const response = await this.hass.callWS({
+        type: "ai_agent_ha/query",
         prompt: userMessage,
       });
 
-      if (response && response.response) {
+      if (response && response.success) {
         this._messages = [
           ...this._messages,
-          { role: "assistant", content: response.response },
+          { role: "assistant", content: response.answer },
         ];
       } else if (response && response.error) {
         this._messages = [
@@ -1009,6 +1009,45 @@ class AiAgentHaPanel extends LitElement {
         color: var(--secondary-text-color);
         font-size: 12px;
       }
+      .trace-waterfall {
+        display: flex;
+        flex-direction: column;
+        gap: 2px;
+        font-size: 11px;
+      }
+      .trace-row {
+        display: grid;
+        grid-template-columns: 160px 1fr 64px;
+        align-items: center;
+        gap: 6px;
+      }
+      .trace-name {
+        overflow: hidden;
+        text-overflow: ellipsis;
+        white-space: nowrap;
+        color: var(--primary-text-color);
+      }
+      .trace-track {
+        position: relative;
+        height: 10px;
+        background: var(--primary-background-color);
+        border-radius: 3px;
+      }
+      .trace-bar {
+        position: absolute;
+        top: 0;
+        bottom: 0;
+        min-width: 2px;
+        border-radius: 3px;
+        background: var(--primary-color);
+      }
+      .trace-bar.error {
+        background: var(--error-color);
+      }
+      .trace-duration {
+        text-align: right;
+        color: var(--secondary-text-color);
+      }
       .send-button {
         --mdc-theme-primary: var(--primary-color);
         --mdc-theme-on-primary: var(--text-primary-color);
@@ -1589,11 +1628,6 @@ class AiAgentHaPanel extends LitElement {
     });
     if (this.hass && !this._eventSubscriptionSetup) {
       this._eventSubscriptionSetup = true;
-      this.hass.connection.subscribeEvents(
-        (event) => this._handleLlamaResponse(event),
-        'ai_agent_ha_response'
-      );
-      console.debug("Event subscription set up in connectedCallback()");
       // Load prompt history from Home Assistant storage
       await this._loadPromptHistory();
       // Load chat messages from Home Assistant storage
@@ -1611,16 +1645,6 @@ class AiAgentHaPanel extends LitElement {
   async updated(changedProps) {
     console.debug("Updated called with:", changedProps);
 
-    // Set up event subscription when hass becomes available
-    if (changedProps.has('hass') && this.hass && !this._eventSubscriptionSetup) {
-      this._eventSubscriptionSetup = true;
-      this.hass.connection.subscribeEvents(
-        (event) => this._handleLlamaResponse(event),
-        'ai_agent_ha_response'
-      );
-      console.debug("Event subscription set up in updated()");
-    }
-
     // Load providers when hass becomes available
     if (changedProps.has('hass') && this.hass && !this.providersLoaded) {
       this.providersLoaded = true;
@@ -2321,12 +2345,16 @@ class AiAgentHaPanel extends LitElement {
     }, 60000); // 60 second timeout
 
     try {
-      console.debug("Calling ai_agent_ha service");
-      await this.hass.callService('ai_agent_ha', 'query', {
+      // The WebSocket command answers this connection only, so other open
+      // panels no longer receive (and have to ignore) our responses
+      console.debug("Calling ai_agent_ha/query");
+      const result = await this.hass.callWS({
+        type: 'ai_agent_ha/query',
         prompt: prompt,
         provider: this._selectedProvider,
         debug: this._showThinking
       });
+      this._handleLlamaResponse({ data: result });
     } catch (error) {
       console.error("Error calling service:", error);
       this._clearLoadingState();
@@ -2629,6 +2657,7 @@ class AiAgentHaPanel extends LitElement {
         </div>
         ${this._thinkingExpanded ? html`
           <div class="thinking-body">
+            ${this._debugInfo.trace ? this._renderTraceWaterfall(this._debugInfo.trace) : ''}
             ${conversation.length === 0 ? html`
               <div class="thinking-empty">No trace captured.</div>
             ` : conversation.map((entry, index) => html`
@@ -2642,6 +2671,37 @@ class AiAgentHaPanel extends LitElement {
       </div>
     `;
   }
+
+  _renderTraceWaterfall(trace) {
+    const spans = trace.spans || [];
+    const total = trace.duration_ms || 1;
+    const depths = {};
+    for (const span of spans) {
+      depths[span.span_id] = span.parent_id ? (depths[span.parent_id] || 0) + 1 : 0;
+    }
+    const label = (span) => {
+      const attrs = span.attributes || {};
+      const detail = attrs.tool || attrs.service || (attrs.iteration ? `#${attrs.iteration}` : '');
+      return detail ? `${span.name} ${detail}` : span.name;
+    };
+
+    return html`
+      <div class="trace-waterfall">
+        ${spans.map((span) => html`
+          <div class="trace-row" title=${JSON.stringify(span.attributes || {})}>
+            <span class="trace-name" style="padding-left: ${depths[span.span_id] * 8}px">${label(span)}</span>
+            <div class="trace-track">
+              <div
+                class="trace-bar ${span.error ? 'error' : ''}"
+                style="left: ${(span.start_ms / total) * 100}%; width: ${(span.duration_ms / total) * 100}%"
+              ></div>
+            </div>
+            <span class="trace-duration">${Math.round(span.duration_ms)} ms</span>
+          </div>
+        `)}
+      </div>
+    `;
+  }
 }
 
 customElements.define("ai_agent_ha-panel", AiAgentHaPanel);
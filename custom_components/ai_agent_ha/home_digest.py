@@ -0,0 +1,209 @@
+"""Compact, background-maintained overview of the home for the AI agent.
+
+The digest summarises areas, entity counts per domain, devices that are on,
+open doors/windows, climate setpoints and the weather so the model can often
+answer or act without first requesting registries and states.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+
+if TYPE_CHECKING:
+    from homeassistant.core import EventStateChangedData
+
+_LOGGER = logging.getLogger(__name__)
+
+# Roughly 4 characters per token, so the default keeps the digest near 500 tokens
+DEFAULT_DIGEST_MAX_CHARS = 2000
+DIGEST_REFRESH_COOLDOWN = 5  # seconds
+
+# Domains whose "on" state is listed in the digest
+ON_DOMAINS = {"light", "switch", "fan", "input_boolean", "media_player"}
+ON_STATES = {"on", "playing"}
+OPENING_DEVICE_CLASSES = {"door", "window", "garage_door", "opening", "garage", "gate"}
+MAX_LISTED_ENTITIES = 25
+
+# State changes in these domains can alter the digest content
+DIGEST_DOMAINS = ON_DOMAINS | {"binary_sensor", "cover", "climate", "weather"}
+
+REGISTRY_UPDATE_EVENTS = (
+    "area_registry_updated",
+    "device_registry_updated",
+    "entity_registry_updated",
+)
+
+
+def _format_entity_list(entity_ids: List[str]) -> str:
+    """Join entity ids, capping the list length."""
+    listed = ", ".join(entity_ids[:MAX_LISTED_ENTITIES])
+    if len(entity_ids) > MAX_LISTED_ENTITIES:
+        listed += f", ... (+{len(entity_ids) - MAX_LISTED_ENTITIES} more)"
+    return listed
+
+
+def build_home_digest(
+    hass: HomeAssistant, max_chars: int = DEFAULT_DIGEST_MAX_CHARS
+) -> str:
+    """Build a compact text digest of the home, bounded to max_chars."""
+    from homeassistant.helpers import area_registry as ar
+    from homeassistant.helpers import device_registry as dr
+    from homeassistant.helpers import entity_registry as er
+
+    area_registry = ar.async_get(hass)
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+
+    # Entity counts by domain per area (entity area, falling back to device area)
+    counts: Dict[Optional[str], Counter] = defaultdict(Counter)
+    for entry in entity_registry.entities.values():
+        if entry.disabled_by is not None:
+            continue
+        area_id = entry.area_id
+        if not area_id and entry.device_id:
+            device = device_registry.devices.get(entry.device_id)
+            area_id = device.area_id if device else None
+        counts[area_id][entry.domain] += 1
+
+    lines: List[str] = []
+    area_lines: List[str] = []
+    for area in sorted(area_registry.areas.values(), key=lambda a: a.name):
+        domains = ", ".join(
+            f"{domain} {count}" for domain, count in sorted(counts[area.id].items())
+        )
+        area_lines.append(f"- {area.name} [{area.id}]: {domains or 'no entities'}")
+    if area_lines:
+        lines.append("Areas (entity counts by domain):")
+        lines.extend(area_lines)
+    if counts.get(None):
+        unassigned = sum(counts[None].values())
+        lines.append(f"Entities without area: {unassigned}")
+
+    on_entities: List[str] = []
+    open_entities: List[str] = []
+    climate_lines: List[str] = []
+    weather_line: Optional[str] = None
+
+    for state in hass.states.async_all():
+        domain = state.domain
+        if domain in ON_DOMAINS and state.state in ON_STATES:
+            on_entities.append(state.entity_id)
+        elif domain in ("binary_sensor", "cover"):
+            device_class = state.attributes.get("device_class")
+            if device_class in OPENING_DEVICE_CLASSES and state.state in ("on", "open"):
+                open_entities.append(state.entity_id)
+        elif domain == "climate":
+            attrs = state.attributes
+            setpoint = attrs.get("temperature")
+            if setpoint is None and attrs.get("target_temp_low") is not None:
+                setpoint = (
+                    f"{attrs.get('target_temp_low')}-{attrs.get('target_temp_high')}"
+                )
+            climate_lines.append(
+                f"- {state.entity_id}: {state.state}, setpoint {setpoint}, "
+                f"current {attrs.get('current_temperature')}"
+            )
+        elif domain == "weather" and weather_line is None:
+            attrs = state.attributes
+            weather_line = (
+                f"Weather ({state.entity_id}): {state.state}, "
+                f"{attrs.get('temperature')}{attrs.get('temperature_unit', '')}, "
+                f"humidity {attrs.get('humidity')}%"
+            )
+
+    if weather_line:
+        lines.append(weather_line)
+    lines.append(f"On: {_format_entity_list(sorted(on_entities)) or 'nothing'}")
+    lines.append(
+        f"Open doors/windows: {_format_entity_list(sorted(open_entities)) or 'none'}"
+    )
+    if climate_lines:
+        lines.append("Climate:")
+        lines.extend(sorted(climate_lines))
+
+    # Keep whole lines only, so truncation never splits an entity id
+    digest_lines: List[str] = []
+    size = 0
+    for line in lines:
+        if size + len(line) + 1 > max_chars:
+            digest_lines.append("... (digest truncated)")
+            break
+        digest_lines.append(line)
+        size += len(line) + 1
+    return "\n".join(digest_lines)
+
+
+class HomeDigest:
+    """Keep a home digest current using a debounced state_changed listener."""
+
+    def __init__(
+        self, hass: HomeAssistant, max_chars: int = DEFAULT_DIGEST_MAX_CHARS
+    ) -> None:
+        """Initialize the digest."""
+        self.hass = hass
+        self.max_chars = max_chars
+        self._digest: Optional[str] = None
+        self._unsub_listeners: List[Callable[[], None]] = []
+        self._debouncer: Debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=DIGEST_REFRESH_COOLDOWN,
+            immediate=False,
+            function=self.async_refresh,
+        )
+
+    @property
+    def digest(self) -> Optional[str]:
+        """Return the latest digest, if one has been built."""
+        return self._digest
+
+    async def async_start(self) -> None:
+        """Build the initial digest and start listening for changes."""
+        self._unsub_listeners.append(
+            self.hass.bus.async_listen(EVENT_STATE_CHANGED, self._handle_state_changed)
+        )
+        for event_type in REGISTRY_UPDATE_EVENTS:
+            self._unsub_listeners.append(
+                self.hass.bus.async_listen(event_type, self._handle_registry_updated)
+            )
+        await self.async_refresh()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop listening and cancel any pending refresh."""
+        for unsub in self._unsub_listeners:
+            unsub()
+        self._unsub_listeners.clear()
+        self._debouncer.async_cancel()
+
+    async def async_refresh(self) -> None:
+        """Rebuild the digest from the current registries and states."""
+        try:
+            self._digest = build_home_digest(self.hass, self.max_chars)
+            _LOGGER.debug("Home digest refreshed (%d chars)", len(self._digest))
+        except Exception as e:
+            _LOGGER.warning("Error building home digest: %s", str(e))
+
+    @callback
+    def _handle_state_changed(self, event: Event[EventStateChangedData]) -> None:
+        """Schedule a refresh when a state relevant to the digest changes."""
+        data = event.data
+        entity_id: str = data.get("entity_id", "")
+        # Added or removed entities change the counts, whatever their domain
+        if (
+            data.get("old_state") is None
+            or data.get("new_state") is None
+            or entity_id.split(".", 1)[0] in DIGEST_DOMAINS
+        ):
+            self._debouncer.async_schedule_call()
+
+    @callback
+    def _handle_registry_updated(self, event: Event) -> None:
+        """Schedule a refresh when areas, devices or entities change."""
+        self._debouncer.async_schedule_call()
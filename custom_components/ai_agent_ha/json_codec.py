@@ -0,0 +1,128 @@
+"""JSON encoding and decoding for provider payloads and tool results.
+
+orjson is used when it is importable (Home Assistant ships it with core) and
+the standard library otherwise. Both backends produce compact UTF-8 JSON and
+serialize datetimes, sets and Home Assistant State objects natively, so
+callers no longer need default=str for the common cases.
+
+Callers should go through the module (json_codec.dumps / json_codec.loads)
+rather than importing the functions, so the backend can be switched with
+use_backend().
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Any, Callable, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with Home Assistant
+    orjson = None
+
+try:
+    from homeassistant.core import State
+except ImportError:  # pragma: no cover - allows use outside Home Assistant
+    State = None  # type: ignore[misc]
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+BACKEND_ORJSON = "orjson"
+BACKEND_STDLIB = "stdlib"
+
+
+def json_default(obj: Any) -> Any:
+    """Convert objects the encoders do not handle natively."""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, Enum):
+        return obj.value
+    if State is not None and isinstance(obj, State):
+        return obj.as_dict()
+    return str(obj)
+
+
+def _stdlib_dumps(obj: Any, indent: bool = False) -> str:
+    """Encode with the standard library json module."""
+    if indent:
+        return json.dumps(obj, default=json_default, ensure_ascii=False, indent=2)
+    return json.dumps(
+        obj, default=json_default, ensure_ascii=False, separators=(",", ":")
+    )
+
+
+def _stdlib_loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Decode with the standard library json module."""
+    return json.loads(data)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def _orjson_dumps(obj: Any, indent: bool = False) -> str:
+        """Encode with orjson, returning str like the stdlib backend."""
+        option = _ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=json_default, option=option).decode("utf-8")
+
+    def _orjson_loads(data: Union[str, bytes, bytearray]) -> Any:
+        """Decode with orjson."""
+        return orjson.loads(data)
+
+
+_BACKENDS = {BACKEND_STDLIB: (_stdlib_dumps, _stdlib_loads)}
+if orjson is not None:
+    _BACKENDS[BACKEND_ORJSON] = (_orjson_dumps, _orjson_loads)
+
+BACKEND: str = BACKEND_ORJSON if orjson is not None else BACKEND_STDLIB
+_dumps: Callable[..., str]
+_loads: Callable[[Union[str, bytes, bytearray]], Any]
+_dumps, _loads = _BACKENDS[BACKEND]
+
+
+def use_backend(name: str) -> None:
+    """Switch the active backend ("orjson" or "stdlib")."""
+    global BACKEND, _dumps, _loads
+    if name not in _BACKENDS:
+        raise ValueError(f"JSON backend not available: {name}")
+    BACKEND = name
+    _dumps, _loads = _BACKENDS[name]
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Encode obj as compact JSON, or indented by two spaces if requested."""
+    return _dumps(obj, indent)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Decode JSON from str or bytes."""
+    return _loads(data)
+
+
+class LazyJSON:
+    """Defer indented encoding until a log record is actually formatted.
+
+    Pass an instance as a logging argument so payloads are only serialized
+    when the debug level is enabled.
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any) -> None:
+        """Wrap the object to encode."""
+        self.obj = obj
+
+    def __str__(self) -> str:
+        """Return the indented JSON encoding."""
+        return dumps(self.obj, indent=True)
+
+
+def available_backends() -> list[str]:
+    """Return the names of the usable backends."""
+    return list(_BACKENDS)
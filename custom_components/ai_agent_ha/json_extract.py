@@ -0,0 +1,183 @@
+"""Tolerant extraction of JSON commands from model output.
+
+Models do not always answer with exactly one JSON object: replies come
+wrapped in ``` fences, with prose or garbage before and after, as several
+concatenated objects, with a BOM or zero-width characters, or cut off in
+the middle. JsonExtractor finds the JSON objects in such text in a single
+pass:
+
+- Text outside objects is skipped to the next "{" with str.find.
+- Inside an object, one compiled pattern matches string literals (so
+  braces in strings do not count) and braces, and the nesting depth is
+  tracked without recursion.
+- Each balanced object is decoded once with json_codec. Objects that do
+  not decode are kept as text.
+
+Text can be fed in chunks as it streams in; feed() returns the objects
+completed by each chunk. extract_json() runs the extractor on a whole text.
+Only objects are extracted: top-level arrays and scalars are left as text.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from . import json_codec
+
+# BOM and zero-width characters, removed before scanning
+_INVISIBLE_CHARS = "\ufeff\u200b\u200c\u200d\u2060"
+_INVISIBLE = dict.fromkeys(map(ord, _INVISIBLE_CHARS))
+# A string literal (group 1 holds its closing quote, empty when the text
+# ends inside the string), a run of opening braces (group 2) or a run of
+# closing braces (group 3)
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*("?)|(\{+)|(\}+)', re.DOTALL)
+# Markdown code fence markers, e.g. ```json
+_FENCE = re.compile(r"```[\w+-]*")
+
+
+def _remove_invisible(text: str) -> str:
+    """Return text without a BOM or zero-width characters."""
+    if any(char in text for char in _INVISIBLE_CHARS):
+        return text.translate(_INVISIBLE)
+    return text
+
+
+def clean_text(text: str) -> str:
+    """Return text without a BOM, zero-width characters or outer whitespace."""
+    return _remove_invisible(text).strip()
+
+
+@dataclass
+class Extraction:
+    """The JSON objects found in a text and the text around them."""
+
+    objects: List[Any] = field(default_factory=list)
+    # Text outside the objects, without code fences
+    text: str = ""
+    # Why the first object-like span failed to decode, if one did
+    error: Optional[json_codec.JSONDecodeError] = None
+
+    @property
+    def command(self) -> Optional[Dict[str, Any]]:
+        """Return the first object with a request_type, if any."""
+        for obj in self.objects:
+            if isinstance(obj, dict) and "request_type" in obj:
+                return obj
+        return None
+
+
+class JsonExtractor:
+    """Single-pass, incremental extractor of JSON objects from text."""
+
+    def __init__(self) -> None:
+        """Initialize with no text seen."""
+        self._buffer = ""
+        self._start = -1  # Start of the object being scanned, if any
+        self._scan = 0  # Where scanning of that object resumes
+        self._depth = 0
+        self._text: List[str] = []
+        self._extraction = Extraction()
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Add text and return the objects it completed."""
+        self._buffer += _remove_invisible(chunk)
+        found: List[Any] = []
+        pos = 0
+        while True:
+            if self._start < 0:
+                start = self._buffer.find("{", pos)
+                if start < 0:
+                    break
+                self._text.append(self._buffer[pos:start])
+                self._start = self._scan = start
+                self._depth = 0
+            end = self._scan_object()
+            if end < 0:
+                break
+            span = self._buffer[self._start : end]
+            self._start = -1
+            pos = end
+            try:
+                obj = json_codec.loads(span)
+            except (json_codec.JSONDecodeError, RecursionError) as err:
+                self._text.append(span)
+                self._set_error(err, span)
+                continue
+            self._extraction.objects.append(obj)
+            found.append(obj)
+
+        # Keep only the object being scanned
+        if self._start < 0:
+            self._text.append(self._buffer[pos:])
+            self._buffer = ""
+        else:
+            self._buffer = self._buffer[self._start :]
+            self._scan -= self._start
+            self._start = 0
+        return found
+
+    def _scan_object(self) -> int:
+        """Scan the current object and return its end, or -1 if incomplete."""
+        if self._buffer.find("}", self._scan) < 0:
+            return -1  # Cannot close yet
+        depth = self._depth
+        for match in _TOKEN.finditer(self._buffer, self._scan):
+            opening, closing = match.group(2), match.group(3)
+            if opening:
+                depth += len(opening)
+            elif closing:
+                if len(closing) >= depth:
+                    return match.start() + depth
+                depth -= len(closing)
+            elif not match.group(1):
+                # The text ends inside this string: resume from its start
+                self._scan = match.start()
+                self._depth = depth
+                return -1
+        self._scan = len(self._buffer)
+        self._depth = depth
+        return -1
+
+    def _set_error(self, err: Exception, span: str) -> None:
+        """Remember the first decoding error."""
+        if self._extraction.error is not None:
+            return
+        if isinstance(err, json_codec.JSONDecodeError):
+            self._extraction.error = err
+        else:
+            self._extraction.error = json_codec.JSONDecodeError(
+                "JSON object nested too deeply", span, 0
+            )
+
+    def finish(self) -> Extraction:
+        """Return everything extracted; an unterminated object is text."""
+        if self._start >= 0:
+            rest = self._buffer[self._start :]
+            self._text.append(rest)
+            self._set_error(
+                json_codec.JSONDecodeError("Unterminated JSON object", rest, len(rest)),
+                rest,
+            )
+            self._buffer = ""
+            self._start = -1
+        self._extraction.text = _FENCE.sub("", "".join(self._text)).strip()
+        return self._extraction
+
+
+def extract_json(text: str) -> Extraction:
+    """Return the JSON objects in text and the text around them."""
+    # Most replies are exactly one object: decode it without scanning
+    stripped = clean_text(text)
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            obj = json_codec.loads(stripped)
+        except (json_codec.JSONDecodeError, RecursionError):
+            pass
+        else:
+            if isinstance(obj, dict):
+                return Extraction(objects=[obj])
+    extractor = JsonExtractor()
+    extractor.feed(text)
+    return extractor.finish()
@@ -0,0 +1,321 @@
+"""Per-provider query metrics.
+
+Each query runs inside MetricsCollector.track_query, which puts a
+QueryRecorder in a context variable. Code anywhere below process_query (the
+AI request loop, tool calls, provider clients reporting token usage) records
+into it through the module-level record_* functions without passing it
+around, and concurrent queries never share a recorder. When the query ends,
+the recorder is merged into the collector's per provider/model totals and
+listeners (the diagnostic sensors) are notified.
+
+Latencies are kept in fixed-size rolling windows, so percentiles describe
+recent queries and memory use stays bounded.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Latency samples kept per window
+LATENCY_WINDOW_SIZE = 500
+PERCENTILES = (50, 95, 99)
+
+_current_query: ContextVar[Optional["QueryRecorder"]] = ContextVar(
+    "ai_agent_ha_query_metrics", default=None
+)
+
+
+def _percentile(sorted_samples: List[float], pct: float) -> Optional[float]:
+    """Return the nearest-rank percentile of sorted samples."""
+    if not sorted_samples:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+class LatencyWindow:
+    """Rolling window of latency samples, in seconds."""
+
+    def __init__(self, size: int = LATENCY_WINDOW_SIZE) -> None:
+        """Initialize an empty window."""
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record one sample."""
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    @staticmethod
+    def summarize(windows: Iterable["LatencyWindow"]) -> Dict[str, Any]:
+        """Return count, mean and percentiles in ms over one or more windows."""
+        windows = list(windows)
+        samples = sorted(s for window in windows for s in window.samples)
+        count = sum(window.count for window in windows)
+        total = sum(window.total for window in windows)
+        summary: Dict[str, Any] = {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 1) if count else None,
+        }
+        for pct in PERCENTILES:
+            value = _percentile(samples, pct)
+            summary[f"p{pct}_ms"] = (
+                round(value * 1000, 1) if value is not None else None
+            )
+        return summary
+
+
+@dataclass
+class ProviderMetrics:
+    """Totals for one provider and model."""
+
+    provider: str
+    model: str
+    queries: int = 0
+    errors: int = 0
+    iterations: int = 0
+    ai_requests: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    last_error: Optional[str] = None
+    query_latency: LatencyWindow = field(default_factory=LatencyWindow)
+    ai_latency: LatencyWindow = field(default_factory=LatencyWindow)
+    tool_latency: Dict[str, LatencyWindow] = field(default_factory=dict)
+    tool_errors: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class QueryRecorder:
+    """Measurements of a single query."""
+
+    provider: str
+    model: str = ""
+    started: float = field(default_factory=time.monotonic)
+    ai_latencies: List[float] = field(default_factory=list)
+    retries: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tools: List[Tuple[str, float, bool]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def finish(self, result: Any) -> None:
+        """Mark the query as failed if its result carries an error."""
+        if isinstance(result, dict) and result.get("error"):
+            self.error = str(result["error"])
+
+
+class MetricsCollector:
+    """Aggregates query measurements per provider and model."""
+
+    def __init__(self) -> None:
+        """Initialize an empty collector."""
+        self._metrics: Dict[Tuple[str, str], ProviderMetrics] = {}
+        self._listeners: List[Callable[[str], None]] = []
+        # Provider summaries, computed once per finished query for all sensors
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def track_query(self, provider: str, model: str = "") -> Iterator[QueryRecorder]:
+        """Record the query running in this context and merge it when done."""
+        recorder = QueryRecorder(provider, model)
+        token = _current_query.set(recorder)
+        try:
+            yield recorder
+        except Exception as e:
+            recorder.error = str(e) or type(e).__name__
+            raise
+        finally:
+            _current_query.reset(token)
+            self._merge(recorder, time.monotonic() - recorder.started)
+
+    def _merge(self, recorder: QueryRecorder, seconds: float) -> None:
+        """Add a finished query to its provider/model totals."""
+        key = (recorder.provider, recorder.model)
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            metrics = self._metrics[key] = ProviderMetrics(*key)
+        metrics.queries += 1
+        metrics.query_latency.add(seconds)
+        metrics.iterations += len(recorder.ai_latencies)
+        metrics.ai_requests += len(recorder.ai_latencies)
+        for ai_seconds in recorder.ai_latencies:
+            metrics.ai_latency.add(ai_seconds)
+        metrics.retries += recorder.retries
+        metrics.cache_hits += recorder.cache_hits
+        metrics.prompt_tokens += recorder.prompt_tokens
+        metrics.completion_tokens += recorder.completion_tokens
+        for name, tool_seconds, failed in recorder.tools:
+            metrics.tool_latency.setdefault(name, LatencyWindow()).add(tool_seconds)
+            if failed:
+                metrics.tool_errors[name] = metrics.tool_errors.get(name, 0) + 1
+        if recorder.error:
+            metrics.errors += 1
+            metrics.last_error = recorder.error[:200]
+        self._summaries.pop(recorder.provider, None)
+
+        for listener in list(self._listeners):
+            try:
+                listener(recorder.provider)
+            except Exception:
+                _LOGGER.exception("Error in metrics listener")
+
+    def add_listener(self, listener: Callable[[str], None]) -> Callable[[], None]:
+        """Call listener with the provider after each query; returns a remover."""
+        self._listeners.append(listener)
+
+        def remove() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return remove
+
+    def provider_summary(self, provider: str) -> Dict[str, Any]:
+        """Return the totals of a provider across its models."""
+        if (cached := self._summaries.get(provider)) is not None:
+            return cached
+        entries = [m for m in self._metrics.values() if m.provider == provider]
+        queries = sum(m.queries for m in entries)
+        summary: Dict[str, Any] = {
+            name: sum(getattr(m, name) for m in entries)
+            for name in (
+                "queries",
+                "errors",
+                "ai_requests",
+                "retries",
+                "cache_hits",
+                "prompt_tokens",
+                "completion_tokens",
+            )
+        }
+        summary["iterations_per_query"] = (
+            round(sum(m.iterations for m in entries) / queries, 2) if queries else None
+        )
+        summary["query_latency"] = LatencyWindow.summarize(
+            m.query_latency for m in entries
+        )
+        summary["ai_latency"] = LatencyWindow.summarize(m.ai_latency for m in entries)
+        summary["models"] = sorted(m.model for m in entries if m.model)
+        self._summaries[provider] = summary
+        return summary
+
+    def as_dict(self) -> List[Dict[str, Any]]:
+        """Return all totals per provider and model, for diagnostics."""
+        return [
+            {
+                "provider": m.provider,
+                "model": m.model,
+                "queries": m.queries,
+                "errors": m.errors,
+                "last_error": m.last_error,
+                "iterations_per_query": (
+                    round(m.iterations / m.queries, 2) if m.queries else None
+                ),
+                "ai_requests": m.ai_requests,
+                "retries": m.retries,
+                "cache_hits": m.cache_hits,
+                "prompt_tokens": m.prompt_tokens,
+                "completion_tokens": m.completion_tokens,
+                "query_latency": LatencyWindow.summarize([m.query_latency]),
+                "ai_latency": LatencyWindow.summarize([m.ai_latency]),
+                "tools": {
+                    name: {
+                        **LatencyWindow.summarize([window]),
+                        "errors": m.tool_errors.get(name, 0),
+                    }
+                    for name, window in sorted(m.tool_latency.items())
+                },
+            }
+            for m in self._metrics.values()
+        ]
+
+
+def set_query_model(provider: str, model: str) -> None:
+    """Set the provider and model once the query has resolved them."""
+    if (recorder := _current_query.get()) is not None:
+        recorder.provider = provider
+        recorder.model = model or ""
+
+
+def record_ai_request(seconds: float) -> None:
+    """Record one AI request (one iteration of the query loop)."""
+    if (recorder := _current_query.get()) is not None:
+        recorder.ai_latencies.append(seconds)
+
+
+def record_retry() -> None:
+    """Record a retried AI request."""
+    if (recorder := _current_query.get()) is not None:
+        recorder.retries += 1
+
+
+def record_cache_hit() -> None:
+    """Record a result served from a cache."""
+    if (recorder := _current_query.get()) is not None:
+        recorder.cache_hits += 1
+
+
+def record_tool(name: str, seconds: float, failed: bool = False) -> None:
+    """Record one tool (data request) call."""
+    if (recorder := _current_query.get()) is not None:
+        recorder.tools.append((name, seconds, failed))
+
+
+def record_usage(data: Any) -> None:
+    """Record token usage from a provider response body.
+
+    Understands the OpenAI-compatible, Anthropic, Gemini, Bedrock Converse,
+    Ollama and Llama API usage formats; responses without usage are ignored.
+    """
+    if (recorder := _current_query.get()) is None or not isinstance(data, dict):
+        return
+    prompt_tokens, completion_tokens = _extract_usage(data)
+    recorder.prompt_tokens += prompt_tokens
+    recorder.completion_tokens += completion_tokens
+
+
+def _extract_usage(data: Dict[str, Any]) -> Tuple[int, int]:
+    """Return (prompt, completion) token counts from a response body."""
+    usage = data.get("usage")
+    if isinstance(usage, dict) and "inputTokens" in usage:
+        # Bedrock Converse
+        return int(usage.get("inputTokens") or 0), int(usage.get("outputTokens") or 0)
+    if isinstance(usage, dict):
+        # OpenAI-compatible uses prompt/completion, Anthropic input/output
+        return (
+            int(usage.get("prompt_tokens", usage.get("input_tokens")) or 0),
+            int(usage.get("completion_tokens", usage.get("output_tokens")) or 0),
+        )
+    usage = data.get("usageMetadata")
+    if isinstance(usage, dict):
+        return (
+            int(usage.get("promptTokenCount") or 0),
+            int(usage.get("candidatesTokenCount") or 0)
+            + int(usage.get("thoughtsTokenCount") or 0),
+        )
+    if "prompt_eval_count" in data or "eval_count" in data:
+        return int(data.get("prompt_eval_count") or 0), int(data.get("eval_count") or 0)
+    if isinstance(data.get("metrics"), list):
+        values = {
+            m.get("metric"): m.get("value")
+            for m in data["metrics"]
+            if isinstance(m, dict)
+        }
+        return (
+            int(values.get("num_prompt_tokens") or 0),
+            int(values.get("num_completion_tokens") or 0),
+        )
+    return 0, 0
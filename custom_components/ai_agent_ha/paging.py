@@ -0,0 +1,153 @@
+"""Size-bounded pages of list tool results.
+
+A list result that would encode to more than the budget is returned as a
+page instead: the items that fit, the total count, a summary of the whole
+list (entities per domain and per area) and a continuation token for the
+next page. The model can then narrow its request or page on with the
+"continuation" (or explicit "offset"/"limit") parameters. Small results are
+returned unchanged.
+
+Continuation tokens are stateless: they hold the next offset and a digest
+of the request, so a token only continues the request that produced it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import Counter
+from typing import Any, Dict, List, Mapping
+
+from . import json_codec
+from .state_cache import CachedEntityState
+
+# Roughly 3,000 tokens per tool result
+DEFAULT_BUDGET_CHARS = 12000
+MAX_LIMIT = 500
+PAGING_PARAMETERS = ("offset", "limit", "continuation")
+# Domains and areas listed in the summary of a truncated result
+SUMMARY_TOP = 15
+
+
+class PagingError(ValueError):
+    """Invalid offset, limit or continuation token."""
+
+
+def _request_digest(request_type: str, parameters: Mapping[str, Any]) -> str:
+    """Return a short digest of a request without its paging parameters."""
+    stable = {k: v for k, v in parameters.items() if k not in PAGING_PARAMETERS}
+    encoded = json.dumps([request_type, stable], sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode(), usedforsecurity=False).hexdigest()[:8]
+
+
+def make_continuation(
+    request_type: str, parameters: Mapping[str, Any], offset: int
+) -> str:
+    """Return the token continuing a request at offset."""
+    return f"{offset}:{_request_digest(request_type, parameters)}"
+
+
+def _resolve_offset(request_type: str, parameters: Mapping[str, Any]) -> int:
+    """Return the offset requested by offset or continuation."""
+    continuation = parameters.get("continuation")
+    if continuation:
+        position, _, digest = str(continuation).partition(":")
+        if not position.isdigit() or digest != _request_digest(
+            request_type, parameters
+        ):
+            raise PagingError(
+                "Invalid continuation: repeat the original request with the same "
+                "parameters and the continuation it returned"
+            )
+        return int(position)
+    try:
+        offset = int(parameters.get("offset") or 0)
+    except (TypeError, ValueError) as e:
+        raise PagingError("offset must be a number") from e
+    if offset < 0:
+        raise PagingError("offset must not be negative")
+    return offset
+
+
+def _resolve_limit(parameters: Mapping[str, Any]) -> int:
+    """Return the requested page size, MAX_LIMIT if none was given."""
+    limit = parameters.get("limit")
+    if limit in (None, ""):
+        return MAX_LIMIT
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError) as e:
+        raise PagingError("limit must be a number") from e
+    if not 1 <= limit <= MAX_LIMIT:
+        raise PagingError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def _encoded_chars(item: Any) -> int:
+    """Return the length of an item's JSON encoding."""
+    if isinstance(item, CachedEntityState):
+        return len(item.json_fragment)
+    return len(json_codec.dumps(item))
+
+
+def summarize_items(items: List[Any]) -> Dict[str, Any]:
+    """Return the counts of a list result per domain and per area."""
+    domains: Counter = Counter()
+    areas: Counter = Counter()
+    for item in items:
+        if not isinstance(item, Mapping):
+            continue
+        entity_id = item.get("entity_id")
+        if isinstance(entity_id, str) and "." in entity_id:
+            domains[entity_id.split(".", 1)[0]] += 1
+        area = item.get("area_id") or item.get("area_name")
+        if area:
+            areas[str(area)] += 1
+    summary: Dict[str, Any] = {"count": len(items)}
+    if domains:
+        summary["domains"] = dict(domains.most_common(SUMMARY_TOP))
+    if areas:
+        summary["areas"] = dict(areas.most_common(SUMMARY_TOP))
+    return summary
+
+
+def paginate(
+    request_type: str,
+    parameters: Mapping[str, Any],
+    data: Any,
+    budget_chars: int = DEFAULT_BUDGET_CHARS,
+) -> Any:
+    """Return a list result unchanged if it fits the budget, else a page of it."""
+    if not isinstance(data, list):
+        return data
+    paged = any(parameters.get(name) not in (None, "") for name in PAGING_PARAMETERS)
+    offset = _resolve_offset(request_type, parameters)
+    limit = _resolve_limit(parameters)
+
+    items: List[Any] = []
+    used = 0
+    for item in data[offset : offset + limit]:
+        used += _encoded_chars(item) + 1
+        if items and used > budget_chars:
+            break
+        items.append(item)
+    end = offset + len(items)
+    if not paged and end == len(data):
+        return data
+
+    page: Dict[str, Any] = {
+        "items": items,
+        "total": len(data),
+        "offset": offset,
+        "returned": len(items),
+    }
+    if end < len(data):
+        page["continuation"] = make_continuation(request_type, parameters, end)
+        page["note"] = (
+            f"Showing items {offset + 1}-{end} of {len(data)}. Narrow the request "
+            "if you can; otherwise repeat it with this continuation in its "
+            "parameters for the next items."
+        )
+        if offset == 0:
+            page["summary"] = summarize_items(data)
+    return page
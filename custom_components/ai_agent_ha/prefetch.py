@@ -0,0 +1,191 @@
+"""Speculative prefetch of tool data while the first AI request runs.
+
+Most queries name a room ("the kitchen"), a kind of device ("the lights")
+or the weather, and the model's first reply is usually the matching data
+request. The predictor finds those mentions with the area registry (names
+and aliases) and the keyword table below, and the agent starts the likely
+get_entities_by_area, get_entities_by_domain and get_weather_data fetches
+alongside the AI request. When the model asks for one of them with the same
+parameters, the prefetched result is used instead of fetching again.
+
+Prefetched tasks live in a per-query scratch scope held in a context
+variable. They are used at most once, dropped once the query changes
+anything (service calls, entity updates) and cancelled when it ends.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+
+from .paging import PAGING_PARAMETERS
+
+# Fetches started per query
+MAX_PREFETCHES = 3
+# Domains with more entities than this are not fetched speculatively
+MAX_DOMAIN_ENTITIES = 100
+
+# Words in a query that point at a domain
+DOMAIN_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "light": ("light", "lights", "lamp", "lamps", "lighting"),
+    "switch": ("switch", "switches", "plug", "plugs", "outlet", "outlets"),
+    "climate": ("thermostat", "thermostats", "heating", "heater", "hvac"),
+    "cover": ("blind", "blinds", "shade", "shades", "curtain", "curtains", "cover"),
+    "lock": ("lock", "locks", "locked", "unlock", "unlocked"),
+    "media_player": ("tv", "television", "speaker", "speakers", "music"),
+    "fan": ("fan", "fans"),
+    "vacuum": ("vacuum", "hoover"),
+}
+WEATHER_KEYWORDS = (
+    "weather",
+    "forecast",
+    "rain",
+    "raining",
+    "snow",
+    "umbrella",
+    "sunny",
+    "outside",
+)
+
+_current_scope: ContextVar[Optional["PrefetchScope"]] = ContextVar(
+    "ai_agent_ha_prefetch", default=None
+)
+
+
+def _request_key(request_type: str, parameters: Mapping[str, Any]) -> str:
+    """Return the key matching a data request, ignoring its paging."""
+    stable = {k: v for k, v in parameters.items() if k not in PAGING_PARAMETERS}
+    return json.dumps([request_type, stable], sort_keys=True, default=str)
+
+
+class PrefetchScope:
+    """The prefetched tasks of one query."""
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+
+    def start(
+        self,
+        request_type: str,
+        parameters: Mapping[str, Any],
+        fetch: Awaitable[Any],
+    ) -> None:
+        """Start fetching the result of a data request."""
+        key = _request_key(request_type, parameters)
+        if key in self._tasks:
+            fetch.close()  # type: ignore[attr-defined]
+            return
+        self._tasks[key] = asyncio.ensure_future(fetch)
+
+    def take(
+        self, request_type: str, parameters: Mapping[str, Any]
+    ) -> Optional[asyncio.Task]:
+        """Return and forget the prefetched task for a data request, if any."""
+        task = self._tasks.pop(_request_key(request_type, parameters), None)
+        if task is not None:
+            self.hits += 1
+        return task
+
+    def invalidate(self) -> None:
+        """Drop all prefetched results, e.g. after the home has changed."""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+
+@contextmanager
+def prefetch_scope() -> Iterator[PrefetchScope]:
+    """Hold the prefetched data of the query running in this context."""
+    scope = PrefetchScope()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        scope.invalidate()
+
+
+def start(
+    request_type: str, parameters: Mapping[str, Any], fetch: Awaitable[Any]
+) -> None:
+    """Start a prefetch in the current query, if it has a scope."""
+    if (scope := _current_scope.get()) is not None:
+        scope.start(request_type, parameters, fetch)
+    else:
+        fetch.close()  # type: ignore[attr-defined]
+
+
+def take(request_type: str, parameters: Mapping[str, Any]) -> Optional[asyncio.Task]:
+    """Return the prefetched task for a data request of the current query."""
+    if (scope := _current_scope.get()) is not None:
+        return scope.take(request_type, parameters)
+    return None
+
+
+def invalidate() -> None:
+    """Drop the prefetched data of the current query."""
+    if (scope := _current_scope.get()) is not None:
+        scope.invalidate()
+
+
+def _pattern(phrase: str) -> str:
+    """Return a regular expression matching phrase as whole words."""
+    return rf"\b{re.escape(phrase)}\b"
+
+
+def _mentions(text: str, phrase: str) -> bool:
+    """Return whether text contains phrase as whole words."""
+    return re.search(_pattern(phrase), text) is not None
+
+
+def build_area_index(hass: HomeAssistant) -> Dict[str, str]:
+    """Return the lower-case names and aliases of all areas, by area_id."""
+    from homeassistant.helpers import area_registry as ar
+
+    index: Dict[str, str] = {}
+    for area in ar.async_get(hass).areas.values():
+        for name in (area.name, *(area.aliases or ())):
+            if name and name.strip():
+                index[name.strip().lower()] = area.id
+    return index
+
+
+def predict_requests(
+    query: str,
+    area_index: Mapping[str, str],
+    domain_counts: Mapping[str, int],
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Return the data requests a query is likely to need, most likely first.
+
+    Areas come first, then domains with at most MAX_DOMAIN_ENTITIES
+    entities (domain_counts), then the weather if there is a weather entity.
+    """
+    text = query.lower()
+    requests: List[Tuple[str, Dict[str, Any]]] = []
+    # Longer names first, each removed once matched, so "living room" does
+    # not also match an area called "room"
+    matched_areas: List[str] = []
+    for name in sorted(area_index, key=len, reverse=True):
+        text, found = re.subn(_pattern(name), " ", text)
+        area_id = area_index[name]
+        if found and area_id not in matched_areas:
+            matched_areas.append(area_id)
+            requests.append(("get_entities_by_area", {"area_id": area_id}))
+    for domain, keywords in DOMAIN_KEYWORDS.items():
+        count = domain_counts.get(domain, 0)
+        if 0 < count <= MAX_DOMAIN_ENTITIES and any(
+            _mentions(text, keyword) for keyword in keywords
+        ):
+            requests.append(("get_entities_by_domain", {"domain": domain}))
+    if domain_counts.get("weather") and any(
+        _mentions(text, keyword) for keyword in WEATHER_KEYWORDS
+    ):
+        requests.append(("get_weather_data", {}))
+    return requests[:MAX_PREFETCHES]
@@ -0,0 +1,169 @@
+"""Field and attribute projection of entity tool results.
+
+Entity tools (get_entity_state and the tools listing entity states) accept
+two optional parameters:
+
+- fields: the top-level fields to return (entity_id is always included),
+  e.g. ["state", "area_name"].
+- attributes: the state attributes to return, or "*" for all of them.
+
+Without attributes, a per-domain default projection applies: attributes
+that are rarely useful to the model but large (pictures, option lists,
+forecast arrays, supported feature bits) are left out, as is any other
+attribute whose encoding exceeds MAX_DEFAULT_ATTRIBUTE_CHARS. The names of
+omitted attributes are listed in "omitted_attributes", so the model can
+still ask for them by name.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple, Union
+
+from . import json_codec
+
+ALL_ATTRIBUTES = "*"
+# Attributes above this encoded size are omitted by default projections
+MAX_DEFAULT_ATTRIBUTE_CHARS = 400
+
+# Omitted for every domain: duplicates of top-level fields, pictures and
+# feature bitmasks the model cannot interpret
+COMMON_OMITTED_ATTRIBUTES: FrozenSet[str] = frozenset(
+    {
+        "friendly_name",
+        "icon",
+        "entity_picture",
+        "entity_picture_local",
+        "supported_features",
+        "attribution",
+        "access_token",
+    }
+)
+
+# Omitted per domain, in addition to the common ones
+DOMAIN_OMITTED_ATTRIBUTES: Dict[str, FrozenSet[str]] = {
+    "camera": frozenset({"model_name", "brand", "frontend_stream_type"}),
+    "climate": frozenset(
+        {
+            "hvac_modes",
+            "fan_modes",
+            "preset_modes",
+            "swing_modes",
+            "swing_horizontal_modes",
+            "min_temp",
+            "max_temp",
+            "min_humidity",
+            "max_humidity",
+            "target_temp_step",
+        }
+    ),
+    "fan": frozenset({"preset_modes", "speed_list"}),
+    "humidifier": frozenset({"available_modes", "min_humidity", "max_humidity"}),
+    "light": frozenset(
+        {
+            "supported_color_modes",
+            "effect_list",
+            "min_mireds",
+            "max_mireds",
+            "min_color_temp_kelvin",
+            "max_color_temp_kelvin",
+            "hs_color",
+            "xy_color",
+        }
+    ),
+    "media_player": frozenset(
+        {
+            "source_list",
+            "sound_mode_list",
+            "group_members",
+            "media_content_id",
+            "media_image_url",
+            "media_image_remotely_accessible",
+            "media_position_updated_at",
+        }
+    ),
+    "remote": frozenset({"activity_list"}),
+    "update": frozenset({"release_summary", "skipped_version", "in_progress"}),
+    "vacuum": frozenset({"fan_speed_list"}),
+    "water_heater": frozenset({"operation_list", "min_temp", "max_temp"}),
+    "weather": frozenset({"forecast"}),
+}
+
+
+def _as_names(value: Union[None, str, List[Any]]) -> Optional[List[str]]:
+    """Normalize a fields/attributes parameter to a list of names."""
+    if value is None or value == "" or value == []:
+        return None
+    if isinstance(value, str):
+        return [name.strip() for name in value.split(",") if name.strip()]
+    return [str(name) for name in value]
+
+
+def is_default_projection(
+    fields: Union[None, str, List[Any]], attributes: Union[None, str, List[Any]]
+) -> bool:
+    """Return whether a request leaves both projections at their defaults."""
+    return _as_names(fields) is None and _as_names(attributes) is None
+
+
+def default_attributes(
+    domain: str, attributes: Mapping[str, Any]
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Return the attributes kept by the domain's default projection and the
+    names of those omitted."""
+    omitted_names = COMMON_OMITTED_ATTRIBUTES | DOMAIN_OMITTED_ATTRIBUTES.get(
+        domain, frozenset()
+    )
+    kept: Dict[str, Any] = {}
+    omitted: List[str] = []
+    for name, value in attributes.items():
+        if name in omitted_names:
+            if name != "friendly_name":
+                omitted.append(name)
+            continue
+        if (
+            isinstance(value, (list, dict, str))
+            and len(json_codec.dumps(value)) > MAX_DEFAULT_ATTRIBUTE_CHARS
+        ):
+            omitted.append(name)
+            continue
+        kept[name] = value
+    return kept, omitted
+
+
+def project_entity_state(
+    result: Mapping[str, Any],
+    fields: Union[None, str, List[Any]] = None,
+    attributes: Union[None, str, List[Any]] = None,
+) -> Dict[str, Any]:
+    """Project a full get_entity_state result."""
+    field_names = _as_names(fields)
+    attribute_names = _as_names(attributes)
+    all_attributes = result.get("attributes") or {}
+
+    if field_names is None:
+        projected = {k: v for k, v in result.items() if k != "attributes"}
+    else:
+        projected = {
+            k: v
+            for k, v in result.items()
+            if k == "entity_id" or (k in field_names and k != "attributes")
+        }
+        # Naming attributes asks for them even if fields leaves them out
+        if "attributes" not in field_names and attribute_names is None:
+            return projected
+
+    if attribute_names is None:
+        domain = str(result.get("entity_id", "")).split(".", 1)[0]
+        kept, omitted = default_attributes(domain, all_attributes)
+        projected["attributes"] = kept
+        if omitted:
+            projected["omitted_attributes"] = omitted
+    elif ALL_ATTRIBUTES in attribute_names:
+        projected["attributes"] = dict(all_attributes)
+    else:
+        projected["attributes"] = {
+            name: all_attributes[name]
+            for name in attribute_names
+            if name in all_attributes
+        }
+    return projected
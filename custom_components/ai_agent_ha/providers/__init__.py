@@ -0,0 +1,58 @@
+"""AI provider clients, imported on first use.
+
+Each provider's client lives in its own module, so setting up the
+integration imports only the configured provider's code instead of every
+client. async_load_client_class imports a module in Home Assistant's import
+executor; the synchronous client_class lookup then finds it already loaded.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import Dict, Tuple
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.importlib import async_import_module
+
+# Credential config key, default model and "module.Class" for each provider
+PROVIDER_CLIENTS: Dict[str, tuple] = {
+    "openai": ("openai_token", "gpt-3.5-turbo", "openai.OpenAIClient"),
+    "gemini": ("gemini_token", "gemini-2.5-flash", "gemini.GeminiClient"),
+    "openrouter": ("openrouter_token", "openai/gpt-4o", "openrouter.OpenRouterClient"),
+    "llama": (
+        "llama_token",
+        "Llama-4-Maverick-17B-128E-Instruct-FP8",
+        "llama.LlamaClient",
+    ),
+    "anthropic": (
+        "anthropic_token",
+        "claude-sonnet-4-5-20250929",
+        "anthropic.AnthropicClient",
+    ),
+    "alter": ("alter_token", "", "alter.AlterClient"),
+    "zai": ("zai_token", "glm-4.7", "zai.ZaiClient"),
+    "bedrock": (
+        "bedrock_access_key",
+        "us.anthropic.claude-opus-4-5-20251101-v1:0",
+        "bedrock.BedrockClient",
+    ),
+    "local": ("local_url", "", "local.LocalClient"),
+}
+
+
+def _client_path(provider: str) -> Tuple[str, str]:
+    """Return the absolute module name and class name of a provider's client."""
+    module_name, class_name = PROVIDER_CLIENTS[provider][2].rsplit(".", 1)
+    return f"{__name__}.{module_name}", class_name
+
+
+def client_class(provider: str) -> type:
+    """Return a provider's client class, importing its module if needed."""
+    module_name, class_name = _client_path(provider)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+async def async_load_client_class(hass: HomeAssistant, provider: str) -> type:
+    """Return a provider's client class, importing it off the event loop."""
+    module_name, class_name = _client_path(provider)
+    return getattr(await async_import_module(hass, module_name), class_name)
@@ -0,0 +1,57 @@
+"""Shared pieces of the AI provider clients."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import aiohttp
+
+
+class BaseAIClient:
+    model: str
+
+    async def get_response(self, messages, **kwargs):
+        raise NotImplementedError
+
+    async def async_warm_up(self) -> None:
+        """Prepare the backend before the first query (no-op by default)."""
+
+
+async def iter_sse_data(content: aiohttp.StreamReader):
+    """Yield the data of each server-sent event as it arrives."""
+    data_lines: List[str] = []
+    async for raw_line in content:
+        line = raw_line.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].lstrip(" "))
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+def merge_turns(
+    messages, assistant_role: str = "assistant", parts_key: str = "content"
+) -> tuple:
+    """Split OpenAI-style messages into a system text and alternating turns.
+
+    System messages are joined into the system text, and consecutive messages
+    of the same role are merged into one turn with several text parts, as
+    the Gemini and Bedrock Converse APIs expect turns to alternate.
+    """
+    system_parts: List[str] = []
+    turns: List[Dict[str, Any]] = []
+    for message in messages:
+        role = message.get("role", "user")
+        content = message.get("content", "")
+        if role == "system":
+            system_parts.append(content)
+            continue
+        role = assistant_role if role == "assistant" else "user"
+        if turns and turns[-1]["role"] == role:
+            turns[-1][parts_key].append({"text": content})
+        else:
+            turns.append({"role": role, parts_key: [{"text": content}]})
+    return "\n\n".join(system_parts), turns
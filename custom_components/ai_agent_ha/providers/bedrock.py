@@ -0,0 +1,165 @@
+"""Client for AWS Bedrock through the Converse API."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List
+
+from .. import degeneration, json_codec, metrics
+from .base import BaseAIClient, merge_turns
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class BedrockClient(BaseAIClient):
+    """AWS Bedrock client using the model-agnostic Converse API.
+
+    Replies are streamed with ConverseStream. boto3 reads the event stream
+    with blocking calls, so a dedicated thread reads it and hands the events
+    to the event loop through an asyncio queue.
+    """
+
+    def __init__(
+        self,
+        access_key_id,
+        secret_access_key,
+        model="us.anthropic.claude-opus-4-5-20251101-v1:0",
+        region="us-east-1",
+    ):
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.model = model
+        self.region = region
+        # boto3 clients are thread-safe, so one is created lazily and reused
+        self._bedrock_client = None
+
+    def _max_tokens(self) -> int:
+        """Return the output token limit; Titan models accept at most 4096."""
+        return 4096 if "titan" in self.model.lower() else 8192
+
+    def build_request(self, messages) -> Dict[str, Any]:
+        """Build the Converse request for OpenAI-style messages."""
+        system_text, turns = merge_turns(messages)
+        # Converse rejects empty text blocks and conversations opening with
+        # an assistant turn, which trimming the history can produce
+        for turn in turns:
+            turn["content"] = [block for block in turn["content"] if block["text"]]
+        turns = [turn for turn in turns if turn["content"]]
+        while turns and turns[0]["role"] != "user":
+            turns.pop(0)
+        request: Dict[str, Any] = {
+            "modelId": self.model,
+            "messages": turns,
+            "inferenceConfig": {"maxTokens": self._max_tokens()},
+        }
+        if system_text:
+            request["system"] = [{"text": system_text}]
+        return request
+
+    async def _get_bedrock_client(self):
+        """Return the boto3 bedrock-runtime client, creating it on first use."""
+        try:
+            import boto3
+        except ImportError:
+            raise Exception(
+                "boto3 is required for AWS Bedrock support. Please install it: pip install boto3>=1.28.0"
+            )
+
+        if self._bedrock_client is None:
+            self._bedrock_client = await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: boto3.client(
+                    "bedrock-runtime",
+                    aws_access_key_id=self.access_key_id,
+                    aws_secret_access_key=self.secret_access_key,
+                    region_name=self.region,
+                ),
+            )
+        return self._bedrock_client
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        """Return a readable message for a boto3 client error."""
+        response = getattr(error, "response", None)
+        if isinstance(response, dict) and "Error" in response:
+            code = response["Error"].get("Code", "Unknown")
+            return f"AWS Bedrock API error [{code}]: {response['Error'].get('Message', error)}"
+        return f"AWS Bedrock client error: {error}"
+
+    async def _stream_events(self, bedrock_client, request: Dict[str, Any]):
+        """Yield ConverseStream events read by a dedicated thread."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        end = object()
+
+        def read_stream() -> None:
+            stream = None
+            try:
+                stream = bedrock_client.converse_stream(**request)["stream"]
+                for event in stream:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception as e:  # pylint: disable=broad-except
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                if stream is not None and hasattr(stream, "close"):
+                    stream.close()
+                loop.call_soon_threadsafe(queue.put_nowait, end)
+
+        threading.Thread(
+            target=read_stream, name="ai_agent_ha_bedrock_stream", daemon=True
+        ).start()
+        try:
+            while (event := await queue.get()) is not end:
+                if isinstance(event, Exception):
+                    raise Exception(self._describe_error(event)) from event
+                yield event
+        finally:
+            # Stop the reader if the query is cancelled mid-stream
+            stop.set()
+
+    async def get_response(self, messages, **kwargs):
+        """Get response from AWS Bedrock."""
+        _LOGGER.debug(
+            "Making request to AWS Bedrock API with model: %s, region: %s",
+            self.model,
+            self.region,
+        )
+        bedrock_client = await self._get_bedrock_client()
+        request = self.build_request(messages)
+        _LOGGER.debug("Bedrock Converse request: %s", json_codec.LazyJSON(request))
+
+        texts: List[str] = []
+        stop_reason = None
+        try:
+            async for event in self._stream_events(bedrock_client, request):
+                if "contentBlockDelta" in event:
+                    text = event["contentBlockDelta"]["delta"].get("text", "")
+                    degeneration.feed(text)
+                    texts.append(text)
+                elif "messageStop" in event:
+                    stop_reason = event["messageStop"].get("stopReason")
+                elif "metadata" in event:
+                    metadata = event["metadata"]
+                    metrics.record_usage(metadata)
+                    _LOGGER.debug(
+                        "Bedrock token usage: %s, latency: %s ms",
+                        metadata.get("usage"),
+                        (metadata.get("metrics") or {}).get("latencyMs"),
+                    )
+                elif any(key.endswith("Exception") for key in event):
+                    raise Exception(f"AWS Bedrock stream error: {event}")
+        except degeneration.DegenerateOutput:
+            # Leaving the stream stops the reader and closes the response
+            raise
+        except Exception as e:
+            _LOGGER.exception("Error invoking Bedrock model: %s", str(e))
+            raise Exception(f"Error invoking Bedrock model: {str(e)}")
+
+        if stop_reason == "max_tokens":
+            _LOGGER.warning("Bedrock response truncated at the max_tokens limit")
+        return "".join(texts)
@@ -0,0 +1,278 @@
+"""Client for the Google Gemini API, with streaming and prompt caching."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from .. import degeneration, json_codec, metrics, tracing
+from .base import BaseAIClient, iter_sse_data, merge_turns
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds to send the system prompt uncached after creating the cache failed
+CACHE_RETRY_DELAY = 60
+
+
+class GeminiClient(BaseAIClient):
+    # Use v1beta for all models as per Google's current API documentation
+    # All Gemini 2.0/2.5 models are available on v1beta endpoint
+    base_url = "https://generativelanguage.googleapis.com/v1beta"
+
+    def __init__(self, token, model="gemini-2.5-flash", stream=True, cache_ttl=0):
+        self.token = token.strip() if token else token  # Strip whitespace from token
+        self.model = model
+        self.stream = stream
+        # Seconds the system prompt is kept in cachedContents, 0 disables
+        self.cache_ttl = int(cache_ttl or 0)
+        # (digest, name, monotonic expiry) of the cached system prompt
+        self._cached_content: Optional[tuple] = None
+        # Digests of system prompts Gemini refused to cache, e.g. too short
+        self._uncacheable: set = set()
+        # Monotonic time before which no cache is created, after a failure
+        self._cache_retry_at = 0.0
+        self._cache_lock = asyncio.Lock()
+
+    @property
+    def api_url(self) -> str:
+        """Return the generateContent (or streaming) endpoint of the model."""
+        if self.stream:
+            return f"{self.base_url}/models/{self.model}:streamGenerateContent?alt=sse"
+        return f"{self.base_url}/models/{self.model}:generateContent"
+
+    def _headers(self) -> Dict[str, str]:
+        """Return the request headers; the key is kept out of URLs and logs."""
+        return {"Content-Type": "application/json", "x-goog-api-key": self.token}
+
+    async def _get_cached_content(
+        self, session: aiohttp.ClientSession, system_text: str
+    ) -> Optional[str]:
+        """Return the cachedContents name holding the system prompt.
+
+        The cache is created on first use and recreated once it expires or
+        the prompt changes; the cache it replaces is deleted. Prompts Gemini
+        refuses to cache (below the model's minimum token count) are sent as
+        systemInstruction instead, and so is every prompt for
+        CACHE_RETRY_DELAY seconds after creating a cache failed.
+        """
+        digest = hashlib.sha1(system_text.encode(), usedforsecurity=False).hexdigest()
+        async with self._cache_lock:
+            cached = self._cached_content
+            if cached and cached[0] == digest and time.monotonic() < cached[2]:
+                return cached[1]
+            if cached:
+                self._cached_content = None
+                await self._delete_cached_content(session, cached[1])
+            if digest in self._uncacheable or time.monotonic() < self._cache_retry_at:
+                return None
+            body = {
+                "model": f"models/{self.model}",
+                "systemInstruction": {"parts": [{"text": system_text}]},
+                "ttl": f"{self.cache_ttl}s",
+            }
+            try:
+                async with session.post(
+                    f"{self.base_url}/cachedContents",
+                    headers=self._headers(),
+                    json=body,
+                    timeout=aiohttp.ClientTimeout(total=60),
+                ) as resp:
+                    response_text = await resp.text()
+                reply = json_codec.loads(response_text) if resp.status == 200 else None
+            except (
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                json_codec.JSONDecodeError,
+            ) as e:
+                _LOGGER.debug("Could not cache the Gemini system prompt: %s", e)
+                self._cache_retry_at = time.monotonic() + CACHE_RETRY_DELAY
+                return None
+            if resp.status != 200:
+                _LOGGER.debug(
+                    "Gemini did not cache the system prompt (%d): %s",
+                    resp.status,
+                    response_text[:200],
+                )
+                if len(self._uncacheable) >= 16:
+                    self._uncacheable.clear()
+                self._uncacheable.add(digest)
+                return None
+            name = reply.get("name") if isinstance(reply, dict) else None
+            # Stop using the cache shortly before Gemini drops it
+            expires = time.monotonic() + max(self.cache_ttl - 30, self.cache_ttl / 2)
+            self._cached_content = (digest, name, expires) if name else None
+            _LOGGER.debug("Cached the Gemini system prompt as %s", name)
+            return name
+
+    async def _delete_cached_content(
+        self, session: aiohttp.ClientSession, name: str
+    ) -> None:
+        """Delete a cachedContents entry rather than leave it billed until its TTL."""
+        try:
+            async with session.delete(
+                f"{self.base_url}/{name}",
+                headers=self._headers(),
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as resp:
+                # 404: Gemini has already dropped it
+                if resp.status not in (200, 404):
+                    _LOGGER.debug(
+                        "Could not delete Gemini cache %s (%d)", name, resp.status
+                    )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _LOGGER.debug("Could not delete Gemini cache %s: %s", name, e)
+
+    async def _read_stream(self, resp: aiohttp.ClientResponse) -> Dict[str, Any]:
+        """Assemble streamed chunks into the shape of a generateContent reply."""
+        texts: List[str] = []
+        finish_reason = ""
+        usage_metadata: Dict[str, Any] = {}
+        async for event in iter_sse_data(resp.content):
+            chunk = json_codec.loads(event)
+            if "error" in chunk:
+                raise Exception(f"Gemini API error: {chunk['error']}")
+            candidates = chunk.get("candidates") or [{}]
+            for part in (candidates[0].get("content") or {}).get("parts", []):
+                if not part.get("thought"):
+                    text = part.get("text", "")
+                    # Raising here closes the response and ends the generation
+                    degeneration.feed(text)
+                    texts.append(text)
+            finish_reason = candidates[0].get("finishReason") or finish_reason
+            # Every chunk carries the running totals
+            usage_metadata = chunk.get("usageMetadata") or usage_metadata
+        candidate: Dict[str, Any] = {"content": {"parts": [{"text": "".join(texts)}]}}
+        if finish_reason:
+            candidate["finishReason"] = finish_reason
+        return {"candidates": [candidate], "usageMetadata": usage_metadata}
+
+    async def get_response(self, messages, **kwargs):
+        _LOGGER.debug("Making request to Gemini API with model: %s", self.model)
+
+        # Validate token
+        if not self.token:
+            raise Exception("Missing Gemini API key")
+
+        system_text, gemini_contents = merge_turns(messages, "model", "parts")
+        # The first system message is the unchanging system prompt; later ones
+        # (home digest, conversation summary) change between queries
+        system_texts = [
+            m.get("content", "") for m in messages if m.get("role") == "system"
+        ]
+
+        payload: Dict[str, Any] = {
+            "contents": gemini_contents,
+            "generationConfig": {
+                "temperature": 0.7,
+                "topP": 0.9,
+                # maxOutputTokens omitted - let Gemini use model's maximum capacity
+            },
+        }
+
+        _LOGGER.debug("Gemini request payload: %s", json_codec.LazyJSON(payload))
+
+        async with aiohttp.ClientSession(
+            json_serialize=json_codec.dumps, trace_configs=tracing.TRACE_CONFIGS
+        ) as session:
+            # A stable system instruction also lets Gemini's implicit caching
+            # reuse the prompt prefix between turns
+            cached_content = None
+            if system_texts and system_texts[0] and self.cache_ttl:
+                cached_content = await self._get_cached_content(
+                    session, system_texts[0]
+                )
+            if cached_content:
+                payload["cachedContent"] = cached_content
+                # A request using a cache cannot add a systemInstruction, so
+                # the per-query context leads the first user turn uncached
+                context = [{"text": text} for text in system_texts[1:] if text]
+                if context and gemini_contents and gemini_contents[0]["role"] == "user":
+                    gemini_contents[0]["parts"][:0] = context
+                elif context:
+                    gemini_contents.insert(0, {"role": "user", "parts": context})
+            elif system_text:
+                payload["systemInstruction"] = {"parts": [{"text": system_text}]}
+
+            async with session.post(
+                self.api_url,
+                headers=self._headers(),
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=300),
+            ) as resp:
+                _LOGGER.debug("Gemini API response status: %d", resp.status)
+                if resp.status != 200:
+                    response_text = await resp.text()
+                    _LOGGER.error("Gemini API error %d: %s", resp.status, response_text)
+                    if cached_content and self._cached_content:
+                        # The cache may have been dropped early; replace it
+                        digest, name, _ = self._cached_content
+                        self._cached_content = (digest, name, 0.0)
+                    raise Exception(f"Gemini API error {resp.status}: {response_text}")
+
+                if self.stream:
+                    try:
+                        data = await self._read_stream(resp)
+                    except json_codec.JSONDecodeError as e:
+                        _LOGGER.error("Failed to parse Gemini stream chunk: %s", str(e))
+                        raise Exception(f"Invalid JSON chunk from Gemini: {e}")
+                else:
+                    response_text = await resp.text()
+                    _LOGGER.debug("Gemini API response: %s", response_text[:500])
+                    try:
+                        data = json_codec.loads(response_text)
+                    except json_codec.JSONDecodeError as e:
+                        _LOGGER.error(
+                            "Failed to parse Gemini response as JSON: %s", str(e)
+                        )
+                        raise Exception(
+                            f"Invalid JSON response from Gemini: {response_text[:200]}"
+                        )
+
+                metrics.record_usage(data)
+
+                # Log token usage for debugging, especially for Gemini 2.5 extended thinking
+                usage_metadata = data.get("usageMetadata", {})
+                if usage_metadata:
+                    _LOGGER.debug(
+                        "Gemini token usage - prompt: %d (cached: %d), total: %d, thoughts: %d",
+                        usage_metadata.get("promptTokenCount", 0),
+                        usage_metadata.get("cachedContentTokenCount", 0),
+                        usage_metadata.get("totalTokenCount", 0),
+                        usage_metadata.get("thoughtsTokenCount", 0),
+                    )
+
+                # Extract text from Gemini response
+                candidates = data.get("candidates", [])
+                if candidates and "content" in candidates[0]:
+                    # Check finish reason for potential issues
+                    finish_reason = candidates[0].get("finishReason", "")
+                    if finish_reason == "MAX_TOKENS":
+                        _LOGGER.warning(
+                            "Gemini response truncated due to MAX_TOKENS limit. "
+                            "Thoughts used: %d tokens. Consider increasing maxOutputTokens.",
+                            usage_metadata.get("thoughtsTokenCount", 0),
+                        )
+
+                    parts = candidates[0]["content"].get("parts", [])
+                    if parts:
+                        content = parts[0].get("text", "")
+                        if not content:
+                            _LOGGER.warning("Gemini returned empty text content")
+                            _LOGGER.debug(
+                                "Full Gemini response: %s", json_codec.LazyJSON(data)
+                            )
+                        return content
+                    else:
+                        _LOGGER.warning("Gemini response missing parts")
+                        _LOGGER.debug(
+                            "Full Gemini response: %s", json_codec.LazyJSON(data)
+                        )
+                else:
+                    _LOGGER.warning("Gemini response missing expected structure")
+                    _LOGGER.debug("Full Gemini response: %s", json_codec.LazyJSON(data))
+                return str(data)
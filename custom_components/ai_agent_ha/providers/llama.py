@@ -0,0 +1,55 @@
+"""Client for the Llama API."""
+
+from __future__ import annotations
+
+import logging
+
+import aiohttp
+
+from .. import json_codec, metrics, tracing
+from .base import BaseAIClient
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LlamaClient(BaseAIClient):
+    def __init__(self, token, model="Llama-4-Maverick-17B-128E-Instruct-FP8"):
+        self.token = token
+        self.model = model
+        self.api_url = "https://api.llama.com/v1/chat/completions"
+
+    async def get_response(self, messages, **kwargs):
+        _LOGGER.debug("Making request to Llama API with model: %s", self.model)
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "top_p": 0.9,
+            # max_tokens omitted - let Llama use the model's default capacity
+        }
+
+        _LOGGER.debug("Llama request payload: %s", json_codec.LazyJSON(payload))
+
+        async with aiohttp.ClientSession(
+            json_serialize=json_codec.dumps, trace_configs=tracing.TRACE_CONFIGS
+        ) as session:
+            async with session.post(
+                self.api_url,
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=300),
+            ) as resp:
+                if resp.status != 200:
+                    error_text = await resp.text()
+                    _LOGGER.error("Llama API error %d: %s", resp.status, error_text)
+                    raise Exception(f"Llama API error {resp.status}")
+                data = await resp.json(loads=json_codec.loads)
+                metrics.record_usage(data)
+                # Extract text from Llama response
+                completion = data.get("completion_message", {})
+                content = completion.get("content", {})
+                return content.get("text", str(data))
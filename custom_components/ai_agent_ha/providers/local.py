@@ -0,0 +1,425 @@
+"""Client for local models served by Ollama, OpenAI-compatible or generic APIs."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from .. import json_codec, json_extract, metrics, tracing
+from ..const import (
+    CONF_LOCAL_API_MODE,
+    CONF_LOCAL_KEEP_ALIVE,
+    CONF_LOCAL_NUM_CTX,
+    DEFAULT_LOCAL_KEEP_ALIVE,
+    LOCAL_API_MODE_AUTO,
+    LOCAL_API_MODE_GENERIC,
+    LOCAL_API_MODE_OLLAMA,
+    LOCAL_API_MODE_OPENAI,
+)
+from ..sanitize import sanitize_for_logging
+from .base import BaseAIClient
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def resolve_local_endpoint(url: str, api_mode: str) -> tuple:
+    """Resolve the local API mode and request URL from the configured URL.
+
+    In auto mode Ollama /api/chat URLs use the native chat endpoint, URLs
+    ending in /chat/completions or /v1 use the OpenAI-compatible API, and
+    anything else, including Ollama /api/generate URLs, keeps the generic
+    flattened-prompt request to the configured URL. Only an explicitly
+    selected Ollama mode moves an /api/generate URL to /api/chat.
+    """
+    base = url.rstrip("/")
+    if api_mode == LOCAL_API_MODE_AUTO:
+        if base.endswith("/api/chat"):
+            api_mode = LOCAL_API_MODE_OLLAMA
+        elif base.endswith(("/chat/completions", "/v1")):
+            api_mode = LOCAL_API_MODE_OPENAI
+        else:
+            api_mode = LOCAL_API_MODE_GENERIC
+
+    if api_mode == LOCAL_API_MODE_OLLAMA:
+        for suffix in ("/api/generate", "/api/chat"):
+            if base.endswith(suffix):
+                base = base[: -len(suffix)]
+        if not url.rstrip("/").endswith("/api/chat"):
+            _LOGGER.info(
+                "Ollama API mode: sending requests to %s/api/chat instead of %s",
+                base,
+                url,
+            )
+        return api_mode, f"{base}/api/chat"
+    if api_mode == LOCAL_API_MODE_OPENAI:
+        if base.endswith("/chat/completions"):
+            return api_mode, base
+        if not base.endswith("/v1"):
+            base += "/v1"
+        return api_mode, f"{base}/chat/completions"
+    return LOCAL_API_MODE_GENERIC, url
+
+
+def _wrap_local_content(content: Optional[str]) -> str:
+    """Pass through a JSON command, or wrap plain text as a final response."""
+    content = json_extract.clean_text(content or "")
+    if json_extract.extract_json(content).command is not None:
+        return content
+    _LOGGER.debug("No JSON command from local model, treating as plain text")
+    return json_codec.dumps({"request_type": "final_response", "response": content})
+
+
+class LocalClient(BaseAIClient):
+    def __init__(
+        self,
+        url,
+        model="",
+        api_mode=LOCAL_API_MODE_AUTO,
+        keep_alive=DEFAULT_LOCAL_KEEP_ALIVE,
+        num_ctx=None,
+    ):
+        self.url = url
+        self.model = model
+        self.api_mode, self.endpoint = resolve_local_endpoint(url, api_mode)
+        # Ollama takes durations ("30m") or seconds, where -1 keeps the model loaded
+        if isinstance(keep_alive, str) and keep_alive.strip().lstrip("-").isdigit():
+            keep_alive = int(keep_alive)
+        self.keep_alive = keep_alive
+        self.num_ctx = int(num_ctx) if num_ctx else None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], model: str) -> "LocalClient":
+        """Create a client from the integration config."""
+        return cls(
+            config.get("local_url"),
+            model,
+            api_mode=config.get(CONF_LOCAL_API_MODE, LOCAL_API_MODE_AUTO),
+            keep_alive=config.get(CONF_LOCAL_KEEP_ALIVE) or DEFAULT_LOCAL_KEEP_ALIVE,
+            num_ctx=config.get(CONF_LOCAL_NUM_CTX),
+        )
+
+    def _build_chat_payload(self, messages, stream: bool = False) -> Dict[str, Any]:
+        """Build an /api/chat or /v1/chat/completions request body."""
+        payload: Dict[str, Any] = {
+            "messages": [
+                {
+                    "role": message.get("role", "user"),
+                    "content": message.get("content", ""),
+                }
+                for message in messages
+            ],
+            "stream": stream,
+        }
+        if self.model:
+            payload["model"] = self.model
+        if self.api_mode == LOCAL_API_MODE_OLLAMA:
+            payload["keep_alive"] = self.keep_alive
+            if self.num_ctx:
+                payload["options"] = {"num_ctx": self.num_ctx}
+        return payload
+
+    async def _post_json(self, payload: Dict[str, Any], timeout: int = 300) -> Any:
+        """POST a JSON payload to the resolved endpoint and decode the reply."""
+        async with aiohttp.ClientSession(
+            json_serialize=json_codec.dumps, trace_configs=tracing.TRACE_CONFIGS
+        ) as session:
+            async with session.post(
+                self.endpoint,
+                headers={"Content-Type": "application/json"},
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                if resp.status != 200:
+                    error_text = await resp.text()
+                    _LOGGER.error("Local API error %d: %s", resp.status, error_text)
+                    if resp.status == 404 and self.api_mode == LOCAL_API_MODE_OLLAMA:
+                        raise Exception(
+                            f"Model '{self.model}' not found. Please ensure the model is installed in Ollama using: ollama pull {self.model}"
+                        )
+                    if resp.status == 404:
+                        raise Exception(
+                            f"Local API endpoint not found: {self.endpoint}. Please check the URL and API mode."
+                        )
+                    raise Exception(f"Local API error {resp.status}: {error_text}")
+                return await resp.json(loads=json_codec.loads, content_type=None)
+
+    async def async_warm_up(self) -> None:
+        """Load the Ollama model ahead of the first query.
+
+        An /api/chat request without messages only loads the model. The same
+        num_ctx is sent as in queries, since Ollama reloads the model when the
+        context size changes.
+        """
+        if self.api_mode != LOCAL_API_MODE_OLLAMA or not self.model:
+            return
+        payload = self._build_chat_payload([])
+        try:
+            await self._post_json(payload)
+            _LOGGER.debug(
+                "Preloaded local model %s (keep_alive %s)", self.model, self.keep_alive
+            )
+        except Exception as e:
+            _LOGGER.warning("Could not preload local model %s: %s", self.model, e)
+
+    async def _get_chat_response(self, messages) -> str:
+        """Send structured messages to the Ollama or OpenAI-compatible chat API."""
+        payload = self._build_chat_payload(messages)
+        _LOGGER.debug(
+            "Local %s chat request to %s: %s",
+            self.api_mode,
+            self.endpoint,
+            json_codec.LazyJSON(payload),
+        )
+        data = await self._post_json(payload)
+        metrics.record_usage(data)
+
+        if self.api_mode == LOCAL_API_MODE_OLLAMA:
+            content = (data.get("message") or {}).get("content")
+            _LOGGER.debug(
+                "Ollama chat: %s prompt tokens (%s ms), %s generated tokens",
+                data.get("prompt_eval_count"),
+                (data.get("prompt_eval_duration") or 0) // 1_000_000,
+                data.get("eval_count"),
+            )
+        else:
+            choices = data.get("choices") or [{}]
+            content = (choices[0].get("message") or {}).get("content")
+
+        if not content or not content.strip():
+            _LOGGER.warning(
+                "Local chat API returned empty content. Full data: %s", data
+            )
+            if data.get("done_reason") == "load":
+                message = (
+                    "The AI model is still loading. Please wait a moment and try again."
+                )
+            else:
+                message = "The AI returned an empty response. Please try rephrasing your question."
+            return json_codec.dumps(
+                {"request_type": "final_response", "response": message}
+            )
+        return _wrap_local_content(content)
+
+    async def get_response(self, messages, **kwargs):
+        if self.api_mode in (LOCAL_API_MODE_OLLAMA, LOCAL_API_MODE_OPENAI):
+            return await self._get_chat_response(messages)
+
+        _LOGGER.debug(
+            "Making request to local API with model: '%s' at URL: %s",
+            self.model or "[NO MODEL SPECIFIED]",
+            self.url,
+        )
+
+        if not self.model:
+            _LOGGER.warning(
+                "No model specified for local API request. Some APIs (like Ollama) require a model name."
+            )
+        headers = {"Content-Type": "application/json"}
+
+        # Format user prompt from messages
+        prompt = ""
+        for message in messages:
+            role = message.get("role", "")
+            content = message.get("content", "")
+
+            # Simple formatting: prefixing each message with its role
+            if role == "system":
+                prompt += f"System: {content}\n\n"
+            elif role == "user":
+                prompt += f"User: {content}\n\n"
+            elif role == "assistant":
+                prompt += f"Assistant: {content}\n\n"
+
+        # Add final prompt prefix for the assistant's response
+        prompt += "Assistant: "
+
+        # Build a generic payload that works with most local API servers
+        payload = {
+            "prompt": prompt,
+            "stream": False,  # Disable streaming to get a single complete response
+            # max_tokens omitted - let local model use its default capacity
+        }
+
+        # Add model if specified
+        if self.model:
+            payload["model"] = self.model
+
+        # Note: Payloads don't contain auth tokens (those are in headers), but may contain user prompts
+        _LOGGER.debug("Local API request payload: %s", json_codec.LazyJSON(payload))
+
+        # Ollama-specific validation
+        if "model" not in payload or not payload["model"]:
+            _LOGGER.warning(
+                "Missing 'model' field in request to local API. This may cause issues with Ollama."
+            )
+        elif self.url and "ollama" in self.url.lower():
+            _LOGGER.debug(
+                "Detected Ollama URL, ensuring model is specified: %s",
+                payload.get("model"),
+            )
+
+        async with aiohttp.ClientSession(
+            json_serialize=json_codec.dumps, trace_configs=tracing.TRACE_CONFIGS
+        ) as session:
+            async with session.post(
+                self.url,
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=300),
+            ) as resp:
+                if resp.status != 200:
+                    error_text = await resp.text()
+                    _LOGGER.error("Local API error %d: %s", resp.status, error_text)
+
+                    # Provide more specific error messages for common Ollama issues
+                    if resp.status == 404:
+                        if "model" in payload and payload["model"]:
+                            raise Exception(
+                                f"Model '{payload['model']}' not found. Please ensure the model is installed in Ollama using: ollama pull {payload['model']}"
+                            )
+                        else:
+                            raise Exception(
+                                "Local API endpoint not found. Please check the URL and ensure Ollama is running."
+                            )
+                    elif resp.status == 400:
+                        raise Exception(
+                            f"Bad request to local API. Error: {error_text}"
+                        )
+                    else:
+                        raise Exception(f"Local API error {resp.status}: {error_text}")
+
+                try:
+                    response_text = await resp.text()
+                    _LOGGER.debug(
+                        "Local API response (first 200 chars): %s", response_text[:200]
+                    )
+                    _LOGGER.debug("Local API response status: %d", resp.status)
+                    # Sanitize headers to avoid logging any auth tokens
+                    _LOGGER.debug(
+                        "Local API response headers: %s",
+                        sanitize_for_logging(dict(resp.headers), copy_on_write=True),
+                    )
+
+                    # Try to parse as JSON
+                    try:
+                        data = json_codec.loads(response_text)
+                        metrics.record_usage(data)
+
+                        # Try common response formats
+                        # Ollama format - return only the response text
+                        if "response" in data:
+                            response_content = data["response"]
+                            _LOGGER.debug(
+                                "Extracted response content: %s",
+                                (
+                                    response_content[:100]
+                                    if response_content
+                                    else "[EMPTY]"
+                                ),
+                            )
+
+                            # Check if response is empty or None
+                            if not response_content or response_content.strip() == "":
+                                _LOGGER.warning(
+                                    "Ollama returned empty response. Full data: %s",
+                                    data,
+                                )
+                                # Check if this is a loading response
+                                if data.get("done_reason") == "load":
+                                    _LOGGER.warning(
+                                        "Ollama is still loading the model. Please wait and try again."
+                                    )
+                                    return json_codec.dumps(
+                                        {
+                                            "request_type": "final_response",
+                                            "response": "The AI model is still loading. Please wait a moment and try again.",
+                                        }
+                                    )
+                                elif data.get("done") is False:
+                                    _LOGGER.warning(
+                                        "Ollama response indicates it's not done yet."
+                                    )
+                                    return json_codec.dumps(
+                                        {
+                                            "request_type": "final_response",
+                                            "response": "The AI is still processing your request. Please try again.",
+                                        }
+                                    )
+                                else:
+                                    return json_codec.dumps(
+                                        {
+                                            "request_type": "final_response",
+                                            "response": "The AI returned an empty response. Please try rephrasing your question.",
+                                        }
+                                    )
+
+                            return _wrap_local_content(response_content)
+
+                        # OpenAI-like format
+                        elif "choices" in data and len(data["choices"]) > 0:
+                            choice = data["choices"][0]
+                            if "message" in choice and "content" in choice["message"]:
+                                content = choice["message"]["content"]
+                            elif "text" in choice:
+                                content = choice["text"]
+                            else:
+                                content = str(data)
+
+                            return _wrap_local_content(content)
+
+                        # Generic content field
+                        elif "content" in data:
+                            return _wrap_local_content(data["content"])
+
+                        # Handle case where no standard fields are found
+                        _LOGGER.warning(
+                            "No standard response fields found in local API response. Full response: %s",
+                            data,
+                        )
+
+                        # Check for Ollama-specific edge cases
+                        if data.get("done_reason") == "load":
+                            return json_codec.dumps(
+                                {
+                                    "request_type": "final_response",
+                                    "response": "The AI model is still loading. Please wait a moment and try again.",
+                                }
+                            )
+                        elif data.get("done") is False:
+                            return json_codec.dumps(
+                                {
+                                    "request_type": "final_response",
+                                    "response": "The AI is still processing your request. Please try again.",
+                                }
+                            )
+                        elif "message" in data:
+                            # Some APIs use "message" field
+                            message_content = data["message"]
+                            if (
+                                isinstance(message_content, dict)
+                                and "content" in message_content
+                            ):
+                                content = message_content["content"]
+                            else:
+                                content = str(message_content)
+                            return json_codec.dumps(
+                                {"request_type": "final_response", "response": content}
+                            )
+
+                        # Return the whole data as string if we can't find a specific field
+                        return json_codec.dumps(
+                            {
+                                "request_type": "final_response",
+                                "response": f"Received unexpected response format from local API: {str(data)}",
+                            }
+                        )
+
+                    except json_codec.JSONDecodeError:
+                        # The body itself may be a (fenced) command or plain text
+                        return _wrap_local_content(response_text)
+
+                except Exception as e:
+                    _LOGGER.error("Failed to parse local API response: %s", str(e))
+                    raise Exception(f"Failed to parse local API response: {str(e)}")
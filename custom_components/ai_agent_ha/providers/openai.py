@@ -0,0 +1,99 @@
+"""Client for the OpenAI chat completions API."""
+
+from __future__ import annotations
+
+import logging
+
+import aiohttp
+
+from .. import json_codec, metrics, tracing
+from .base import BaseAIClient
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class OpenAIClient(BaseAIClient):
+    def __init__(self, token, model="gpt-3.5-turbo"):
+        self.token = token
+        self.model = model
+        self.api_url = "https://api.openai.com/v1/chat/completions"
+
+    def _is_restricted_model(self):
+        """Check if the model has restricted parameters (no temperature, top_p, etc.)."""
+        # Models that don't support temperature, top_p and other parameters
+        restricted_models = ["o3-mini", "o3", "o1-mini", "o1-preview", "o1", "gpt-5"]
+
+        model_lower = self.model.lower()
+        return any(model_id in model_lower for model_id in restricted_models)
+
+    async def get_response(self, messages, **kwargs):
+        _LOGGER.debug("Making request to OpenAI API with model: %s", self.model)
+
+        # Validate token
+        if not self.token or not self.token.startswith("sk-"):
+            raise Exception("Invalid OpenAI API key format")
+
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json",
+        }
+
+        # Check if model has restricted parameters
+        is_restricted = self._is_restricted_model()
+        _LOGGER.debug(
+            "Using model: %s (restricted parameters: %s)",
+            self.model,
+            is_restricted,
+        )
+
+        # Build payload with model-appropriate parameters
+        # Don't set max_tokens - let OpenAI use the model's maximum capacity
+        payload = {"model": self.model, "messages": messages}
+
+        # Only add temperature and top_p for models that support them
+        if not is_restricted:
+            payload.update({"temperature": 0.7, "top_p": 0.9})
+
+        _LOGGER.debug("OpenAI request payload: %s", json_codec.LazyJSON(payload))
+
+        async with aiohttp.ClientSession(
+            json_serialize=json_codec.dumps, trace_configs=tracing.TRACE_CONFIGS
+        ) as session:
+            async with session.post(
+                self.api_url,
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=300),
+            ) as resp:
+                response_text = await resp.text()
+                _LOGGER.debug("OpenAI API response status: %d", resp.status)
+                _LOGGER.debug("OpenAI API response: %s", response_text[:500])
+
+                if resp.status != 200:
+                    _LOGGER.error("OpenAI API error %d: %s", resp.status, response_text)
+                    raise Exception(f"OpenAI API error {resp.status}: {response_text}")
+
+                try:
+                    data = json_codec.loads(response_text)
+                except json_codec.JSONDecodeError as e:
+                    _LOGGER.error("Failed to parse OpenAI response as JSON: %s", str(e))
+                    raise Exception(
+                        f"Invalid JSON response from OpenAI: {response_text[:200]}"
+                    )
+
+                metrics.record_usage(data)
+
+                # Extract text from OpenAI response
+                choices = data.get("choices", [])
+                if choices and "message" in choices[0]:
+                    content = choices[0]["message"].get("content", "")
+                    if not content:
+                        _LOGGER.warning("OpenAI returned empty content in message")
+                        _LOGGER.debug(
+                            "Full OpenAI response: %s", json_codec.LazyJSON(data)
+                        )
+                    return content
+                else:
+                    _LOGGER.warning("OpenAI response missing expected structure")
+                    _LOGGER.debug("Full OpenAI response: %s", json_codec.LazyJSON(data))
+                    return str(data)
@@ -0,0 +1,164 @@
+"""Masking of credentials in data that is logged or recorded.
+
+Keys are matched against all sensitive patterns with a single precompiled,
+case-insensitive regular expression, and the decision for each key is
+memoized: configs, headers and traces repeat the same few hundred keys.
+
+The walk is iterative, so deeply nested payloads (long conversation
+histories, debug traces) cannot exhaust the interpreter's recursion limit.
+Containers nested deeper than max_depth, and any container reached after
+max_items entries have been visited, are replaced by TRUNCATED instead of
+being walked: their contents are unknown, so they are not passed through.
+
+This module has no Home Assistant dependencies.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List
+
+DEFAULT_MASK = "***REDACTED***"
+TRUNCATED = "<truncated>"
+
+# Containers nested deeper than this are replaced by TRUNCATED
+MAX_DEPTH = 100
+# Dict, list and tuple entries visited before nested containers are
+# replaced by TRUNCATED
+MAX_ITEMS = 1_000_000
+# Key decisions remembered; the cache is cleared when it is full
+MAX_CACHED_KEYS = 4096
+
+# Substrings of sensitive keys (case-insensitive)
+SENSITIVE_KEY_PATTERNS = (
+    "token",
+    "key",
+    "password",
+    "secret",
+    "credential",
+    "auth",
+    "authorization",
+    "api_key",
+    "apikey",
+    "llama_token",
+    "openai_token",
+    "gemini_token",
+    "anthropic_token",
+    "openrouter_token",
+    "alter_token",
+    "zai_token",
+)
+
+_SENSITIVE_KEY = re.compile(
+    "|".join(
+        re.escape(pattern)
+        for pattern in sorted(SENSITIVE_KEY_PATTERNS, key=len, reverse=True)
+    ),
+    re.IGNORECASE,
+)
+_key_decisions: Dict[str, bool] = {}
+
+_CONTAINERS = (dict, list, tuple)
+
+
+def is_sensitive_key(key: Any) -> bool:
+    """Return whether values under a key must be masked."""
+    if not isinstance(key, str):
+        return _SENSITIVE_KEY.search(str(key)) is not None
+    decision = _key_decisions.get(key)
+    if decision is None:
+        decision = _SENSITIVE_KEY.search(key) is not None
+        if len(_key_decisions) >= MAX_CACHED_KEYS:
+            _key_decisions.clear()
+        _key_decisions[key] = decision
+    return decision
+
+
+def sanitize_for_logging(
+    data: Any,
+    mask: str = DEFAULT_MASK,
+    *,
+    copy_on_write: bool = False,
+    max_depth: int = MAX_DEPTH,
+    max_items: int = MAX_ITEMS,
+) -> Any:
+    """Sanitize sensitive data for safe logging.
+
+    Masks sensitive fields like API keys, tokens, passwords, etc. in nested
+    dicts, lists and tuples. This prevents accidental exposure of
+    credentials in debug logs.
+
+    Args:
+        data: The data structure to sanitize (dict, list, str, etc.)
+        mask: The string to use for masking sensitive values
+        copy_on_write: Return containers in which nothing was masked or
+            truncated as they are, instead of copying them
+        max_depth: Containers nested deeper than this are truncated
+        max_items: Entries visited before the remaining nested containers
+            are truncated
+
+    Returns:
+        A sanitized copy of the data with sensitive fields masked (or with
+        copy_on_write, data itself if nothing needed masking)
+
+    Example:
+        >>> config = {"openai_token": "sk-abc123", "ai_provider": "openai"}
+        >>> sanitize_for_logging(config)
+        {"openai_token": "***REDACTED***", "ai_provider": "openai"}
+    """
+    if not isinstance(data, _CONTAINERS):
+        # Primitive types (str, int, bool, etc.) - return as-is
+        return data
+
+    remaining = max_items
+    # Frames: [source, iterator, entries, changed, depth, key in parent]
+    root: List[Any] = [data, _entries(data), [], False, 0, None]
+    stack = [root]
+    while True:
+        frame = stack[-1]
+        source, entries, out, depth = frame[0], frame[1], frame[2], frame[4]
+        is_dict = isinstance(source, dict)
+        child = None
+        for entry in entries:
+            remaining -= 1
+            if is_dict:
+                key, value = entry
+                if is_sensitive_key(key):
+                    out.append((key, mask))
+                    frame[3] = True
+                    continue
+            else:
+                key, value = None, entry
+            if isinstance(value, _CONTAINERS):
+                if depth >= max_depth or remaining < 0:
+                    value = TRUNCATED
+                    frame[3] = True
+                else:
+                    child = [value, _entries(value), [], False, depth + 1, key]
+                    break
+            out.append((key, value) if is_dict else value)
+
+        if child is not None:
+            stack.append(child)
+            continue
+
+        stack.pop()
+        if copy_on_write and not frame[3]:
+            built = source
+        elif is_dict:
+            built = dict(out)
+        elif isinstance(source, list):
+            built = out
+        else:
+            built = tuple(out)
+        if not stack:
+            return built
+        parent = stack[-1]
+        if built is not source:
+            parent[3] = True
+        parent[2].append((frame[5], built) if isinstance(parent[0], dict) else built)
+
+
+def _entries(container: Any) -> Any:
+    """Return an iterator over a container's items or elements."""
+    return iter(container.items()) if isinstance(container, dict) else iter(container)
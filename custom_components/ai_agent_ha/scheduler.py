@@ -0,0 +1,241 @@
+"""Priority-aware admission of queries to the AI providers.
+
+Voice and other interactive queries, panel chats and automation-triggered
+query calls share the same providers and rate limits. Instead of running
+them first come, first served, every query takes a slot from the shared
+QueryScheduler before it starts:
+
+- Each priority class has its own concurrency cap, and all classes share a
+  global cap. Background queries can never take every slot, so a burst of
+  automations leaves room for interactive and panel queries.
+- When a slot frees up, waiting queries of the highest priority class that
+  is under its cap start first, oldest first.
+- Each class has a bounded queue and a deadline: the longest a query waits
+  for a slot. A query is rejected straight away when its queue is full or
+  when the expected wait (from the recent mean query duration) is already
+  past its deadline, and rejected when the deadline passes while it waits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Priority classes, highest first
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_PANEL = "panel"
+PRIORITY_BACKGROUND = "background"
+PRIORITIES = [PRIORITY_INTERACTIVE, PRIORITY_PANEL, PRIORITY_BACKGROUND]
+
+# Queries running at once over all classes
+MAX_CONCURRENT_QUERIES = 4
+# Weight of the latest query in the mean query duration
+DURATION_SMOOTHING = 0.2
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    """Limits of one priority class."""
+
+    max_concurrent: int
+    max_queued: int
+    deadline: float  # Longest wait for a slot, in seconds
+
+
+DEFAULT_CLASSES: Dict[str, PriorityClass] = {
+    PRIORITY_INTERACTIVE: PriorityClass(max_concurrent=4, max_queued=8, deadline=5),
+    PRIORITY_PANEL: PriorityClass(max_concurrent=3, max_queued=16, deadline=30),
+    PRIORITY_BACKGROUND: PriorityClass(max_concurrent=2, max_queued=32, deadline=300),
+}
+
+
+class QueryRejected(Exception):
+    """A query was not admitted before its deadline."""
+
+    def __init__(self, priority: str, reason: str, message: str) -> None:
+        """Initialize with the query's class and why it was rejected."""
+        super().__init__(message)
+        self.priority = priority
+        self.reason = reason
+
+
+@dataclass
+class ClassStats:
+    """Counters of one priority class."""
+
+    running: int = 0
+    admitted: int = 0
+    queue_full: int = 0
+    deadline_rejected: int = 0
+    timed_out: int = 0
+    wait_total: float = 0.0
+
+
+class QueryScheduler:
+    """Admit queries by priority within concurrency caps and deadlines."""
+
+    def __init__(
+        self,
+        classes: Optional[Dict[str, PriorityClass]] = None,
+        max_concurrent: int = MAX_CONCURRENT_QUERIES,
+    ) -> None:
+        """Initialize with no queries running or waiting."""
+        self.classes = dict(classes or DEFAULT_CLASSES)
+        self.max_concurrent = max_concurrent
+        self._stats = {priority: ClassStats() for priority in self.classes}
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {
+            priority: deque() for priority in self.classes
+        }
+        self._running = 0
+        # Mean query duration in seconds, unknown until a query has finished
+        self.mean_duration: Optional[float] = None
+
+    def _can_start(self, priority: str) -> bool:
+        """Return whether a query of a class may start now."""
+        return (
+            self._running < self.max_concurrent
+            and self._stats[priority].running < self.classes[priority].max_concurrent
+        )
+
+    def _start(self, priority: str) -> None:
+        """Count a query of a class as running."""
+        self._running += 1
+        self._stats[priority].running += 1
+        self._stats[priority].admitted += 1
+
+    def _wake(self) -> None:
+        """Start waiting queries while there are free slots, by priority."""
+        for priority in PRIORITIES:
+            waiting = self._waiting.get(priority)
+            while waiting and self._can_start(priority):
+                waiter = waiting.popleft()
+                if waiter.done():  # Timed out or cancelled
+                    continue
+                self._start(priority)
+                waiter.set_result(None)
+
+    def _finish(self, priority: str, duration: Optional[float]) -> None:
+        """Free the slot of a query and start the next ones."""
+        self._running -= 1
+        self._stats[priority].running -= 1
+        if duration is not None:
+            self.mean_duration = (
+                duration
+                if self.mean_duration is None
+                else self.mean_duration
+                + DURATION_SMOOTHING * (duration - self.mean_duration)
+            )
+        self._wake()
+
+    def estimated_wait(self, priority: str) -> Optional[float]:
+        """Return the expected wait in seconds for a new query of a class.
+
+        Queries of the same or higher classes that are already waiting go
+        first. None until the mean query duration is known.
+        """
+        if self.mean_duration is None:
+            return None
+        ahead = sum(
+            len(self._waiting[other])
+            for other in PRIORITIES[: PRIORITIES.index(priority) + 1]
+            if other in self._waiting
+        )
+        slots = max(min(self.classes[priority].max_concurrent, self.max_concurrent), 1)
+        return (ahead + 1) / slots * self.mean_duration
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: str, deadline: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """Hold a query slot of a priority class while the query runs.
+
+        deadline overrides the class's longest wait for a slot. Raises
+        QueryRejected if the query cannot start in time.
+        """
+        if priority not in self.classes:
+            raise ValueError(f"Unknown query priority: {priority}")
+        limits = self.classes[priority]
+        stats = self._stats[priority]
+        deadline = limits.deadline if deadline is None else deadline
+        waiting = self._waiting[priority]
+
+        queued_at = time.monotonic()
+        if not waiting and self._can_start(priority):
+            self._start(priority)
+        else:
+            if len(waiting) >= limits.max_queued:
+                stats.queue_full += 1
+                raise QueryRejected(
+                    priority,
+                    "queue_full",
+                    f"Too many {priority} queries are waiting, try again later",
+                )
+            expected = self.estimated_wait(priority)
+            if expected is not None and expected > deadline:
+                stats.deadline_rejected += 1
+                raise QueryRejected(
+                    priority,
+                    "deadline",
+                    f"The AI agent is busy: a {priority} query would wait about "
+                    f"{expected:.0f}s, longer than {deadline:.0f}s",
+                )
+
+            waiter = asyncio.get_running_loop().create_future()
+            waiting.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, deadline)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as err:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was granted just as the wait ended
+                    self._finish(priority, None)
+                elif waiter in waiting:
+                    waiting.remove(waiter)
+                if isinstance(err, asyncio.CancelledError):
+                    raise
+                stats.timed_out += 1
+                raise QueryRejected(
+                    priority,
+                    "timeout",
+                    f"The AI agent is busy: a {priority} query waited "
+                    f"{deadline:.0f}s without starting",
+                ) from None
+
+        started = time.monotonic()
+        stats.wait_total += started - queued_at
+        try:
+            yield
+        finally:
+            self._finish(priority, time.monotonic() - started)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the running and waiting queries and counters per class."""
+        return {
+            "running": self._running,
+            "max_concurrent": self.max_concurrent,
+            "mean_duration_s": (
+                round(self.mean_duration, 2) if self.mean_duration is not None else None
+            ),
+            "classes": {
+                priority: {
+                    "running": stats.running,
+                    "waiting": len(self._waiting[priority]),
+                    "admitted": stats.admitted,
+                    "queue_full": stats.queue_full,
+                    "deadline_rejected": stats.deadline_rejected,
+                    "timed_out": stats.timed_out,
+                    "mean_wait_s": (
+                        round(stats.wait_total / stats.admitted, 3)
+                        if stats.admitted
+                        else None
+                    ),
+                }
+                for priority, stats in self._stats.items()
+            },
+        }
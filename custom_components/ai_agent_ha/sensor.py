@@ -0,0 +1,142 @@
+"""Diagnostic sensors publishing query metrics of a provider."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .metrics import MetricsCollector
+
+
+@dataclass(frozen=True, kw_only=True)
+class MetricsSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor reading one value of a provider summary."""
+
+    value_fn: Callable[[Dict[str, Any]], Any]
+
+
+def _latency(window: str, percentile: str) -> Callable[[Dict[str, Any]], Any]:
+    """Return a reader for a latency percentile of a summary."""
+    return lambda summary: summary[window][percentile]
+
+
+def _counter(key: str) -> Callable[[Dict[str, Any]], Any]:
+    """Return a reader for a counter of a summary."""
+    return lambda summary: summary[key]
+
+
+LATENCY_SENSORS = tuple(
+    MetricsSensorEntityDescription(
+        key=f"{window}_{percentile}",
+        name=f"{label} {percentile}",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_latency(window, f"{percentile}_ms"),
+    )
+    for window, label, percentiles in (
+        ("query_latency", "Query latency", ("p50", "p95", "p99")),
+        ("ai_latency", "AI request latency", ("p50", "p95")),
+    )
+    for percentile in percentiles
+)
+
+COUNTER_SENSORS = tuple(
+    MetricsSensorEntityDescription(
+        key=key,
+        name=name,
+        native_unit_of_measurement=unit,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=_counter(key),
+    )
+    for key, name, unit in (
+        ("queries", "Queries", None),
+        ("errors", "Query errors", None),
+        ("retries", "AI request retries", None),
+        ("cache_hits", "Cache hits", None),
+        ("prompt_tokens", "Prompt tokens", "tokens"),
+        ("completion_tokens", "Completion tokens", "tokens"),
+    )
+)
+
+SENSORS = (
+    *LATENCY_SENSORS,
+    *COUNTER_SENSORS,
+    MetricsSensorEntityDescription(
+        key="iterations_per_query",
+        name="Iterations per query",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda summary: summary["iterations_per_query"],
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the metrics sensors of a provider entry."""
+    collector: MetricsCollector = hass.data[DOMAIN]["metrics"]
+    provider = entry.data["ai_provider"]
+    async_add_entities(
+        AiAgentMetricsSensor(collector, entry, provider, description)
+        for description in SENSORS
+    )
+
+
+class AiAgentMetricsSensor(SensorEntity):
+    """A query metric of one provider, updated after each of its queries."""
+
+    entity_description: MetricsSensorEntityDescription
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        collector: MetricsCollector,
+        entry: ConfigEntry,
+        provider: str,
+        description: MetricsSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._collector = collector
+        self._provider = provider
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            manufacturer="AI Agent HA",
+            model=provider,
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Update the state whenever a query of this provider finishes."""
+        self.async_on_remove(self._collector.add_listener(self._handle_query_done))
+
+    @callback
+    def _handle_query_done(self, provider: str) -> None:
+        """Write the new state if the query used this sensor's provider."""
+        if provider == self._provider:
+            self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> Any:
+        """Return the metric from the provider's current summary."""
+        return self.entity_description.value_fn(
+            self._collector.provider_summary(self._provider)
+        )
@@ -0,0 +1,218 @@
+"""Recording of query sessions for offline replay.
+
+While recording is switched on (ai_agent_ha.record_sessions service), every
+process_query is captured: the conversation it started from, each AI turn
+(the new message sent, the reply, the prompt size and latency) and each
+tool call (parameters, result, latency). Sessions are appended as JSON
+lines to ai_agent_ha_debug/sessions.jsonl with secrets masked by the
+sanitize function, and benchmarks/replay_sessions.py re-runs them against
+the current code.
+
+Like the metrics recorder, the session lives in a context variable, so the
+agent records into it without passing it around and recording costs nothing
+when switched off.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from homeassistant.core import HomeAssistant
+
+from . import json_codec
+from .debug_files import DEBUG_DIR, append_line
+
+_LOGGER = logging.getLogger(__name__)
+
+SESSIONS_FILE = "sessions.jsonl"
+# The sessions file is rotated to sessions.jsonl.1 once it grows past this size
+SESSIONS_MAX_BYTES = 20 * 1024 * 1024
+# Conversation messages sent along with a query (see _get_ai_response)
+HISTORY_SENT = 10
+FORMAT_VERSION = 1
+# Turn fields holding conversation or home data, masked before writing
+CONTENT_FIELDS = ("input", "response", "parameters", "result")
+
+_current_session: ContextVar[Optional["RecordedSession"]] = ContextVar(
+    "ai_agent_ha_recorded_session", default=None
+)
+
+
+@dataclass
+class RecordedSession:
+    """One process_query call as it happened."""
+
+    query: str
+    provider: str
+    model: str = ""
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+    recorded_at: float = field(default_factory=time.time)
+    turns: List[Dict[str, Any]] = field(default_factory=list)
+    result: Dict[str, Any] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def as_dict(self, sanitize: Callable[[Any], Any]) -> Dict[str, Any]:
+        """Return the session for the sessions file, with secrets masked."""
+        return {
+            "version": FORMAT_VERSION,
+            "recorded_at": self.recorded_at,
+            "provider": self.provider,
+            "model": self.model,
+            "query": self.query,
+            "history": [_sanitize_message(m, sanitize) for m in self.history],
+            "turns": [
+                {
+                    name: (
+                        _sanitize_content(value, sanitize)
+                        if name in CONTENT_FIELDS
+                        else value
+                    )
+                    for name, value in turn.items()
+                }
+                for turn in self.turns
+            ],
+            "result": sanitize(self.result),
+            "seconds": round(self.seconds, 4),
+        }
+
+
+def _sanitize_content(value: Any, sanitize: Callable[[Any], Any]) -> Any:
+    """Sanitize a turn field; messages and responses may hold JSON text."""
+    if isinstance(value, dict) and "role" in value:
+        return _sanitize_message(value, sanitize)
+    if isinstance(value, str):
+        return _sanitize_text(value, sanitize)
+    return sanitize(value)
+
+
+def _sanitize_message(message: Dict[str, Any], sanitize: Callable[[Any], Any]) -> Any:
+    """Sanitize a conversation message, including JSON in its content."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return {**sanitize(message), "content": _sanitize_text(content, sanitize)}
+    return sanitize(message)
+
+
+def _sanitize_text(text: str, sanitize: Callable[[Any], Any]) -> str:
+    """Sanitize the data in JSON text (tool results, AI requests)."""
+    if not text.lstrip().startswith(("{", "[")):
+        return text
+    try:
+        return json_codec.dumps(sanitize(json_codec.loads(text)))
+    except (json_codec.JSONDecodeError, TypeError, ValueError):
+        return text
+
+
+class SessionRecorder:
+    """Writes recorded sessions while recording is switched on."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        sanitize: Callable[[Any], Any],
+        path: Optional[str] = None,
+    ) -> None:
+        """Initialize with recording switched off."""
+        self.hass = hass
+        self.enabled = False
+        self.recorded = 0
+        self._sanitize = sanitize
+        self.path = path or hass.config.path(DEBUG_DIR, SESSIONS_FILE)
+
+    def add(self, session: RecordedSession) -> None:
+        """Queue a finished session for writing."""
+        self.recorded += 1
+        self.hass.async_add_executor_job(self._write, session)
+
+    def _write(self, session: RecordedSession) -> None:
+        """Append a session to the sessions file (runs in the executor)."""
+        try:
+            line = json_codec.dumps(session.as_dict(self._sanitize))
+            append_line(self.path, line, SESSIONS_MAX_BYTES)
+        except Exception as e:
+            _LOGGER.warning("Could not record session to %s: %s", self.path, e)
+
+
+@contextmanager
+def record_session(
+    recorder: Optional[SessionRecorder],
+    query: str,
+    provider: str,
+) -> Iterator[Optional[RecordedSession]]:
+    """Record the query running in this context if recording is switched on."""
+    if recorder is None or not recorder.enabled:
+        yield None
+        return
+    session = RecordedSession(query, provider)
+    token = _current_session.set(session)
+    try:
+        yield session
+    except Exception as e:
+        session.result = {"error": str(e) or type(e).__name__}
+        raise
+    finally:
+        _current_session.reset(token)
+        session.seconds = time.monotonic() - session.started
+        recorder.add(session)
+
+
+def set_session_model(provider: str, model: str) -> None:
+    """Set the provider and model once the query has resolved them."""
+    if (session := _current_session.get()) is not None:
+        session.provider = provider
+        session.model = model or ""
+
+
+def set_session_history(history: List[Dict[str, Any]]) -> None:
+    """Set the conversation the query continues, as far as it is sent along.
+
+    The system prompt is left out: it is rebuilt for every request.
+    """
+    if (session := _current_session.get()) is not None:
+        session.history = [
+            message for message in history if message.get("role") != "system"
+        ][-HISTORY_SENT:]
+
+
+def record_ai_turn(
+    messages: List[Dict[str, Any]], response: str, seconds: float
+) -> None:
+    """Record a successful AI request and the message that prompted it."""
+    if (session := _current_session.get()) is None:
+        return
+    session.turns.append(
+        {
+            "input": messages[-1] if messages else None,
+            "messages": len(messages),
+            "prompt_chars": sum(len(str(m.get("content", ""))) for m in messages),
+            "response": response,
+            "seconds": round(seconds, 4),
+        }
+    )
+
+
+def record_tool(name: str, parameters: Any, result: Any, seconds: float) -> None:
+    """Record a tool (data request or service call) and its result."""
+    if (session := _current_session.get()) is None:
+        return
+    session.turns.append(
+        {
+            "tool": name,
+            "parameters": parameters,
+            "result": result,
+            "seconds": round(seconds, 4),
+        }
+    )
+
+
+def record_result(result: Dict[str, Any]) -> None:
+    """Record how the query ended, without the debug trace."""
+    if (session := _current_session.get()) is None:
+        return
+    session.result = {k: v for k, v in result.items() if k != "debug"}
@@ -0,0 +1,154 @@
+"""Incremental cache of serialized entity states.
+
+get_entity_state results are cached per entity together with their JSON
+encoding, keyed on the state's last_updated timestamp. Entries are dropped
+when the entity changes, and the cache is cleared when areas, devices or
+entities are updated since the results embed area information.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+
+from . import json_codec
+
+if TYPE_CHECKING:
+    from homeassistant.core import EventStateChangedData
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bound for the total size of cached JSON fragments (characters)
+DEFAULT_MAX_CACHE_CHARS = 4 * 1024 * 1024
+
+REGISTRY_UPDATE_EVENTS = (
+    "area_registry_updated",
+    "device_registry_updated",
+    "entity_registry_updated",
+)
+
+
+class CachedEntityState(dict):
+    """Entity state dict that carries its pre-encoded JSON fragment.
+
+    Instances are shared between callers and must be treated as read-only.
+    """
+
+    __slots__ = ("json_fragment",)
+
+    def __init__(self, data: Dict[str, Any], json_fragment: str) -> None:
+        """Initialize with the state dict and its JSON encoding."""
+        super().__init__(data)
+        self.json_fragment = json_fragment
+
+
+def encode_data_payload(data: Any) -> str:
+    """Encode a tool result as the {"data": ...} conversation message.
+
+    Cached entity states are joined from their pre-encoded fragments;
+    anything else goes through the JSON codec. The output is identical to
+    json_codec.dumps({"data": data}).
+    """
+    if isinstance(data, CachedEntityState):
+        return '{"data":' + data.json_fragment + "}"
+    if (
+        isinstance(data, list)
+        and data
+        and all(isinstance(item, CachedEntityState) for item in data)
+    ):
+        return '{"data":[' + ",".join(item.json_fragment for item in data) + "]}"
+    return json_codec.dumps({"data": data})
+
+
+class EntityStateCache:
+    """Memory-bounded LRU cache of serialized entity states."""
+
+    def __init__(
+        self, hass: HomeAssistant, max_chars: int = DEFAULT_MAX_CACHE_CHARS
+    ) -> None:
+        """Initialize the cache."""
+        self.hass = hass
+        self.max_chars = max_chars
+        self._entries: OrderedDict[str, Tuple[Any, CachedEntityState]] = OrderedDict()
+        self._size = 0
+        self._unsub_listeners: List[Callable[[], None]] = []
+        self.hits = 0
+        self.misses = 0
+
+    @callback
+    def async_start(self) -> None:
+        """Start invalidating entries on state and registry changes."""
+        self._unsub_listeners.append(
+            self.hass.bus.async_listen(EVENT_STATE_CHANGED, self._handle_state_changed)
+        )
+        for event_type in REGISTRY_UPDATE_EVENTS:
+            self._unsub_listeners.append(
+                self.hass.bus.async_listen(event_type, self._handle_registry_updated)
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop listening and drop all entries."""
+        for unsub in self._unsub_listeners:
+            unsub()
+        self._unsub_listeners.clear()
+        self.clear()
+
+    def get(self, entity_id: str, last_updated: Any) -> Optional[CachedEntityState]:
+        """Return the cached state if it matches last_updated."""
+        entry = self._entries.get(entity_id)
+        if entry is None or entry[0] != last_updated:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(entity_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(
+        self, entity_id: str, last_updated: Any, result: Dict[str, Any]
+    ) -> CachedEntityState:
+        """Encode and store a get_entity_state result, returning the cached copy."""
+        cached = CachedEntityState(result, json_codec.dumps(result))
+        self.invalidate(entity_id)
+        self._entries[entity_id] = (last_updated, cached)
+        self._size += len(cached.json_fragment)
+        while self._size > self.max_chars and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted.json_fragment)
+        return cached
+
+    def invalidate(self, entity_id: str) -> None:
+        """Drop the entry for an entity."""
+        entry = self._entries.pop(entity_id, None)
+        if entry is not None:
+            self._size -= len(entry[1].json_fragment)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of cached entities."""
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Return the total size of cached fragments in characters."""
+        return self._size
+
+    @callback
+    def _handle_state_changed(self, event: Event[EventStateChangedData]) -> None:
+        """Drop the cached state of the entity that changed."""
+        entity_id = event.data.get("entity_id")
+        if entity_id:
+            self.invalidate(entity_id)
+
+    @callback
+    def _handle_registry_updated(self, event: Event) -> None:
+        """Drop everything, since cached results embed area information."""
+        self.clear()
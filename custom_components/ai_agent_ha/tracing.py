@@ -0,0 +1,444 @@
+"""Per-query trace spans.
+
+A query traced with trace_query is broken down into spans: the query
+itself, each iteration of the AI request loop, provider calls, tool calls
+and history persistence. Provider HTTP requests made through a session
+created with TRACE_CONFIGS get child spans for connection queue wait, DNS,
+connect, time to first byte and body download.
+
+Like the metrics recorder, the trace lives in a context variable so code
+below process_query opens spans without it being passed around, and spans
+opened outside a traced query are no-ops. Spans use monotonic timestamps;
+wall-clock time is only used to anchor the OTLP export.
+
+The finished trace is attached to debug responses for the panel's waterfall
+and, while the export_traces option is switched on, appended to
+ai_agent_ha_debug/traces.jsonl as OTLP/JSON (one ExportTraceServiceRequest
+per line, as written by the OpenTelemetry Collector file exporter).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import aiohttp
+
+from . import json_codec
+from .debug_files import DEBUG_DIR, append_line
+
+_LOGGER = logging.getLogger(__name__)
+
+TRACE_EXPORT_FILE = "traces.jsonl"
+# The export file is rotated to traces.jsonl.1 once it grows past this size
+TRACE_EXPORT_MAX_BYTES = 10 * 1024 * 1024
+SERVICE_NAME = "ai_agent_ha"
+
+_current_trace: ContextVar[Optional["QueryTrace"]] = ContextVar(
+    "ai_agent_ha_query_trace", default=None
+)
+_current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "ai_agent_ha_current_span", default=None
+)
+
+
+class Span:
+    """A timed operation within a query trace."""
+
+    __slots__ = ("name", "span_id", "parent", "start", "end", "attributes", "error")
+
+    def __init__(
+        self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]
+    ) -> None:
+        """Start the span now."""
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent = parent
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes, such as sizes known only once the operation ends."""
+        self.attributes.update(attributes)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """End the span, marking it failed if error is given."""
+        if self.end is None:
+            self.end = time.monotonic()
+        if error is not None:
+            self.error = str(error) or type(error).__name__
+
+
+class _NoopSpan:
+    """Stand-in returned when no query is being traced."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        """Ignore attributes."""
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Do nothing."""
+
+
+NOOP_SPAN = _NoopSpan()
+AnySpan = Union[Span, _NoopSpan]
+
+
+class QueryTrace:
+    """All spans of one query, rooted at the query span."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        """Start the trace and its root span."""
+        self.trace_id = secrets.token_hex(16)
+        # Anchors mapping monotonic span times to wall-clock time for export
+        self.started_unix_ns = time.time_ns()
+        self.started = time.monotonic()
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = [self.root]
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """End the root span and any span left open when the query returned."""
+        self.root.finish(error)
+        for span in self.spans:
+            if span.end is None:
+                span.end = self.root.end
+
+    def _offset_ms(self, monotonic: float) -> float:
+        """Return a monotonic time as ms since the query started."""
+        return round((monotonic - self.started) * 1000, 2)
+
+    def _end(self, span: Span) -> float:
+        """Return the end of a span, or now while it is still open."""
+        return span.end if span.end is not None else time.monotonic()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the spans with offsets from the query start, in ms."""
+        return {
+            "trace_id": self.trace_id,
+            "duration_ms": self._offset_ms(self._end(self.root)),
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent.span_id if span.parent else None,
+                    "start_ms": self._offset_ms(span.start),
+                    "duration_ms": round((self._end(span) - span.start) * 1000, 2),
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+                for span in self.spans
+            ],
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Return the trace as an OTLP/JSON ExportTraceServiceRequest."""
+
+        def unix_nano(monotonic: float) -> str:
+            # OTLP/JSON encodes 64-bit integers as strings
+            return str(
+                self.started_unix_ns + int((monotonic - self.started) * 1_000_000_000)
+            )
+
+        spans = []
+        for span in self.spans:
+            otlp_span: Dict[str, Any] = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                # SPAN_KIND_INTERNAL, or SPAN_KIND_CLIENT for outgoing requests
+                "kind": 3 if span.name == "http" else 1,
+                "startTimeUnixNano": unix_nano(span.start),
+                "endTimeUnixNano": unix_nano(self._end(span)),
+                "attributes": [
+                    _otlp_attribute(key, value)
+                    for key, value in span.attributes.items()
+                    if value is not None
+                ],
+                "status": (
+                    {"code": 2, "message": span.error}
+                    if span.error is not None
+                    else {"code": 1}
+                ),
+            }
+            if span.parent is not None:
+                otlp_span["parentSpanId"] = span.parent.span_id
+            spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [_otlp_attribute("service.name", SERVICE_NAME)]
+                    },
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+                }
+            ]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Return an OTLP/JSON key/value attribute."""
+    if isinstance(value, bool):
+        typed: Dict[str, Any] = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+@contextmanager
+def trace_query(
+    name: str = "query", enabled: bool = True, **attributes: Any
+) -> Iterator[Optional[QueryTrace]]:
+    """Trace the query running in this context; yields None if not enabled."""
+    if not enabled:
+        yield None
+        return
+    trace = QueryTrace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.finish(e)
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        trace.finish()
+
+
+def set_query_attributes(**attributes: Any) -> None:
+    """Add attributes to the query span, such as the resolved model."""
+    if (trace := _current_trace.get()) is not None:
+        trace.root.set(**attributes)
+
+
+def start_span(name: str, *, activate: bool = False, **attributes: Any) -> AnySpan:
+    """Start a child of the current span.
+
+    An activated span becomes the parent of spans started after it until it
+    is passed to end_span, for spans that cannot be scoped by a with block.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    span = Span(name, _current_span.get(), attributes)
+    trace.spans.append(span)
+    if activate:
+        _current_span.set(span)
+    return span
+
+
+def end_span(span: AnySpan, error: Optional[BaseException] = None) -> None:
+    """End a span; if it is the current span, its parent becomes current."""
+    span.finish(error)
+    if isinstance(span, Span) and _current_span.get() is span:
+        _current_span.set(span.parent)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[AnySpan]:
+    """Run the block as a span, parenting spans started inside it."""
+    current = start_span(name, activate=True, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, e)
+        raise
+    else:
+        end_span(current)
+
+
+def export_otlp(config_dir: str, trace: QueryTrace) -> Optional[str]:
+    """Append a trace to the OTLP/JSON export file and return its path.
+
+    Does blocking I/O; run it in the executor. Failures are logged, not
+    raised, as nothing waits for the export.
+    """
+    path = os.path.join(config_dir, DEBUG_DIR, TRACE_EXPORT_FILE)
+    try:
+        append_line(path, json_codec.dumps(trace.to_otlp()), TRACE_EXPORT_MAX_BYTES)
+    except OSError as e:
+        _LOGGER.warning("Could not export query trace to %s: %s", path, e)
+        return None
+    return path
+
+
+# aiohttp request tracing. Callbacks run in the task making the request, so
+# the current span is the provider call that issued it. The trace config
+# context holds the request's spans; the context variable is left untouched.
+
+
+def _http_span(ctx: SimpleNamespace) -> Optional[Span]:
+    """Return the span of the request, if it is part of a traced query."""
+    return getattr(ctx, "http_span", None)
+
+
+def _child(ctx: SimpleNamespace, name: str, **attributes: Any) -> Optional[Span]:
+    """Start a child of the request's http span."""
+    parent = _http_span(ctx)
+    trace = _current_trace.get()
+    if parent is None or trace is None:
+        return None
+    child = Span(name, parent, attributes)
+    trace.spans.append(child)
+    return child
+
+
+def _finish(ctx: SimpleNamespace, attr: str) -> None:
+    """End a request phase span stored on the trace config context."""
+    if (child := getattr(ctx, attr, None)) is not None:
+        child.finish()
+
+
+async def _on_request_start(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceRequestStartParams,
+) -> None:
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    # Query strings and user info can carry API keys (Gemini, local URLs)
+    url = params.url.with_query(None).with_user(None)
+    ctx.http_span = Span(
+        "http", _current_span.get(), {"method": params.method, "url": str(url)}
+    )
+    trace.spans.append(ctx.http_span)
+    ctx.ttfb_span = _child(ctx, "ttfb")
+
+
+async def _on_connection_queued_start(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceConnectionQueuedStartParams,
+) -> None:
+    ctx.queue_span = _child(ctx, "queue_wait")
+
+
+async def _on_connection_queued_end(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceConnectionQueuedEndParams,
+) -> None:
+    _finish(ctx, "queue_span")
+
+
+async def _on_dns_resolvehost_start(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceDnsResolveHostStartParams,
+) -> None:
+    ctx.dns_span = _child(ctx, "dns")
+
+
+async def _on_dns_resolvehost_end(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceDnsResolveHostEndParams,
+) -> None:
+    _finish(ctx, "dns_span")
+
+
+async def _on_connection_create_start(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceConnectionCreateStartParams,
+) -> None:
+    ctx.connect_span = _child(ctx, "connect")
+
+
+async def _on_connection_create_end(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceConnectionCreateEndParams,
+) -> None:
+    _finish(ctx, "connect_span")
+
+
+async def _on_request_chunk_sent(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceRequestChunkSentParams,
+) -> None:
+    if (http_span := _http_span(ctx)) is not None:
+        sent = http_span.attributes.get("request_bytes", 0)
+        http_span.set(request_bytes=sent + len(params.chunk))
+
+
+async def _on_request_end(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceRequestEndParams,
+) -> None:
+    if (http_span := _http_span(ctx)) is None:
+        return
+    # Ended again when the body has been read, if it is read with read()
+    http_span.set(status=params.response.status)
+    http_span.finish()
+    _finish(ctx, "ttfb_span")
+    ctx.body_span = _child(ctx, "body")
+
+
+async def _on_response_chunk_received(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceResponseChunkReceivedParams,
+) -> None:
+    if (http_span := _http_span(ctx)) is None:
+        return
+    received = http_span.attributes.get("response_bytes", 0) + len(params.chunk)
+    http_span.set(response_bytes=received)
+    http_span.end = time.monotonic()
+    if (body_span := getattr(ctx, "body_span", None)) is not None:
+        body_span.end = http_span.end
+        body_span.set(bytes=received)
+
+
+async def _on_request_exception(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceRequestExceptionParams,
+) -> None:
+    if (http_span := _http_span(ctx)) is not None:
+        http_span.finish(params.exception)
+
+
+def _build_trace_config() -> aiohttp.TraceConfig:
+    """Return a trace config recording request phases as spans."""
+    trace_config = aiohttp.TraceConfig()
+    for signal, callback in (
+        (trace_config.on_request_start, _on_request_start),
+        (trace_config.on_connection_queued_start, _on_connection_queued_start),
+        (trace_config.on_connection_queued_end, _on_connection_queued_end),
+        (trace_config.on_dns_resolvehost_start, _on_dns_resolvehost_start),
+        (trace_config.on_dns_resolvehost_end, _on_dns_resolvehost_end),
+        (trace_config.on_connection_create_start, _on_connection_create_start),
+        (trace_config.on_connection_create_end, _on_connection_create_end),
+        (trace_config.on_request_chunk_sent, _on_request_chunk_sent),
+        (trace_config.on_request_end, _on_request_end),
+        (trace_config.on_response_chunk_received, _on_response_chunk_received),
+        (trace_config.on_request_exception, _on_request_exception),
+    ):
+        # The callbacks match aiohttp's _SignalCallback, but aiohttp before
+        # 3.12 parametrizes its signals for aiosignal before 1.4, so mypy
+        # cannot match them against the signals of newer aiosignal releases
+        signal.append(callback)  # type: ignore[arg-type]
+    return trace_config
+
+
+# Passed as trace_configs= to provider client sessions
+TRACE_CONFIGS = [_build_trace_config()]
@@ -0,0 +1,116 @@
+"""WebSocket commands for querying the AI agent.
+
+Results are sent to the requesting connection only, instead of being
+broadcast to every client as an ai_agent_ha_response bus event.
+
+ai_agent_ha/query returns the process_query result. The subscription
+variant ai_agent_ha/query/subscribe streams {"type": "progress", ...}
+events while the query runs, then a final {"type": "result", "result": ...}
+event. Unsubscribing cancels the query.
+
+Queries run at panel priority unless the message sets another one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .scheduler import PRIORITIES, PRIORITY_PANEL
+
+_LOGGER = logging.getLogger(__name__)
+
+QUERY_SCHEMA: Dict[Any, Any] = {
+    vol.Required("prompt"): str,
+    vol.Optional("provider"): vol.Any(str, None),
+    vol.Optional("debug", default=False): bool,
+    vol.Optional("priority", default=PRIORITY_PANEL): vol.In(PRIORITIES),
+}
+
+
+def get_agent(
+    hass: HomeAssistant, provider: Optional[str]
+) -> Tuple[Any, Optional[str]]:
+    """Return the agent for a provider, falling back to the first configured one."""
+    agents = hass.data.get(DOMAIN, {}).get("agents") or {}
+    if not agents:
+        return None, None
+    if provider not in agents:
+        provider = next(iter(agents))
+        _LOGGER.debug("Using fallback provider: %s", provider)
+    return agents[provider], provider
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """Register the query commands."""
+    websocket_api.async_register_command(hass, websocket_query)
+    websocket_api.async_register_command(hass, websocket_subscribe_query)
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): "ai_agent_ha/query", **QUERY_SCHEMA}
+)
+@websocket_api.async_response
+async def websocket_query(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Run a query and return the result to this connection."""
+    agent, provider = get_agent(hass, msg.get("provider"))
+    if agent is None:
+        connection.send_error(msg["id"], "not_configured", "No AI agents configured")
+        return
+
+    result = await agent.process_query(
+        msg["prompt"], provider=provider, debug=msg["debug"], priority=msg["priority"]
+    )
+    connection.send_result(msg["id"], result)
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): "ai_agent_ha/query/subscribe", **QUERY_SCHEMA}
+)
+@websocket_api.async_response
+async def websocket_subscribe_query(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Run a query, streaming progress events and then the result."""
+    agent, provider = get_agent(hass, msg.get("provider"))
+    if agent is None:
+        connection.send_error(msg["id"], "not_configured", "No AI agents configured")
+        return
+
+    msg_id = msg["id"]
+
+    @callback
+    def send_progress(progress: Dict[str, Any]) -> None:
+        connection.send_message(
+            websocket_api.event_message(msg_id, {"type": "progress", **progress})
+        )
+
+    task = asyncio.current_task()
+    connection.subscriptions[msg_id] = task.cancel if task else lambda: None
+    connection.send_result(msg_id)
+    try:
+        result = await agent.process_query(
+            msg["prompt"],
+            provider=provider,
+            debug=msg["debug"],
+            progress_callback=send_progress,
+            priority=msg["priority"],
+        )
+    finally:
+        connection.subscriptions.pop(msg_id, None)
+    connection.send_message(
+        websocket_api.event_message(msg_id, {"type": "result", "result": result})
+    )
@@ -42,6 +42,19 @@ async def hass():
     await hass.async_stop()
 
 
+@pytest.fixture
+def mock_hass():
+    """Create a mock hass object with the integration's shared client registry."""
+    if not HOMEASSISTANT_AVAILABLE:
+        pytest.skip("Home Assistant not available")
+    from custom_components.ai_agent_ha.client_registry import ClientRegistry
+    from custom_components.ai_agent_ha.const import DOMAIN
+
+    hass = MagicMock()
+    hass.data = {DOMAIN: {"configs": {}, "client_registry": ClientRegistry()}}
+    return hass
+
+
 @pytest.fixture
 def mock_agent():
     """Mock the AI Agent."""
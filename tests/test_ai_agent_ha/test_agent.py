@@ -461,3 +461,215 @@ class TestAIAgent:
                     assert not (
                         isinstance(content, str) and '"data":' in content
                     ), "System messages should not contain data payloads (would overwrite system prompt in Anthropic API)"
+
+    @pytest.mark.asyncio
+    async def test_get_history_batches_entity_ids(self, mock_hass, mock_agent_config):
+        """Test that get_history fetches multiple entities with one recorder query."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+        from datetime import datetime, timezone
+
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        changed = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        bedroom = MagicMock(
+            entity_id="sensor.bedroom_temperature",
+            state="21.0",
+            last_changed=changed,
+            last_updated=changed,
+            attributes={"unit_of_measurement": "°C"},
+        )
+        office = MagicMock(
+            entity_id="sensor.office_temperature",
+            state="22.5",
+            last_changed=changed,
+            last_updated=changed,
+            attributes={},
+        )
+        get_significant_states = MagicMock(
+            return_value={
+                "sensor.bedroom_temperature": [bedroom],
+                "sensor.office_temperature": [office],
+            }
+        )
+        mock_hass.async_add_executor_job = AsyncMock(
+            side_effect=lambda func, *args: func(*args)
+        )
+
+        agent = AiAgentHaAgent(mock_hass, mock_agent_config)
+        with patch(
+            "homeassistant.components.recorder.history.get_significant_states",
+            get_significant_states,
+        ):
+            result = await agent.get_history(
+                entity_ids=["sensor.bedroom_temperature", "sensor.office_temperature"],
+                hours=168,
+            )
+
+        assert get_significant_states.call_count == 1
+        assert get_significant_states.call_args.args[3] == [
+            "sensor.bedroom_temperature",
+            "sensor.office_temperature",
+        ]
+        assert [item["entity_id"] for item in result] == [
+            "sensor.bedroom_temperature",
+            "sensor.office_temperature",
+        ]
+
+        # Without any entity the request is rejected before touching the recorder
+        assert "error" in (await agent.get_history())[0]
+
+    @pytest.mark.asyncio
+    async def test_get_statistics_long_term_multi_entity(
+        self, mock_hass, mock_agent_config
+    ):
+        """Test long-term statistics for several entities in a single query."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+        from homeassistant.components import recorder
+
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        mock_hass.data = {recorder.DATA_INSTANCE: MagicMock()}
+        mock_hass.async_add_executor_job = AsyncMock(
+            side_effect=lambda func, *args: func(*args)
+        )
+        statistics_during_period = MagicMock(
+            return_value={
+                "sensor.bedroom_temperature": [
+                    {"start": 1735689600.0, "end": 1735776000.0, "mean": 20.5},
+                    {"start": 1735776000.0, "end": 1735862400.0, "mean": 21.0},
+                ]
+            }
+        )
+
+        agent = AiAgentHaAgent(mock_hass, mock_agent_config)
+        with patch(
+            "homeassistant.components.recorder.statistics.statistics_during_period",
+            statistics_during_period,
+        ):
+            result = await agent.get_statistics(
+                entity_ids=["sensor.bedroom_temperature", "sensor.office_temperature"],
+                period="day",
+                hours=48,
+                statistic_types=["mean"],
+            )
+
+        assert statistics_during_period.call_count == 1
+        args = statistics_during_period.call_args.args
+        assert args[3] == {"sensor.bedroom_temperature", "sensor.office_temperature"}
+        assert args[4] == "day"
+        assert args[6] == {"mean"}
+
+        assert result["period"] == "day"
+        rows = result["statistics"]["sensor.bedroom_temperature"]
+        assert [row["mean"] for row in rows] == [20.5, 21.0]
+        assert rows[0]["start"].startswith("2025-01-01")
+        assert result["missing"] == ["sensor.office_temperature"]
+
+        # Invalid options are rejected up front
+        assert "error" in await agent.get_statistics("sensor.x", period="fortnight")
+        assert "error" in await agent.get_statistics(
+            "sensor.x", statistic_types=["median"]
+        )
+
+    def test_home_digest_follows_system_prompt(self, mock_hass, mock_agent_config):
+        """Test that the home digest is sent after the system prompt for a query."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        agent = AiAgentHaAgent(mock_hass, mock_agent_config)
+        assert agent._build_system_messages() == [agent.system_prompt]
+
+        mock_hass.data[DOMAIN] = {"home_digest": MagicMock(digest="On: light.kitchen")}
+        with agent._home_digest_scope():
+            prompt, message = agent._build_system_messages()
+
+        # The system prompt itself stays unchanged, so it can be cached
+        assert prompt is agent.system_prompt
+        assert message["role"] == "system"
+        assert "On: light.kitchen" in message["content"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_keep_their_home_digest(self, mock_hass):
+        """Test that each of two concurrent queries sends its own digest."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.client_registry import ClientRegistry
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        home_digest = MagicMock(digest="On: light.kitchen")
+        mock_hass.data = {
+            DOMAIN: {"client_registry": ClientRegistry(), "home_digest": home_digest}
+        }
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+        agent.get_entity_state = AsyncMock(
+            return_value={"entity_id": "light.kitchen", "state": "on"}
+        )
+        second_sent = asyncio.Event()
+        sent = []
+
+        async def get_response(messages, **kwargs):
+            sent.append(messages[1]["content"])
+            if len(sent) == 1:
+                # The first query looks up an entity once the second has started
+                await second_sent.wait()
+                return (
+                    '{"request_type": "get_entity_state", '
+                    '"parameters": {"entity_id": "light.kitchen"}}'
+                )
+            second_sent.set()
+            return '{"request_type": "final_response", "response": "Done"}'
+
+        agent._get_client = MagicMock(return_value=MagicMock(get_response=get_response))
+        first = asyncio.ensure_future(agent.process_query("Is the kitchen on?"))
+        while not sent:
+            await asyncio.sleep(0)
+        home_digest.digest = "Off: light.kitchen"
+        second = await agent.process_query("Is it off now?")
+        assert second["success"] and (await first)["success"]
+        # The first query's second request still carries its own snapshot
+        assert ["On" in text for text in sent] == [True, False, True]
+
+    @pytest.mark.asyncio
+    async def test_get_entity_state_uses_state_cache(
+        self, mock_hass, mock_agent_config
+    ):
+        """Test that unchanged entities are served from the serialized state cache."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.const import DOMAIN
+        from custom_components.ai_agent_ha.state_cache import EntityStateCache
+
+        light_state = MagicMock()
+        light_state.entity_id = "light.kitchen"
+        light_state.state = "on"
+        light_state.last_changed = None
+        light_state.last_updated = 1
+        light_state.attributes = {"friendly_name": "Kitchen"}
+        mock_hass.states.get = lambda entity_id: light_state
+        mock_hass.data[DOMAIN] = {"state_cache": EntityStateCache(mock_hass)}
+
+        agent = AiAgentHaAgent(mock_hass, mock_agent_config)
+        first = await agent.get_entity_state("light.kitchen")
+        second = await agent.get_entity_state("light.kitchen")
+        assert second is first
+
+        light_state.last_updated = 2
+        light_state.state = "off"
+        third = await agent.get_entity_state("light.kitchen")
+        assert third is not first
+        assert third["state"] == "off"
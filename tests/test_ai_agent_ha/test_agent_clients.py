@@ -54,6 +54,100 @@ class TestLocalClient:
         except ImportError:
             pytest.skip("LocalClient not available")
 
+    def test_local_client_resolves_api_mode_from_url(self):
+        """Test auto-detection of the Ollama chat and OpenAI-compatible modes."""
+        try:
+            from custom_components.ai_agent_ha.agent import LocalClient
+        except ImportError:
+            pytest.skip("LocalClient not available")
+
+        client = LocalClient("http://localhost:11434/api/chat", "llama3.2")
+        assert client.api_mode == "ollama"
+        assert client.endpoint == "http://localhost:11434/api/chat"
+
+        # Configured /api/generate URLs keep the request they were set up for
+        client = LocalClient("http://localhost:11434/api/generate", "llama3.2")
+        assert client.api_mode == "generic"
+        assert client.endpoint == "http://localhost:11434/api/generate"
+
+        client = LocalClient("http://localhost:8080/v1/", "qwen")
+        assert client.api_mode == "openai"
+        assert client.endpoint == "http://localhost:8080/v1/chat/completions"
+
+        client = LocalClient("http://localhost:5000/generate", "model")
+        assert client.api_mode == "generic"
+        assert client.endpoint == "http://localhost:5000/generate"
+
+        client = LocalClient("http://localhost:11434", "llama3.2", api_mode="ollama")
+        assert client.endpoint == "http://localhost:11434/api/chat"
+        client = LocalClient(
+            "http://localhost:11434/api/generate", "llama3.2", api_mode="ollama"
+        )
+        assert client.endpoint == "http://localhost:11434/api/chat"
+
+    @pytest.mark.asyncio
+    async def test_local_client_ollama_chat_request(self):
+        """Test the /api/chat payload and response handling."""
+        try:
+            from custom_components.ai_agent_ha.agent import LocalClient
+        except ImportError:
+            pytest.skip("LocalClient not available")
+
+        client = LocalClient(
+            "http://localhost:11434/api/chat", "llama3.2", keep_alive="-1", num_ctx=8192
+        )
+        client._post_json = AsyncMock(
+            return_value={
+                "message": {"role": "assistant", "content": "All lights are off."},
+                "done": True,
+            }
+        )
+        messages = [
+            {"role": "system", "content": "You are a home assistant."},
+            {"role": "user", "content": "Are any lights on?"},
+        ]
+
+        response = await client.get_response(messages)
+
+        payload = client._post_json.call_args.args[0]
+        assert payload["messages"] == messages
+        assert payload["stream"] is False
+        assert payload["keep_alive"] == -1
+        assert payload["options"] == {"num_ctx": 8192}
+        assert json.loads(response) == {
+            "request_type": "final_response",
+            "response": "All lights are off.",
+        }
+
+        # A JSON command from the model is passed through unchanged
+        command = '{"request_type": "get_state", "parameters": {}}'
+        client._post_json.return_value = {"message": {"content": command}}
+        assert await client.get_response(messages) == command
+
+    @pytest.mark.asyncio
+    async def test_local_client_warm_up_loads_ollama_model(self):
+        """Test that warm-up sends an empty chat to load the model."""
+        try:
+            from custom_components.ai_agent_ha.agent import LocalClient
+        except ImportError:
+            pytest.skip("LocalClient not available")
+
+        client = LocalClient("http://localhost:11434/api/chat", "llama3.2")
+        client._post_json = AsyncMock(return_value={"done": True})
+        await client.async_warm_up()
+        payload = client._post_json.call_args.args[0]
+        assert payload["messages"] == []
+        assert payload["keep_alive"] == "30m"
+
+        # Failures are logged, not raised
+        client._post_json.side_effect = Exception("connection refused")
+        await client.async_warm_up()
+
+        generic = LocalClient("http://localhost:5000/generate", "model")
+        generic._post_json = AsyncMock()
+        await generic.async_warm_up()
+        generic._post_json.assert_not_called()
+
 
 class TestOpenAIClient:
     """Test OpenAI client functionality."""
@@ -115,6 +209,157 @@ class TestGeminiClient:
         except ImportError:
             pytest.skip("GeminiClient not available")
 
+    @pytest.mark.asyncio
+    async def test_gemini_client_streams_with_cached_system_prompt(self):
+        """Test the streamed request, system instruction and prompt cache."""
+        try:
+            from aiohttp import web
+            from aiohttp.test_utils import TestServer
+
+            from custom_components.ai_agent_ha.agent import GeminiClient
+        except ImportError:
+            pytest.skip("GeminiClient not available")
+
+        requests = []
+
+        async def create_cache(request):
+            requests.append(("cache", request.headers, await request.json()))
+            return web.json_response({"name": f"cachedContents/c{len(requests)}"})
+
+        async def delete_cache(request):
+            requests.append(("delete", request, None))
+            return web.json_response({})
+
+        async def stream(request):
+            requests.append(("stream", request, await request.json()))
+            response = web.StreamResponse(
+                headers={"Content-Type": "text/event-stream"}
+            )
+            await response.prepare(request)
+            for text, usage in (("{\"request_type\": ", 10), ("\"final_response\"}", 14)):
+                chunk = {
+                    "candidates": [{"content": {"parts": [{"text": text}]}}],
+                    "usageMetadata": {"promptTokenCount": usage},
+                }
+                await response.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+            return response
+
+        app = web.Application()
+        app.router.add_post("/cachedContents", create_cache)
+        app.router.add_delete("/cachedContents/{name}", delete_cache)
+        app.router.add_post("/models/gemini-2.5-flash:streamGenerateContent", stream)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            client = GeminiClient("key", "gemini-2.5-flash", cache_ttl=3600)
+            client.base_url = str(server.make_url("")).rstrip("/")
+            messages = [
+                {"role": "system", "content": "You are a home assistant"},
+                {"role": "user", "content": "Is it on?"},
+                {"role": "user", "content": '{"data": "on"}'},
+            ]
+            for digest in ("On: light.kitchen", "Off: light.kitchen"):
+                # The per-query home digest follows the system prompt
+                context = {"role": "system", "content": digest}
+                response = await client.get_response(
+                    messages[:1] + [context] + messages[1:]
+                )
+                assert response == '{"request_type": "final_response"}'
+            # A changed system prompt replaces the cache
+            await client.get_response(
+                [{"role": "system", "content": "You are a butler"}] + messages[1:]
+            )
+        finally:
+            await server.close()
+
+        # Only the unchanging system prompt is cached, once per prompt
+        kinds = [kind for kind, _, _ in requests]
+        assert kinds == ["cache", "stream", "stream", "delete", "cache", "stream"]
+        assert requests[3][1].match_info["name"] == "c1"
+        assert requests[5][2]["cachedContent"] == "cachedContents/c5"
+        _, headers, cache_body = requests[0]
+        assert headers["x-goog-api-key"] == "key"
+        assert cache_body["systemInstruction"] == {
+            "parts": [{"text": "You are a home assistant"}]
+        }
+        _, request, body = requests[1]
+        assert request.query["alt"] == "sse"
+        assert "key" not in request.query
+        assert body["cachedContent"] == "cachedContents/c1"
+        assert "systemInstruction" not in body
+        assert body["contents"] == [
+            {
+                "role": "user",
+                "parts": [
+                    {"text": "On: light.kitchen"},
+                    {"text": "Is it on?"},
+                    {"text": '{"data": "on"}'},
+                ],
+            }
+        ]
+        assert requests[2][2]["contents"][0]["parts"][0] == {
+            "text": "Off: light.kitchen"
+        }
+
+
+    @pytest.mark.asyncio
+    async def test_gemini_client_answers_when_caching_fails(self):
+        """Test that a failed cache creation falls back to systemInstruction."""
+        try:
+            from aiohttp import web
+            from aiohttp.test_utils import TestServer
+
+            from custom_components.ai_agent_ha.agent import GeminiClient
+        except ImportError:
+            pytest.skip("GeminiClient not available")
+
+        requests = []
+
+        async def create_cache(request):
+            requests.append(("cache", None))
+            if len(requests) == 1:
+                return web.Response(text="<html>Service Unavailable</html>")
+            # Drop the connection without a reply
+            request.transport.close()
+            return web.Response()
+
+        async def generate(request):
+            requests.append(("generate", await request.json()))
+            return web.json_response(
+                {"candidates": [{"content": {"parts": [{"text": "It is on."}]}}]}
+            )
+
+        app = web.Application()
+        app.router.add_post("/cachedContents", create_cache)
+        app.router.add_post("/models/gemini-2.5-flash:generateContent", generate)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            client = GeminiClient(
+                "key", "gemini-2.5-flash", stream=False, cache_ttl=3600
+            )
+            client.base_url = str(server.make_url("")).rstrip("/")
+            messages = [
+                {"role": "system", "content": "You are a home assistant"},
+                {"role": "user", "content": "Is it on?"},
+            ]
+            assert await client.get_response(messages) == "It is on."
+            # Caching is not retried straight away
+            assert await client.get_response(messages) == "It is on."
+            client._cache_retry_at = 0.0
+            assert await client.get_response(messages) == "It is on."
+        finally:
+            await server.close()
+
+        kinds = [kind for kind, _ in requests]
+        assert kinds == ["cache", "generate", "generate", "cache", "generate"]
+        for kind, body in requests:
+            if kind == "generate":
+                assert "cachedContent" not in body
+                assert body["systemInstruction"] == {
+                    "parts": [{"text": "You are a home assistant"}]
+                }
+
 
 class TestAnthropicClient:
     """Test Anthropic client functionality."""
@@ -159,3 +404,54 @@ class TestLlamaClient:
             assert client.model == "Llama-4-Maverick-17B-128E-Instruct-FP8"
         except ImportError:
             pytest.skip("LlamaClient not available")
+
+
+class TestBedrockClient:
+    """Test Bedrock client functionality."""
+
+    @pytest.mark.asyncio
+    async def test_bedrock_client_converse_stream(self):
+        """Test the Converse request and the streamed reply and usage."""
+        try:
+            from custom_components.ai_agent_ha import metrics
+            from custom_components.ai_agent_ha.agent import BedrockClient
+        except ImportError:
+            pytest.skip("BedrockClient not available")
+
+        events = [
+            {"messageStart": {"role": "assistant"}},
+            {"contentBlockDelta": {"delta": {"text": "Hello"}, "contentBlockIndex": 0}},
+            {"contentBlockDelta": {"delta": {"text": " there"}, "contentBlockIndex": 0}},
+            {"messageStop": {"stopReason": "end_turn"}},
+            {"metadata": {"usage": {"inputTokens": 12, "outputTokens": 3}}},
+        ]
+        boto_client = Mock()
+        boto_client.converse_stream.return_value = {"stream": iter(events)}
+
+        client = BedrockClient("access", "secret", "us.meta.llama3-3-70b-instruct-v1:0")
+        client._bedrock_client = boto_client
+        collector = metrics.MetricsCollector()
+        with collector.track_query("bedrock"):
+            response = await client.get_response(
+                [
+                    {"role": "system", "content": "Be brief"},
+                    {"role": "assistant", "content": "Earlier answer"},
+                    {"role": "user", "content": "Hi"},
+                    {"role": "user", "content": ""},
+                ]
+            )
+        assert response == "Hello there"
+        assert collector.provider_summary("bedrock")["prompt_tokens"] == 12
+
+        # One request shape for every model family
+        boto_client.converse_stream.assert_called_once_with(
+            modelId="us.meta.llama3-3-70b-instruct-v1:0",
+            messages=[{"role": "user", "content": [{"text": "Hi"}]}],
+            inferenceConfig={"maxTokens": 8192},
+            system=[{"text": "Be brief"}],
+        )
+
+        # Errors raised by the reader thread reach the caller
+        boto_client.converse_stream.side_effect = RuntimeError("throttled")
+        with pytest.raises(Exception, match="throttled"):
+            await client.get_response([{"role": "user", "content": "Hi"}])
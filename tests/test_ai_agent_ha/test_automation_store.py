@@ -0,0 +1,131 @@
+"""Tests for the automations.yaml store."""
+
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+try:
+    import homeassistant
+
+    HOMEASSISTANT_AVAILABLE = True
+except ImportError:
+    HOMEASSISTANT_AVAILABLE = False
+
+
+def _automation(alias):
+    """Return a minimal automation config."""
+    return {
+        "alias": alias,
+        "trigger": [{"platform": "time", "at": "21:00:00"}],
+        "action": [{"service": "light.turn_off"}],
+    }
+
+
+@pytest.fixture
+def mock_hass(tmp_path):
+    """Create a mock hass object with a temporary config directory."""
+    if not HOMEASSISTANT_AVAILABLE:
+        pytest.skip("Home Assistant not available")
+    hass = MagicMock()
+    hass.data = {}
+    hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+    hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *a: func(*a))
+    hass.services.async_call = AsyncMock()
+    return hass
+
+
+class TestAutomationStore:
+    """Test caching, atomic writes and batched creation."""
+
+    @pytest.mark.asyncio
+    async def test_reads_once_until_the_file_changes(self, mock_hass, tmp_path):
+        """Test that the file is only parsed again after an external edit."""
+        import yaml
+
+        from custom_components.ai_agent_ha.automation_store import (
+            AutomationStore,
+            DuplicateAutomationError,
+        )
+
+        path = tmp_path / "automations.yaml"
+        path.write_text("- id: '1'\n  alias: Existing\n", encoding="utf-8")
+        store = AutomationStore(mock_hass)
+
+        with patch("yaml.load", wraps=yaml.load) as load:
+            await store.async_add([{"id": "2", "alias": "New"}])
+            with pytest.raises(DuplicateAutomationError):
+                await store.async_add([{"id": "3", "alias": "New"}])
+            assert load.call_count == 1
+
+            # An edit in the automation editor is picked up by its mtime
+            path.write_text("- id: '3'\n  alias: Edited\n", encoding="utf-8")
+            stat = path.stat()
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            await store.async_add([{"id": "4", "alias": "New"}])
+            assert load.call_count == 2
+
+        assert [a["alias"] for a in yaml.safe_load(path.read_text())] == [
+            "Edited",
+            "New",
+        ]
+
+        assert list(tmp_path.iterdir()) == [path]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_aliases_leave_the_file_untouched(
+        self, mock_hass, tmp_path
+    ):
+        """Test that a batch with a duplicate alias is rejected as a whole."""
+        from custom_components.ai_agent_ha.automation_store import (
+            AutomationStore,
+            DuplicateAutomationError,
+        )
+
+        store = AutomationStore(mock_hass)
+        await store.async_add([{"id": "1", "alias": "Existing"}])
+        content = (tmp_path / "automations.yaml").read_text()
+
+        with pytest.raises(DuplicateAutomationError):
+            await store.async_add(
+                [{"id": "2", "alias": "New"}, {"id": "3", "alias": "Existing"}]
+            )
+        with pytest.raises(DuplicateAutomationError):
+            await store.async_add(
+                [{"id": "4", "alias": "Twice"}, {"id": "5", "alias": "Twice"}]
+            )
+        assert (tmp_path / "automations.yaml").read_text() == content
+
+    @pytest.mark.asyncio
+    async def test_create_automations_reloads_once(self, mock_hass, tmp_path):
+        """Test that a batch is written and reloaded once."""
+        import yaml
+
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+        )
+
+        result = await agent.create_automations(
+            [_automation(f"Lights off {i}") for i in range(3)]
+        )
+        assert result["success"] is True
+        assert result["created"] == ["Lights off 0", "Lights off 1", "Lights off 2"]
+        mock_hass.services.async_call.assert_awaited_once_with("automation", "reload")
+
+        saved = yaml.safe_load((tmp_path / "automations.yaml").read_text())
+        assert [a["alias"] for a in saved] == result["created"]
+        assert len({a["id"] for a in saved}) == 3
+
+        duplicate = await agent.create_automation(_automation("Lights off 1"))
+        assert "already exists" in duplicate["error"]
+        assert mock_hass.services.async_call.await_count == 1
+
+        missing = await agent.create_automations([_automation("Ok"), {"alias": "x"}])
+        assert missing["index"] == 1
@@ -0,0 +1,219 @@
+"""Tests for the query_batch service."""
+
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+try:
+    import homeassistant
+
+    HOMEASSISTANT_AVAILABLE = True
+except ImportError:
+    HOMEASSISTANT_AVAILABLE = False
+
+
+def _make_agent(answers, tracker):
+    """Create an agent whose ephemeral copies answer after a delay."""
+
+    async def process_query(prompt, provider=None, debug=False, priority=None):
+        assert priority == "background"
+        tracker["running"] += 1
+        tracker["peak"] = max(tracker["peak"], tracker["running"])
+        delay, answer = answers[prompt]
+        await asyncio.sleep(delay)
+        tracker["running"] -= 1
+        if answer is None:
+            return {"success": False, "error": f"failed: {prompt}"}
+        return {"success": True, "answer": answer}
+
+    agent = MagicMock()
+    agent.create_ephemeral_agent.side_effect = lambda: MagicMock(
+        process_query=AsyncMock(side_effect=process_query)
+    )
+    return agent
+
+
+@pytest.fixture
+def mock_hass():
+    """Create a mock hass object."""
+    if not HOMEASSISTANT_AVAILABLE:
+        pytest.skip("Home Assistant not available")
+    hass = MagicMock()
+    hass.data = {}
+    return hass
+
+
+class TestQueryBatch:
+    """Test ordering, concurrency and the partial-failure policies."""
+
+    def test_schema_normalizes_prompts(self, mock_hass):
+        """Test that string prompts become items and limits are enforced."""
+        import voluptuous as vol
+
+        from custom_components.ai_agent_ha.batch import (
+            MAX_BATCH_CONCURRENCY,
+            QUERY_BATCH_SCHEMA,
+        )
+
+        data = QUERY_BATCH_SCHEMA(
+            {"prompts": ["Weather?", {"prompt": "Calendar?", "provider": "gemini"}]}
+        )
+        assert data["prompts"] == [
+            {"prompt": "Weather?"},
+            {"prompt": "Calendar?", "provider": "gemini", "debug": False},
+        ]
+        assert data["max_concurrency"] == MAX_BATCH_CONCURRENCY == 2
+        assert data["failure_policy"] == "continue"
+
+        with pytest.raises(vol.Invalid):
+            QUERY_BATCH_SCHEMA({"prompts": []})
+        with pytest.raises(vol.Invalid):
+            QUERY_BATCH_SCHEMA({"prompts": ["a"], "max_concurrency": 50})
+        with pytest.raises(vol.Invalid):
+            QUERY_BATCH_SCHEMA({"prompts": ["a"], "max_concurrency": 3})
+
+    @pytest.mark.asyncio
+    async def test_results_are_ordered_and_concurrency_bounded(self, mock_hass):
+        """Test that results keep request order while running in parallel."""
+        from custom_components.ai_agent_ha.batch import async_run_query_batch
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        tracker = {"running": 0, "peak": 0}
+        answers = {
+            "slow": (0.05, "slow answer"),
+            "fast": (0.0, "fast answer"),
+            "broken": (0.01, None),
+            "last": (0.0, "last answer"),
+        }
+        mock_hass.data[DOMAIN] = {
+            "agents": {
+                "openai": _make_agent(answers, tracker),
+                "gemini": _make_agent(answers, tracker),
+            }
+        }
+
+        result = await async_run_query_batch(
+            mock_hass,
+            [
+                {"prompt": "slow"},
+                {"prompt": "fast", "provider": "gemini"},
+                {"prompt": "broken"},
+                {"prompt": "last"},
+            ],
+            max_concurrency=2,
+        )
+
+        assert [r["prompt"] for r in result["results"]] == list(answers)
+        assert [r["provider"] for r in result["results"]] == [
+            "openai",
+            "gemini",
+            "openai",
+            "openai",
+        ]
+        assert result["results"][0]["answer"] == "slow answer"
+        assert result["results"][2] == {
+            "prompt": "broken",
+            "provider": "openai",
+            "success": False,
+            "error": "failed: broken",
+        }
+        assert (result["succeeded"], result["failed"], result["success"]) == (
+            3,
+            1,
+            False,
+        )
+        assert tracker["peak"] == 2
+
+    @pytest.mark.asyncio
+    async def test_scheduler_runs_the_batch_concurrency(self, mock_hass):
+        """Test that the scheduler admits as many batch prompts as allowed."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.batch import (
+            MAX_BATCH_CONCURRENCY,
+            async_run_query_batch,
+        )
+        from custom_components.ai_agent_ha.client_registry import ClientRegistry
+        from custom_components.ai_agent_ha.const import DOMAIN
+        from custom_components.ai_agent_ha.scheduler import QueryScheduler
+
+        tracker = {"running": 0, "peak": 0}
+
+        async def run_query(self, user_query, provider, debug, progress_callback):
+            tracker["running"] += 1
+            tracker["peak"] = max(tracker["peak"], tracker["running"])
+            await asyncio.sleep(0.02)
+            tracker["running"] -= 1
+            return {"success": True, "answer": user_query}
+
+        scheduler = QueryScheduler()
+        mock_hass.data[DOMAIN] = {
+            "client_registry": ClientRegistry(),
+            "scheduler": scheduler,
+        }
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+        )
+        mock_hass.data[DOMAIN]["agents"] = {"openai": agent}
+
+        with patch.object(AiAgentHaAgent, "_run_query", run_query):
+            result = await async_run_query_batch(
+                mock_hass,
+                [{"prompt": f"prompt {index}"} for index in range(6)],
+                max_concurrency=MAX_BATCH_CONCURRENCY,
+            )
+
+        assert result["succeeded"] == 6
+        assert tracker["peak"] == MAX_BATCH_CONCURRENCY
+        background = scheduler.as_dict()["classes"]["background"]
+        assert background["admitted"] == 6
+        assert background["timed_out"] == background["deadline_rejected"] == 0
+
+    @pytest.mark.asyncio
+    async def test_fail_fast_skips_prompts_not_started(self, mock_hass):
+        """Test that fail_fast skips queued prompts after a failure."""
+        from custom_components.ai_agent_ha.batch import async_run_query_batch
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        tracker = {"running": 0, "peak": 0}
+        answers = {"broken": (0.0, None), "next": (0.0, "next answer")}
+        mock_hass.data[DOMAIN] = {"agents": {"openai": _make_agent(answers, tracker)}}
+
+        result = await async_run_query_batch(
+            mock_hass,
+            [{"prompt": "broken"}, {"prompt": "next"}],
+            max_concurrency=1,
+            failure_policy="fail_fast",
+        )
+
+        assert result["results"][0]["error"] == "failed: broken"
+        assert result["results"][1]["skipped"] is True
+        assert result["succeeded"] == 0
+
+    @pytest.mark.asyncio
+    async def test_ephemeral_agent_does_not_touch_storage(self, mock_hass):
+        """Test that batch agents keep their conversation in memory only."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.client_registry import ClientRegistry
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        mock_hass.data[DOMAIN] = {"client_registry": ClientRegistry()}
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+        )
+        worker = agent.create_ephemeral_agent()
+        worker.conversation_history = [{"role": "user", "content": "hi"}]
+
+        await worker.save_conversation_history()
+        await worker.load_conversation_history()
+
+        assert worker._conversation_store is None
+        assert worker.conversation_history == [{"role": "user", "content": "hi"}]
+        assert worker.ai_client is agent.ai_client
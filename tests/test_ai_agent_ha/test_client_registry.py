@@ -0,0 +1,74 @@
+"""Tests for the shared provider client registry."""
+
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def _openai_config(token="sk-test-token-1234567890abcdef", model="gpt-4o"):
+    """Return an OpenAI provider config."""
+    return {"ai_provider": "openai", "openai_token": token, "models": {"openai": model}}
+
+
+class TestClientRegistry:
+    """Test client creation, reuse and invalidation."""
+
+    def test_get_or_create_and_invalidate(self, mock_hass):
+        """Test that clients are built once per key and dropped per provider."""
+        from custom_components.ai_agent_ha.client_registry import (
+            ClientKey,
+            ClientRegistry,
+            hash_credentials,
+        )
+
+        registry = ClientRegistry()
+        factory = MagicMock(side_effect=lambda: object())
+        key = ClientKey("openai", "gpt-4o", hash_credentials("secret"), "")
+
+        first = registry.get_or_create(key, factory)
+        assert registry.get_or_create(key, factory) is first
+        assert factory.call_count == 1
+        assert "secret" not in repr(key)
+
+        registry.get_or_create(key._replace(provider="gemini"), factory)
+        assert registry.invalidate("openai") == 1
+        assert len(registry) == 1
+        assert registry.get_or_create(key, factory) is not first
+
+    def test_agents_share_clients_until_settings_change(self, mock_hass):
+        """Test that agents reuse clients and rebuild them for new credentials."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent, OpenAIClient
+
+        agent = AiAgentHaAgent(mock_hass, _openai_config())
+        other = AiAgentHaAgent(mock_hass, _openai_config())
+        assert isinstance(agent.ai_client, OpenAIClient)
+        assert other.ai_client is agent.ai_client
+        assert agent._get_client("openai", agent.config) is agent.ai_client
+
+        old_client = agent.ai_client
+        agent.update_config(_openai_config(token="sk-rotated-token-0987654321fedcba"))
+        assert agent.ai_client is not old_client
+        assert agent.ai_client.token == "sk-rotated-token-0987654321fedcba"
+
+        agent.update_config(_openai_config(model="gpt-5"))
+        assert agent.ai_client.model == "gpt-5"
+
+    @pytest.mark.asyncio
+    async def test_ai_response_uses_the_query_client(self, mock_hass):
+        """Test that a query keeps its client even if another query swaps it."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        agent = AiAgentHaAgent(mock_hass, _openai_config())
+        query_client = MagicMock()
+        query_client.get_response = AsyncMock(return_value='{"request_type": "x"}')
+        agent.ai_client = MagicMock()
+        agent.ai_client.get_response = AsyncMock(side_effect=AssertionError)
+        agent.conversation_history = [{"role": "user", "content": "hi"}]
+
+        assert await agent._get_ai_response(query_client) == '{"request_type": "x"}'
+        query_client.get_response.assert_awaited_once()
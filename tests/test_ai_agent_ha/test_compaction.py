@@ -0,0 +1,210 @@
+"""Tests for conversation compaction."""
+
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def past_turn(index, dump_size=0):
+    """Return the messages of an earlier query with one lookup."""
+    data = [
+        {"entity_id": f"sensor.dump_{n}", "state": "x" * 20} for n in range(dump_size)
+    ] or {"entity_id": f"light.room_{index}", "state": "on"}
+    return [
+        {"role": "user", "content": f"Is the light in room {index} on?"},
+        {
+            "role": "assistant",
+            "content": json.dumps(
+                {
+                    "request_type": "get_entity_state",
+                    "parameters": {"entity_id": f"light.room_{index}"},
+                }
+            ),
+        },
+        {"role": "user", "content": json.dumps({"data": data}, separators=(",", ":"))},
+        {
+            "role": "assistant",
+            "content": json.dumps(
+                {"request_type": "final_response", "response": f"Room {index}: on"}
+            ),
+        },
+    ]
+
+
+class TestCompaction:
+    """Test folding old turns into the rolling summary."""
+
+    def test_extractive_summary(self, mock_hass):
+        """Test that turns are reduced to queries, actions, states and answers."""
+        from custom_components.ai_agent_ha import compaction
+
+        messages = past_turn(1) + past_turn(2, dump_size=200)
+        messages += [
+            {"role": "user", "content": "Turn it off"},
+            {
+                "role": "assistant",
+                "content": json.dumps(
+                    {
+                        "request_type": "call_service",
+                        "domain": "light",
+                        "service": "turn_off",
+                        "target": {"entity_id": ["light.room_2"]},
+                    }
+                ),
+            },
+        ]
+        summary = compaction.summarize_extractive("User: earlier question", messages)
+        assert summary.splitlines() == [
+            "User: earlier question",
+            "User: Is the light in room 1 on?",
+            'Assistant looked up get_entity_state {"entity_id":"light.room_1"}',
+            "  light.room_1: on",
+            "Assistant: Room 1: on",
+            "User: Is the light in room 2 on?",
+            'Assistant looked up get_entity_state {"entity_id":"light.room_2"}',
+            "  (200 results)",
+            "Assistant: Room 2: on",
+            "User: Turn it off",
+            "Assistant called light.turn_off on ['light.room_2']",
+        ]
+
+        # The rolling summary drops its oldest lines first
+        trimmed = compaction.summarize_extractive(summary, messages, max_chars=120)
+        assert len(trimmed) <= 120
+        assert trimmed.endswith("Assistant called light.turn_off on ['light.room_2']")
+
+    @pytest.mark.asyncio
+    async def test_long_history_is_folded_into_summary(self, mock_hass):
+        """Test compaction of a long conversation before the next request."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {
+                "ai_provider": "openai",
+                "openai_token": "sk-test-token-1234567890abc",
+                "compaction_threshold": 500,
+            },
+            persist_history=False,
+        )
+        client = MagicMock(
+            get_response=AsyncMock(
+                return_value='{"request_type": "final_response", "response": "Yes"}'
+            )
+        )
+        agent._get_client = MagicMock(return_value=client)
+        agent.conversation_history = [agent.system_prompt]
+        for index in range(4):
+            agent.conversation_history += past_turn(index, dump_size=40)
+
+        result = await agent.process_query("And the kitchen?")
+        assert result == {"success": True, "answer": "Yes"}
+
+        # Only the system prompt, the current query and its answer remain
+        assert agent.conversation_history[0] is agent.system_prompt
+        assert agent.conversation_history[1] == {
+            "role": "user",
+            "content": "And the kitchen?",
+        }
+        assert len(agent.conversation_history) == 3
+        assert "User: Is the light in room 0 on?" in agent.conversation_summary
+        assert "Assistant: Room 3: on" in agent.conversation_summary
+
+        (sent,) = client.get_response.await_args.args
+        assert len(sent) == 3
+        assert sent[0] is agent.system_prompt
+        assert "SUMMARY OF THE EARLIER CONVERSATION" in sent[1]["content"]
+        assert agent.conversation_summary in sent[1]["content"]
+
+        # Short conversations are left alone
+        summary = agent.conversation_summary
+        await agent.process_query("Thanks")
+        assert agent.conversation_summary == summary
+        assert len(agent.conversation_history) == 5
+
+        await agent.clear_conversation_history()
+        assert agent.conversation_summary is None
+        assert agent._build_system_messages() == [agent.system_prompt]
+
+    @pytest.mark.asyncio
+    async def test_summary_model(self, mock_hass):
+        """Test summaries by the configured model, with the extractive fallback."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        config = {
+            "ai_provider": "openai",
+            "openai_token": "sk-test-token-1234567890abc",
+            "compaction_threshold": 100,
+            "compaction_model": "gpt-4o-mini",
+        }
+        agent = AiAgentHaAgent(mock_hass, config, persist_history=False)
+        summarizer = MagicMock(
+            get_response=AsyncMock(return_value="  Rooms 0 and 1 were on.  ")
+        )
+        agent._get_client = MagicMock(return_value=summarizer)
+        agent.conversation_history = past_turn(0, 10) + past_turn(1, 10)
+        agent.conversation_history.append({"role": "user", "content": "Next?"})
+
+        await agent._compact_history("openai", config)
+        assert agent.conversation_summary == "Rooms 0 and 1 were on."
+        assert agent.conversation_history == [{"role": "user", "content": "Next?"}]
+        provider, summary_config = agent._get_client.call_args.args
+        assert provider == "openai"
+        assert summary_config["models"]["openai"] == "gpt-4o-mini"
+        request = summarizer.get_response.await_args.args[0]
+        assert "User: Is the light in room 1 on?" in request[1]["content"]
+
+        summarizer.get_response.side_effect = Exception("model unavailable")
+        agent.conversation_history[:0] = past_turn(2, 10)
+        await agent._compact_history("openai", config)
+        assert agent.conversation_summary.startswith("Rooms 0 and 1 were on.\n")
+        assert "User: Is the light in room 2 on?" in agent.conversation_summary
+
+    @pytest.mark.asyncio
+    async def test_concurrent_compactions_fold_each_turn_once(self, mock_hass):
+        """Test that a compaction waiting for another does not cut newer turns."""
+        import asyncio
+
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        config = {
+            "ai_provider": "openai",
+            "openai_token": "sk-test-token-1234567890abc",
+            "compaction_threshold": 100,
+            "compaction_model": "gpt-4o-mini",
+        }
+        agent = AiAgentHaAgent(mock_hass, config, persist_history=False)
+
+        async def slow_summary(messages):
+            await asyncio.sleep(0.02)
+            return "Rooms 0 and 1 were on."
+
+        summarizer = MagicMock(get_response=AsyncMock(side_effect=slow_summary))
+        agent._get_client = MagicMock(return_value=summarizer)
+        agent.conversation_history = past_turn(0, 10) + past_turn(1, 10)
+        newer = [
+            {"role": "user", "content": "Next?"},
+            {"role": "assistant", "content": "Room 2 is off."},
+        ]
+        agent.conversation_history.append(newer[0])
+
+        async def query_appends():
+            # Another query answers while the summary is being written
+            await asyncio.sleep(0.01)
+            agent.conversation_history.append(newer[1])
+
+        await asyncio.gather(
+            agent._compact_history("openai", config),
+            agent._compact_history("openai", config),
+            query_appends(),
+        )
+
+        assert summarizer.get_response.await_count == 1
+        assert agent.conversation_summary == "Rooms 0 and 1 were on."
+        assert agent.conversation_history == newer
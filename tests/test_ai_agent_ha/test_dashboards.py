@@ -0,0 +1,205 @@
+"""Tests for storage-mode dashboard creation and updates."""
+
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+try:
+    import homeassistant
+
+    HOMEASSISTANT_AVAILABLE = True
+except ImportError:
+    HOMEASSISTANT_AVAILABLE = False
+
+
+def _dashboard(mode, config=None, path=None):
+    """Create a Lovelace dashboard object."""
+    dashboard = MagicMock(mode=mode, config=config, path=path)
+    dashboard.async_save = AsyncMock()
+    return dashboard
+
+
+@pytest.fixture
+def mock_hass():
+    """Create a mock hass object with Lovelace dashboards loaded."""
+    if not HOMEASSISTANT_AVAILABLE:
+        pytest.skip("Home Assistant not available")
+    dashboards = {None: _dashboard("storage")}
+
+    async def create_item(data):
+        # Lovelace's collection listener registers the new dashboard
+        dashboards[data["url_path"]] = _dashboard(
+            "storage", {**data, "id": data["url_path"]}
+        )
+
+    collection = MagicMock()
+    collection.async_create_item = AsyncMock(side_effect=create_item)
+    collection.async_update_item = AsyncMock()
+
+    hass = MagicMock()
+    hass.data = {
+        "lovelace": {
+            "dashboards": dashboards,
+            "dashboards_collection": collection,
+            "yaml_dashboards": {},
+        }
+    }
+    hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *a: func(*a))
+    return hass
+
+
+class TestDashboards:
+    """Test the Lovelace storage dashboard helpers."""
+
+    @pytest.mark.asyncio
+    async def test_create_storage_dashboard(self, mock_hass):
+        """Test that a dashboard is created through the collection in one save."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+        )
+        views = [{"title": "Lights", "cards": []}]
+
+        result = await agent.create_dashboard(
+            {"title": "Living Room", "url_path": "Living Room", "views": views}
+        )
+
+        assert result["success"] is True
+        assert result["url_path"] == "living-room"
+        assert "restart" not in result["message"].lower()
+        collection = mock_hass.data["lovelace"]["dashboards_collection"]
+        created = collection.async_create_item.await_args.args[0]
+        assert created["mode"] == "storage"
+        assert created["icon"] == "mdi:view-dashboard"
+        dashboard = mock_hass.data["lovelace"]["dashboards"]["living-room"]
+        dashboard.async_save.assert_awaited_once_with(
+            {"title": "Living Room", "views": views}
+        )
+
+        duplicate = await agent.create_dashboard(
+            {"title": "Living Room", "url_path": "living-room"}
+        )
+        assert "already exists" in duplicate["error"]
+        assert collection.async_create_item.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_update_uses_the_save_path_for_the_mode(self, mock_hass, tmp_path):
+        """Test storage, YAML and unknown dashboards on update."""
+        from custom_components.ai_agent_ha.dashboards import (
+            async_create_storage_dashboard,
+            async_update_dashboard,
+        )
+
+        dashboards = mock_hass.data["lovelace"]["dashboards"]
+        yaml_path = tmp_path / "ui-lovelace-energy.yaml"
+        dashboards["energy"] = _dashboard(
+            "yaml", {"url_path": "energy"}, str(yaml_path)
+        )
+        await async_create_storage_dashboard(
+            mock_hass, "climate", {"title": "Climate", "views": []}
+        )
+
+        result = await async_update_dashboard(
+            mock_hass, "climate", {"icon": "mdi:thermometer", "views": [{}]}
+        )
+        assert result == {"success": True, "url_path": "climate", "mode": "storage"}
+        dashboards["climate"].async_save.assert_awaited_with({"views": [{}]})
+        collection = mock_hass.data["lovelace"]["dashboards_collection"]
+        collection.async_update_item.assert_awaited_once_with(
+            "climate", {"icon": "mdi:thermometer"}
+        )
+
+        result = await async_update_dashboard(
+            mock_hass, "energy", {"title": "Energy", "views": []}
+        )
+        assert result["mode"] == "yaml"
+        assert "title: Energy" in yaml_path.read_text()
+
+        result = await async_update_dashboard(mock_hass, "storage", {"views": []})
+        assert result["url_path"] is None
+        dashboards[None].async_save.assert_awaited_once()
+
+        result = await async_update_dashboard(mock_hass, "missing", {"views": []})
+        assert "default (storage)" in result["error"]
+        assert "energy (yaml)" in result["error"]
+
+    @pytest.mark.asyncio
+    async def test_yaml_fallback_without_collection(self, mock_hass, tmp_path):
+        """Test that older releases without the collection get a YAML dashboard."""
+        from types import SimpleNamespace
+
+        import yaml
+
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.dashboards import get_dashboards_collection
+
+        # Newer releases keep Lovelace's data in a dataclass
+        lovelace = mock_hass.data["lovelace"]
+        mock_hass.data["lovelace"] = SimpleNamespace(**lovelace)
+        assert get_dashboards_collection(mock_hass) is lovelace["dashboards_collection"]
+        del mock_hass.data["lovelace"].dashboards_collection
+
+        mock_hass.config.path = lambda name: str(tmp_path / name)
+        config_file = tmp_path / "configuration.yaml"
+        config_file.write_text(
+            "default_config:\n\n"
+            "lovelace:\n"
+            "    mode: storage\n"
+            "    dashboards:\n"
+            "        energy:\n"
+            "            mode: yaml\n"
+            "            filename: energy.yaml\n"
+            "\n"
+            "automation: !include automations.yaml\n"
+        )
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+        )
+        views = [{"title": "Doors", "cards": []}]
+
+        result = await agent.create_dashboard(
+            {"title": "Security: Doors", "url_path": "security", "views": views}
+        )
+
+        assert result["success"] is True
+        assert result["mode"] == "yaml"
+        assert result["restart_required"] is True
+        assert "restart" in result["message"].lower()
+        saved = yaml.safe_load((tmp_path / "ui-lovelace-security.yaml").read_text())
+        assert saved == {"title": "Security: Doors", "views": views}
+        class IncludeLoader(yaml.SafeLoader):
+            """Read !include tags as the included file name."""
+
+        IncludeLoader.add_constructor(
+            "!include", lambda loader, node: loader.construct_scalar(node)
+        )
+        config = yaml.load(config_file.read_text(), Loader=IncludeLoader)
+        assert config["automation"] == "automations.yaml"
+        assert config["lovelace"]["mode"] == "storage"
+        assert config["lovelace"]["dashboards"]["energy"]["filename"] == "energy.yaml"
+        assert config["lovelace"]["dashboards"]["security"] == {
+            "mode": "yaml",
+            "title": "Security: Doors",
+            "icon": "mdi:view-dashboard",
+            "show_in_sidebar": True,
+            "require_admin": False,
+            "filename": "ui-lovelace-security.yaml",
+        }
+
+        # An included lovelace section has to be edited by hand
+        config_file.write_text("lovelace: !include lovelace.yaml\n")
+        result = await agent.create_dashboard(
+            {"title": "Garden", "url_path": "garden", "views": []}
+        )
+        assert result["success"] is True
+        assert "configuration_entry" not in result
+        assert "    garden:\n      mode: yaml" in result["message"]
+        assert config_file.read_text() == "lovelace: !include lovelace.yaml\n"
@@ -0,0 +1,135 @@
+"""Tests for detecting degenerate model output."""
+
+import importlib.util
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DEGENERATION_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "..",
+    "custom_components",
+    "ai_agent_ha",
+    "degeneration.py",
+)
+
+
+def load_degeneration_module():
+    """Load degeneration.py without importing the full integration."""
+    spec = importlib.util.spec_from_file_location("degeneration", DEGENERATION_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+degeneration = load_degeneration_module()
+
+LOOP = "Water is essential for its use in various fields. " * 2000
+
+
+def feed_chunks(detector, text, size=7):
+    """Feed text in chunks of size characters."""
+    for pos in range(0, len(text), size):
+        detector.feed(text[pos : pos + size])
+
+
+class TestDegenerationDetector:
+    """Test the repetition, length and nesting guards."""
+
+    def test_repetition_detected_early(self):
+        """Test a looping reply is stopped long before it ends."""
+        detector = degeneration.DegenerationDetector()
+        with pytest.raises(degeneration.DegenerateOutput) as err:
+            feed_chunks(detector, LOOP)
+        assert err.value.reason == "repetition"
+        assert detector.chars < 2000
+
+    def test_structured_output_passes(self):
+        """Test dashboards, entity lists and prose are not flagged."""
+        cards = [
+            {
+                "type": "tile",
+                "entity": f"light.room_{i}",
+                "vertical": False,
+                "hide_state": False,
+                "state_content": ["state", "last_changed"],
+            }
+            for i in range(300)
+        ]
+        texts = [
+            json.dumps({"request_type": "dashboard_suggestion", "cards": cards}),
+            ", ".join(f"light.room_{i} is on" for i in range(1500)),
+            " ".join(
+                f"Step {i}: open valve {i * 7 % 13} and wait." for i in range(900)
+            ),
+        ]
+        for text in texts:
+            detector = degeneration.DegenerationDetector()
+            feed_chunks(detector, text, size=13)
+            assert detector.repetition_rate < degeneration.MAX_REPETITION_RATE
+
+    def test_length_and_depth_guards(self):
+        """Test the length guard and JSON depth outside strings."""
+        detector = degeneration.DegenerationDetector(max_chars=100)
+        with pytest.raises(degeneration.DegenerateOutput) as err:
+            feed_chunks(detector, " ".join(str(i) for i in range(100)))
+        assert err.value.reason == "length"
+
+        detector = degeneration.DegenerationDetector()
+        with pytest.raises(degeneration.DegenerateOutput) as err:
+            feed_chunks(detector, '{"a": [' * 30, size=3)
+        assert err.value.reason == "json_depth"
+
+        # Brackets in strings, escaped quotes and escapes split across chunks
+        detector = degeneration.DegenerationDetector(max_json_depth=3)
+        feed_chunks(detector, json.dumps({"a": ["\\" + '"{[' * 20, {"b": 1}]}), size=1)
+        detector.feed('{"done": true}')
+
+    def test_watch_scope(self):
+        """Test feed() only checks replies inside watch()."""
+        degeneration.feed(LOOP)
+        with degeneration.watch() as detector:
+            degeneration.feed("The lights are on.")
+            assert detector.fed
+            with pytest.raises(degeneration.DegenerateOutput):
+                degeneration.feed(LOOP)
+        degeneration.feed(LOOP)
+
+    @pytest.mark.asyncio
+    async def test_agent_cancels_degenerate_stream(self, mock_hass):
+        """Test a looping stream is abandoned and retried once with a nudge."""
+        from custom_components.ai_agent_ha import degeneration as agent_degeneration
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+        agent._retry_delay = 0
+        chunks_read = []
+        attempts = []
+
+        async def get_response(messages, **kwargs):
+            attempts.append(messages)
+            for pos in range(0, len(LOOP), 20):
+                chunks_read.append(pos)
+                agent_degeneration.feed(LOOP[pos : pos + 20])
+            return LOOP
+
+        agent._get_client = MagicMock(return_value=MagicMock(get_response=get_response))
+        result = await agent.process_query("Tell me about water")
+        assert result["success"] is False
+        assert "repetitive" in result["error"]
+        # Two attempts, each abandoned after a few dozen chunks
+        assert len(attempts) == 2
+        assert len(chunks_read) < 200
+        assert attempts[1][:-1] == attempts[0]
+        assert "repeating" in attempts[1][-1]["content"]
@@ -0,0 +1,153 @@
+"""Tests for the background home digest."""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+try:
+    import homeassistant
+
+    HOMEASSISTANT_AVAILABLE = True
+except ImportError:
+    HOMEASSISTANT_AVAILABLE = False
+
+
+def _state(entity_id, state, **attributes):
+    """Create a minimal state object."""
+    return SimpleNamespace(
+        entity_id=entity_id,
+        domain=entity_id.split(".")[0],
+        state=state,
+        attributes=attributes,
+    )
+
+
+def _entry(entity_id, area_id=None, device_id=None, disabled_by=None):
+    """Create a minimal entity registry entry."""
+    return SimpleNamespace(
+        entity_id=entity_id,
+        domain=entity_id.split(".")[0],
+        area_id=area_id,
+        device_id=device_id,
+        disabled_by=disabled_by,
+    )
+
+
+@pytest.fixture
+def mock_home():
+    """Mock hass plus registries describing a small home."""
+    hass = MagicMock()
+    hass.states.async_all.return_value = [
+        _state("light.kitchen", "on"),
+        _state("light.bedroom", "off"),
+        _state("media_player.tv", "playing"),
+        _state("binary_sensor.front_door", "on", device_class="door"),
+        _state("binary_sensor.motion", "on", device_class="motion"),
+        _state("cover.garage", "open", device_class="garage"),
+        _state(
+            "climate.thermostat",
+            "heat",
+            temperature=21,
+            current_temperature=19.5,
+        ),
+        _state(
+            "weather.home",
+            "sunny",
+            temperature=18,
+            temperature_unit="°C",
+            humidity=60,
+        ),
+    ]
+    areas = SimpleNamespace(
+        areas={
+            "kitchen": SimpleNamespace(id="kitchen", name="Kitchen"),
+            "bedroom": SimpleNamespace(id="bedroom", name="Bedroom"),
+        }
+    )
+    devices = SimpleNamespace(devices={"dev1": SimpleNamespace(area_id="bedroom")})
+    entities = SimpleNamespace(
+        entities={
+            "light.kitchen": _entry("light.kitchen", area_id="kitchen"),
+            "light.bedroom": _entry("light.bedroom", device_id="dev1"),
+            "climate.thermostat": _entry("climate.thermostat", device_id="dev1"),
+            "media_player.tv": _entry("media_player.tv"),
+            "light.old": _entry("light.old", area_id="kitchen", disabled_by="user"),
+        }
+    )
+    with patch(
+        "homeassistant.helpers.area_registry.async_get", return_value=areas
+    ), patch(
+        "homeassistant.helpers.device_registry.async_get", return_value=devices
+    ), patch(
+        "homeassistant.helpers.entity_registry.async_get", return_value=entities
+    ):
+        yield hass
+
+
+class TestHomeDigest:
+    """Test home digest building and refresh scheduling."""
+
+    def test_build_home_digest_content(self, mock_home):
+        """Test that the digest summarises areas, on devices, openings, climate and weather."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+        from custom_components.ai_agent_ha.home_digest import build_home_digest
+
+        digest = build_home_digest(mock_home)
+
+        assert "- Bedroom [bedroom]: climate 1, light 1" in digest
+        assert "- Kitchen [kitchen]: light 1" in digest
+        assert "Entities without area: 1" in digest
+        assert "On: light.kitchen, media_player.tv" in digest
+        assert "Open doors/windows: binary_sensor.front_door, cover.garage" in digest
+        assert "climate.thermostat: heat, setpoint 21, current 19.5" in digest
+        assert "Weather (weather.home): sunny, 18°C, humidity 60%" in digest
+        assert "binary_sensor.motion" not in digest
+
+    def test_build_home_digest_respects_budget(self, mock_home):
+        """Test that the digest is truncated on whole lines within the budget."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+        from custom_components.ai_agent_ha.home_digest import build_home_digest
+
+        digest = build_home_digest(mock_home, max_chars=80)
+
+        assert digest.endswith("... (digest truncated)")
+        assert len(digest) <= 80 + len("\n... (digest truncated)")
+
+    def test_state_changed_filter(self):
+        """Test that only relevant state changes schedule a refresh."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+        from custom_components.ai_agent_ha.home_digest import HomeDigest
+
+        digest = HomeDigest(MagicMock())
+        digest._debouncer = MagicMock()
+
+        digest._handle_state_changed(
+            SimpleNamespace(
+                data={"entity_id": "sensor.power", "old_state": 1, "new_state": 2}
+            )
+        )
+        digest._debouncer.async_schedule_call.assert_not_called()
+
+        digest._handle_state_changed(
+            SimpleNamespace(
+                data={"entity_id": "light.kitchen", "old_state": 1, "new_state": 2}
+            )
+        )
+        digest._handle_state_changed(
+            SimpleNamespace(
+                data={"entity_id": "sensor.new", "old_state": None, "new_state": 2}
+            )
+        )
+        assert digest._debouncer.async_schedule_call.call_count == 2
@@ -38,6 +38,11 @@ class TestIntegration:
         mock.states = MagicMock()
         mock.http = MagicMock()
         mock.http.async_register_static_paths = AsyncMock()
+        mock.config_entries.async_forward_entry_setups = AsyncMock()
+        mock.config_entries.async_unload_platforms = AsyncMock(return_value=True)
+        mock.async_add_import_executor_job = AsyncMock(
+            side_effect=lambda func, *args: func(*args)
+        )
         return mock
 
     @pytest.fixture
@@ -0,0 +1,95 @@
+"""Tests for the JSON codec."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+try:
+    import homeassistant
+
+    HOMEASSISTANT_AVAILABLE = True
+except ImportError:
+    HOMEASSISTANT_AVAILABLE = False
+
+
+class _Color(Enum):
+    RED = "red"
+
+
+@pytest.fixture
+def json_codec():
+    """Return the codec module, restoring the active backend afterwards."""
+    if not HOMEASSISTANT_AVAILABLE:
+        pytest.skip("Home Assistant not available")
+    from custom_components.ai_agent_ha import json_codec
+
+    original_backend = json_codec.BACKEND
+    yield json_codec
+    json_codec.use_backend(original_backend)
+
+
+class TestJsonCodec:
+    """Test both backends encode the same types the same way."""
+
+    def test_backends_agree_on_rich_types(self, json_codec):
+        """Test datetimes, sets, enums and non-string keys on every backend."""
+        when = datetime(2025, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+        payload = {
+            "when": when,
+            "day": when.date(),
+            "tags": {"kitchen"},
+            "elapsed": timedelta(minutes=2),
+            "color": _Color.RED,
+            5: "int key",
+            "name": "Küche",
+        }
+
+        encoded = set()
+        for backend in json_codec.available_backends():
+            json_codec.use_backend(backend)
+            text = json_codec.dumps(payload)
+            encoded.add(text)
+            assert json_codec.loads(text) == {
+                "when": "2025-01-02T03:04:05.678000+00:00",
+                "day": "2025-01-02",
+                "tags": ["kitchen"],
+                "elapsed": 120.0,
+                "color": "red",
+                "5": "int key",
+                "name": "Küche",
+            }
+        # Compact output that is byte-identical across backends
+        assert len(encoded) == 1
+        assert ", " not in encoded.pop()
+
+    def test_state_objects_encode_as_dict(self, json_codec):
+        """Test that Home Assistant State objects are encoded via as_dict."""
+        from homeassistant.core import State
+
+        state = State("light.kitchen", "on", {"brightness": 255})
+        for backend in json_codec.available_backends():
+            json_codec.use_backend(backend)
+            decoded = json_codec.loads(json_codec.dumps({"state": state}))
+            assert decoded["state"]["entity_id"] == "light.kitchen"
+            assert decoded["state"]["attributes"] == {"brightness": 255}
+
+    def test_loads_accepts_bytes_and_raises_json_decode_error(self, json_codec):
+        """Test decoding bytes and that errors are json.JSONDecodeError."""
+        for backend in json_codec.available_backends():
+            json_codec.use_backend(backend)
+            assert json_codec.loads(b'{"a": [1, 2]}') == {"a": [1, 2]}
+            with pytest.raises(json_codec.JSONDecodeError) as err:
+                json_codec.loads('{"a": x}')
+            assert err.value.pos == 6
+
+    def test_lazy_json_and_unknown_backend(self, json_codec):
+        """Test deferred log formatting and backend validation."""
+        assert str(json_codec.LazyJSON({"a": 1})) == '{\n  "a": 1\n}'
+        with pytest.raises(ValueError):
+            json_codec.use_backend("ujson")
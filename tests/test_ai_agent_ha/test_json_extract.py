@@ -0,0 +1,154 @@
+"""Tests for tolerant extraction of JSON commands from model output."""
+
+import json
+import os
+import random
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+PROSE = [
+    "Sure! Here is the request:",
+    "I'll check that for you.",
+    "Done; the lights are off.",
+    "Let me know if you need anything else :)",
+    "garbage ]]] ::: ''' \\ \"",
+    "\u200b\ufeff",
+    "",
+]
+FENCES = [("```json\n", "\n```"), ("```\n", "\n```"), ("", "")]
+
+
+def random_value(rng, depth=0):
+    """Return a random JSON value whose strings contain JSON syntax."""
+    kind = rng.randrange(6 if depth < 4 else 3)
+    if kind == 0:
+        return rng.choice([None, True, False, 0, -1.5, 10**12])
+    if kind in (1, 2):
+        return "".join(rng.choice('ab {}[]"\\:,\n\u00e9') for _ in range(8))
+    if kind == 3:
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {
+        "k" + str(i) + rng.choice(["", "{", "}", '"']): random_value(rng, depth + 1)
+        for i in range(rng.randrange(4))
+    }
+
+
+def random_command(rng):
+    """Return a random command object."""
+    return {
+        "request_type": rng.choice(["get_entity_state", "final_response"]),
+        "parameters": random_value(rng, 1),
+    }
+
+
+class TestJsonExtract:
+    """Test extraction from clean, decorated and pathological output."""
+
+    def test_decorated_output(self, mock_hass):
+        """Test fences, text around objects and concatenated objects."""
+        from custom_components.ai_agent_ha.json_extract import extract_json
+
+        command = {"request_type": "final_response", "response": "a } and a {"}
+        text = json.dumps(command)
+        assert extract_json(text).command == command
+        assert extract_json(f"\ufeff```json\n{text}\n```").command == command
+        extraction = extract_json(f'Sure. {{"note": 1}}{text} trailing }} junk')
+        assert extraction.objects == [{"note": 1}, command]
+        assert extraction.command == command
+        assert extraction.text == "Sure.  trailing } junk"
+
+        broken = extract_json('Use {curly} braces {"request_type": "final_resp')
+        assert broken.objects == []
+        assert broken.command is None
+        assert broken.error is not None
+        assert extract_json("The lights are on.").error is None
+
+    def test_fuzz_round_trip(self, mock_hass):
+        """Test that objects embedded in noise come back, in any chunking."""
+        from custom_components.ai_agent_ha.json_extract import (
+            JsonExtractor,
+            extract_json,
+        )
+
+        rng = random.Random(1234)
+        for _ in range(300):
+            objects = [random_command(rng) for _ in range(rng.randrange(1, 4))]
+            parts = []
+            for obj in objects:
+                opening, closing = rng.choice(FENCES)
+                parts.append(rng.choice(PROSE))
+                parts.append(opening + json.dumps(obj, ensure_ascii=rng.random() < 0.5))
+                parts.append(closing)
+            parts.append(rng.choice(PROSE))
+            text = rng.choice([" ", "\n", ""]).join(parts)
+
+            assert extract_json(text).objects == objects, text
+
+            extractor = JsonExtractor()
+            streamed = []
+            pos = 0
+            while pos < len(text):
+                size = rng.randrange(1, 12)
+                streamed += extractor.feed(text[pos : pos + size])
+                pos += size
+            assert streamed == objects, text
+            assert extractor.finish().objects == objects
+
+    def test_fuzz_never_raises(self, mock_hass):
+        """Test random and pathological text is handled without errors."""
+        from custom_components.ai_agent_ha.json_extract import extract_json
+
+        rng = random.Random(99)
+        alphabet = '{}[]":,\\ abc1\n`\ufeff'
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randrange(60)))
+            extraction = extract_json(text)
+            assert isinstance(extraction.objects, list)
+
+        for text in (
+            "{" * 100_000,
+            "}" * 100_000,
+            '{"a": "' + "{" * 100_000,
+            "[" * 50_000 + "{" + "}" * 50_000,
+            '{"a":' * 50_000 + "1" + "}" * 50_000,
+            "{}" * 50_000,
+        ):
+            extraction = extract_json(text)
+            assert extraction.command is None
+
+    @pytest.mark.asyncio
+    async def test_agent_uses_extracted_command(self, mock_hass):
+        """Test fenced and concatenated replies in process_query."""
+        from custom_components.ai_agent_ha.agent import (
+            AiAgentHaAgent,
+            _wrap_local_content,
+        )
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+        reply = (
+            "Here you go:\n```json\n"
+            '{"request_type": "final_response", "response": "All off"}\n```'
+            '{"request_type": "final_response", "response": "again"}'
+        )
+        agent._get_client = MagicMock(
+            return_value=MagicMock(get_response=AsyncMock(return_value=reply))
+        )
+        result = await agent.process_query("Are the lights off?")
+        assert result == {"success": True, "answer": "All off"}
+
+        # Local replies: commands pass through, anything else is wrapped
+        assert _wrap_local_content(reply) == reply
+        assert json.loads(_wrap_local_content(' {"state": "on"} ')) == {
+            "request_type": "final_response",
+            "response": '{"state": "on"}',
+        }
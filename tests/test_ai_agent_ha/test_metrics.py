@@ -0,0 +1,182 @@
+"""Tests for query metrics, their sensors and diagnostics."""
+
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+try:
+    import homeassistant
+
+    # Imported at collection, before config flow tests mock out voluptuous
+    from custom_components.ai_agent_ha.diagnostics import (
+        async_get_config_entry_diagnostics,
+    )
+
+    HOMEASSISTANT_AVAILABLE = True
+except ImportError:
+    HOMEASSISTANT_AVAILABLE = False
+
+
+@pytest.fixture
+def mock_hass(mock_hass):
+    """Add a shared metrics collector to the mock hass object."""
+    from custom_components.ai_agent_ha.const import DOMAIN
+    from custom_components.ai_agent_ha.metrics import MetricsCollector
+
+    mock_hass.data[DOMAIN]["metrics"] = MetricsCollector()
+    mock_hass.states.get.return_value = None
+    return mock_hass
+
+
+class TestMetrics:
+    """Test recording, aggregation and publishing of query metrics."""
+
+    def test_collector_aggregates_per_provider_and_model(self, mock_hass):
+        """Test counters, percentiles and listener notification."""
+        from custom_components.ai_agent_ha import metrics
+
+        collector = metrics.MetricsCollector()
+        notified = []
+        remove = collector.add_listener(notified.append)
+
+        for latency in range(1, 101):
+            with collector.track_query("openai"):
+                metrics.set_query_model("openai", "gpt-4o")
+                metrics.record_ai_request(latency / 1000)
+                metrics.record_usage({"usage": {"prompt_tokens": 10}})
+
+        with pytest.raises(RuntimeError):
+            with collector.track_query("gemini"):
+                metrics.record_retry()
+                raise RuntimeError("boom")
+
+        # Nothing is recorded outside of a query
+        metrics.record_cache_hit()
+
+        summary = collector.provider_summary("openai")
+        assert summary["queries"] == 100
+        assert summary["prompt_tokens"] == 1000
+        assert summary["iterations_per_query"] == 1
+        assert summary["ai_latency"]["p50_ms"] == 50.0
+        assert summary["ai_latency"]["p95_ms"] == 95.0
+        assert summary["ai_latency"]["p99_ms"] == 99.0
+        assert summary["models"] == ["gpt-4o"]
+        assert collector.provider_summary("gemini")["errors"] == 1
+        assert collector.provider_summary("gemini")["retries"] == 1
+        assert notified == ["openai"] * 100 + ["gemini"]
+
+        remove()
+        with collector.track_query("openai"):
+            pass
+        assert len(notified) == 101
+        assert collector.provider_summary("openai")["queries"] == 101
+
+    def test_usage_formats(self, mock_hass):
+        """Test token usage extraction for each provider response format."""
+        from custom_components.ai_agent_ha.metrics import _extract_usage
+
+        assert _extract_usage(
+            {"usage": {"prompt_tokens": 3, "completion_tokens": 4}}
+        ) == (3, 4)
+        assert _extract_usage({"usage": {"input_tokens": 5, "output_tokens": 6}}) == (
+            5,
+            6,
+        )
+        assert _extract_usage(
+            {
+                "usageMetadata": {
+                    "promptTokenCount": 7,
+                    "candidatesTokenCount": 8,
+                    "thoughtsTokenCount": 2,
+                }
+            }
+        ) == (7, 10)
+        assert _extract_usage({"prompt_eval_count": 9, "eval_count": 1}) == (9, 1)
+        assert _extract_usage(
+            {
+                "metrics": [
+                    {"metric": "num_prompt_tokens", "value": 11},
+                    {"metric": "num_completion_tokens", "value": 12},
+                ]
+            }
+        ) == (11, 12)
+        assert _extract_usage({"choices": []}) == (0, 0)
+
+    @pytest.mark.asyncio
+    async def test_process_query_records_metrics(self, mock_hass):
+        """Test that a query records AI requests, tokens, tools and errors."""
+        from custom_components.ai_agent_ha import metrics
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        responses = iter(
+            [
+                '{"request_type": "get_entity_state", '
+                '"parameters": {"entity_id": "light.missing"}}',
+                '{"request_type": "final_response", "response": "Done"}',
+            ]
+        )
+
+        async def get_response(messages, **kwargs):
+            metrics.record_usage({"usage": {"input_tokens": 100, "output_tokens": 5}})
+            return next(responses)
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "anthropic", "anthropic_token": "sk-ant-test-token-123"},
+            persist_history=False,
+        )
+        agent._get_client = MagicMock(
+            return_value=MagicMock(get_response=AsyncMock(side_effect=get_response))
+        )
+
+        failed = await agent.process_query("Is the light on?", provider="anthropic")
+        assert "not found" in failed["error"]
+        done = await agent.process_query("Say done", provider="anthropic")
+        assert done["success"] is True
+
+        collector = mock_hass.data[DOMAIN]["metrics"]
+        summary = collector.provider_summary("anthropic")
+        assert summary["queries"] == 2
+        assert summary["errors"] == 1
+        assert summary["ai_requests"] == 2
+        assert summary["prompt_tokens"] == 200
+        assert summary["completion_tokens"] == 10
+        (model_metrics,) = collector.as_dict()
+        assert model_metrics["model"] == "claude-sonnet-4-5-20250929"
+        assert model_metrics["tools"]["get_entity_state"]["count"] == 1
+        assert model_metrics["tools"]["get_entity_state"]["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sensors_and_diagnostics(self, mock_hass):
+        """Test that sensors read the summary and diagnostics are redacted."""
+        from custom_components.ai_agent_ha.const import DOMAIN
+        from custom_components.ai_agent_ha.metrics import record_ai_request
+        from custom_components.ai_agent_ha.sensor import SENSORS, AiAgentMetricsSensor
+
+        collector = mock_hass.data[DOMAIN]["metrics"]
+        with collector.track_query("openai"):
+            record_ai_request(0.25)
+
+        entry = MagicMock(entry_id="abc", title="AI Agent HA (openai)")
+        entry.data = {"ai_provider": "openai", "openai_token": "sk-secret"}
+        sensors = {
+            description.key: AiAgentMetricsSensor(
+                collector, entry, "openai", description
+            )
+            for description in SENSORS
+        }
+        assert sensors["queries"].native_value == 1
+        assert sensors["ai_latency_p95"].native_value == 250.0
+        assert sensors["query_latency_p99"].unique_id == "abc_query_latency_p99"
+        assert sensors["errors"].entity_category == "diagnostic"
+
+        diagnostics = await async_get_config_entry_diagnostics(mock_hass, entry)
+        assert diagnostics["entry"]["openai_token"] == "**REDACTED**"
+        assert diagnostics["metrics"][0]["ai_latency"]["count"] == 1
+        assert diagnostics["client_registry"]["clients"] == 0
@@ -0,0 +1,145 @@
+"""Tests for paging oversized tool results."""
+
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def registry(size):
+    """Return entity registry entries spread over two domains and areas."""
+    return [
+        {
+            "entity_id": f"{'sensor' if n % 4 else 'light'}.entity_{n}",
+            "area_id": f"area_{n % 2}",
+            "platform": "bench",
+        }
+        for n in range(size)
+    ]
+
+
+class TestPaging:
+    """Test budgeted pages, summaries and continuation tokens."""
+
+    def test_paginate(self, mock_hass):
+        """Test that only results over the budget are paged."""
+        from custom_components.ai_agent_ha import paging
+
+        small = registry(3)
+        assert paging.paginate("get_entity_registry", {}, small) is small
+        assert paging.paginate("get_entity_state", {}, {"state": "on"}) == {
+            "state": "on"
+        }
+
+        entries = registry(1000)
+        page = paging.paginate("get_entity_registry", {}, entries, budget_chars=2000)
+        assert len(json.dumps(page["items"], separators=(",", ":"))) <= 2000
+        assert page["total"] == 1000
+        assert page["offset"] == 0
+        assert page["returned"] == len(page["items"]) > 0
+        assert page["summary"] == {
+            "count": 1000,
+            "domains": {"sensor": 750, "light": 250},
+            "areas": {"area_0": 500, "area_1": 500},
+        }
+
+        # The continuation picks up where the page ended, without a summary
+        following = paging.paginate(
+            "get_entity_registry",
+            {"continuation": page["continuation"]},
+            entries,
+            budget_chars=2000,
+        )
+        assert following["offset"] == page["returned"]
+        assert following["items"][0] == entries[page["returned"]]
+        assert "summary" not in following
+
+        # Explicit paging returns a page even when it fits
+        last = paging.paginate("get_entity_registry", {"offset": 998}, entries)
+        assert last["items"] == entries[998:]
+        assert "continuation" not in last
+        assert (
+            paging.paginate("get_entity_registry", {"limit": 2}, entries)["items"]
+            == entries[:2]
+        )
+
+        # Tokens only continue the request they came from
+        for parameters in (
+            {"continuation": page["continuation"], "domain": "light"},
+            {"continuation": "garbage"},
+            {"offset": -1},
+            {"limit": 0},
+        ):
+            with pytest.raises(paging.PagingError):
+                paging.paginate("get_entity_registry", parameters, entries)
+
+    @pytest.mark.asyncio
+    async def test_agent_pages_large_results(self, mock_hass):
+        """Test that the model sees a bounded page and can ask for the next."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+        agent._tool_result_budget = 3000
+        entries = registry(2000)
+        agent.get_entity_registry = AsyncMock(return_value=entries)
+        sent = []
+
+        async def get_response(messages, **kwargs):
+            sent.append(messages[-1]["content"])
+            if len(sent) == 1:
+                return '{"request_type": "get_entity_registry", "parameters": {}}'
+            if len(sent) == 2:
+                continuation = json.loads(sent[-1])["data"]["continuation"]
+                return json.dumps(
+                    {
+                        "request_type": "get_entity_registry",
+                        "parameters": {"continuation": continuation},
+                    }
+                )
+            return '{"request_type": "final_response", "response": "Plenty"}'
+
+        agent._get_client = MagicMock(
+            return_value=MagicMock(get_response=AsyncMock(side_effect=get_response))
+        )
+
+        result = await agent.process_query("How many entities do I have?")
+        assert result == {"success": True, "answer": "Plenty"}
+        first, second = (json.loads(message)["data"] for message in sent[1:])
+        assert len(sent[1]) < 3000 + 500
+        assert first["total"] == 2000
+        assert first["summary"]["count"] == 2000
+        assert second["offset"] == first["returned"]
+        assert second["items"][0] == entries[first["returned"]]
+
+    @pytest.mark.asyncio
+    async def test_invalid_continuation_fails_query(self, mock_hass):
+        """Test that a forged continuation is reported as an error."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+        agent.get_entity_registry = AsyncMock(return_value=registry(10))
+        agent._get_client = MagicMock(
+            return_value=MagicMock(
+                get_response=AsyncMock(
+                    return_value='{"request_type": "get_entity_registry", '
+                    '"parameters": {"continuation": "5:deadbeef"}}'
+                )
+            )
+        )
+
+        result = await agent.process_query("More entities please")
+        assert result["success"] is False
+        assert "Invalid continuation" in result["error"]
@@ -0,0 +1,107 @@
+"""Tests for speculative prefetch of tool data."""
+
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@pytest.fixture
+def mock_hass(mock_hass):
+    """Add entity counts per domain to the mock hass object."""
+    mock_hass.states.async_entity_ids_count = lambda domain: {
+        "light": 12,
+        "switch": 500,
+        "weather": 1,
+    }.get(domain, 0)
+    return mock_hass
+
+
+AREAS = {"living room": "living_room", "lounge": "living_room", "room": "room"}
+
+
+class TestPrefetch:
+    """Test request prediction and use of prefetched results."""
+
+    def test_predict_requests(self, mock_hass):
+        """Test that areas, small domains and the weather are predicted."""
+        from custom_components.ai_agent_ha import prefetch
+
+        counts = {"light": 12, "switch": 500, "weather": 1}
+        assert prefetch.predict_requests(
+            "Turn off the lights in the Living Room", AREAS, counts
+        ) == [
+            ("get_entities_by_area", {"area_id": "living_room"}),
+            ("get_entities_by_domain", {"domain": "light"}),
+        ]
+        # Aliases match, large domains are skipped
+        assert prefetch.predict_requests(
+            "Are any switches on in the lounge?", AREAS, counts
+        ) == [("get_entities_by_area", {"area_id": "living_room"})]
+        assert prefetch.predict_requests("Will it rain today?", {}, counts) == [
+            ("get_weather_data", {})
+        ]
+        assert prefetch.predict_requests("Will it rain today?", {}, {}) == []
+        # Whole words only: "delighted" is not about lights
+        assert prefetch.predict_requests("I am delighted", AREAS, counts) == []
+
+    @pytest.mark.asyncio
+    async def test_agent_uses_prefetched_data(self, mock_hass):
+        """Test that a predicted request is answered from the prefetch."""
+        from custom_components.ai_agent_ha import prefetch
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+        sofa = {"entity_id": "light.sofa", "state": "on"}
+        agent.get_entities_by_domain = AsyncMock(side_effect=lambda *args: [dict(sofa)])
+        mock_hass.services.async_call = AsyncMock(
+            side_effect=lambda *args: sofa.update(state="off")
+        )
+        domain_request = json.dumps(
+            {"request_type": "get_entities_by_domain", "parameters": {"domain": "light"}}
+        )
+        turn_off = json.dumps(
+            {
+                "request_type": "call_service",
+                "domain": "light",
+                "service": "turn_off",
+                "target": {"entity_id": "light.sofa"},
+            }
+        )
+        done = '{"request_type": "final_response", "response": "Done"}'
+        replies = []
+
+        async def get_response(messages, **kwargs):
+            await asyncio.sleep(0)  # the provider request lets prefetches run
+            return replies.pop(0)
+
+        client = MagicMock(get_response=AsyncMock(side_effect=get_response))
+        agent._get_client = MagicMock(return_value=client)
+
+        with patch.object(prefetch, "build_area_index", return_value=AREAS):
+            replies[:] = [domain_request, done]
+            result = await agent.process_query("Are the lights on?")
+            assert result == {"success": True, "answer": "Done"}
+            sent = client.get_response.await_args.args[0][-1]["content"]
+            assert json.loads(sent)["data"] == [sofa]
+            # Fetched once, ahead of the model's request
+            assert agent.get_entities_by_domain.await_count == 1
+
+            # After a service call the prefetched states are stale and the
+            # request is fetched again
+            replies[:] = [turn_off, domain_request, done]
+            result = await agent.process_query("Turn off the lights")
+            assert result == {"success": True, "answer": "Done"}
+            assert agent.get_entities_by_domain.await_count == 3
+            sent = client.get_response.await_args.args[0][-1]["content"]
+            assert json.loads(sent)["data"][0]["state"] == "off"
@@ -0,0 +1,124 @@
+"""Tests for field and attribute projection of entity tool results."""
+
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def media_player_state():
+    """Return a get_entity_state style result with bulky attributes."""
+    return {
+        "entity_id": "media_player.living_room",
+        "state": "playing",
+        "last_changed": None,
+        "friendly_name": "Living Room",
+        "area_id": "living_room",
+        "area_name": "Living Room",
+        "attributes": {
+            "friendly_name": "Living Room",
+            "volume_level": 0.4,
+            "media_title": "Song",
+            "source_list": [f"Source {n}" for n in range(40)],
+            "supported_features": 152463,
+            "queue": ["track"] * 200,
+        },
+    }
+
+
+class TestProjection:
+    """Test default projections and explicit field selection."""
+
+    def test_project_entity_state(self, mock_hass):
+        """Test default, explicit and wildcard projections."""
+        from custom_components.ai_agent_ha.projection import project_entity_state
+
+        result = media_player_state()
+        projected = project_entity_state(result)
+        assert projected["attributes"] == {"volume_level": 0.4, "media_title": "Song"}
+        # Domain data, common exclusions and the size cap are all listed
+        assert projected["omitted_attributes"] == [
+            "source_list",
+            "supported_features",
+            "queue",
+        ]
+        assert projected["area_name"] == "Living Room"
+
+        assert project_entity_state(result, fields=["state"]) == {
+            "entity_id": "media_player.living_room",
+            "state": "playing",
+        }
+        assert project_entity_state(
+            result, fields="state", attributes="source_list, missing"
+        ) == {
+            "entity_id": "media_player.living_room",
+            "state": "playing",
+            "attributes": {"source_list": result["attributes"]["source_list"]},
+        }
+        everything = project_entity_state(result, attributes="*")
+        assert everything["attributes"] == result["attributes"]
+        assert "omitted_attributes" not in everything
+
+    @pytest.mark.asyncio
+    async def test_agent_projects_entity_tools(self, mock_hass):
+        """Test projection of entity tools and caching of the default only."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.const import DOMAIN
+        from custom_components.ai_agent_ha.state_cache import EntityStateCache
+
+        light = MagicMock(
+            entity_id="light.kitchen",
+            state="on",
+            last_changed=None,
+            last_updated=1,
+            attributes={
+                "friendly_name": "Kitchen",
+                "brightness": 200,
+                "effect_list": ["rainbow", "blink"],
+            },
+        )
+        mock_hass.states.get = lambda entity_id: light
+        mock_hass.states.async_all = lambda: [light]
+        mock_hass.data[DOMAIN]["state_cache"] = EntityStateCache(mock_hass)
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+
+        default = await agent.get_entity_state("light.kitchen")
+        assert default["attributes"] == {"brightness": 200}
+        assert default["omitted_attributes"] == ["effect_list"]
+        assert await agent.get_entity_state("light.kitchen") is default
+        selected = await agent.get_entity_state(
+            "light.kitchen", attributes=["effect_list"]
+        )
+        assert selected["attributes"] == {"effect_list": ["rainbow", "blink"]}
+        assert await agent.get_entity_state("light.kitchen") is default
+
+        sent = []
+
+        async def get_response(messages, **kwargs):
+            sent.append(messages[-1]["content"])
+            if len(sent) == 1:
+                return json.dumps(
+                    {
+                        "request_type": "get_entities_by_domain",
+                        "parameters": {"domain": "light", "fields": ["state"]},
+                    }
+                )
+            return '{"request_type": "final_response", "response": "On"}'
+
+        agent._get_client = MagicMock(
+            return_value=MagicMock(get_response=AsyncMock(side_effect=get_response))
+        )
+        result = await agent.process_query("Which lights are on?")
+        assert result == {"success": True, "answer": "On"}
+        assert json.loads(sent[1])["data"] == [
+            {"entity_id": "light.kitchen", "state": "on"}
+        ]
@@ -0,0 +1,62 @@
+"""Tests for lazily imported provider clients."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+class TestProviders:
+    """Test provider clients are imported on first use."""
+
+    def test_import_loads_no_provider(self, mock_hass):
+        """Test importing the integration loads no provider client module."""
+        code = (
+            "import sys\n"
+            "import custom_components.ai_agent_ha\n"
+            "print(sorted(m for m in sys.modules\n"
+            "    if m.startswith('custom_components.ai_agent_ha.')))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=REPO_ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        assert "custom_components.ai_agent_ha.providers.base" in output
+        for module in ("openai", "gemini", "bedrock", "local"):
+            assert f"custom_components.ai_agent_ha.providers.{module}'" not in output
+        assert "automation_store" not in output
+        assert "dashboards" not in output
+
+    @pytest.mark.asyncio
+    async def test_client_classes(self, mock_hass):
+        """Test agents build clients of lazily loaded classes."""
+        from custom_components.ai_agent_ha import agent
+        from custom_components.ai_agent_ha.providers import (
+            PROVIDER_CLIENTS,
+            client_class,
+        )
+        from custom_components.ai_agent_ha.providers.gemini import GeminiClient
+
+        for provider in PROVIDER_CLIENTS:
+            cls = client_class(provider)
+            # Names that moved out of agent.py are still importable from it
+            assert getattr(agent, cls.__name__) is cls
+
+        gemini = agent.AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "gemini", "gemini_token": "test-token"},
+            persist_history=False,
+        )
+        assert isinstance(gemini.ai_client, GeminiClient)
+        assert agent.merge_turns is not None
+        with pytest.raises(AttributeError):
+            agent.NoSuchClient
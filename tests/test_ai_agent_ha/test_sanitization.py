@@ -1,5 +1,6 @@
 """Tests for the sanitization utility function."""
 
+import importlib.util
 import os
 import sys
 
@@ -9,73 +10,28 @@ import pytest
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 
-# Import the sanitization function directly without importing the full module
-# This avoids dependency on homeassistant which may not be installed
-def get_sanitize_function():
-    """Get the sanitize_for_logging function without importing full module."""
-    from typing import Any
-
-    def sanitize_for_logging(data: Any, mask: str = "***REDACTED***") -> Any:
-        """Sanitize sensitive data for safe logging.
-
-        Recursively masks sensitive fields like API keys, tokens, passwords, etc.
-        This prevents accidental exposure of credentials in debug logs.
-
-        Args:
-            data: The data structure to sanitize (dict, list, str, etc.)
-            mask: The string to use for masking sensitive values
-
-        Returns:
-            A sanitized copy of the data with sensitive fields masked
-        """
-        # Sensitive field patterns (case-insensitive)
-        sensitive_patterns = {
-            "token",
-            "key",
-            "password",
-            "secret",
-            "credential",
-            "auth",
-            "authorization",
-            "api_key",
-            "apikey",
-            "llama_token",
-            "openai_token",
-            "gemini_token",
-            "anthropic_token",
-            "openrouter_token",
-        }
-
-        if isinstance(data, dict):
-            sanitized = {}
-            for key, value in data.items():
-                # Check if key matches any sensitive pattern
-                key_lower = str(key).lower()
-                is_sensitive = any(
-                    pattern in key_lower for pattern in sensitive_patterns
-                )
-
-                if is_sensitive:
-                    sanitized[key] = mask
-                else:
-                    # Recursively sanitize nested structures
-                    sanitized[key] = sanitize_for_logging(value, mask)
-            return sanitized
+SANITIZE_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "..",
+    "custom_components",
+    "ai_agent_ha",
+    "sanitize.py",
+)
 
-        elif isinstance(data, list):
-            return [sanitize_for_logging(item, mask) for item in data]
 
-        elif isinstance(data, tuple):
-            return tuple(sanitize_for_logging(item, mask) for item in data)
-
-        else:
-            # Primitive types (str, int, bool, etc.) - return as-is
-            return data
-
-    return sanitize_for_logging
+# Import sanitize.py directly without importing the integration package
+# This avoids dependency on homeassistant which may not be installed
+def load_sanitize_module():
+    """Load sanitize.py without importing the full integration."""
+    spec = importlib.util.spec_from_file_location("sanitize", SANITIZE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
 
-sanitize_for_logging = get_sanitize_function()
+sanitize = load_sanitize_module()
+sanitize_for_logging = sanitize.sanitize_for_logging
 
 
 class TestSanitization:
@@ -280,3 +236,69 @@ class TestSanitization:
         assert result["Authorization"] == "***REDACTED***"
         assert result["X-API-Key"] == "***REDACTED***"
         assert result["User-Agent"] == "HomeAssistant/1.0"
+
+    def test_sanitize_leaves_input_unchanged(self):
+        """Test that the input is never modified."""
+        data = {"config": {"token": "secret"}, "items": [{"password": "pw"}]}
+        result = sanitize_for_logging(data)
+
+        assert data == {"config": {"token": "secret"}, "items": [{"password": "pw"}]}
+        assert result["items"][0]["password"] == "***REDACTED***"
+        assert result is not data
+
+    def test_sanitize_copy_on_write(self):
+        """Test that unchanged containers are shared with copy_on_write."""
+        clean = {"history": [{"role": "user", "content": "hi"}], "n": (1, 2)}
+        assert sanitize_for_logging(clean, copy_on_write=True) is clean
+        assert sanitize_for_logging(clean) is not clean
+
+        data = {"safe": clean, "auth": {"token": "secret"}}
+        result = sanitize_for_logging(data, copy_on_write=True)
+        assert result is not data
+        assert result["safe"] is clean
+        assert result["auth"] == "***REDACTED***"
+
+    def test_sanitize_depth_limit(self):
+        """Test deep nesting is truncated instead of hitting recursion limits."""
+        data = current = {}
+        for _ in range(5000):
+            current["child"] = current = {}
+        current["token"] = "secret"
+
+        result = sanitize_for_logging(data)
+        depth = 0
+        while isinstance(result, dict):
+            result = result["child"]
+            depth += 1
+        assert result == sanitize.TRUNCATED
+        assert depth == sanitize.MAX_DEPTH + 1
+
+        shallow = sanitize_for_logging(
+            [[["deep"]], "top"], max_depth=1, copy_on_write=True
+        )
+        assert shallow == [[sanitize.TRUNCATED], "top"]
+
+    def test_sanitize_size_limit(self):
+        """Test containers past the item budget are truncated."""
+        data = [{"token": "a"}, {"token": "b"}, {"token": "c"}, "plain"]
+        result = sanitize_for_logging(data, max_items=2)
+
+        assert result == [
+            {"token": "***REDACTED***"},
+            sanitize.TRUNCATED,
+            sanitize.TRUNCATED,
+            "plain",
+        ]
+
+    def test_sensitive_key_decisions(self):
+        """Test the key matcher, its cache and non-string keys."""
+        assert sanitize.is_sensitive_key("X-Goog-Api-Key")
+        assert sanitize.is_sensitive_key("X-Goog-Api-Key")
+        assert sanitize.is_sensitive_key("refresh_TOKEN")
+        assert not sanitize.is_sensitive_key("entity_id")
+        assert not sanitize.is_sensitive_key(42)
+        assert sanitize._key_decisions["X-Goog-Api-Key"] is True
+        assert sanitize_for_logging({1: "one", "secret_x": 2}) == {
+            1: "one",
+            "secret_x": "***REDACTED***",
+        }
@@ -0,0 +1,129 @@
+"""Tests for priority-aware admission of queries."""
+
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def make_scheduler():
+    """Return a scheduler with two slots, one for background queries."""
+    from custom_components.ai_agent_ha.scheduler import PriorityClass, QueryScheduler
+
+    return QueryScheduler(
+        {
+            "interactive": PriorityClass(max_concurrent=2, max_queued=2, deadline=5),
+            "panel": PriorityClass(max_concurrent=2, max_queued=2, deadline=5),
+            "background": PriorityClass(max_concurrent=1, max_queued=2, deadline=5),
+        },
+        max_concurrent=2,
+    )
+
+
+class TestScheduler:
+    """Test priority order, caps, bounded queues and deadlines."""
+
+    @pytest.mark.asyncio
+    async def test_priority_order_and_caps(self, mock_hass):
+        """Test that waiting queries start by priority within the caps."""
+        scheduler = make_scheduler()
+        release = asyncio.Event()
+        started = []
+
+        async def query(name, priority):
+            async with scheduler.slot(priority):
+                started.append(name)
+                await release.wait()
+
+        tasks = [
+            asyncio.ensure_future(query(name, priority))
+            for name, priority in [
+                ("auto 1", "background"),
+                ("auto 2", "background"),
+                ("panel", "panel"),
+                ("auto 3", "background"),
+                ("voice", "interactive"),
+            ]
+        ]
+        await asyncio.sleep(0)
+        # Background queries take at most one of the two slots
+        assert started == ["auto 1", "panel"]
+        assert scheduler.as_dict()["classes"]["background"]["waiting"] == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        # The interactive query went ahead of the automations queued before it
+        assert started == ["auto 1", "panel", "voice", "auto 2", "auto 3"]
+        stats = scheduler.as_dict()
+        assert stats["running"] == 0
+        assert stats["classes"]["background"]["admitted"] == 3
+
+    @pytest.mark.asyncio
+    async def test_admission_control(self, mock_hass):
+        """Test rejections for full queues, expected waits and timeouts."""
+        from custom_components.ai_agent_ha.scheduler import QueryRejected
+
+        scheduler = make_scheduler()
+        release = asyncio.Event()
+
+        async def query(priority, deadline=None):
+            async with scheduler.slot(priority, deadline):
+                await release.wait()
+
+        running = [asyncio.ensure_future(query("panel")) for _ in range(2)]
+        queued = [asyncio.ensure_future(query("background")) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(QueryRejected) as err:
+            await query("background")
+        assert err.value.reason == "queue_full"
+
+        with pytest.raises(QueryRejected) as err:
+            await query("interactive", deadline=0.01)
+        assert err.value.reason == "timeout"
+        assert scheduler.as_dict()["classes"]["interactive"]["waiting"] == 0
+
+        # Once durations are known, hopeless waits are rejected up front
+        scheduler.mean_duration = 60
+        with pytest.raises(QueryRejected) as err:
+            await query("panel")
+        assert err.value.reason == "deadline"
+
+        release.set()
+        await asyncio.gather(*running, *queued)
+        assert scheduler.as_dict()["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_agent_reports_rejected_query(self, mock_hass):
+        """Test that a query the scheduler rejects fails without running."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        scheduler = make_scheduler()
+        mock_hass.data[DOMAIN]["scheduler"] = scheduler
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+        client = MagicMock(
+            get_response=AsyncMock(
+                return_value='{"request_type": "final_response", "response": "Hi"}'
+            )
+        )
+        agent._get_client = MagicMock(return_value=client)
+
+        result = await agent.process_query("Hello", priority="interactive")
+        assert result == {"success": True, "answer": "Hi"}
+        assert scheduler.mean_duration is not None
+
+        scheduler.max_concurrent = 0
+        scheduler.mean_duration = 60
+        result = await agent.process_query("Hello", priority="background")
+        assert result["success"] is False
+        assert "busy" in result["error"]
+        assert client.get_response.await_count == 1
@@ -0,0 +1,135 @@
+"""Tests for recording query sessions."""
+
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@pytest.fixture
+def mock_hass(mock_hass, tmp_path):
+    """Add a session recorder writing to a temporary file."""
+    from custom_components.ai_agent_ha.agent import sanitize_for_logging
+    from custom_components.ai_agent_ha.const import DOMAIN
+    from custom_components.ai_agent_ha.session_recorder import SessionRecorder
+
+    mock_hass.async_add_executor_job = MagicMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+    mock_hass.data[DOMAIN]["session_recorder"] = SessionRecorder(
+        mock_hass, sanitize_for_logging, path=str(tmp_path / "sessions.jsonl")
+    )
+    return mock_hass
+
+
+def make_agent(hass, responses):
+    """Return an agent answering from the given responses."""
+    from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+    replies = iter(responses)
+    agent = AiAgentHaAgent(
+        hass,
+        {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+        persist_history=False,
+    )
+    agent._get_client = MagicMock(
+        return_value=MagicMock(
+            get_response=AsyncMock(side_effect=lambda *a, **k: next(replies))
+        )
+    )
+    return agent
+
+
+class TestSessionRecorder:
+    """Test recording sessions for replay."""
+
+    @pytest.mark.asyncio
+    async def test_records_turns_and_masks_secrets(self, mock_hass):
+        """Test that a query is recorded turn by turn with secrets masked."""
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        recorder = mock_hass.data[DOMAIN]["session_recorder"]
+        recorder.enabled = True
+        agent = make_agent(
+            mock_hass,
+            [
+                '{"request_type": "get_entity_state", '
+                '"parameters": {"entity_id": "sensor.router"}}',
+                '{"request_type": "final_response", "response": "It is online"}',
+            ],
+        )
+        agent.conversation_history = [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi"},
+        ]
+        agent.get_entity_state = AsyncMock(
+            return_value={
+                "entity_id": "sensor.router",
+                "state": "online",
+                "attributes": {"api_key": "secret-value"},
+            }
+        )
+
+        result = await agent.process_query("Is the router online?")
+        assert result == {"success": True, "answer": "It is online"}
+        assert recorder.recorded == 1
+
+        with open(recorder.path, encoding="utf-8") as sessions_file:
+            (line,) = sessions_file.read().splitlines()
+        assert "secret-value" not in line
+        session = json.loads(line)
+        assert session["query"] == "Is the router online?"
+        assert session["provider"] == "openai"
+        assert session["model"] == "gpt-3.5-turbo"
+        assert session["history"] == agent.conversation_history[:2]
+        assert session["result"] == result
+
+        first, tool, second = session["turns"]
+        assert first["input"] == {"role": "user", "content": "Is the router online?"}
+        assert first["messages"] == 4  # system prompt, history and query
+        assert first["prompt_chars"] > len("Is the router online?")
+        assert tool["tool"] == "get_entity_state"
+        assert tool["parameters"] == {"entity_id": "sensor.router"}
+        assert tool["result"]["state"] == "online"
+        assert second["input"]["content"].startswith("{")
+        assert second["messages"] == first["messages"] + 2
+        assert json.loads(second["response"])["response"] == "It is online"
+
+    @pytest.mark.asyncio
+    async def test_nothing_recorded_while_disabled(self, mock_hass):
+        """Test that queries are not recorded unless recording is enabled."""
+        from custom_components.ai_agent_ha.const import DOMAIN
+
+        recorder = mock_hass.data[DOMAIN]["session_recorder"]
+        agent = make_agent(
+            mock_hass, ['{"request_type": "final_response", "response": "Done"}']
+        )
+
+        result = await agent.process_query("Anything?")
+        assert result["success"] is True
+        assert recorder.recorded == 0
+        assert not os.path.exists(recorder.path)
+        mock_hass.async_add_executor_job.assert_not_called()
+
+    def test_concurrent_writes_keep_lines_whole(self, mock_hass, tmp_path):
+        """Test that writes from several executor threads never interleave."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from custom_components.ai_agent_ha.debug_files import append_line
+
+        path = str(tmp_path / "debug" / "sessions.jsonl")
+        lines = [json.dumps({"n": n, "text": "x" * (n % 500)}) for n in range(400)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda line: append_line(path, line, 20000), lines))
+
+        written = []
+        for name in (f"{path}.1", path):
+            with open(name, encoding="utf-8") as f:
+                written.extend(json.loads(line) for line in f.read().splitlines())
+        assert len({entry["n"] for entry in written}) == len(written)
+        assert os.path.getsize(path) <= 20000 + max(len(line) for line in lines) + 1
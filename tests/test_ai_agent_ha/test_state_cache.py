@@ -0,0 +1,113 @@
+"""Tests for the serialized entity state cache."""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+try:
+    import homeassistant
+
+    HOMEASSISTANT_AVAILABLE = True
+except ImportError:
+    HOMEASSISTANT_AVAILABLE = False
+
+
+def _result(entity_id, state="on"):
+    """Create a get_entity_state style result."""
+    return {
+        "entity_id": entity_id,
+        "state": state,
+        "last_changed": "2025-01-01T00:00:00+00:00",
+        "friendly_name": entity_id,
+        "area_id": None,
+        "area_name": None,
+        "attributes": {"brightness": 255},
+    }
+
+
+class TestEntityStateCache:
+    """Test cache hits, invalidation, bounds and payload encoding."""
+
+    @pytest.fixture(autouse=True)
+    def _require_homeassistant(self):
+        """Skip when Home Assistant is not installed."""
+        if not HOMEASSISTANT_AVAILABLE:
+            pytest.skip("Home Assistant not available")
+
+    def test_hit_requires_matching_last_updated(self):
+        """Test that entries are only returned for the same last_updated."""
+        from custom_components.ai_agent_ha.state_cache import EntityStateCache
+
+        cache = EntityStateCache(MagicMock())
+        stored = cache.put("light.kitchen", 1, _result("light.kitchen"))
+
+        assert cache.get("light.kitchen", 1) is stored
+        assert cache.get("light.kitchen", 2) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_state_changed_and_registry_events_invalidate(self):
+        """Test event-driven invalidation."""
+        from custom_components.ai_agent_ha.state_cache import EntityStateCache
+
+        cache = EntityStateCache(MagicMock())
+        cache.put("light.kitchen", 1, _result("light.kitchen"))
+        cache.put("light.hall", 1, _result("light.hall"))
+
+        cache._handle_state_changed(SimpleNamespace(data={"entity_id": "light.hall"}))
+        assert cache.get("light.hall", 1) is None
+        assert len(cache) == 1
+
+        cache._handle_registry_updated(SimpleNamespace(data={}))
+        assert len(cache) == 0
+        assert cache.size == 0
+
+    def test_memory_bound_evicts_least_recently_used(self):
+        """Test that the oldest entries are evicted once over budget."""
+        from custom_components.ai_agent_ha.state_cache import EntityStateCache
+
+        from custom_components.ai_agent_ha import json_codec
+
+        fragment_size = len(json_codec.dumps(_result("light.a")))
+        cache = EntityStateCache(MagicMock(), max_chars=fragment_size * 2)
+        cache.put("light.a", 1, _result("light.a"))
+        cache.put("light.b", 1, _result("light.b"))
+        cache.get("light.a", 1)
+        cache.put("light.c", 1, _result("light.c"))
+
+        assert cache.get("light.b", 1) is None
+        assert cache.get("light.a", 1) is not None
+        assert cache.size <= fragment_size * 2
+
+    def test_encode_data_payload_matches_codec(self):
+        """Test that joined fragments encode exactly like the JSON codec."""
+        from custom_components.ai_agent_ha import json_codec
+        from custom_components.ai_agent_ha.state_cache import (
+            EntityStateCache,
+            encode_data_payload,
+        )
+
+        original_backend = json_codec.BACKEND
+        for backend in json_codec.available_backends():
+            json_codec.use_backend(backend)
+            try:
+                cache = EntityStateCache(MagicMock())
+                items = [
+                    cache.put(entity_id, 1, _result(entity_id))
+                    for entity_id in ("light.a", "light.b")
+                ]
+
+                assert encode_data_payload(items) == json_codec.dumps({"data": items})
+                assert encode_data_payload(items[0]) == json_codec.dumps(
+                    {"data": items[0]}
+                )
+                mixed = [items[0], {"error": "x"}]
+                assert encode_data_payload(mixed) == json_codec.dumps({"data": mixed})
+                assert encode_data_payload([]) == '{"data":[]}'
+            finally:
+                json_codec.use_backend(original_backend)
@@ -0,0 +1,184 @@
+"""Tests for per-query trace spans."""
+
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class TestTracing:
+    """Test span recording, debug responses and OTLP export."""
+
+    @pytest.mark.asyncio
+    async def test_debug_response_includes_query_spans(self, mock_hass):
+        """Test the span tree of a query with a tool call."""
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        responses = iter(
+            [
+                '{"request_type": "get_entity_state", '
+                '"parameters": {"entity_id": "light.kitchen"}}',
+                '{"request_type": "final_response", "response": "It is on"}',
+                '{"request_type": "final_response", "response": "Still on"}',
+            ]
+        )
+        agent = AiAgentHaAgent(
+            mock_hass,
+            {"ai_provider": "openai", "openai_token": "sk-test-token-1234567890abc"},
+            persist_history=False,
+        )
+        agent._get_client = MagicMock(
+            return_value=MagicMock(
+                get_response=AsyncMock(side_effect=lambda *a, **k: next(responses))
+            )
+        )
+        agent.get_entity_state = AsyncMock(
+            return_value={"entity_id": "light.kitchen", "state": "on"}
+        )
+
+        result = await agent.process_query("Is the kitchen light on?", debug=True)
+        assert result["success"] is True
+        trace = result["debug"]["trace"]
+        spans = {span["span_id"]: span for span in trace["spans"]}
+        tree = [
+            (
+                span["name"],
+                spans[span["parent_id"]]["name"] if span["parent_id"] else None,
+            )
+            for span in trace["spans"]
+        ]
+        assert tree == [
+            ("query", None),
+            ("iteration", "query"),
+            ("provider_call", "iteration"),
+            ("tool", "iteration"),
+            ("iteration", "query"),
+            ("provider_call", "iteration"),
+        ]
+        query, _, call, tool, *_ = trace["spans"]
+        assert query["attributes"]["model"] == "gpt-3.5-turbo"
+        assert call["attributes"]["response_chars"] > 0
+        assert tool["attributes"]["tool"] == "get_entity_state"
+        assert tool["attributes"]["result_chars"] > 0
+        for span in trace["spans"]:
+            end_ms = span["start_ms"] + span["duration_ms"]
+            assert 0 <= span["start_ms"] <= end_ms <= trace["duration_ms"] + 0.01
+
+        # The cached answer is served with a fresh trace and never stores one
+        cached = await agent.process_query("Is the kitchen light on?", debug=True)
+        assert cached["debug"]["trace"]["trace_id"] != trace["trace_id"]
+        assert [s["name"] for s in cached["debug"]["trace"]["spans"]] == ["query"]
+        assert all(
+            "trace" not in cached_result["debug"]
+            for _, cached_result in agent._cache.values()
+        )
+
+        plain = await agent.process_query("Is it still on?")
+        assert plain == {"success": True, "answer": "Still on"}
+
+    @pytest.mark.asyncio
+    async def test_http_request_phases(self, mock_hass):
+        """Test that provider HTTP requests are split into phase spans."""
+        import aiohttp
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        from custom_components.ai_agent_ha import tracing
+
+        async def handler(request):
+            return web.Response(body=b"x" * 2048)
+
+        app = web.Application()
+        app.router.add_post("/v1/chat", handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            with tracing.trace_query() as trace:
+                with tracing.span("provider_call"):
+                    async with aiohttp.ClientSession(
+                        trace_configs=tracing.TRACE_CONFIGS
+                    ) as session:
+                        async with session.post(
+                            server.make_url("/v1/chat?key=secret"), data=b"{}"
+                        ) as resp:
+                            assert len(await resp.read()) == 2048
+        finally:
+            await server.close()
+
+        spans = {span["name"]: span for span in trace.as_dict()["spans"]}
+        http = spans["http"]
+        assert http["parent_id"] == spans["provider_call"]["span_id"]
+        assert "secret" not in http["attributes"]["url"]
+        assert http["attributes"]["status"] == 200
+        assert http["attributes"]["response_bytes"] == 2048
+        for phase in ("connect", "ttfb", "body"):
+            assert spans[phase]["parent_id"] == http["span_id"]
+        assert spans["body"]["attributes"]["bytes"] == 2048
+        assert spans["body"]["start_ms"] >= spans["ttfb"]["start_ms"]
+
+    def test_otlp_export(self, mock_hass, tmp_path):
+        """Test that traces are appended as OTLP/JSON lines."""
+        from custom_components.ai_agent_ha import tracing
+
+        # Spans outside a traced query are no-ops
+        assert tracing.start_span("orphan") is tracing.NOOP_SPAN
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                with tracing.trace_query(provider="openai") as trace:
+                    with tracing.span("tool", tool="get_history", hours=24):
+                        raise ValueError("boom")
+            path = tracing.export_otlp(str(tmp_path), trace)
+
+        lines = open(path, encoding="utf-8").read().splitlines()
+        assert len(lines) == 2
+        request = json.loads(lines[-1])
+        (resource_spans,) = request["resourceSpans"]
+        assert resource_spans["resource"]["attributes"][0]["value"] == {
+            "stringValue": "ai_agent_ha"
+        }
+        root, tool = resource_spans["scopeSpans"][0]["spans"]
+        assert root["traceId"] == tool["traceId"] == trace.trace_id
+        assert "parentSpanId" not in root
+        assert tool["parentSpanId"] == root["spanId"]
+        assert int(tool["startTimeUnixNano"]) <= int(tool["endTimeUnixNano"])
+        assert tool["status"] == {"code": 2, "message": "boom"}
+        assert {"key": "hours", "value": {"intValue": "24"}} in tool["attributes"]
+
+    @pytest.mark.asyncio
+    async def test_export_follows_option(self, mock_hass):
+        """Test that traces are exported only with the export_traces option."""
+        from custom_components.ai_agent_ha import tracing
+        from custom_components.ai_agent_ha.agent import AiAgentHaAgent
+
+        for export in (False, True):
+            mock_hass.async_add_executor_job.reset_mock()
+            agent = AiAgentHaAgent(
+                mock_hass,
+                {
+                    "ai_provider": "openai",
+                    "openai_token": "sk-test-token-1234567890abc",
+                    "export_traces": export,
+                },
+                persist_history=False,
+            )
+            agent._get_client = MagicMock(
+                return_value=MagicMock(
+                    get_response=AsyncMock(
+                        return_value='{"request_type": "final_response", '
+                        '"response": "Done"}'
+                    )
+                )
+            )
+            assert (await agent.process_query("Anything?"))["success"] is True
+            exported = [
+                call
+                for call in mock_hass.async_add_executor_job.call_args_list
+                if call.args[0] is tracing.export_otlp
+            ]
+            assert len(exported) == int(export)
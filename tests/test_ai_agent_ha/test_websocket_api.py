@@ -0,0 +1,110 @@
+"""Tests for the query WebSocket commands."""
+
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Add the parent directory to the path for direct imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+try:
+    import homeassistant
+
+    HOMEASSISTANT_AVAILABLE = True
+except ImportError:
+    HOMEASSISTANT_AVAILABLE = False
+
+
+@pytest.fixture
+def mock_hass():
+    """Create a mock hass object with one configured agent."""
+    if not HOMEASSISTANT_AVAILABLE:
+        pytest.skip("Home Assistant not available")
+    from custom_components.ai_agent_ha.const import DOMAIN
+
+    agent = MagicMock()
+    agent.process_query = AsyncMock(return_value={"success": True, "answer": "Done"})
+    hass = MagicMock()
+    hass.data = {DOMAIN: {"agents": {"openai": agent}}}
+    return hass
+
+
+class TestWebsocketQuery:
+    """Test that results go to the requesting connection only."""
+
+    @pytest.mark.asyncio
+    async def test_query_sends_result_to_connection(self, mock_hass):
+        """Test the query command with a provider fallback."""
+        from custom_components.ai_agent_ha.const import DOMAIN
+        from custom_components.ai_agent_ha.websocket_api import websocket_query
+
+        connection = MagicMock()
+        msg = {
+            "id": 7,
+            "prompt": "Lights?",
+            "provider": "gemini",
+            "debug": False,
+            "priority": "panel",
+        }
+        await websocket_query.__wrapped__(mock_hass, connection, msg)
+
+        agent = mock_hass.data[DOMAIN]["agents"]["openai"]
+        agent.process_query.assert_awaited_once_with(
+            "Lights?", provider="openai", debug=False, priority="panel"
+        )
+        connection.send_result.assert_called_once_with(
+            7, {"success": True, "answer": "Done"}
+        )
+        mock_hass.bus.async_fire.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_query_without_agents_sends_error(self, mock_hass):
+        """Test the error response when no agent is configured."""
+        from custom_components.ai_agent_ha.const import DOMAIN
+        from custom_components.ai_agent_ha.websocket_api import websocket_query
+
+        mock_hass.data[DOMAIN]["agents"] = {}
+        connection = MagicMock()
+        await websocket_query.__wrapped__(
+            mock_hass, connection, {"id": 1, "prompt": "Hi", "debug": False}
+        )
+
+        connection.send_error.assert_called_once()
+        connection.send_result.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_subscription_streams_progress_then_result(self, mock_hass):
+        """Test progress events followed by the final result event."""
+        from custom_components.ai_agent_ha.const import DOMAIN
+        from custom_components.ai_agent_ha.websocket_api import (
+            websocket_subscribe_query,
+        )
+
+        async def process_query(prompt, provider, debug, progress_callback, priority):
+            progress_callback({"stage": "requesting_ai", "iteration": 1})
+            progress_callback({"stage": "tool", "request_type": "get_entity_state"})
+            return {"success": True, "answer": "It is on"}
+
+        agent = mock_hass.data[DOMAIN]["agents"]["openai"]
+        agent.process_query = AsyncMock(side_effect=process_query)
+        connection = MagicMock()
+        connection.subscriptions = {}
+
+        await websocket_subscribe_query.__wrapped__(
+            mock_hass,
+            connection,
+            {"id": 3, "prompt": "Kitchen?", "debug": False, "priority": "panel"},
+        )
+
+        connection.send_result.assert_called_once_with(3)
+        events = [
+            call.args[0]["event"] for call in connection.send_message.call_args_list
+        ]
+        assert events == [
+            {"type": "progress", "stage": "requesting_ai", "iteration": 1},
+            {"type": "progress", "stage": "tool", "request_type": "get_entity_state"},
+            {"type": "result", "result": {"success": True, "answer": "It is on"}},
+        ]
+        assert connection.subscriptions == {}